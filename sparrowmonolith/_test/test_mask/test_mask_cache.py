@@ -0,0 +1,119 @@
+"""
+This section is dedicated to the testing of the mask cache and the
+fingerprints of the data arrays.
+"""
+
+import tempfile
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+
+def test_fingerprint_array():
+    """ This tests that fingerprints tell apart different arrays."""
+    dummy_array = np.random.normal(size=(50, 40))
+    fingerprint = mono.mask.fingerprint_array(data_array=dummy_array)
+    # The same values give the same fingerprint.
+    assert (fingerprint 
+            == mono.mask.fingerprint_array(data_array=dummy_array.copy())), (
+                "The same array has different fingerprints.")
+    # Different values, shapes, and types give different fingerprints.
+    changed_array = dummy_array.copy()
+    changed_array[10, 10] += 1
+    for otherdex in (changed_array, dummy_array.reshape(40, 50), 
+                     dummy_array.astype(np.float32)):
+        assert (fingerprint 
+                != mono.mask.fingerprint_array(data_array=otherdex)), (
+                    "Different arrays have the same fingerprint.")
+    # Sampled fingerprints are stable too.
+    assert (mono.mask.fingerprint_array(data_array=dummy_array, 
+                                        sample_size=100)
+            == mono.mask.fingerprint_array(data_array=dummy_array.copy(), 
+                                           sample_size=100)), (
+                "The same array has different sampled fingerprints.")
+    return None
+
+def test_mask_cache():
+    """ This tests that the mask cache returns the same masks as the
+    mask functions, only computing them once."""
+    dummy_array = np.random.normal(size=(50, 40))
+    mask_cache = mono.mask.MaskCache()
+    expected_mask = mono.mask.mask_sigma_value(data_array=dummy_array, 
+                                               sigma_multiple=1)
+    for __ in range(3):
+        test_mask = mask_cache.mask(mono.mask.mask_sigma_value, 
+                                    data_array=dummy_array, 
+                                    sigma_multiple=1)
+        assert np.array_equal(test_mask, expected_mask), (
+            "The cached mask is not the mask.")
+    assert (mask_cache.misses == 1) and (mask_cache.hits == 2), (
+        "The mask was not cached.")
+    assert not test_mask.flags.writeable, "The cached mask is writeable."
+    # Different parameters or data are different masks.
+    mask_cache.mask(mono.mask.mask_sigma_value, data_array=dummy_array, 
+                    sigma_multiple=2)
+    mask_cache.mask(mono.mask.mask_sigma_value, data_array=dummy_array + 1, 
+                    sigma_multiple=1)
+    assert mask_cache.misses == 3, "Different masks were mixed up."
+    # Geometric masks only depend on the shape.
+    for __ in range(2):
+        mask_cache.mask(mono.mask.mask_rectangle, 
+                        data_array=np.random.random((50, 40)), 
+                        column_range=[1, 5], row_range=[10, 20])
+    assert mask_cache.misses == 4, "The geometric mask was not cached."
+    # Only the listed geometric masks are keyed by the shape, others
+    # of the same module are keyed by their data.
+    def mask_geometric_values(data_array):
+        return data_array > 0.5
+    mask_geometric_values.__module__ = mono.mask.geometric.__name__
+    for __ in range(2):
+        dummy_array = np.random.random((50, 40))
+        test_mask = mask_cache.mask(mask_geometric_values, 
+                                    data_array=dummy_array)
+        assert np.array_equal(test_mask, dummy_array > 0.5), (
+            "The data dependent mask was taken by its shape.")
+    assert mask_cache.misses == 6, "The data dependent mask was cached."
+    return None
+
+def test_mask_cache_limits():
+    """ This tests the byte limit, the verification of sampled 
+    fingerprints, and the directory of the mask cache."""
+    dummy_array = np.random.normal(size=(50, 40))
+    # Only two masks fit in memory, the oldest is removed.
+    mask_cache = mono.mask.MaskCache(max_bytes=2 * dummy_array.size)
+    for sigmadex in (1, 2, 3):
+        mask_cache.mask(mono.mask.mask_sigma_value, data_array=dummy_array,
+                        sigma_multiple=sigmadex)
+    assert ((len(mask_cache) == 2) 
+            and (mask_cache.nbytes <= mask_cache.max_bytes)), (
+                "The cache is larger than its limit.")
+    mask_cache.mask(mono.mask.mask_sigma_value, data_array=dummy_array,
+                    sigma_multiple=1)
+    assert mask_cache.misses == 4, "The oldest mask was not removed."
+
+    # A change outside of the sample is caught by the verification.
+    mask_cache = mono.mask.MaskCache(sampled=True, verify=True, 
+                                     sample_size=10)
+    changed_array = dummy_array.copy()
+    changed_array[0, 1] = 100
+    mask_cache.mask(mono.mask.mask_maximum_value, data_array=dummy_array,
+                    maximum_value=10)
+    test_mask = mask_cache.mask(mono.mask.mask_maximum_value, 
+                                data_array=changed_array, maximum_value=10)
+    assert test_mask[0, 1], "The verification did not catch the change."
+
+    # Masks saved in the directory are found by other caches.
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        mask_cache = mono.mask.MaskCache(directory=temporary_directory)
+        expected_mask = mask_cache.mask(mono.mask.mask_sigma_value, 
+                                        data_array=dummy_array, 
+                                        sigma_multiple=1)
+        other_cache = mono.mask.MaskCache(directory=temporary_directory)
+        test_mask = other_cache.mask(mono.mask.mask_sigma_value, 
+                                     data_array=dummy_array, 
+                                     sigma_multiple=1)
+        assert np.array_equal(test_mask, expected_mask), (
+            "The saved mask is not the mask.")
+        assert other_cache.hits == 1, "The saved mask was not used."
+    return None
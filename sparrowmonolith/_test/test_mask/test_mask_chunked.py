@@ -0,0 +1,106 @@
+"""
+This section is dedicated to the testing of the out-of-core 
+evaluation of masks, which should be the same as the masks 
+evaluated in memory.
+"""
+
+import os
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+import sparrowmonolith as mono
+from sparrowmonolith.mask import expression as expr
+
+
+def test_mask_chunked():
+    """ This tests the chunked evaluation of expressions and mask
+    functions over a memory-mapped array against their masks in 
+    memory."""
+    dummy_array = np.random.normal(size=(150, 40))
+    dummy_array[np.random.random(dummy_array.shape) < 0.02] = np.nan
+    dummy_array[np.random.random(dummy_array.shape) < 0.02] *= 50
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        # The memory-mapped data.
+        data_filename = os.path.join(temporary_directory, 'data.dat')
+        memmap_array = np.memmap(data_filename, dtype=dummy_array.dtype, 
+                                 mode='w+', shape=dummy_array.shape)
+        memmap_array[...] = dummy_array
+        memmap_array.flush()
+        mask_filename = os.path.join(temporary_directory, 'mask.npy')
+
+        # Expressions with global statistics, in many small chunks.
+        for expressiondex in (
+                expr.sigma(sigma_multiple=2, sigma_iterations=None),
+                expr.count_truncation(top_count=40, bottom_count=25),
+                expr.percent_truncation(top_percent=0.1, 
+                                        bottom_percent=0.05),
+                (expr.invalid() | expr.sigma([1, 3], sigma_iterations=3)
+                 | expr.rect([1, 5], [100, 149]))):
+            expected_mask = expressiondex.evaluate(data_array=dummy_array)
+            test_mask = mono.mask.mask_chunked(
+                data_array=memmap_array, mask_expression=expressiondex,
+                filename=mask_filename, chunk_size=2000)
+            # Check that they are the same, and it is on disk.
+            assert_message = ("The expected mask and the created mask do "
+                              "not agree for {expr}. "
+                              "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                              .format(expr=expressiondex, t_mask=test_mask,
+                                      e_mask=expected_mask))
+            assert np.array_equal(test_mask, expected_mask), assert_message
+            assert np.array_equal(np.load(mask_filename), expected_mask), (
+                "The mask file does not match the mask.")
+            del test_mask
+
+        # A mask function.
+        expected_mask = mono.mask.mask_sigma_value(data_array=dummy_array,
+                                                   sigma_multiple=1.5,
+                                                   sigma_iterations=4)
+        test_mask = mono.mask.mask_chunked(
+            data_array=memmap_array, 
+            mask_expression=mono.mask.mask_sigma_value, chunk_size=2000, 
+            sigma_multiple=1.5, sigma_iterations=4)
+        assert np.array_equal(test_mask, expected_mask), (
+            "The expected mask and the created mask do not agree. "
+            "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+            .format(t_mask=test_mask, e_mask=expected_mask))
+        del memmap_array
+
+        # Truncating a large fraction of the data, the bounds are found
+        # by selection in passes, without holding the truncated values.
+        dummy_array = np.random.normal(size=(512, 1024))
+        memmap_array = np.memmap(data_filename, dtype=dummy_array.dtype, 
+                                 mode='w+', shape=dummy_array.shape)
+        memmap_array[...] = dummy_array
+        memmap_array.flush()
+        expression = expr.percent_truncation(top_percent=0.4, 
+                                             bottom_percent=0.4)
+        test_mask = np.empty(dummy_array.shape, dtype=bool)
+        tracemalloc.start()
+        mono.mask.mask_chunked(data_array=memmap_array, 
+                               mask_expression=expression, out=test_mask, 
+                               chunk_size=2**18)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert np.array_equal(test_mask, 
+                              expression.evaluate(data_array=dummy_array))
+        assert peak_memory < 0.5 * dummy_array.nbytes, (
+            "The chunked truncation used {peak} bytes for {size} bytes of "
+            "data.".format(peak=peak_memory, size=dummy_array.nbytes))
+        # Gathering only a few values at a time narrows the pivots over 
+        # many passes.
+        windows = mono.mask.expression._tile_windows(
+            shape=dummy_array.shape, itemsize=dummy_array.itemsize, 
+            tile_size=2**18)
+        lower_bound, upper_bound = (
+            mono.mask.chunked._chunked_truncation_bounds(
+                data_array=memmap_array, windows=windows, 
+                truncation_counts=lambda n_data_points: (1000, 200000), 
+                gather_size=100))
+        sorted_values = np.sort(dummy_array, axis=None)
+        assert lower_bound == sorted_values[200000]
+        assert upper_bound == sorted_values[-1001]
+        del memmap_array
+    return None
@@ -0,0 +1,105 @@
+"""
+This section is dedicated to the testing of the coverage statistics
+of masks.
+"""
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+
+def test_mask_coverage():
+    """ This tests the coverage statistics from boolean masks and
+    from bitmasks."""
+    def boolean_masks():
+        # The coverage statistics against those computed plainly, 
+        # mask by mask.
+        for n_masks in (1, 4, 14):
+            dummy_masks = [np.random.random((3, 17, 23)) 
+                           < np.random.random() for __ in range(n_masks)]
+            overlap = np.array([[np.count_nonzero(firstdex & seconddex)
+                                 for seconddex in dummy_masks] 
+                                for firstdex in dummy_masks])
+            exclusive_counts = []
+            for indexdex in range(n_masks):
+                other_masks = np.zeros(dummy_masks[0].shape, dtype=bool)
+                for otherdex in range(n_masks):
+                    if (otherdex != indexdex):
+                        other_masks |= dummy_masks[otherdex]
+                exclusive_counts.append(np.count_nonzero(
+                    dummy_masks[indexdex] & ~other_masks))
+            union_count = np.count_nonzero(np.any(dummy_masks, axis=0))
+
+            coverage = mono.mask.mask_coverage(masks=dummy_masks)
+            assert np.array_equal(coverage['overlap'], overlap)
+            assert np.array_equal(coverage['exclusive_counts'], 
+                                  exclusive_counts)
+            assert coverage['union_count'] == union_count
+            assert np.allclose(coverage['fractions'],
+                               [np.mean(maskdex) for maskdex in dummy_masks])
+            # Over the rows and columns of the images.
+            for indexdex, maskdex in enumerate(dummy_masks):
+                assert np.array_equal(coverage['row_counts'][indexdex],
+                                      np.sum(maskdex, axis=(0, 2)))
+                assert np.array_equal(coverage['column_counts'][indexdex],
+                                      np.sum(maskdex, axis=(0, 1)))
+        return None
+    def bitmasks():
+        # The same masks as a bitmask have the same coverage.
+        for n_masks in (1, 4, 14):
+            dummy_masks = [np.random.random((3, 17, 23)) 
+                           < np.random.random() for __ in range(n_masks)]
+            dummy_bitmask = np.zeros((3, 17, 23), dtype=np.int32)
+            for indexdex, maskdex in enumerate(dummy_masks):
+                dummy_bitmask |= maskdex.astype(np.int32) << indexdex
+            coverage = mono.mask.mask_coverage(masks=dummy_masks)
+            bitmask_coverage = mono.mask.mask_coverage(
+                masks=dummy_bitmask, names=list(range(n_masks)))
+            for keydex in ('counts', 'exclusive_counts', 'overlap',
+                           'union_count', 'row_counts', 'column_counts'):
+                assert np.array_equal(bitmask_coverage[keydex],
+                                      coverage[keydex]), keydex
+        return None
+
+    def signed_bitmasks():
+        # The sign bit of a signed bitmask is its highest bit.
+        coverage = mono.mask.mask_coverage(
+            masks=np.array([[1, -1]], dtype=np.int8))
+        assert coverage['names'] == list(range(8))
+        assert np.array_equal(coverage['counts'], [2, 1, 1, 1, 1, 1, 1, 1])
+        dummy_masks = [np.random.random((17, 23)) < 0.5 for __ in range(16)]
+        dummy_bitmask = np.zeros((17, 23), dtype=np.uint16)
+        for indexdex, maskdex in enumerate(dummy_masks):
+            dummy_bitmask |= maskdex.astype(np.uint16) << indexdex
+        bitmask_coverage = mono.mask.mask_coverage(
+            masks=dummy_bitmask.view(np.int16))
+        coverage = mono.mask.mask_coverage(masks=dummy_masks)
+        for keydex in ('names', 'counts', 'exclusive_counts', 'overlap'):
+            assert np.array_equal(bitmask_coverage[keydex],
+                                  coverage[keydex]), keydex
+        return None
+
+    # Run the tests.
+    boolean_masks()
+    bitmasks()
+    signed_bitmasks()
+    # All done.
+    return None
+
+def test_mask_coverage_table():
+    """ This tests the summary table of the coverage statistics."""
+    dummy_array = np.random.normal(size=(20, 30))
+    dummy_array[np.random.random(dummy_array.shape) < 0.1] = np.nan
+    masks = {'nan': mono.mask.mask_invalid_nan(data_array=dummy_array),
+             'high': mono.mask.mask_maximum_value(data_array=dummy_array,
+                                                  maximum_value=1),
+             'columns': mono.mask.mask_columns(data_array=dummy_array,
+                                               column_list=[0, 29])}
+    coverage_table = mono.mask.mask_coverage_table(
+        coverage=mono.mask.mask_coverage(masks=masks))
+    assert list(coverage_table['name']) == ['nan', 'high', 'columns']
+    assert list(coverage_table['count']) == [
+        np.count_nonzero(maskdex) for maskdex in masks.values()]
+    assert coverage_table.meta['union_count'] == np.count_nonzero(
+        masks['nan'] | masks['high'] | masks['columns'])
+    return None
@@ -0,0 +1,536 @@
+"""
+This section is dedicated to the testing of the lazy mask
+expressions, which should be the same as the masks they describe.
+"""
+
+import numpy as np
+
+import sparrowmonolith as mono
+from sparrowmonolith.mask import expression as expr
+
+
+def test_expression_combination():
+    """ This tests a combination of value, invalid, and geometric
+    expressions against the same combination of masks."""
+    # The dummy array, with some invalid values.
+    dummy_array = np.random.normal(size=(60, 40))
+    dummy_array[np.random.random(dummy_array.shape) < 0.02] = np.inf
+    column_list = [3, 17, 39]
+
+    # The expression and the expected mask.
+    mask_expression = ((expr.invalid() | expr.maximum(1.5)
+                        | expr.minimum(-1) | expr.rect([10, 20], [5, 30]))
+                       & ~expr.columns(column_list))
+    expected_mask = ((mono.mask.mask_invalid_all(data_array=dummy_array)
+                      | mono.mask.mask_maximum_value(
+                          data_array=dummy_array, maximum_value=1.5)
+                      | mono.mask.mask_minimum_value(
+                          data_array=dummy_array, minimum_value=-1)
+                      | mono.mask.mask_rectangle(data_array=dummy_array,
+                                                 column_range=[10, 20],
+                                                 row_range=[5, 30]))
+                     & ~mono.mask.mask_columns(data_array=dummy_array,
+                                               column_list=column_list))
+    # A small tile size ensures that many tiles are used.
+    test_mask = mask_expression.evaluate(data_array=dummy_array,
+                                         tile_size=1000)
+
+    # Check that they are the same.
+    assert_message = ("The expected mask and the created mask do not agree. "
+                      "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                      .format(t_mask=test_mask, e_mask=expected_mask))
+    assert np.array_equal(test_mask, expected_mask), assert_message
+    return None
+
+def test_expression_global():
+    """ This tests expressions which need the statistics of the
+    entire array, evaluated in tiles."""
+    dummy_array = np.random.normal(size=(50, 30))
+
+    mask_expression = (expr.sigma(2, sigma_iterations=2)
+                       | expr.count_truncation(top_count=10,
+                                               bottom_count=20)
+                       | expr.pixels(column_indexes=[1, 2, 3],
+                                     row_indexes=[49, 0, 25])
+                       | expr.rows([-1, 7]))
+    expected_mask = (mono.mask.mask_sigma_value(data_array=dummy_array,
+                                                sigma_multiple=2,
+                                                sigma_iterations=2)
+                     | mono.mask.mask_count_truncation(
+                         data_array=dummy_array, top_count=10,
+                         bottom_count=20)
+                     | mono.mask.mask_single_pixels(
+                         data_array=dummy_array, column_indexes=[1, 2, 3],
+                         row_indexes=[49, 0, 25])
+                     | mono.mask.mask_rows(data_array=dummy_array,
+                                           row_list=[-1, 7]))
+    test_mask = mask_expression.evaluate(data_array=dummy_array,
+                                         tile_size=1000)
+
+    # Check that they are the same.
+    assert_message = ("The expected mask and the created mask do not agree. "
+                      "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                      .format(t_mask=test_mask, e_mask=expected_mask))
+    assert np.array_equal(test_mask, expected_mask), assert_message
+    return None
+
+def test_expression_constant():
+    """ This tests expressions made from functions and already
+    computed dense and sparse masks."""
+    dummy_array = np.random.normal(size=(50, 30))
+    dense_mask = np.random.random(dummy_array.shape) < 0.1
+    sparse_mask = mono.mask.sparse_mask(
+        mask=np.random.random(dummy_array.shape) < 0.1, kind='run_length')
+
+    mask_expression = (expr.function(mono.mask.mask_circle,
+                                     center_column=10, center_row=20,
+                                     radius=8)
+                       | sparse_mask) ^ dense_mask
+    expected_mask = ((mono.mask.mask_circle(data_array=dummy_array,
+                                            center_column=10,
+                                            center_row=20, radius=8)
+                      | sparse_mask.to_dense()) ^ dense_mask)
+    test_mask = mask_expression.evaluate(data_array=dummy_array,
+                                         tile_size=1000)
+
+    # Check that they are the same.
+    assert_message = ("The expected mask and the created mask do not agree. "
+                      "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                      .format(t_mask=test_mask, e_mask=expected_mask))
+    assert np.array_equal(test_mask, expected_mask), assert_message
+    return None
+
+def test_invalid():
+    """ This tests the invalid value expression."""
+    def nan_and_infinity():
+        dummy_array = np.random.normal(size=(20, 30))
+        dummy_array[np.random.random(dummy_array.shape) < 0.1] = np.nan
+        dummy_array[np.random.random(dummy_array.shape) < 0.1] = -np.inf
+        mask_expression = expr.invalid()
+        expected_mask = mono.mask.mask_invalid_all(data_array=dummy_array)
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    nan_and_infinity()
+    # All done.
+    return None
+
+def test_sigma():
+    """ This tests the sigma value expression."""
+    def iterated_sigma():
+        dummy_array = np.random.normal(size=(20, 30))
+        mask_expression = expr.sigma(sigma_multiple=1, sigma_iterations=3)
+        expected_mask = mono.mask.mask_sigma_value(data_array=dummy_array, 
+                                                   sigma_multiple=1,
+                                                   sigma_iterations=3)
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    iterated_sigma()
+    # All done.
+    return None
+
+def test_minimum():
+    """ This tests the minimum value expression."""
+    def minimum_value():
+        dummy_array = np.random.normal(size=(20, 30))
+        mask_expression = expr.minimum(minimum_value=0.5)
+        expected_mask = mono.mask.mask_minimum_value(data_array=dummy_array,
+                                                     minimum_value=0.5)
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    minimum_value()
+    # All done.
+    return None
+
+def test_maximum():
+    """ This tests the maximum value expression."""
+    def maximum_value():
+        dummy_array = np.random.normal(size=(20, 30))
+        mask_expression = expr.maximum(maximum_value=0.5)
+        expected_mask = mono.mask.mask_maximum_value(data_array=dummy_array,
+                                                     maximum_value=0.5)
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    maximum_value()
+    # All done.
+    return None
+
+def test_exact():
+    """ This tests the exact value expression."""
+    def integer_value():
+        dummy_array = np.random.randint(0, 5, size=(20, 30))
+        mask_expression = expr.exact(exact_value=3)
+        expected_mask = mono.mask.mask_exact_value(data_array=dummy_array,
+                                                   exact_value=3)
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    integer_value()
+    # All done.
+    return None
+
+def test_exact_values():
+    """ This tests the exact values expression."""
+    def values_with_tolerance():
+        dummy_array = np.random.randint(0, 50, size=(20, 30)).astype(float)
+        mask_expression = expr.exact_values(exact_values=[3, 10, 40], 
+                                            tolerance=1)
+        expected_mask = mono.mask.mask_exact_values(
+            data_array=dummy_array, exact_values=[3, 10, 40], tolerance=1)
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    values_with_tolerance()
+    # All done.
+    return None
+
+def test_count_truncation():
+    """ This tests the count truncation expression."""
+    def top_and_bottom():
+        dummy_array = np.random.normal(size=(20, 30))
+        mask_expression = expr.count_truncation(top_count=15, 
+                                                bottom_count=40)
+        expected_mask = mono.mask.mask_count_truncation(
+            data_array=dummy_array, top_count=15, bottom_count=40)
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    top_and_bottom()
+    # All done.
+    return None
+
+def test_percent_truncation():
+    """ This tests the percent truncation expression."""
+    def top_and_bottom():
+        dummy_array = np.random.normal(size=(20, 30))
+        mask_expression = expr.percent_truncation(top_percent=0.1, 
+                                                  bottom_percent=0.05)
+        expected_mask = mono.mask.mask_percent_truncation(
+            data_array=dummy_array, top_percent=0.1, bottom_percent=0.05)
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    top_and_bottom()
+    # All done.
+    return None
+
+def test_pixels():
+    """ This tests the single pixels expression."""
+    def random_pixels():
+        dummy_array = np.random.normal(size=(20, 30))
+        column_indexes = np.random.randint(0, 30, size=50)
+        row_indexes = np.random.randint(0, 20, size=50)
+        mask_expression = expr.pixels(column_indexes=column_indexes, 
+                                      row_indexes=row_indexes)
+        expected_mask = mono.mask.mask_single_pixels(
+            data_array=dummy_array, column_indexes=column_indexes, 
+            row_indexes=row_indexes)
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    random_pixels()
+    # All done.
+    return None
+
+def test_rectangle():
+    """ This tests the rectangle expression."""
+    def inner_rectangle():
+        dummy_array = np.random.normal(size=(20, 30))
+        mask_expression = expr.rectangle(column_range=[4, 25], 
+                                         row_range=[3, 11])
+        expected_mask = mono.mask.mask_rectangle(
+            data_array=dummy_array, column_range=[4, 25], row_range=[3, 11])
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    inner_rectangle()
+    # All done.
+    return None
+# Aliases
+def test_rect(): return test_rectangle()
+
+def test_subarray():
+    """ This tests the sub-array expression."""
+    def inner_subarray():
+        dummy_array = np.random.normal(size=(20, 30))
+        mask_expression = expr.subarray(column_range=[4, 25], 
+                                        row_range=[3, 11])
+        expected_mask = mono.mask.mask_subarray(
+            data_array=dummy_array, column_range=[4, 25], row_range=[3, 11])
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    inner_subarray()
+    # All done.
+    return None
+
+def test_columns():
+    """ This tests the columns expression."""
+    def edge_columns():
+        dummy_array = np.random.normal(size=(20, 30))
+        mask_expression = expr.columns(column_list=[0, 5, 29])
+        expected_mask = mono.mask.mask_columns(data_array=dummy_array, 
+                                               column_list=[0, 5, 29])
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    edge_columns()
+    # All done.
+    return None
+
+def test_rows():
+    """ This tests the rows expression, in images and in stacks."""
+    def image_rows():
+        dummy_array = np.random.normal(size=(20, 30))
+        mask_expression = expr.rows(row_list=[0, 5, -1])
+        expected_mask = mono.mask.mask_rows(data_array=dummy_array, 
+                                            row_list=[0, 5, -1])
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+    def stack_rows():
+        dummy_array = np.random.normal(size=(4, 20, 30))
+        mask_expression = expr.rows(row_list=[0, 5, -1])
+        expected_mask = mono.mask.mask_rows(data_array=dummy_array, 
+                                            row_list=[0, 5, -1])
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    image_rows()
+    stack_rows()
+    # All done.
+    return None
+
+def test_constant():
+    """ This tests the constant expression of dense and sparse masks.
+    """
+    def dense_mask():
+        dummy_array = np.random.normal(size=(20, 30))
+        expected_mask = np.random.random(dummy_array.shape) < 0.1
+        mask_expression = expr.constant(mask=expected_mask)
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+    def sparse_mask():
+        dummy_array = np.random.normal(size=(20, 30))
+        expected_mask = np.random.random(dummy_array.shape) < 0.1
+        mask_expression = expr.constant(mask=mono.mask.sparse_mask(
+            mask=expected_mask, kind='coordinate'))
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    dense_mask()
+    sparse_mask()
+    # All done.
+    return None
+
+def test_function():
+    """ This tests the expression of any mask function."""
+    def annulus_function():
+        dummy_array = np.random.normal(size=(20, 30))
+        mask_expression = expr.function(mono.mask.mask_annulus, 
+                                        center_column=10, center_row=10, 
+                                        inner_radius=2, outer_radius=7)
+        expected_mask = mono.mask.mask_annulus(
+            data_array=dummy_array, center_column=10, center_row=10, 
+            inner_radius=2, outer_radius=7)
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    annulus_function()
+    # All done.
+    return None
+
+def test_elementwise():
+    """ This tests the expression of element-wise mask functions."""
+    def infinity_function():
+        dummy_array = np.random.normal(size=(20, 30))
+        dummy_array[np.random.random(dummy_array.shape) < 0.1] = np.inf
+        mask_expression = expr.elementwise(mono.mask.mask_invalid_infinity)
+        expected_mask = mono.mask.mask_invalid_infinity(
+            data_array=dummy_array)
+        # Evaluate the expression in many small tiles and check that 
+        # it is the same as the expected mask.
+        test_mask = mask_expression.evaluate(data_array=dummy_array, 
+                                             tile_size=500)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Expression: {expr} "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(expr=mask_expression, t_mask=test_mask, 
+                                  e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    # Run the tests.
+    infinity_function()
+    # All done.
+    return None
@@ -170,6 +170,150 @@ def test_mask_rows():
     # All done.
     return None
 
+def test_mask_circle():
+    """ This tests the masking of a circle in an array.
+    """
+    # Dummy data array to use.
+    dummy_array = np.random.rand(7,7)
+    # The masking that should be produced by the masking function.
+    expected_mask = [[0, 0, 0, 0, 0, 0, 0],
+                     [0, 0, 0, 1, 0, 0, 0],
+                     [0, 0, 1, 1, 1, 0, 0],
+                     [0, 1, 1, 1, 1, 1, 0],
+                     [0, 0, 1, 1, 1, 0, 0],
+                     [0, 0, 0, 1, 0, 0, 0],
+                     [0, 0, 0, 0, 0, 0, 0]]
+    expected_mask = np.array(expected_mask, dtype=bool)
+
+    # Making the test mask.
+    test_mask = mono.mask.mask_circle(
+        data_array=dummy_array, center_column=3, center_row=3, radius=2)
+
+    # Check that they are the same.
+    assert_message = ("The expected mask and the created mask do not agree. "
+                      "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                      .format(t_mask=test_mask, e_mask=expected_mask))
+    assert np.array_equal(test_mask, expected_mask), assert_message
+    # All done.
+    return None
+
+def test_mask_annulus():
+    """ This tests the masking of an annulus in an array, against a 
+    direct computation over the whole array.
+    """
+    # Dummy data array to use, the annulus goes off of the edge.
+    dummy_array = np.random.rand(40,50)
+    row_grid, column_grid = np.indices(dummy_array.shape)
+    distance = np.hypot(column_grid - 45.3, row_grid - 12.6)
+    expected_mask = (4.5 <= distance) & (distance <= 11.2)
+
+    # Making the test mask.
+    test_mask = mono.mask.mask_annulus(
+        data_array=dummy_array, center_column=45.3, center_row=12.6, 
+        inner_radius=4.5, outer_radius=11.2)
+
+    # Check that they are the same.
+    assert_message = ("The expected mask and the created mask do not agree. "
+                      "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                      .format(t_mask=test_mask, e_mask=expected_mask))
+    assert np.array_equal(test_mask, expected_mask), assert_message
+    # All done.
+    return None
+
+def test_mask_ellipse():
+    """ This tests the masking of a rotated ellipse in an array, 
+    against a direct computation over the whole array.
+    """
+    # Dummy data array to use.
+    dummy_array = np.random.rand(40,50)
+    row_grid, column_grid = np.indices(dummy_array.shape)
+    angle = 0.6
+    major = ((column_grid - 25.5) * np.cos(angle) 
+             + (row_grid - 18.2) * np.sin(angle))
+    minor = ((row_grid - 18.2) * np.cos(angle) 
+             - (column_grid - 25.5) * np.sin(angle))
+    expected_mask = (major / 15)**2 + (minor / 6)**2 <= 1
+
+    # Making the test mask.
+    test_mask = mono.mask.mask_ellipse(
+        data_array=dummy_array, center_column=25.5, center_row=18.2, 
+        column_radius=15, row_radius=6, angle=angle)
+
+    # Check that they are the same.
+    assert_message = ("The expected mask and the created mask do not agree. "
+                      "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                      .format(t_mask=test_mask, e_mask=expected_mask))
+    assert np.array_equal(test_mask, expected_mask), assert_message
+    # All done.
+    return None
+
+def test_mask_polygon():
+    """ This tests the masking of a polygon in an array.
+    """
+    # Dummy data array to use.
+    dummy_array = np.random.rand(6,6)
+    # The masking that should be produced by the masking function, 
+    # a triangle.
+    expected_mask = [[0, 0, 0, 0, 0, 0],
+                     [0, 1, 1, 1, 1, 0],
+                     [0, 1, 1, 1, 0, 0],
+                     [0, 1, 1, 0, 0, 0],
+                     [0, 1, 0, 0, 0, 0],
+                     [0, 0, 0, 0, 0, 0]]
+    expected_mask = np.array(expected_mask, dtype=bool)
+
+    # The vertices are slightly outside of the pixels to avoid pixel 
+    # centers on the edges.
+    column_vertices = [0.5, 4.7, 0.5]
+    row_vertices = [0.5, 0.5, 4.7]
+
+    # Making the test mask.
+    test_mask = mono.mask.mask_polygon(
+        data_array=dummy_array, column_vertices=column_vertices, 
+        row_vertices=row_vertices)
+
+    # Check that they are the same.
+    assert_message = ("The expected mask and the created mask do not agree. "
+                      "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                      .format(t_mask=test_mask, e_mask=expected_mask))
+    assert np.array_equal(test_mask, expected_mask), assert_message
+    # All done.
+    return None
+
+def test_mask_circles():
+    """ This tests the masking of many circles at once, which should 
+    be the same as masking each circle on its own.
+    """
+    # Dummy data array to use.
+    dummy_array = np.random.rand(40,50)
+    center_columns = np.random.rand(100) * 50
+    center_rows = np.random.rand(100) * 40
+    radii = np.random.rand(100) * 4
+    # One large circle, the chunks of the small circles are sized by
+    # their own stencils.
+    radii[17] = 15
+
+    # The expected mask, one circle at a time.
+    expected_mask = mono.mask.mask_nothing(data_array=dummy_array)
+    for columndex, rowdex, radiusdex in zip(center_columns, center_rows, 
+                                            radii):
+        expected_mask |= mono.mask.mask_circle(
+            data_array=dummy_array, center_column=columndex, 
+            center_row=rowdex, radius=radiusdex)
+
+    # Making the test mask, a small chunk size tests the chunking.
+    test_mask = mono.mask.mask_circles(
+        data_array=dummy_array, center_columns=center_columns, 
+        center_rows=center_rows, radii=radii, chunk_size=200)
+
+    # Check that they are the same.
+    assert_message = ("The expected mask and the created mask do not agree. "
+                      "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                      .format(t_mask=test_mask, e_mask=expected_mask))
+    assert np.array_equal(test_mask, expected_mask), assert_message
+    # All done.
+    return None
+
 def test_mask_nothing():
     """ This tests the masking of nothing in an array.
     """
@@ -230,14 +374,127 @@ def test_mask_everything():
     # All done.
     return None
 
+def test_mask_stack_single_pixels():
+    """ This tests the masking of single pixels in a stack of arrays.
+    """
+    def broadcast_single_mask():
+        # Every array of the stack should have the same mask as the 
+        # single array version.
+        dummy_stack = np.random.rand(4,6,6)
+        parameters = {'column_indexes':[1,2,3,5,5,5], 
+                      'row_indexes':[3,1,4,0,3,5]}
+        test_mask = mono.mask.mask_stack_single_pixels(
+            data_stack=dummy_stack, **parameters)
+        expected_mask = np.broadcast_to(
+            mono.mask.mask_single_pixels(
+                data_array=dummy_stack[0], **parameters),
+            dummy_stack.shape)
+
+        # Check that they are the same.
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Test: \n {t_mask} \n Expected: \n "
+                          "{e_mask}".format(t_mask=test_mask, 
+                                            e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        # The single mask is shared by every array.
+        assert test_mask.strides[0] == 0, ("The stack mask is not a "
+                                           "broadcast of a single mask.")
+        return None
+
+    # Run the tests.
+    broadcast_single_mask()
+    # All done.
+    return None
 
+def test_mask_stack_rectangle():
+    """ This tests the masking of a rectangle in a stack of arrays.
+    """
+    def broadcast_single_mask():
+        # Every array of the stack should have the same mask as the 
+        # single array version.
+        dummy_stack = np.random.rand(4,6,6)
+        parameters = {'column_range':[2,4], 'row_range':[1,4]}
+        test_mask = mono.mask.mask_stack_rectangle(
+            data_stack=dummy_stack, **parameters)
+        expected_mask = np.broadcast_to(
+            mono.mask.mask_rectangle(
+                data_array=dummy_stack[0], **parameters),
+            dummy_stack.shape)
+
+        # Check that they are the same.
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Test: \n {t_mask} \n Expected: \n "
+                          "{e_mask}".format(t_mask=test_mask, 
+                                            e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        # The single mask is shared by every array.
+        assert test_mask.strides[0] == 0, ("The stack mask is not a "
+                                           "broadcast of a single mask.")
+        return None
+
+    # Run the tests.
+    broadcast_single_mask()
+    # All done.
+    return None
 
+def test_mask_stack_columns():
+    """ This tests the masking of columns in a stack of arrays.
+    """
+    def broadcast_single_mask():
+        # Every array of the stack should have the same mask as the 
+        # single array version.
+        dummy_stack = np.random.rand(4,6,6)
+        parameters = {'column_list':[1,4,5]}
+        test_mask = mono.mask.mask_stack_columns(
+            data_stack=dummy_stack, **parameters)
+        expected_mask = np.broadcast_to(
+            mono.mask.mask_columns(
+                data_array=dummy_stack[0], **parameters),
+            dummy_stack.shape)
+
+        # Check that they are the same.
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Test: \n {t_mask} \n Expected: \n "
+                          "{e_mask}".format(t_mask=test_mask, 
+                                            e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        # The single mask is shared by every array.
+        assert test_mask.strides[0] == 0, ("The stack mask is not a "
+                                           "broadcast of a single mask.")
+        return None
+
+    # Run the tests.
+    broadcast_single_mask()
+    # All done.
+    return None
 
-
-
-
-
-
-
-
-
+def test_mask_stack_rows():
+    """ This tests the masking of rows in a stack of arrays.
+    """
+    def broadcast_single_mask():
+        # Every array of the stack should have the same mask as the 
+        # single array version.
+        dummy_stack = np.random.rand(4,6,6)
+        parameters = {'row_list':[1,2,4,5]}
+        test_mask = mono.mask.mask_stack_rows(
+            data_stack=dummy_stack, **parameters)
+        expected_mask = np.broadcast_to(
+            mono.mask.mask_rows(
+                data_array=dummy_stack[0], **parameters),
+            dummy_stack.shape)
+
+        # Check that they are the same.
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. \n Test: \n {t_mask} \n Expected: \n "
+                          "{e_mask}".format(t_mask=test_mask, 
+                                            e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+        # The single mask is shared by every array.
+        assert test_mask.strides[0] == 0, ("The stack mask is not a "
+                                           "broadcast of a single mask.")
+        return None
+
+    # Run the tests.
+    broadcast_single_mask()
+    # All done.
+    return None
@@ -0,0 +1,227 @@
+"""
+This section is dedicated to the testing of the instrumentation of
+the mask functions.
+"""
+
+import os
+import json
+import tempfile
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+
+def test_enable_mask_instrumentation():
+    """ This tests that the calls are recorded while enabled, and
+    nested calls are recorded with their depth."""
+    def wrapped_functions():
+        original_function = mono.mask.mask_sigma_value
+        mono.mask.reset_mask_instrumentation()
+        mono.mask.enable_mask_instrumentation()
+        try:
+            assert mono.mask.mask_sigma_value is not original_function
+            assert (mono.mask.value.mask_band_value
+                    is mono.mask.mask_band_value)
+            assert mono.mask.mask_sigma_value.__name__ == 'mask_sigma_value'
+        finally:
+            mono.mask.disable_mask_instrumentation()
+        return None
+    def recorded_calls():
+        # A few masks, recorded.
+        mono.mask.reset_mask_instrumentation()
+        mono.mask.enable_mask_instrumentation()
+        try:
+            dummy_array = np.random.normal(size=(200, 300))
+            for __ in range(3):
+                mono.mask.mask_sigma_value(data_array=dummy_array,
+                                           sigma_multiple=3)
+            mono.mask.mask_invalid_all(data_array=dummy_array)
+        finally:
+            mono.mask.disable_mask_instrumentation()
+        records = mono.mask.mask_instrumentation_records()
+        sigma_records = [recorddex for recorddex in records
+                         if (recorddex['function'] == 'mask_sigma_value')]
+        assert len(sigma_records) == 3
+        for recorddex in sigma_records:
+            assert recorddex['depth'] == 0
+            assert recorddex['time'] > 0
+            assert recorddex['input_bytes'] == dummy_array.nbytes
+            assert recorddex['output_bytes'] == dummy_array.size
+            # At least the mask itself is allocated.
+            assert recorddex['allocated_bytes'] >= dummy_array.size
+        # The band mask is called within the sigma mask.
+        band_records = [recorddex for recorddex in records
+                        if (recorddex['function'] == 'mask_band_value')]
+        assert len(band_records) >= 3
+        assert all((recorddex['depth'] == 1)
+                   and (recorddex['allocated_bytes'] is None)
+                   for recorddex in band_records[:3])
+        return None
+
+    # Run the tests.
+    wrapped_functions()
+    recorded_calls()
+    # All done.
+    return None
+
+def test_disable_mask_instrumentation():
+    """ This tests that the original functions are put back."""
+    def restored_functions():
+        original_functions = {namedex: getattr(mono.mask, namedex)
+                              for namedex in ('mask_sigma_value',
+                                              'mask_band_value',
+                                              'mask_invalid_nan')}
+        # A few masks, recorded.
+        mono.mask.reset_mask_instrumentation()
+        mono.mask.enable_mask_instrumentation()
+        try:
+            dummy_array = np.random.normal(size=(200, 300))
+            for __ in range(3):
+                mono.mask.mask_sigma_value(data_array=dummy_array,
+                                           sigma_multiple=3)
+            mono.mask.mask_invalid_all(data_array=dummy_array)
+        finally:
+            mono.mask.disable_mask_instrumentation()
+        for namedex, functiondex in original_functions.items():
+            assert getattr(mono.mask, namedex) is functiondex
+        assert mono.mask.value.mask_band_value is \
+            original_functions['mask_band_value']
+        # Nothing more is recorded.
+        n_records = len(mono.mask.mask_instrumentation_records())
+        mono.mask.mask_invalid_nan(data_array=np.zeros(3))
+        assert len(mono.mask.mask_instrumentation_records()) == n_records
+        return None
+
+    # Run the tests.
+    restored_functions()
+    # All done.
+    return None
+
+def test_reset_mask_instrumentation():
+    """ This tests the removal of what was recorded."""
+    def removed_records():
+        # A few masks, recorded.
+        mono.mask.reset_mask_instrumentation()
+        mono.mask.enable_mask_instrumentation()
+        try:
+            dummy_array = np.random.normal(size=(200, 300))
+            for __ in range(3):
+                mono.mask.mask_sigma_value(data_array=dummy_array,
+                                           sigma_multiple=3)
+            mono.mask.mask_invalid_all(data_array=dummy_array)
+        finally:
+            mono.mask.disable_mask_instrumentation()
+        mono.mask.reset_mask_instrumentation()
+        assert mono.mask.mask_instrumentation_records() == []
+        assert len(mono.mask.mask_instrumentation_table()) == 0
+        return None
+
+    # Run the tests.
+    removed_records()
+    # All done.
+    return None
+
+def test_mask_instrumentation_records():
+    """ This tests the sampling of the allocations of the calls."""
+    def sampled_allocations():
+        # A few masks, recorded with every other call measured.
+        mono.mask.reset_mask_instrumentation()
+        mono.mask.enable_mask_instrumentation(memory_interval=2)
+        try:
+            dummy_array = np.random.normal(size=(200, 300))
+            for __ in range(3):
+                mono.mask.mask_sigma_value(data_array=dummy_array,
+                                           sigma_multiple=3)
+            mono.mask.mask_invalid_all(data_array=dummy_array)
+        finally:
+            mono.mask.disable_mask_instrumentation()
+        sigma_records = [recorddex for recorddex
+                         in mono.mask.mask_instrumentation_records()
+                         if (recorddex['function'] == 'mask_sigma_value')]
+        # Only the first and third calls are measured.
+        assert [recorddex['allocated_bytes'] is None
+                for recorddex in sigma_records] == [False, True, False]
+        return None
+    def no_allocations():
+        # A few masks, recorded with no call measured.
+        mono.mask.reset_mask_instrumentation()
+        mono.mask.enable_mask_instrumentation(memory_interval=0)
+        try:
+            dummy_array = np.random.normal(size=(200, 300))
+            for __ in range(3):
+                mono.mask.mask_sigma_value(data_array=dummy_array,
+                                           sigma_multiple=3)
+            mono.mask.mask_invalid_all(data_array=dummy_array)
+        finally:
+            mono.mask.disable_mask_instrumentation()
+        assert all(recorddex['allocated_bytes'] is None for recorddex
+                   in mono.mask.mask_instrumentation_records())
+        return None
+
+    # Run the tests.
+    sampled_allocations()
+    no_allocations()
+    # All done.
+    return None
+
+def test_mask_instrumentation_table():
+    """ This tests the summary of the calls of every function."""
+    def summarized_calls():
+        # A few masks, recorded.
+        mono.mask.reset_mask_instrumentation()
+        mono.mask.enable_mask_instrumentation()
+        try:
+            dummy_array = np.random.normal(size=(200, 300))
+            for __ in range(3):
+                mono.mask.mask_sigma_value(data_array=dummy_array,
+                                           sigma_multiple=3)
+            mono.mask.mask_invalid_all(data_array=dummy_array)
+        finally:
+            mono.mask.disable_mask_instrumentation()
+        instrumentation_table = mono.mask.mask_instrumentation_table()
+        rows = {rowdex['function']: rowdex
+                for rowdex in instrumentation_table}
+        assert rows['mask_sigma_value']['calls'] == 3
+        assert rows['mask_invalid_all']['calls'] == 1
+        assert rows['mask_sigma_value']['memory_calls'] == 3
+        assert np.all(np.diff(instrumentation_table['total_time']) <= 0)
+        return None
+
+    # Run the tests.
+    summarized_calls()
+    # All done.
+    return None
+
+def test_dump_mask_instrumentation():
+    """ This tests the JSON of the instrumentation."""
+    def dumped_json():
+        # A few masks, recorded.
+        mono.mask.reset_mask_instrumentation()
+        mono.mask.enable_mask_instrumentation()
+        try:
+            dummy_array = np.random.normal(size=(200, 300))
+            for __ in range(3):
+                mono.mask.mask_sigma_value(data_array=dummy_array,
+                                           sigma_multiple=3)
+            mono.mask.mask_invalid_all(data_array=dummy_array)
+        finally:
+            mono.mask.disable_mask_instrumentation()
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'instrumentation.json')
+            instrumentation_json = mono.mask.dump_mask_instrumentation(
+                filename=filename)
+            with open(filename, 'r') as file:
+                assert file.read() == instrumentation_json
+        instrumentation = json.loads(instrumentation_json)
+        assert ({rowdex['function']
+                 for rowdex in instrumentation['summary']}
+                >= {'mask_sigma_value', 'mask_invalid_all'})
+        assert (len(instrumentation['records'])
+                == len(mono.mask.mask_instrumentation_records()))
+        return None
+
+    # Run the tests.
+    dumped_json()
+    # All done.
+    return None
@@ -68,9 +68,34 @@ def test_mask_invalid_all():
         assert np.array_equal(test_mask, expected_mask), assert_message
         return None
 
+    def integer_and_output():
+        # Integer data is never invalid, the mask is shared and takes
+        # no memory.
+        dummy_array = np.random.randint(0, 2**16, size=(30, 40),
+                                        dtype=np.uint16)
+        test_mask = mono.mask.mask_invalid_all(data_array=dummy_array)
+        assert test_mask.shape == dummy_array.shape
+        assert not np.any(test_mask)
+        assert test_mask.strides == (0, 0)
+        assert not test_mask.flags.writeable
+        # The output buffer is written into, for integers and floats.
+        out = np.ones((30, 40), dtype=bool)
+        test_mask = mono.mask.mask_invalid_all(data_array=dummy_array,
+                                               out=out)
+        assert (test_mask is out) and not np.any(out)
+        dummy_array = np.random.normal(size=(30, 40))
+        dummy_array[dummy_array > 1] = np.nan
+        dummy_array[dummy_array < -1] = -np.inf
+        test_mask = mono.mask.mask_invalid_all(data_array=dummy_array,
+                                               out=out)
+        assert test_mask is out
+        assert np.array_equal(out, ~np.isfinite(dummy_array))
+        return None
+
     # Run the masks.
     static_distribution()
     random_distribution()
+    integer_and_output()
     # All done.
     return None
 
@@ -216,6 +241,9 @@ def test_mask_invalid_nan():
 
     # Making the test mask.
     test_mask = mono.mask.mask_invalid_nan(data_array=dummy_array)
+    # Integer data is never NaN.
+    assert not np.any(mono.mask.mask_invalid_nan(
+        data_array=np.arange(36).reshape(6, 6)))
 
     # Check that they are the same.
     assert_message = ("The expected mask and the created mask do not agree. "
@@ -0,0 +1,157 @@
+"""
+This section is dedicated to the testing of the mask libraries.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+import sparrowmonolith as mono
+
+
+def test_save_mask_library():
+    """ This tests the saving of masks, each in its most compact form
+    unless asked for."""
+    def compact_kinds():
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'library.npz')
+            # Masks of every kind.
+            dummy_array = np.random.normal(size=(3, 40, 50))
+            rows = np.zeros((3, 40, 50), dtype=bool)
+            rows[:, 7:9, :] = True
+            hot = np.zeros((3, 40, 50), dtype=bool)
+            hot[1, 5, 9] = hot[2, 30, 2] = True
+            bitmask = np.random.randint(0, 2**10, 
+                                        size=(40, 50)).astype(np.int16)
+            dummy_masks = {'random': dummy_array > 0.5,
+                           'rows': rows,
+                           'hot': hot,
+                           'sparse': mono.mask.sparse_mask(
+                               mask=dummy_array > 2, kind='coordinate'),
+                           'bitmask': bitmask}
+            mono.mask.save_mask_library(filename=filename, 
+                                        masks=dummy_masks)
+            with mono.mask.load_mask_library(filename=filename) as library:
+                assert library.names == list(dummy_masks.keys())
+                assert library.kind('random') == 'packed'
+                assert library.kind('rows') == 'run_length'
+                assert library.kind('hot') == 'coordinate'
+                assert library.kind('sparse') == 'coordinate'
+                assert library.kind('bitmask') == 'bitmask'
+        return None
+    def chosen_kinds():
+        # The kinds may be chosen.
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'library.npz')
+            hot = np.zeros((3, 40, 50), dtype=bool)
+            hot[1, 5, 9] = hot[2, 30, 2] = True
+            mono.mask.save_mask_library(filename=filename, 
+                                        masks={'hot': hot},
+                                        kind={'hot': 'packed'}, 
+                                        compress=False)
+            with mono.mask.load_mask_library(filename=filename) as library:
+                assert library.kind('hot') == 'packed'
+                assert np.array_equal(library['hot'], hot)
+        return None
+    def invalid_masks():
+        # Only boolean and integer masks, with plain names.
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'library.npz')
+            with pytest.raises(mono.InputError):
+                mono.mask.save_mask_library(
+                    filename=filename, masks={'float': np.zeros(3)})
+            with pytest.raises(mono.InputError):
+                mono.mask.save_mask_library(
+                    filename=filename, 
+                    masks={'a/b': np.zeros(3, dtype=bool)})
+        return None
+
+    # Run the tests.
+    compact_kinds()
+    chosen_kinds()
+    invalid_masks()
+    # All done.
+    return None
+
+def test_load_mask_library():
+    """ This tests the loading of the masks, lazily by name."""
+    def lazy_loading():
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'library.npz')
+            # Masks of every kind.
+            dummy_array = np.random.normal(size=(3, 40, 50))
+            rows = np.zeros((3, 40, 50), dtype=bool)
+            rows[:, 7:9, :] = True
+            hot = np.zeros((3, 40, 50), dtype=bool)
+            hot[1, 5, 9] = hot[2, 30, 2] = True
+            bitmask = np.random.randint(0, 2**10, 
+                                        size=(40, 50)).astype(np.int16)
+            dummy_masks = {'random': dummy_array > 0.5,
+                           'rows': rows,
+                           'hot': hot,
+                           'sparse': mono.mask.sparse_mask(
+                               mask=dummy_array > 2, kind='coordinate'),
+                           'bitmask': bitmask}
+            mono.mask.save_mask_library(filename=filename, 
+                                        masks=dummy_masks)
+            library = mono.mask.load_mask_library(filename=filename)
+            assert len(library) == 5
+            assert 'hot' in library and 'cold' not in library
+            assert library.shape('random') == (3, 40, 50)
+            for namedex, maskdex in dummy_masks.items():
+                if (isinstance(maskdex, mono.mask.sparse._SparseMask)):
+                    maskdex = maskdex.to_dense()
+                test_mask = library[namedex]
+                assert test_mask.dtype == maskdex.dtype
+                assert np.array_equal(test_mask, maskdex), namedex
+            # Sparse masks may stay sparse.
+            assert isinstance(library.load(name='rows', dense=False),
+                              mono.mask.RunLengthMask)
+            with pytest.raises(mono.InputError):
+                library['cold']
+            library.close()
+            # Loaded masks are kept after the file is closed.
+            assert np.array_equal(library['hot'], dummy_masks['hot'])
+        return None
+    def other_files():
+        # Other files are not libraries.
+        with tempfile.TemporaryDirectory() as directory:
+            other_filename = os.path.join(directory, 'other.npz')
+            np.savez(other_filename, data=np.zeros(3))
+            with pytest.raises(mono.FileError):
+                mono.mask.load_mask_library(filename=other_filename)
+            with pytest.raises(mono.FileError):
+                mono.mask.load_mask_library(
+                    filename=os.path.join(directory, 'missing.npz'))
+        return None
+
+    def shared_masks():
+        # The cached masks cannot be changed through a load.
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'library.npz')
+            bitmask = np.random.randint(0, 2**10,
+                                        size=(40, 50)).astype(np.int16)
+            dummy_masks = {'random': np.random.random((40, 50)) > 0.5,
+                           'bitmask': bitmask}
+            mono.mask.save_mask_library(filename=filename,
+                                        masks=dummy_masks)
+            with mono.mask.load_mask_library(filename=filename) as library:
+                assert library.kind('random') == 'packed'
+                for namedex, maskdex in dummy_masks.items():
+                    test_mask = library[namedex]
+                    with pytest.raises(ValueError):
+                        test_mask[0, 0] = 7
+                    changed_mask = test_mask.copy()
+                    changed_mask[0, 0] = 7
+                    assert np.array_equal(library[namedex], maskdex), (
+                        "The cached mask was changed.")
+        return None
+
+    # Run the tests.
+    lazy_loading()
+    other_files()
+    shared_masks()
+    # All done.
+    return None
@@ -0,0 +1,54 @@
+"""
+This section is dedicated to the testing of the masks from local
+statistics.
+"""
+
+import numpy as np
+import scipy.ndimage as sp_ndimage
+
+import sparrowmonolith as mono
+
+
+def test_mask_local_sigma():
+    """ This tests the local sigma mask against the filters over the
+    entire array, in tiles and in threads; and that it finds hot 
+    pixels on a gradient which a global sigma mask cannot."""
+    # A gradient with a bright blob and some hot pixels.
+    row_grid, column_grid = np.mgrid[0:120, 0:80]
+    dummy_array = (np.random.normal(size=row_grid.shape) + 0.5 * column_grid
+                   + 20 * np.exp(-((column_grid - 40)**2 
+                                   + (row_grid - 60)**2) / 200))
+    hot_pixels = np.zeros(dummy_array.shape, dtype=bool)
+    hot_pixels[np.random.randint(0, 120, 20), 
+               np.random.randint(0, 80, 20)] = True
+    dummy_array[hot_pixels] += 50
+
+    # The expected mask from the filters over the entire array.
+    local_median = sp_ndimage.median_filter(dummy_array, size=7, 
+                                            mode='reflect')
+    local_sigma = 1.482602218505602 * sp_ndimage.median_filter(
+        np.abs(dummy_array - local_median), size=7, mode='reflect')
+    expected_mask = ((dummy_array < local_median - 5 * local_sigma)
+                     | (dummy_array > local_median + 5 * local_sigma))
+    for threaddex in (None, 3):
+        test_mask = mono.mask.mask_local_sigma(
+            data_array=dummy_array, box_size=7, sigma_multiple=5, 
+            chunk_size=1000, threads=threaddex)
+        # Check that they are the same.
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree. "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(t_mask=test_mask, e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+    assert np.all(test_mask[hot_pixels]), "Hot pixels were not masked."
+
+    # The mean statistic in tiles is the same as without.
+    test_mask = mono.mask.mask_local_sigma(
+        data_array=dummy_array, box_size=[5, 9], sigma_multiple=[4, 5], 
+        statistic='mean', chunk_size=1000)
+    expected_mask = mono.mask.mask_local_sigma(
+        data_array=dummy_array, box_size=[5, 9], sigma_multiple=[4, 5], 
+        statistic='mean', chunk_size=dummy_array.size)
+    assert np.array_equal(test_mask, expected_mask), (
+        "The tiled mean statistic mask is not the same as untiled.")
+    return None
@@ -0,0 +1,253 @@
+"""
+This section is dedicated to the testing of the morphology of masks.
+"""
+
+import numpy as np
+import scipy.ndimage as sp_ndimage
+
+import sparrowmonolith as mono
+
+
+def test_structuring_element():
+    """ This tests the shapes of the structuring elements."""
+    square = mono.mask.structuring_element(kind='square', radius=1)
+    cross = mono.mask.structuring_element(kind='cross', radius=1)
+    disk = mono.mask.structuring_element(kind='disk', radius=2)
+    assert np.array_equal(square, np.ones((3, 3), dtype=bool))
+    assert np.array_equal(cross, np.array([[0, 1, 0],
+                                           [1, 1, 1],
+                                           [0, 1, 0]], dtype=bool))
+    assert np.array_equal(disk, np.array([[0, 0, 1, 0, 0],
+                                          [0, 1, 1, 1, 0],
+                                          [1, 1, 1, 1, 1],
+                                          [0, 1, 1, 1, 0],
+                                          [0, 0, 1, 0, 0]], dtype=bool))
+    return None
+
+def test_dilate_mask():
+    """ This tests the growing of masks."""
+    def single_pixel():
+        # A single hot pixel is grown by the square by default.
+        dummy_mask = np.zeros((5, 5), dtype=bool)
+        dummy_mask[2, 2] = True
+        expected_mask = np.zeros((5, 5), dtype=bool)
+        expected_mask[1:4, 1:4] = True
+        assert np.array_equal(mono.mask.dilate_mask(mask=dummy_mask),
+                              expected_mask)
+        return None
+    def against_scipy():
+        # The tiled and threaded morphology against the Scipy filter 
+        # over the entire mask, for images and stacks.
+        for shapedex in ((40, 30), (3, 25, 20)):
+            dummy_mask = np.random.random(shapedex) < 0.3
+            structure = np.random.random((3, 5)) < 0.6
+            structure[1, 2] = True
+            full_structure = structure.reshape((1,) * (len(shapedex) - 2)
+                                               + structure.shape)
+            expected_mask = sp_ndimage.binary_dilation(
+                dummy_mask, structure=full_structure, iterations=2, 
+                border_value=0)
+            for threadsdex in (None, 3):
+                test_mask = mono.mask.dilate_mask(
+                    mask=dummy_mask, structure=structure, iterations=2, 
+                    chunk_size=37, threads=threadsdex)
+                assert np.array_equal(test_mask, expected_mask), (
+                    "The tiled mask and the expected mask do not agree.")
+        return None
+    def sparse_masks():
+        # Sparse masks stay sparse.
+        dummy_mask = np.random.random((3, 25, 20)) < 0.3
+        structure = np.random.random((3, 5)) < 0.6
+        structure[1, 2] = True
+        expected_mask = sp_ndimage.binary_dilation(
+            dummy_mask, structure=structure[None, :, :], iterations=2, 
+            border_value=0)
+        for kinddex in ('coordinate', 'run_length'):
+            sparse_mask = mono.mask.sparse_mask(mask=dummy_mask,
+                                                kind=kinddex)
+            test_mask = mono.mask.dilate_mask(
+                mask=sparse_mask, structure=structure, iterations=2)
+            assert isinstance(test_mask, type(sparse_mask))
+            assert np.array_equal(test_mask.to_dense(), expected_mask), (
+                "The sparse mask and the expected mask do not agree.")
+        return None
+    def off_center_elements():
+        # Elements without their center, sparse masks as dense masks.
+        structure = np.zeros((3, 3), dtype=bool)
+        structure[0, 1] = True
+        dummy_mask = np.zeros((5, 5), dtype=bool)
+        dummy_mask[2, 2] = True
+        expected_mask = np.zeros((5, 5), dtype=bool)
+        expected_mask[1, 2] = True
+        dense_mask = mono.mask.dilate_mask(mask=dummy_mask,
+                                           structure=structure)
+        assert np.array_equal(dense_mask, expected_mask), (
+            "The dense mask and the expected mask do not agree.")
+        dummy_mask = np.random.random((3, 25, 20)) < 0.6
+        structure = np.random.random((3, 5)) < 0.4
+        structure[1, 2] = False
+        structure[0, 0] = True
+        for kinddex in ('coordinate', 'run_length'):
+            sparse_mask = mono.mask.sparse_mask(mask=dummy_mask,
+                                                kind=kinddex)
+            for iterationdex in (1, 2):
+                dense_mask = mono.mask.dilate_mask(
+                    mask=dummy_mask, structure=structure,
+                    iterations=iterationdex)
+                test_mask = mono.mask.dilate_mask(
+                    mask=sparse_mask, structure=structure,
+                    iterations=iterationdex)
+                assert np.array_equal(test_mask.to_dense(),
+                                      dense_mask), (
+                    "The sparse mask and the dense mask do not agree.")
+        assert np.array_equal(dense_mask, sp_ndimage.binary_dilation(
+            dummy_mask, structure=structure[None, :, :], iterations=2,
+            border_value=0)), (
+                "The dense mask and the scipy mask do not agree.")
+        return None
+
+    # Run the tests.
+    single_pixel()
+    against_scipy()
+    sparse_masks()
+    off_center_elements()
+    # All done.
+    return None
+
+def test_erode_mask():
+    """ This tests the shrinking of masks."""
+    def single_block():
+        # A block is shrunk by the square by default, the border is 
+        # not masked.
+        dummy_mask = np.zeros((6, 6), dtype=bool)
+        dummy_mask[1:5, 0:4] = True
+        expected_mask = np.zeros((6, 6), dtype=bool)
+        expected_mask[2:4, 1:3] = True
+        assert np.array_equal(mono.mask.erode_mask(mask=dummy_mask),
+                              expected_mask)
+        return None
+    def against_scipy():
+        # The tiled and threaded morphology against the Scipy filter 
+        # over the entire mask, for images and stacks.
+        for shapedex in ((40, 30), (3, 25, 20)):
+            dummy_mask = np.random.random(shapedex) < 0.3
+            structure = np.random.random((3, 5)) < 0.6
+            structure[1, 2] = True
+            full_structure = structure.reshape((1,) * (len(shapedex) - 2)
+                                               + structure.shape)
+            expected_mask = sp_ndimage.binary_erosion(
+                dummy_mask, structure=full_structure, iterations=2, 
+                border_value=0)
+            for threadsdex in (None, 3):
+                test_mask = mono.mask.erode_mask(
+                    mask=dummy_mask, structure=structure, iterations=2, 
+                    chunk_size=37, threads=threadsdex)
+                assert np.array_equal(test_mask, expected_mask), (
+                    "The tiled mask and the expected mask do not agree.")
+        return None
+    def sparse_masks():
+        # Sparse masks stay sparse.
+        dummy_mask = np.random.random((3, 25, 20)) < 0.3
+        structure = np.random.random((3, 5)) < 0.6
+        structure[1, 2] = True
+        expected_mask = sp_ndimage.binary_erosion(
+            dummy_mask, structure=structure[None, :, :], iterations=2, 
+            border_value=0)
+        for kinddex in ('coordinate', 'run_length'):
+            sparse_mask = mono.mask.sparse_mask(mask=dummy_mask,
+                                                kind=kinddex)
+            test_mask = mono.mask.erode_mask(
+                mask=sparse_mask, structure=structure, iterations=2)
+            assert isinstance(test_mask, type(sparse_mask))
+            assert np.array_equal(test_mask.to_dense(), expected_mask), (
+                "The sparse mask and the expected mask do not agree.")
+        return None
+    def off_center_elements():
+        # Elements without their center, sparse masks as dense masks.
+        structure = np.zeros((3, 3), dtype=bool)
+        structure[0, 1] = True
+        dummy_mask = np.zeros((5, 5), dtype=bool)
+        dummy_mask[2, 2] = True
+        expected_mask = np.zeros((5, 5), dtype=bool)
+        expected_mask[3, 2] = True
+        dense_mask = mono.mask.erode_mask(mask=dummy_mask, structure=structure)
+        assert np.array_equal(dense_mask, expected_mask), (
+            "The dense mask and the expected mask do not agree.")
+        dummy_mask = np.random.random((3, 25, 20)) < 0.6
+        structure = np.random.random((3, 5)) < 0.4
+        structure[1, 2] = False
+        structure[0, 0] = True
+        for kinddex in ('coordinate', 'run_length'):
+            sparse_mask = mono.mask.sparse_mask(mask=dummy_mask,
+                                                kind=kinddex)
+            for iterationdex in (1, 2):
+                dense_mask = mono.mask.erode_mask(
+                    mask=dummy_mask, structure=structure,
+                    iterations=iterationdex)
+                test_mask = mono.mask.erode_mask(
+                    mask=sparse_mask, structure=structure,
+                    iterations=iterationdex)
+                assert np.array_equal(test_mask.to_dense(),
+                                      dense_mask), (
+                    "The sparse mask and the dense mask do not agree.")
+        assert np.array_equal(dense_mask, sp_ndimage.binary_erosion(
+            dummy_mask, structure=structure[None, :, :], iterations=2,
+            border_value=0)), (
+                "The dense mask and the scipy mask do not agree.")
+        return None
+
+    # Run the tests.
+    single_block()
+    against_scipy()
+    sparse_masks()
+    off_center_elements()
+    # All done.
+    return None
+
+def test_label_mask_regions():
+    """ This tests the labelling of the regions of a mask, and their
+    statistics."""
+    dummy_mask = np.zeros((8, 10), dtype=bool)
+    dummy_mask[1:3, 1:4] = True
+    dummy_mask[5, 6:9] = True
+    # Touching the second region only at a corner.
+    dummy_mask[6, 9] = True
+    dummy_array = np.arange(80, dtype=float).reshape(8, 10)
+
+    labels, regions = mono.mask.label_mask_regions(mask=dummy_mask,
+                                                   data_array=dummy_array)
+    assert np.array_equal(labels > 0, dummy_mask)
+    assert list(regions['pixel_count']) == [6, 4]
+    assert list(regions['row_min']) == [1, 5]
+    assert list(regions['column_max']) == [3, 9]
+    assert np.allclose(regions['row_centroid'], [1.5, 5.25])
+    assert np.allclose(regions['data_sum'], [np.sum(dummy_array[1:3, 1:4]),
+                                             56 + 57 + 58 + 69])
+    assert list(regions['data_max']) == [23, 69]
+    # Only edges connect with the cross.
+    __, regions = mono.mask.label_mask_regions(
+        mask=dummy_mask, structure=mono.mask.structuring_element('cross'))
+    assert len(regions) == 3
+
+    # Against Scipy, for images in a stack and sparse masks.
+    dummy_mask = np.random.random((3, 30, 20)) < 0.3
+    labels, regions = mono.mask.label_mask_regions(mask=dummy_mask)
+    expected_labels = np.zeros(dummy_mask.shape, dtype=int)
+    n_regions = 0
+    for framedex in range(dummy_mask.shape[0]):
+        frame_labels, n_frame = sp_ndimage.label(
+            dummy_mask[framedex], structure=np.ones((3, 3)))
+        frame_labels[frame_labels > 0] += n_regions
+        expected_labels[framedex] = frame_labels
+        n_regions = n_regions + n_frame
+    assert np.array_equal(labels, expected_labels)
+    assert np.array_equal(regions['pixel_count'],
+                          np.bincount(expected_labels.ravel())[1:])
+    assert np.all(np.diff(regions['frame']) >= 0)
+    sparse_labels, sparse_regions = mono.mask.label_mask_regions(
+        mask=mono.mask.sparse_mask(mask=dummy_mask, kind='run_length'))
+    assert np.array_equal(sparse_labels,
+                          expected_labels.ravel()[np.flatnonzero(dummy_mask)])
+    assert np.array_equal(sparse_regions['pixel_count'],
+                          regions['pixel_count'])
+    return None
@@ -0,0 +1,57 @@
+"""
+This section is dedicated to the testing of the parallel evaluation
+of masks, which should be the same as the serial evaluation.
+"""
+
+import numpy as np
+
+import sparrowmonolith as mono
+from sparrowmonolith.mask import expression as expr
+
+
+def test_mask_parallel():
+    """ This tests the parallel evaluation of expressions and mask
+    functions against their serial masks."""
+    dummy_array = np.random.normal(size=(120, 50))
+    dummy_array[np.random.random(dummy_array.shape) < 0.02] = np.nan
+
+    # An expression with global statistics and geometric masks. 
+    # Small tiles ensure that every thread has many tiles.
+    mask_expression = ((expr.invalid() | expr.sigma(2, sigma_iterations=2)
+                        | expr.count_truncation(top_count=10, 
+                                                bottom_count=5)
+                        | expr.rect([10, 20], [5, 90]))
+                       & ~expr.columns([3, 17]))
+    expected_mask = mask_expression.evaluate(data_array=dummy_array)
+    test_mask = mono.mask.mask_parallel(data_array=dummy_array, 
+                                        mask_expression=mask_expression,
+                                        threads=4, tile_size=1000)
+    # Check that they are the same.
+    assert_message = ("The expected mask and the created mask do not agree. "
+                      "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                      .format(t_mask=test_mask, e_mask=expected_mask))
+    assert np.array_equal(test_mask, expected_mask), assert_message
+    # The threaded evaluation of the expression itself.
+    test_mask = mask_expression.evaluate(data_array=dummy_array, threads=3,
+                                         tile_size=1000)
+    assert np.array_equal(test_mask, expected_mask), assert_message
+
+    # Mask functions, with and without an expression.
+    for functiondex, kwargsdex in (
+            (mono.mask.mask_sigma_value, {'sigma_multiple': 1}),
+            (mono.mask.mask_sigma_value, {'sigma_multiple': 1, 'axis': 0}),
+            (mono.mask.mask_invalid_nan, {}),
+            (mono.mask.mask_circle, {'center_column': 20, 'center_row': 60,
+                                     'radius': 15})):
+        expected_mask = functiondex(data_array=dummy_array, **kwargsdex)
+        test_mask = mono.mask.mask_parallel(data_array=dummy_array, 
+                                            mask_expression=functiondex,
+                                            threads=4, tile_size=1000,
+                                            **kwargsdex)
+        assert_message = ("The expected mask and the created mask do not "
+                          "agree for {func}. "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(func=functiondex.__name__, 
+                                  t_mask=test_mask, e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+    return None
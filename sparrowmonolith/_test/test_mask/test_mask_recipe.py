@@ -0,0 +1,108 @@
+"""
+This section is dedicated to the testing of the mask recipes, which
+should be the same as the masks they describe.
+"""
+
+import os
+import tempfile
+
+import astropy.io.fits as ap_fits
+import numpy as np
+
+import sparrowmonolith as mono
+
+# A recipe of invalid, sigma, and border masks.
+_DUMMY_RECIPE = ['# The options of the recipe.',
+                 'suffix = "_test_mask"',
+                 '[invalid]',
+                 'function = "mask_invalid_all"',
+                 '[sigma]',
+                 'function = "mask_sigma_value"',
+                 'sigma_multiple = 2',
+                 'sigma_iterations = None',
+                 '[border]',
+                 'function = "mask_subarray"',
+                 'column_range = [2, 27]',
+                 'row_range = [3, 36]']
+
+def test_read_mask_recipe():
+    """ This tests the reading of a mask recipe."""
+    recipe = mono.mask.read_mask_recipe(filename=_DUMMY_RECIPE)
+    assert recipe['options']['suffix'] == '_test_mask', "Wrong options."
+    assert recipe['options']['extension'] == 0, "Wrong default options."
+    assert ([maskdex[0] for maskdex in recipe['masks']] 
+            == ['invalid', 'sigma', 'border']), "Wrong masks."
+    assert recipe['masks'][1][2] == {'sigma_multiple': 2, 
+                                     'sigma_iterations': None}, (
+                                         "Wrong mask parameters.")
+    # Masks must name mask functions.
+    try:
+        mono.mask.read_mask_recipe(filename=['[bad]', 'function = "nope"'])
+    except mono.ConfigurationError:
+        pass
+    else:
+        raise AssertionError("A bad mask function was not caught.")
+    return None
+
+def test_apply_mask_recipe():
+    """ This tests the application of a mask recipe to data."""
+    dummy_array = np.random.normal(size=(40, 30))
+    dummy_array[np.random.random(dummy_array.shape) < 0.05] = np.nan
+    recipe = mono.mask.read_mask_recipe(filename=_DUMMY_RECIPE)
+    test_mask = mono.mask.apply_mask_recipe(recipe=recipe, 
+                                            data_array=dummy_array)
+    # The mask which the dummy recipe describes.
+    expected_mask = mono.mask.combine_masks_lor(
+        mono.mask.mask_invalid_all(data_array=dummy_array),
+        mono.mask.mask_sigma_value(data_array=dummy_array, sigma_multiple=2,
+                                   sigma_iterations=None),
+        mono.mask.mask_subarray(data_array=dummy_array,
+                                column_range=[2, 27], row_range=[3, 36]))
+    # Check that they are the same.
+    assert_message = ("The expected mask and the created mask do not agree. "
+                      "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                      .format(t_mask=test_mask, e_mask=expected_mask))
+    assert np.array_equal(test_mask, expected_mask), assert_message
+    return None
+
+def test_run_mask_recipe():
+    """ This tests the application of a mask recipe to many fits 
+    files."""
+    recipe = mono.mask.read_mask_recipe(filename=_DUMMY_RECIPE)
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        # The data files.
+        filenames = []
+        data_arrays = []
+        for filedex in range(3):
+            data_array = np.random.normal(size=(40, 30)).astype(np.float32)
+            if (filedex == 2):
+                # Unsigned integers are scaled images, with BZERO.
+                data_array = np.random.randint(0, 2**16, size=(40, 30),
+                                               dtype=np.uint16)
+            filename = os.path.join(temporary_directory, 
+                                    'data_{n}.fits'.format(n=filedex))
+            ap_fits.PrimaryHDU(data=data_array).writeto(filename)
+            filenames.append(filename)
+            data_arrays.append(data_array)
+        summary = mono.mask.run_mask_recipe(recipe=recipe, 
+                                            filenames=filenames, 
+                                            processes=2)
+        # Check every mask file.
+        for rowdex, data_arraydex in zip(summary, data_arrays):
+            assert rowdex['error'] == '', "A file failed: {err}".format(
+                err=rowdex['error'])
+            with ap_fits.open(rowdex['mask_filename']) as hdul:
+                test_mask = np.array(hdul[0].data, dtype=bool)
+            expected_mask = mono.mask.combine_masks_lor(
+                mono.mask.mask_invalid_all(data_array=data_arraydex),
+                mono.mask.mask_sigma_value(data_array=data_arraydex,
+                                           sigma_multiple=2,
+                                           sigma_iterations=None),
+                mono.mask.mask_subarray(data_array=data_arraydex,
+                                        column_range=[2, 27],
+                                        row_range=[3, 36]))
+            assert np.array_equal(test_mask, expected_mask), (
+                "The mask file is not the mask of the recipe.")
+            assert rowdex['masked_count'] == np.count_nonzero(expected_mask), (
+                "The summary count is wrong.")
+    return None
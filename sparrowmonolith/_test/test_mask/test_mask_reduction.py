@@ -0,0 +1,369 @@
+"""
+This section is dedicated to the testing of the reductions over the
+unmasked values of arrays.
+"""
+
+import numpy as np
+import numpy.ma as np_ma
+import pytest
+
+import sparrowmonolith as mono
+
+
+def test_iterate_unmasked_values():
+    """ This tests the chunks of the unmasked values."""
+    def chunked_values():
+        dummy_array = np.random.normal(size=(37, 23))
+        dummy_mask = np.random.random((37, 23)) < 0.3
+        for chunkdex in (1, 100, 2**20):
+            values = list(mono.mask.iterate_unmasked_values(
+                data_array=dummy_array, mask=dummy_mask,
+                chunk_size=chunkdex))
+            assert all(valuesdex.size <= max(chunkdex, 23)
+                       for valuesdex in values)
+            assert np.array_equal(np.concatenate(values),
+                                  dummy_array[~dummy_mask])
+        return None
+    def broadcast_mask():
+        # A mask of the rows is broadcast.
+        dummy_array = np.random.normal(size=(37, 23))
+        row_mask = np.zeros((37, 1), dtype=bool)
+        row_mask[3] = True
+        values = np.concatenate(list(mono.mask.iterate_unmasked_values(
+            data_array=dummy_array, mask=row_mask)))
+        assert np.array_equal(values,
+                              np.delete(dummy_array, 3, axis=0).ravel())
+        return None
+
+    # Run the tests.
+    chunked_values()
+    broadcast_mask()
+    # All done.
+    return None
+
+def test_masked_count():
+    """ This tests the number of unmasked values."""
+    def dense_masks():
+        dummy_array = np.random.normal(size=(37, 23))
+        dummy_mask = np.random.random((37, 23)) < 0.3
+        assert (mono.mask.masked_count(data_array=dummy_array,
+                                       mask=dummy_mask)
+                == np.count_nonzero(~dummy_mask))
+        assert mono.mask.masked_count(data_array=dummy_array) == 37 * 23
+        # A mask of the rows is broadcast.
+        row_mask = np.zeros((37, 1), dtype=bool)
+        row_mask[3] = True
+        assert mono.mask.masked_count(data_array=dummy_array,
+                                      mask=row_mask) == 36 * 23
+        return None
+    def sparse_masks():
+        dummy_array = np.random.normal(size=(37, 23))
+        dummy_mask = np.random.random((37, 23)) < 0.3
+        sparse_mask = mono.mask.sparse_mask(mask=dummy_mask)
+        assert (mono.mask.masked_count(data_array=dummy_array,
+                                       mask=sparse_mask)
+                == np.count_nonzero(~dummy_mask))
+        return None
+
+    # Run the tests.
+    dense_masks()
+    sparse_masks()
+    # All done.
+    return None
+
+def test_masked_sum():
+    """ This tests the sum of the unmasked values."""
+    def against_masked_arrays():
+        # The reduction against the masked array reduction over the
+        # entire array, in chunks, and along axes.
+        for shapedex in ((37, 23), (4, 9, 11), (50,)):
+            dummy_array = np.random.normal(size=shapedex)
+            dummy_mask = np.random.random(shapedex) < 0.3
+            masked_array = np_ma.array(dummy_array, mask=dummy_mask)
+            for chunkdex in (1, 40, 2**20):
+                test_value = mono.mask.masked_sum(
+                    data_array=dummy_array, mask=dummy_mask,
+                    chunk_size=chunkdex)
+                assert np.isclose(test_value, np_ma.sum(masked_array))
+            for axisdex in range(len(shapedex)):
+                test_value = mono.mask.masked_sum(
+                    data_array=dummy_array, mask=dummy_mask, axis=axisdex)
+                assert np.allclose(test_value, np_ma.sum(masked_array,
+                                                         axis=axisdex))
+            # Without a mask, and with the axes kept.
+            assert np.isclose(mono.mask.masked_sum(data_array=dummy_array),
+                              np.sum(dummy_array))
+            test_value = mono.mask.masked_sum(
+                data_array=dummy_array, mask=dummy_mask, keepdims=True)
+            assert np.shape(test_value) == (1,) * len(shapedex)
+        return None
+    def nothing_unmasked():
+        # Nothing unmasked.
+        dummy_array = np.random.normal(size=(37, 23))
+        empty_sum = mono.mask.masked_sum(data_array=dummy_array, mask=True)
+        assert empty_sum == 0
+        return None
+    def integers():
+        # Integers are summed as integers.
+        assert mono.mask.masked_sum(data_array=np.arange(10),
+                                    mask=np.arange(10) < 5) == 35
+        return None
+
+    # Run the tests.
+    against_masked_arrays()
+    nothing_unmasked()
+    integers()
+    # All done.
+    return None
+
+def test_masked_mean():
+    """ This tests the mean of the unmasked values."""
+    def against_masked_arrays():
+        # The reduction against the masked array reduction over the
+        # entire array, in chunks, and along axes.
+        for shapedex in ((37, 23), (4, 9, 11), (50,)):
+            dummy_array = np.random.normal(size=shapedex)
+            dummy_mask = np.random.random(shapedex) < 0.3
+            masked_array = np_ma.array(dummy_array, mask=dummy_mask)
+            for chunkdex in (1, 40, 2**20):
+                test_value = mono.mask.masked_mean(
+                    data_array=dummy_array, mask=dummy_mask,
+                    chunk_size=chunkdex)
+                assert np.isclose(test_value, np_ma.mean(masked_array))
+            for axisdex in range(len(shapedex)):
+                test_value = mono.mask.masked_mean(
+                    data_array=dummy_array, mask=dummy_mask, axis=axisdex)
+                assert np.allclose(test_value, np_ma.mean(masked_array,
+                                                          axis=axisdex))
+            # Without a mask, and with the axes kept.
+            assert np.isclose(mono.mask.masked_mean(data_array=dummy_array),
+                              np.mean(dummy_array))
+            test_value = mono.mask.masked_mean(
+                data_array=dummy_array, mask=dummy_mask, keepdims=True)
+            assert np.shape(test_value) == (1,) * len(shapedex)
+        return None
+    def nothing_unmasked():
+        # Nothing unmasked.
+        dummy_array = np.random.normal(size=(37, 23))
+        empty_mean = mono.mask.masked_mean(data_array=dummy_array, mask=True)
+        assert np.isnan(empty_mean)
+        return None
+
+    # Run the tests.
+    against_masked_arrays()
+    nothing_unmasked()
+    # All done.
+    return None
+
+def test_masked_std():
+    """ This tests the standard deviation of the unmasked values."""
+    def against_masked_arrays():
+        # The reduction against the masked array reduction over the
+        # entire array, in chunks, and along axes.
+        for ddofdex in (0, 1):
+            for shapedex in ((37, 23), (4, 9, 11), (50,)):
+                dummy_array = np.random.normal(size=shapedex)
+                dummy_mask = np.random.random(shapedex) < 0.3
+                masked_array = np_ma.array(dummy_array, mask=dummy_mask)
+                for chunkdex in (1, 40, 2**20):
+                    test_value = mono.mask.masked_std(
+                        data_array=dummy_array, mask=dummy_mask,
+                        chunk_size=chunkdex, ddof=ddofdex)
+                    assert np.isclose(test_value,
+                                      np_ma.std(masked_array, ddof=ddofdex))
+                for axisdex in range(len(shapedex)):
+                    test_value = mono.mask.masked_std(
+                        data_array=dummy_array, mask=dummy_mask,
+                        axis=axisdex, ddof=ddofdex)
+                    assert np.allclose(test_value, np_ma.std(
+                        masked_array, axis=axisdex, ddof=ddofdex))
+                # Without a mask, and with the axes kept.
+                assert np.isclose(
+                    mono.mask.masked_std(data_array=dummy_array,
+                                         ddof=ddofdex),
+                    np.std(dummy_array, ddof=ddofdex))
+                test_value = mono.mask.masked_std(
+                    data_array=dummy_array, mask=dummy_mask,
+                    keepdims=True, ddof=ddofdex)
+                assert np.shape(test_value) == (1,) * len(shapedex)
+        return None
+    def nothing_unmasked():
+        # Nothing unmasked.
+        dummy_array = np.random.normal(size=(37, 23))
+        empty_std = mono.mask.masked_std(data_array=dummy_array, mask=True,
+                                         ddof=1)
+        assert np.isnan(empty_std)
+        return None
+    def large_offset():
+        # Large offsets do not lose precision.
+        dummy_array = 1e9 + np.random.normal(size=1000)
+        dummy_mask = np.random.random(1000) < 0.5
+        assert np.isclose(mono.mask.masked_std(data_array=dummy_array,
+                                               mask=dummy_mask, chunk_size=7),
+                          np.std(dummy_array[~dummy_mask]))
+        return None
+
+    # Run the tests.
+    against_masked_arrays()
+    nothing_unmasked()
+    large_offset()
+    # All done.
+    return None
+
+def test_masked_min():
+    """ This tests the minimum of the unmasked values."""
+    def against_masked_arrays():
+        # The reduction against the masked array reduction over the
+        # entire array, in chunks, and along axes.
+        for shapedex in ((37, 23), (4, 9, 11), (50,)):
+            dummy_array = np.random.normal(size=shapedex)
+            dummy_mask = np.random.random(shapedex) < 0.3
+            masked_array = np_ma.array(dummy_array, mask=dummy_mask)
+            for chunkdex in (1, 40, 2**20):
+                test_value = mono.mask.masked_min(
+                    data_array=dummy_array, mask=dummy_mask,
+                    chunk_size=chunkdex)
+                assert np.isclose(test_value, np_ma.min(masked_array))
+            for axisdex in range(len(shapedex)):
+                test_value = mono.mask.masked_min(
+                    data_array=dummy_array, mask=dummy_mask, axis=axisdex)
+                assert np.allclose(test_value, np_ma.min(masked_array,
+                                                         axis=axisdex))
+            # Without a mask, and with the axes kept.
+            assert np.isclose(mono.mask.masked_min(data_array=dummy_array),
+                              np.min(dummy_array))
+            test_value = mono.mask.masked_min(
+                data_array=dummy_array, mask=dummy_mask, keepdims=True)
+            assert np.shape(test_value) == (1,) * len(shapedex)
+        return None
+    def nothing_unmasked():
+        # Nothing unmasked.
+        dummy_array = np.random.normal(size=(37, 23))
+        empty_min = mono.mask.masked_min(data_array=dummy_array, mask=True)
+        assert np.isnan(empty_min)
+        return None
+    def integers():
+        # Integers, and slices with nothing unmasked.
+        dummy_array = np.arange(12, dtype=np.uint16).reshape(3, 4)
+        dummy_mask = dummy_array < 6
+        assert mono.mask.masked_min(data_array=dummy_array,
+                                    mask=dummy_mask) == 6
+        assert np.array_equal(
+            mono.mask.masked_min(data_array=dummy_array, mask=dummy_mask,
+                                 axis=1), [np.nan, 6, 8], equal_nan=True)
+        return None
+
+    # Run the tests.
+    against_masked_arrays()
+    nothing_unmasked()
+    integers()
+    # All done.
+    return None
+
+def test_masked_max():
+    """ This tests the maximum of the unmasked values."""
+    def against_masked_arrays():
+        # The reduction against the masked array reduction over the
+        # entire array, in chunks, and along axes.
+        for shapedex in ((37, 23), (4, 9, 11), (50,)):
+            dummy_array = np.random.normal(size=shapedex)
+            dummy_mask = np.random.random(shapedex) < 0.3
+            masked_array = np_ma.array(dummy_array, mask=dummy_mask)
+            for chunkdex in (1, 40, 2**20):
+                test_value = mono.mask.masked_max(
+                    data_array=dummy_array, mask=dummy_mask,
+                    chunk_size=chunkdex)
+                assert np.isclose(test_value, np_ma.max(masked_array))
+            for axisdex in range(len(shapedex)):
+                test_value = mono.mask.masked_max(
+                    data_array=dummy_array, mask=dummy_mask, axis=axisdex)
+                assert np.allclose(test_value, np_ma.max(masked_array,
+                                                         axis=axisdex))
+            # Without a mask, and with the axes kept.
+            assert np.isclose(mono.mask.masked_max(data_array=dummy_array),
+                              np.max(dummy_array))
+            test_value = mono.mask.masked_max(
+                data_array=dummy_array, mask=dummy_mask, keepdims=True)
+            assert np.shape(test_value) == (1,) * len(shapedex)
+        return None
+    def nothing_unmasked():
+        # Nothing unmasked.
+        dummy_array = np.random.normal(size=(37, 23))
+        empty_max = mono.mask.masked_max(data_array=dummy_array, mask=True)
+        assert np.isnan(empty_max)
+        return None
+
+    # Run the tests.
+    against_masked_arrays()
+    nothing_unmasked()
+    # All done.
+    return None
+
+def test_masked_percentile():
+    """ This tests the percentiles of the unmasked values by
+    selection."""
+    percents = [0, 2.5, 25, 50, 99, 100]
+    for sizedex in (1, 2, 17, 100000):
+        dummy_array = np.random.standard_cauchy(size=sizedex)
+        dummy_mask = np.random.random(sizedex) < 0.3
+        dummy_mask[0] = False
+        expected_percentile = np.percentile(dummy_array[~dummy_mask],
+                                            percents)
+        for chunkdex in (max(sizedex // 7, 3), 2**20):
+            test_percentile = mono.mask.masked_percentile(
+                data_array=dummy_array, percent=percents, mask=dummy_mask,
+                chunk_size=chunkdex)
+            assert np.allclose(test_percentile, expected_percentile)
+    # Many equal values, and infinite values.
+    dummy_array = np.repeat([1.0, 2.0, np.inf], [5000, 3, 10])
+    np.random.shuffle(dummy_array)
+    assert mono.mask.masked_percentile(data_array=dummy_array,
+                                       percent=50) == 1
+    assert mono.mask.masked_percentile(data_array=dummy_array,
+                                       percent=100) == np.inf
+    # Nothing unmasked, or unmasked NaN values.
+    assert np.isnan(mono.mask.masked_percentile(
+        data_array=dummy_array, percent=50, mask=True))
+    assert np.isnan(mono.mask.masked_percentile(
+        data_array=[1, np.nan], percent=50))
+    with pytest.raises(mono.InputError):
+        mono.mask.masked_percentile(data_array=dummy_array, percent=101)
+    return None
+
+def test_masked_rank_values():
+    """ This tests the exact values of the ranks of the unmasked
+    values."""
+    def against_sorting():
+        for sizedex in (1, 2, 17, 100000):
+            dummy_array = np.random.randint(-2**62, 2**62, size=sizedex)
+            dummy_mask = np.random.random(sizedex) < 0.3
+            dummy_mask[0] = False
+            sorted_values = np.sort(dummy_array[~dummy_mask])
+            ranks = np.unique([0, sorted_values.size // 2,
+                               sorted_values.size - 1])
+            for chunkdex in (max(sizedex // 7, 3), 2**20):
+                test_values = mono.mask.masked_rank_values(
+                    data_array=dummy_array, ranks=ranks, mask=dummy_mask,
+                    chunk_size=chunkdex)
+                assert test_values.dtype == dummy_array.dtype
+                assert np.array_equal(test_values, sorted_values[ranks])
+        # A single rank is a scalar.
+        assert mono.mask.masked_rank_values(data_array=[3, 1, 2],
+                                            ranks=1) == 2
+        return None
+    def invalid_ranks():
+        dummy_array = np.arange(10.0)
+        assert np.isnan(mono.mask.masked_rank_values(
+            data_array=[1, np.nan], ranks=0))
+        for rankdex in (-1, 5, 2.5):
+            with pytest.raises(mono.InputError):
+                mono.mask.masked_rank_values(
+                    data_array=dummy_array, ranks=rankdex,
+                    mask=dummy_array >= 5)
+        return None
+
+    # Run the tests.
+    against_sorting()
+    invalid_ranks()
+    # All done.
+    return None
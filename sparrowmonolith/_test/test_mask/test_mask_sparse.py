@@ -0,0 +1,207 @@
+"""
+This section is dedicated to the testing of the sparse mask
+representations.
+"""
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+
+def test_coordinate_mask():
+    """ This tests the creation of a coordinate mask from pixel
+    coordinates."""
+    expected_mask = [[0, 0, 0, 0, 0, 1],
+                     [0, 0, 1, 0, 0, 0],
+                     [0, 0, 0, 0, 0, 0],
+                     [0, 1, 0, 0, 0, 1],
+                     [0, 0, 0, 1, 0, 0],
+                     [0, 0, 0, 0, 0, 1]]
+    expected_mask = np.array(expected_mask, dtype=bool)
+
+    # Repeated pixels should not matter.
+    test_mask = mono.mask.CoordinateMask(shape=(6,6),
+                                         row_indexes=[3,1,4,0,3,5,5],
+                                         column_indexes=[1,2,3,5,5,5,5])
+
+    # Check that they are the same.
+    assert_message = ("The expected mask and the created mask do not agree. "
+                      "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                      .format(t_mask=test_mask.to_dense(),
+                              e_mask=expected_mask))
+    assert np.array_equal(test_mask.to_dense(), expected_mask), assert_message
+    assert test_mask.count == 6, "The masked pixel count is incorrect."
+    return None
+
+def test_run_length_mask():
+    """ This tests the creation of a run-length mask from runs."""
+    expected_mask = [[0, 1, 1, 1, 0, 0],
+                     [0, 0, 0, 0, 0, 0],
+                     [1, 1, 0, 0, 0, 1],
+                     [0, 0, 0, 0, 0, 0],
+                     [0, 0, 0, 0, 0, 0],
+                     [1, 1, 1, 1, 1, 1]]
+    expected_mask = np.array(expected_mask, dtype=bool)
+
+    test_mask = mono.mask.RunLengthMask(shape=(6,6),
+                                        run_rows=[0,2,2,5],
+                                        run_starts=[1,0,5,0],
+                                        run_lengths=[3,2,1,6])
+
+    # Check that they are the same.
+    assert_message = ("The expected mask and the created mask do not agree. "
+                      "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                      .format(t_mask=test_mask.to_dense(),
+                              e_mask=expected_mask))
+    assert np.array_equal(test_mask.to_dense(), expected_mask), assert_message
+    assert test_mask.run_count == 4, "The number of runs is incorrect."
+    return None
+
+def test_sparse_mask():
+    """ This tests that sparse masks convert to and from dense masks
+    and between each other without loss."""
+    def dense_round_trip():
+        # A dense mask which has scattered pixels, a bad row, and a bad
+        # column; and the sparse versions of it.
+        dummy_mask = np.random.random((30, 20)) < 0.05
+        dummy_mask[4,:] = True
+        dummy_mask[:,11] = True
+        for kinddex in ('coordinate', 'run_length'):
+            sparsedex = mono.mask.sparse_mask(mask=dummy_mask, kind=kinddex)
+            assert np.array_equal(sparsedex.to_dense(), dummy_mask), (
+                "The {kind} mask does not match its dense mask."
+                .format(kind=sparsedex._kind))
+            assert np.array_equal(np.asarray(sparsedex), dummy_mask), (
+                "The {kind} mask does not convert to an array."
+                .format(kind=sparsedex._kind))
+            assert np.array_equal(sparsedex.to_coordinate().to_dense(),
+                                  dummy_mask), "Coordinate conversion failed."
+            assert np.array_equal(sparsedex.to_run_length().to_dense(),
+                                  dummy_mask), "Run-length conversion failed."
+        return None
+
+    # Run the tests.
+    dense_round_trip()
+    # All done.
+    return None
+
+def test_sparse_mask_combination():
+    """ This tests the combination of sparse masks with dense and
+    sparse masks."""
+    def dense_and_sparse():
+        # A dense mask which has scattered pixels, a bad row, and a bad
+        # column; and the sparse versions of it.
+        dummy_mask = np.random.random((30, 20)) < 0.05
+        dummy_mask[4,:] = True
+        dummy_mask[:,11] = True
+        other_mask = np.random.random(dummy_mask.shape) < 0.1
+        for kinddex in ('coordinate', 'run_length'):
+            sparsedex = mono.mask.sparse_mask(mask=dummy_mask, kind=kinddex)
+            other_sparse = mono.mask.sparse_mask(mask=other_mask,
+                                                 kind=sparsedex._kind)
+            # Dense combinations.
+            assert np.array_equal(sparsedex | other_mask,
+                                  dummy_mask | other_mask), (
+                                      "Dense lor failed.")
+            assert np.array_equal((sparsedex & other_mask).to_dense(),
+                                  dummy_mask & other_mask), (
+                                      "Dense land failed.")
+            # Sparse combinations stay sparse.
+            assert np.array_equal((sparsedex | other_sparse).to_dense(),
+                                  dummy_mask | other_mask), (
+                                      "Sparse lor failed.")
+            assert np.array_equal((sparsedex & other_sparse).to_dense(),
+                                  dummy_mask & other_mask), (
+                                      "Sparse land failed.")
+            assert np.array_equal(~sparsedex, ~dummy_mask), "Inversion failed."
+            # The common combination functions should also work.
+            assert np.array_equal(
+                mono.mask.combine_masks_lor(sparsedex, other_mask),
+                dummy_mask | other_mask), "Combining via function failed."
+        return None
+
+    # Run the tests.
+    dense_and_sparse()
+    # All done.
+    return None
+
+def test_sparse_mask_application():
+    """ This tests the application of sparse masks onto data."""
+    def masked_data():
+        # A dense mask which has scattered pixels, a bad row, and a bad
+        # column; and the sparse versions of it.
+        dummy_mask = np.random.random((30, 20)) < 0.05
+        dummy_mask[4,:] = True
+        dummy_mask[:,11] = True
+        dummy_array = np.random.random(dummy_mask.shape)
+        for kinddex in ('coordinate', 'run_length'):
+            sparsedex = mono.mask.sparse_mask(mask=dummy_mask, kind=kinddex)
+            assert np.array_equal(
+                sparsedex.masked_values(data_array=dummy_array),
+                dummy_array[dummy_mask]), "Masked values wrong."
+            assert np.array_equal(
+                sparsedex.unmasked_values(data_array=dummy_array),
+                np.ma.array(dummy_array, mask=dummy_mask).compressed()), (
+                    "Unmasked values wrong.")
+            filled_array = sparsedex.fill(data_array=dummy_array.copy(),
+                                          fill_value=-1)
+            assert np.array_equal(filled_array,
+                                  np.where(dummy_mask, -1, dummy_array)), (
+                                      "Filling failed.")
+        return None
+
+    # Run the tests.
+    masked_data()
+    # All done.
+    return None
+
+def test_sparse_mask_from_bytes():
+    """ This tests that sparse masks survive serialization."""
+    def bytes_round_trip():
+        # A dense mask which has scattered pixels, a bad row, and a bad
+        # column; and the sparse versions of it.
+        dummy_mask = np.random.random((30, 20)) < 0.05
+        dummy_mask[4,:] = True
+        dummy_mask[:,11] = True
+        for kinddex in ('coordinate', 'run_length'):
+            sparsedex = mono.mask.sparse_mask(mask=dummy_mask, kind=kinddex)
+            mask_bytes = sparsedex.to_bytes()
+            test_mask = mono.mask.sparse_mask_from_bytes(
+                mask_bytes=mask_bytes)
+            assert type(test_mask) is type(sparsedex), (
+                "Wrong sparse mask type.")
+            assert np.array_equal(test_mask.to_dense(), dummy_mask), (
+                "The serialized mask does not match the original.")
+            # The sparse form should be smaller than the dense form.
+            assert sparsedex.nbytes < dummy_mask.nbytes, (
+                "Sparse mask is larger.")
+        return None
+
+    # Run the tests.
+    bytes_round_trip()
+    # All done.
+    return None
+
+def test_sparse_mask_from_dict():
+    """ This tests that sparse masks survive serialization into a 
+    dictionary of arrays."""
+    def dictionary_round_trip():
+        # A dense mask which has scattered pixels, a bad row, and a bad
+        # column; and the sparse versions of it.
+        dummy_mask = np.random.random((30, 20)) < 0.05
+        dummy_mask[4,:] = True
+        dummy_mask[:,11] = True
+        for kinddex in ('coordinate', 'run_length'):
+            sparsedex = mono.mask.sparse_mask(mask=dummy_mask, kind=kinddex)
+            test_mask = mono.mask.sparse_mask_from_dict(
+                mask_dictionary=sparsedex.to_dict())
+            assert type(test_mask) is type(sparsedex), (
+                "Wrong sparse mask type.")
+            assert np.array_equal(test_mask.to_dense(), dummy_mask), (
+                "The serialized mask does not match the original.")
+        return None
+
+    # Run the tests.
+    dictionary_round_trip()
+    # All done.
+    return None
@@ -0,0 +1,95 @@
+"""
+This section is dedicated to the testing of the masks of stacks of
+images.
+"""
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+
+def test_mask_stack_static():
+    """ This tests that the static masks of a stack are broadcast
+    views of the single image mask."""
+    dummy_stack = np.random.random((50, 20, 30))
+    test_mask = mono.mask.mask_stack_static(
+        data_stack=dummy_stack, mask_function=mono.mask.mask_circle,
+        center_column=10, center_row=8, radius=5)
+    expected_mask = mono.mask.mask_circle(data_array=dummy_stack,
+                                          center_column=10, center_row=8,
+                                          radius=5)
+    assert np.array_equal(test_mask, expected_mask)
+    # One image of memory, shared by every image.
+    assert test_mask.strides[0] == 0
+    assert not test_mask.flags.writeable
+    assert np.shares_memory(test_mask[0], test_mask[-1])
+    return None
+
+def test_mask_stack_dynamic():
+    """ This tests the lazy per image masks of a stack."""
+    dummy_stack = np.random.normal(size=(6, 20, 30))
+    dummy_stack[np.random.random(dummy_stack.shape) < 0.05] = np.nan
+    static_mask = mono.mask.mask_stack_columns(data_stack=dummy_stack,
+                                               column_list=[3, 17])
+    stack_mask = mono.mask.mask_stack_dynamic(
+        data_stack=dummy_stack, mask_function=mono.mask.mask_sigma_value,
+        static_mask=static_mask, sigma_multiple=2, sigma_iterations=3)
+    assert isinstance(stack_mask, mono.mask.StackMask)
+    # Only the static mask is stored.
+    assert stack_mask.nbytes == 20 * 30
+
+    expected_mask = np.array([mono.mask.mask_sigma_value(
+        data_array=framedex, sigma_multiple=2, sigma_iterations=3)
+                              for framedex in dummy_stack])
+    expected_mask[..., [3, 17]] = True
+    assert np.array_equal(stack_mask.to_dense(), expected_mask)
+    assert np.array_equal(stack_mask[-2], expected_mask[-2])
+    assert np.array_equal(np.asarray(stack_mask), expected_mask)
+    assert np.array_equal(stack_mask.count(),
+                          np.count_nonzero(expected_mask, axis=(1, 2)))
+    return None
+
+def test_stack_mask_combination():
+    """ This tests the combination of stack masks with static and
+    dynamic masks, including sparse masks."""
+    shape = (4, 10, 12)
+    dummy_static = np.random.random(shape[1:]) < 0.1
+    dummy_dynamic = np.random.random(shape) < 0.05
+    sparse_dynamic = mono.mask.sparse_mask(
+        mask=np.random.random(shape) < 0.05, kind='run_length')
+
+    stack_mask = mono.mask.StackMask(shape=shape)
+    assert stack_mask.count().sum() == 0
+    # Single image masks and broadcasts join the static mask.
+    stack_mask = stack_mask | dummy_static
+    stack_mask = np.broadcast_to(dummy_static, shape) | stack_mask
+    assert np.array_equal(stack_mask.static_mask,
+                          np.broadcast_to(dummy_static, shape))
+    assert np.array_equal(stack_mask.count(),
+                          [np.count_nonzero(dummy_static)] * 4)
+    # Full masks are dynamic.
+    stack_mask = stack_mask | dummy_dynamic | sparse_dynamic
+    expected_mask = dummy_static | dummy_dynamic | sparse_dynamic.to_dense()
+    assert np.array_equal(stack_mask.to_dense(), expected_mask)
+    for framedex, expecteddex in zip(stack_mask, expected_mask):
+        assert np.array_equal(framedex, expecteddex)
+    # And two stack masks.
+    other_mask = mono.mask.StackMask(
+        shape=shape, dynamic_masks=[lambda index: np.eye(10, 12) > 0])
+    combined_mask = stack_mask | other_mask
+    assert np.array_equal(combined_mask.to_dense(),
+                          expected_mask | (np.eye(10, 12) > 0))
+    # Single image sparse masks are static too, on either side.
+    sparse_static = mono.mask.sparse_mask(
+        mask=np.random.random(shape[1:]) < 0.1, kind='coordinate')
+    sparse_rows = mono.mask.sparse_mask(
+        mask=np.eye(10, 12) > 0, kind='run_length')
+    combined_mask = sparse_rows | (stack_mask | sparse_static)
+    assert len(combined_mask._dynamic_masks) == 2
+    assert np.array_equal(combined_mask.static_mask[0], 
+                          dummy_static | sparse_static.to_dense() 
+                          | sparse_rows.to_dense())
+    assert np.array_equal(combined_mask.to_dense(), 
+                          expected_mask | sparse_static.to_dense() 
+                          | sparse_rows.to_dense())
+    return None
@@ -0,0 +1,71 @@
+"""
+This section is dedicated to the testing of the streaming masks.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+
+def test_streaming_statistics():
+    """ This tests the running statistics of the streaming masker
+    against the statistics of the entire stack, with and without
+    forgetting."""
+    dummy_stack = np.random.normal(loc=5, scale=2, size=(30, 8, 9))
+    for factordex in (1.0, 0.9):
+        masker = mono.mask.StreamingSigmaMasker(
+            shape=(8, 9), sigma_multiple=3, forgetting_factor=factordex,
+            update_masked=True)
+        for framedex in dummy_stack:
+            masker.mask(frame=framedex)
+        # The weights of the frames, the newest weighted the most.
+        weights = factordex ** np.arange(29, -1, -1)[:, None, None]
+        expected_mean = (np.sum(weights * dummy_stack, axis=0)
+                         / np.sum(weights, axis=0))
+        expected_variance = (np.sum(weights
+                                    * (dummy_stack - expected_mean)**2,
+                                    axis=0)
+                             / np.sum(weights, axis=0))
+        assert np.allclose(masker.mean, expected_mean)
+        assert np.allclose(masker.variance, expected_variance)
+        assert masker.n_frames == 30
+    return None
+
+def test_streaming_mask():
+    """ This tests the masking of outliers from their own history,
+    and the checkpoints."""
+    dummy_stack = np.random.normal(size=(25, 20, 20))
+    masker = mono.mask.StreamingSigmaMasker(shape=(20, 20),
+                                            sigma_multiple=10)
+    for framedex in dummy_stack[:12]:
+        masker.mask(frame=framedex)
+    # Hot pixels are masked, invalid values are not.
+    dummy_frame = dummy_stack[12].copy()
+    dummy_frame[3, 4] = 1000
+    dummy_frame[5, 5] = -1000
+    dummy_frame[7, 7] = np.nan
+    test_mask = masker.mask(frame=dummy_frame)
+    expected_mask = np.zeros((20, 20), dtype=bool)
+    expected_mask[3, 4] = expected_mask[5, 5] = True
+    assert np.array_equal(test_mask, expected_mask)
+    # The masked and invalid values are not in the history.
+    assert masker.frame_count[3, 4] == 12
+    assert masker.frame_count[7, 7] == 12
+    assert masker.frame_count[0, 0] == 13
+    assert np.all(np.isfinite(masker.mean))
+
+    # A checkpoint continues the same stream.
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'checkpoint.npz')
+        masker.save(filename=filename)
+        loaded_masker = mono.mask.StreamingSigmaMasker.load(
+            filename=filename)
+    for framedex in dummy_stack[13:]:
+        assert np.array_equal(masker.mask(frame=framedex),
+                              loaded_masker.mask(frame=framedex))
+    assert np.array_equal(masker.mean, loaded_masker.mean)
+    assert np.array_equal(masker.variance, loaded_masker.variance)
+    return None
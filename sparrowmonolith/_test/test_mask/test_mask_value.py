@@ -8,6 +8,7 @@ import numpy as np
 import numpy.ma as np_ma
 import sympy as sy
 import math
+import pytest
 
 import sparrowmonolith as mono
 
@@ -67,6 +68,14 @@ def test_mask_sigma_value():
         test_mask = mono.mask.mask_sigma_value(data_array=dummy_array, 
                                                sigma_multiple=sigma, 
                                                sigma_iterations=1)
+        # Values on the bounds, within rounding, may be on either side
+        # of them; such as both values if there are only two.
+        on_bounds = (np.isclose(dummy_array, mean - sigma*std, rtol=1e-12, 
+                                atol=0)
+                     | np.isclose(dummy_array, mean + sigma*std, rtol=1e-12, 
+                                  atol=0))
+        test_mask = test_mask[~on_bounds]
+        expected_mask = expected_mask[~on_bounds]
         # Check that they are the same.
         assert_message = ("The expected mask and the created mask do "
                           "not agree. "
@@ -76,9 +85,113 @@ def test_mask_sigma_value():
         return None
 
 
+    def exact():
+        # The float and arbitrary precision computations should 
+        # agree, including for uneven sigma and many iterations.
+        dummy_array = np.random.normal(size=(20, 15))
+        sigma = [1.5, 2]
+        float_mask = mono.mask.mask_sigma_value(data_array=dummy_array, 
+                                                sigma_multiple=sigma, 
+                                                sigma_iterations=3)
+        exact_mask = mono.mask.mask_sigma_value(data_array=dummy_array, 
+                                                sigma_multiple=sigma, 
+                                                sigma_iterations=3, 
+                                                exact=True)
+        # Check that they are the same.
+        assert_message = ("The float mask and the exact mask do "
+                          "not agree. "
+                          "\n Float: \n {f_mask} \n Exact: \n {e_mask}"
+                          .format(f_mask=float_mask, e_mask=exact_mask))
+        assert np.array_equal(float_mask, exact_mask), assert_message
+        return None
+    def invalid():
+        # Invalid values should not ruin the statistics of the rest.
+        dummy_array = np.random.normal(size=(20, 15))
+        expected_mask = mono.mask.mask_sigma_value(data_array=dummy_array, 
+                                                   sigma_multiple=1)
+        dummy_array[0, 0] = np.nan
+        expected_mask[0, 0] = False
+        test_mask = mono.mask.mask_sigma_value(data_array=dummy_array, 
+                                               sigma_multiple=1)
+        # Only the statistics could change, and by not much.
+        assert np.sum(test_mask != expected_mask) <= 3, (
+            "The invalid value changed the mask. "
+            "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+            .format(t_mask=test_mask, e_mask=expected_mask))
+        # Infinite values are left out of the statistics just as NaN.
+        dummy_array[0, 0] = np.inf
+        infinite_mask = mono.mask.mask_sigma_value(
+            data_array=dummy_array, sigma_multiple=1, sigma_iterations=None)
+        dummy_array[0, 0] = np.nan
+        nan_mask = mono.mask.mask_sigma_value(
+            data_array=dummy_array, sigma_multiple=1, sigma_iterations=None)
+        nan_mask[0, 0] = True
+        assert np.array_equal(infinite_mask, nan_mask), (
+            "The infinite value changed the statistics.")
+        return None
+    def converge():
+        # Iterating until convergence should be the same as iterating
+        # many times, for both the float and exact computations.
+        dummy_array = np.random.normal(size=(20, 15))
+        dummy_array[np.random.random(dummy_array.shape) < 0.05] *= 100
+        for exactdex in (False, True):
+            expected_mask = mono.mask.mask_sigma_value(
+                data_array=dummy_array, sigma_multiple=2, 
+                sigma_iterations=100, exact=exactdex)
+            test_mask = mono.mask.mask_sigma_value(
+                data_array=dummy_array, sigma_multiple=2, 
+                sigma_iterations=None, exact=exactdex)
+            # Check that they are the same.
+            assert_message = ("The converged mask and the expected mask "
+                              "do not agree. "
+                              "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                              .format(t_mask=test_mask, 
+                                      e_mask=expected_mask))
+            assert np.array_equal(test_mask, expected_mask), assert_message
+        return None
+
+    def axis():
+        # Clipping along an axis should be the same as clipping every
+        # slice by itself, in any number of chunks.
+        dummy_array = np.random.normal(size=(8, 15, 10))
+        dummy_array[np.random.random(dummy_array.shape) < 0.05] *= 100
+        for axisdex in (0, 1, -1):
+            test_mask = mono.mask.mask_sigma_value(
+                data_array=dummy_array, sigma_multiple=2, 
+                sigma_iterations=3, axis=axisdex, chunk_size=100)
+            # Clip the slices one at a time.
+            slice_array = np.moveaxis(dummy_array, axisdex, -1)
+            expected_mask = np.zeros(slice_array.shape, dtype=bool)
+            for indexdex in np.ndindex(slice_array.shape[:-1]):
+                expected_mask[indexdex] = mono.mask.mask_sigma_value(
+                    data_array=slice_array[indexdex], sigma_multiple=2, 
+                    sigma_iterations=3)
+            expected_mask = np.moveaxis(expected_mask, -1, axisdex)
+            # Check that they are the same.
+            assert_message = ("The axis mask and the expected mask "
+                              "do not agree. "
+                              "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                              .format(t_mask=test_mask, 
+                                      e_mask=expected_mask))
+            assert np.array_equal(test_mask, expected_mask), assert_message
+        # The exact computation should agree along an axis too.
+        exact_mask = mono.mask.mask_sigma_value(
+            data_array=dummy_array, sigma_multiple=2, sigma_iterations=3, 
+            axis=(0, 2), exact=True)
+        float_mask = mono.mask.mask_sigma_value(
+            data_array=dummy_array, sigma_multiple=2, sigma_iterations=3, 
+            axis=(0, 2))
+        assert np.array_equal(exact_mask, float_mask), (
+            "The float mask and the exact mask do not agree.")
+        return None
+
     # Do the tests.
     static()
     dynamic()
+    exact()
+    invalid()
+    converge()
+    axis()
 
     # All done.
     return None
@@ -125,9 +238,50 @@ def test_mask_percent_truncation():
                           "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
                           .format(t_mask=test_mask, e_mask=expected_mask))
         assert np.array_equal(test_mask, expected_mask), assert_message
+    def axis():
+        # Truncating the columns should be the same as truncating 
+        # every column by itself.
+        dummy_array = np.random.random(size=(40, 7))
+        test_mask = mono.mask.mask_percent_truncation(
+            data_array=dummy_array, top_percent=0.1, bottom_percent=0.05, 
+            axis=0)
+        expected_mask = np.stack([mono.mask.mask_percent_truncation(
+            data_array=columndex, top_percent=0.1, bottom_percent=0.05) 
+                                  for columndex in dummy_array.T], axis=1)
+
+        # Check that they are the same.
+        assert_message = ("The expected mask and the created mask do "
+                          "not agree. "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(t_mask=test_mask, e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+    def non_terminating():
+        # Percents which do not terminate as decimals are exact
+        # fractions with large numerators.
+        dummy_array = np.random.random(size=10000)
+        for top_percent, bottom_percent in ((1/3, 0.0), (0.0, 1/3)):
+            test_mask = mono.mask.mask_percent_truncation(
+                data_array=dummy_array, top_percent=top_percent,
+                bottom_percent=bottom_percent)
+            assert np.count_nonzero(test_mask) == 3333, (
+                "The non-terminating percent was not truncated.")
+        test_mask = mono.mask.expr.percent_truncation(
+            top_percent=1/3, bottom_percent=0.0).evaluate(
+                data_array=dummy_array)
+        assert np.count_nonzero(test_mask) == 3333, (
+            "The non-terminating percent expression was not truncated.")
+        # And along an axis, for every slice.
+        test_mask = mono.mask.mask_percent_truncation(
+            data_array=dummy_array.reshape(2, 5000), top_percent=1/3,
+            bottom_percent=0.0, axis=1)
+        assert np.array_equal(np.count_nonzero(test_mask, axis=1),
+                              [1666, 1666]), (
+            "The non-terminating percent slices were not truncated.")
     # Do the mask tests.
     similar()
     unsimilar()
+    axis()
+    non_terminating()
     # All done.
     return None
 
@@ -166,6 +320,66 @@ def test_mask_count_truncation():
         test_mask = mono.mask.mask_count_truncation(
             data_array=dummy_array, top_count=4, bottom_count=7)
 
+        # Check that they are the same.
+        assert_message = ("The expected mask and the created mask do "
+                          "not agree. "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(t_mask=test_mask, e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+    def invalid():
+        # NaN values are not counted and are not masked.
+        dummy_array = np.array([4, np.nan, 5, 9, 6, np.nan, 7, 3, 0, 1])
+        expected_mask = np.array([False, False, False, True, False, 
+                                  False, False, False, True, False])
+        test_mask = mono.mask.mask_count_truncation(
+            data_array=dummy_array, top_count=1, bottom_count=1)
+        # Truncating every value still leaves the NaN values.
+        assert np.array_equal(
+            mono.mask.mask_count_truncation(data_array=dummy_array, 
+                                            top_count=5, bottom_count=3), 
+            ~np.isnan(dummy_array))
+
+        # Check that they are the same.
+        assert_message = ("The expected mask and the created mask do "
+                          "not agree. "
+                          "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                          .format(t_mask=test_mask, e_mask=expected_mask))
+        assert np.array_equal(test_mask, expected_mask), assert_message
+    def axis():
+        # Truncating along an axis should be the same as truncating 
+        # every slice by itself, with or without NaN values.
+        dummy_array = np.random.randint(0, 10, size=(6, 8, 5)).astype(float)
+        for nandex in (False, True):
+            if (nandex):
+                dummy_array[np.random.random(dummy_array.shape) < 0.1] = (
+                    np.nan)
+            test_mask = mono.mask.mask_count_truncation(
+                data_array=dummy_array, top_count=2, bottom_count=1, 
+                axis=1)
+            expected_mask = np.zeros(dummy_array.shape, dtype=bool)
+            for indexdex in np.ndindex(6, 5):
+                expected_mask[indexdex[0], :, indexdex[1]] = (
+                    mono.mask.mask_count_truncation(
+                        data_array=dummy_array[indexdex[0], :, indexdex[1]],
+                        top_count=2, bottom_count=1))
+
+            # Check that they are the same.
+            assert_message = ("The expected mask and the created mask do "
+                              "not agree. "
+                              "\n Test: \n {t_mask} \n Expected: \n {e_mask}"
+                              .format(t_mask=test_mask, 
+                                      e_mask=expected_mask))
+            assert np.array_equal(test_mask, expected_mask), assert_message
+    def large_integers():
+        # Integers beyond the precision of floats are cut at their
+        # own values along an axis, as for the entire array.
+        dummy_array = 2**53 + np.array([[1, 2, 3, 4], [4, 3, 2, 1]], 
+                                       dtype=np.int64)
+        test_mask = mono.mask.mask_count_truncation(
+            data_array=dummy_array, top_count=1, bottom_count=1, axis=1)
+        expected_mask = np.array([[True, False, False, True], 
+                                  [True, False, False, True]])
+
         # Check that they are the same.
         assert_message = ("The expected mask and the created mask do "
                           "not agree. "
@@ -175,9 +389,56 @@ def test_mask_count_truncation():
     # Do the mask tests.
     similar()
     unsimilar()
+    invalid()
+    axis()
+    large_integers()
     # All done.
     return None
 
+def test_mask_band_value():
+    """ This tests the masking of values outside of a band, with 
+    single and per row or column thresholds."""
+    dummy_array = np.random.normal(size=(37, 23))
+    dummy_array[np.random.random(dummy_array.shape) < 0.05] = np.nan
+    dummy_array[0, 0] = np.inf
+    dummy_array[1, 1] = -np.inf
+    # Single thresholds, against the pair of masks, in small chunks.
+    expected_mask = (dummy_array < -1) | (dummy_array > 0.5)
+    for chunkdex in (1, 50, 2**16):
+        test_mask = mono.mask.mask_band_value(
+            data_array=dummy_array, minimum_value=-1, maximum_value=0.5,
+            chunk_size=chunkdex)
+        assert np.array_equal(test_mask, expected_mask)
+    # Only one of the thresholds.
+    assert np.array_equal(
+        mono.mask.mask_band_value(data_array=dummy_array, 
+                                  maximum_value=0.5),
+        mono.mask.mask_maximum_value(data_array=dummy_array, 
+                                     maximum_value=0.5))
+    assert not np.any(mono.mask.mask_band_value(data_array=dummy_array))
+
+    # Thresholds for every row and every column.
+    row_minimum = np.random.uniform(-2, 0, size=37)
+    row_maximum = np.random.uniform(0, 2, size=37)
+    out = np.empty(dummy_array.shape, dtype=bool)
+    test_mask = mono.mask.mask_band_value(
+        data_array=dummy_array, minimum_value=row_minimum, 
+        maximum_value=row_maximum, axis=0, out=out, chunk_size=100)
+    assert test_mask is out
+    assert np.array_equal(test_mask, 
+                          (dummy_array < row_minimum[:, None]) 
+                          | (dummy_array > row_maximum[:, None]))
+    column_maximum = np.random.uniform(0, 2, size=23)
+    test_mask = mono.mask.mask_band_value(
+        data_array=dummy_array, minimum_value=-1, 
+        maximum_value=column_maximum, axis=1)
+    assert np.array_equal(test_mask, (dummy_array < -1) 
+                          | (dummy_array > column_maximum))
+    with pytest.raises(mono.InputError):
+        mono.mask.mask_band_value(data_array=dummy_array, 
+                                  minimum_value=row_minimum)
+    return None
+
 def test_mask_maximum_value():
     """ This tests the masking of values below a minimum."""
     # Dummy array
@@ -284,3 +545,93 @@ def test_mask_exact_value():
     floats()
     # All done.
     return None
+
+def test_mask_exact_values():
+    """ This tests the masking of many exact values at once."""
+
+    def integers():
+        # Dummy array, with the extremes of the type.
+        dummy_array = np.array([0, 7, 65535, 3, 9, 1, 7, 65534, 1, 4], 
+                               dtype=np.uint16)
+        # The negative value cannot be in the array.
+        exact = [0, 65535, -32768, 7]
+        expected_mask = np.array([1, 1, 1, 0, 0, 0, 1, 0, 0, 0], 
+                                 dtype=bool)
+        test_mask = mono.mask.mask_exact_values(
+            data_array=dummy_array, exact_values=exact)
+        assert np.array_equal(test_mask, expected_mask)
+        # With a tolerance, and many values.
+        expected_mask = np.isin(dummy_array, [0, 1, 65535, 65534, 7, 
+                                              3, 4, 9])
+        test_mask = mono.mask.mask_exact_values(
+            data_array=dummy_array, exact_values=[0, 65535, 3.5, 8], 
+            tolerance=1)
+        assert np.array_equal(test_mask, expected_mask)
+        return None
+    def floats():
+        # Dummy array, with invalid values.
+        dummy_array = np.array([0.0, 7.5, 65535.2, 3.0, np.nan, 1.0, 
+                                -32768.0, np.inf, 7.0, 4.0])
+        exact = [0, 65535, -32768]
+        expected_mask = np.array([1, 0, 0, 0, 0, 0, 1, 0, 0, 0], 
+                                 dtype=bool)
+        test_mask = mono.mask.mask_exact_values(
+            data_array=dummy_array, exact_values=exact)
+        assert np.array_equal(test_mask, expected_mask)
+        # With a tolerance, and NaN.
+        expected_mask = np.array([1, 1, 1, 0, 1, 0, 1, 0, 1, 0], 
+                                 dtype=bool)
+        test_mask = mono.mask.mask_exact_values(
+            data_array=dummy_array, exact_values=exact + [7.2, np.nan], 
+            tolerance=0.3)
+        assert np.array_equal(test_mask, expected_mask)
+        return None
+    def large_integers():
+        # Values beyond 2**53, which float64 cannot hold exactly.
+        dummy_array = np.array([2**53, 2**53 + 1, 2**62 + 3], 
+                               dtype=np.int64)
+        test_mask = mono.mask.mask_exact_values(
+            data_array=dummy_array, exact_values=[2**53 + 1, 2**62 + 3])
+        assert np.array_equal(test_mask, [False, True, True])
+        dummy_array = np.array([2**63 + 5, 2**63 + 4, 2**64 - 1], 
+                               dtype=np.uint64)
+        test_mask = mono.mask.mask_exact_values(
+            data_array=dummy_array, exact_values=[2**63 + 5, 2**64 - 1])
+        assert np.array_equal(test_mask, [True, False, True])
+        return None
+    def wide_tolerance():
+        # A tolerance far wider than could be listed compares ranges, 
+        # clipped to the type.
+        dummy_array = np.array([-2**63, -5, 0, 10**12, 2**62, 2**63 - 1], 
+                               dtype=np.int64)
+        test_mask = mono.mask.mask_exact_values(
+            data_array=dummy_array, exact_values=[-2**63, 2**62 + 2**61], 
+            tolerance=2.0**61, chunk_size=4)
+        assert np.array_equal(test_mask, 
+                              [True, False, False, False, True, True])
+        test_mask = mono.mask.mask_exact_values(
+            data_array=dummy_array.astype(np.int16), 
+            exact_values=[0, 32767], tolerance=np.inf)
+        assert np.all(test_mask)
+        return None
+    def against_loop():
+        # The sorted search against comparing each value in turn.
+        dummy_array = np.random.normal(scale=10, size=(40, 50))
+        exact = np.random.normal(scale=10, size=30)
+        expected_mask = np.zeros(dummy_array.shape, dtype=bool)
+        for exactdex in exact:
+            expected_mask |= (np.abs(dummy_array - exactdex) <= 0.1)
+        test_mask = mono.mask.mask_exact_values(
+            data_array=dummy_array, exact_values=exact, tolerance=0.1, 
+            chunk_size=333)
+        assert np.array_equal(test_mask, expected_mask)
+        return None
+
+    # Run the tests.
+    integers()
+    large_integers()
+    wide_tolerance()
+    floats()
+    against_loop()
+    # All done.
+    return None
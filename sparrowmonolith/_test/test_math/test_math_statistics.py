@@ -8,6 +8,7 @@ results.
 import decimal
 import numpy as np
 import math
+import pytest
 
 import sparrowmonolith as mono
 
@@ -35,8 +36,37 @@ def test_arithmetic_mean():
                                   arry=test_array))
         assert math.isclose(expected_mean, calculated_mean), assert_message
 
+    def masked_calculation():
+        # Only the unmasked values are used.
+        test_array = np.array([[98, 59, 82, 75, 49], 
+                               [91, 55, 77, 68, 4]])
+        test_mask = test_array > 80
+        expected_mean = decimal.Decimal(59 + 75 + 49 + 55 + 77 + 68 + 4) / 7
+        calculated_mean = mono.math.statistics.arithmetic_mean(
+            array=test_array, mask=test_mask)
+        assert math.isclose(expected_mean, calculated_mean)
+
+    def precision_tiers():
+        # The float tiers are within their error bounds of the exact
+        # mean, even with a large offset.
+        test_array = 1e6 + np.random.normal(size=1200)
+        exact_mean = mono.math.statistics.arithmetic_mean(
+            array=test_array, precision='exact')
+        float_mean = mono.math.statistics.arithmetic_mean(
+            array=test_array)
+        compensated_mean = mono.math.statistics.arithmetic_mean(
+            array=test_array, precision='compensated')
+        assert isinstance(float_mean, float)
+        assert math.isclose(float_mean, exact_mean, rel_tol=1e-14)
+        assert math.isclose(compensated_mean, exact_mean, rel_tol=2**-52)
+        with pytest.raises(mono.InputError):
+            mono.math.statistics.arithmetic_mean(array=test_array, 
+                                                 precision='double')
+
     # Execute the tests.
     example_calculation()
+    masked_calculation()
+    precision_tiers()
 # Aliases
 def test_mean(): return test_arithmetic_mean()
 
@@ -79,9 +109,34 @@ def test_median():
                                   arry=test_array))
         assert expected_median == calculated_median, assert_message
 
+    def masked_calculation():
+        # The median of the unmasked values, odd and even in number.
+        test_array = np.array([56, 10, 14, 60, 17, 33, 90, 79, 55, 9, 
+                               72, 5, 81, 21, 99, 39, 73, 28, 18, 12])
+        for thresholddex in (80, 90):
+            test_mask = test_array > thresholddex
+            expected_median = mono.math.statistics.median(
+                array=test_array[~test_mask])
+            calculated_median = mono.math.statistics.median(
+                array=test_array, mask=test_mask)
+            assert expected_median == calculated_median
+
+    def exact_calculation():
+        # The exact median keeps the type of the middle value, and 
+        # averages the middle values as Decimals.
+        test_array = [56, 10, 14, 60, 17, 33, 90, 79, 55, 9, 
+                      72, 5, 81, 21, 99, 39, 73, 28, 18, 12]
+        assert mono.math.statistics.median(array=test_array[:-1], 
+                                           precision='exact') == 39
+        assert (mono.math.statistics.median(array=test_array, 
+                                            precision='exact') 
+                == decimal.Decimal(36))
+
     # Execute the tests.
     example_odd_calculation()
     example_even_calculation()
+    masked_calculation()
+    exact_calculation()
 
     # All done.
     return None
@@ -126,11 +181,121 @@ def test_standard_deviation():
                                   arry=test_array))
         assert math.isclose(expected_std, calculated_std), assert_message
 
+    def masked_ddof_1():
+        # Only the unmasked values are used.
+        test_array = np.array([92, 9, 43, 72, 64, 33, 15, 33, 20, 71, 
+                               69, 51, 23, 61, 70, 27, 85, 10, 60, 36])
+        test_mask = test_array < 20
+        expected_std = mono.math.statistics.standard_deviation(
+            array=test_array[~test_mask], ddof=1)
+        calculated_std = mono.math.statistics.standard_deviation(
+            array=test_array, ddof=1, mask=test_mask)
+        assert math.isclose(expected_std, calculated_std)
+
+    def precision_tiers():
+        # The float tiers are within their error bounds of the exact
+        # standard deviation, even with a large offset.
+        test_array = 1e6 + np.random.normal(size=500)
+        test_mask = np.random.random(500) < 0.2
+        exact_std = mono.math.statistics.standard_deviation(
+            array=test_array, ddof=1, mask=test_mask, precision='exact')
+        for precisiondex in ('float', 'compensated'):
+            calculated_std = mono.math.statistics.standard_deviation(
+                array=test_array, ddof=1, mask=test_mask, 
+                precision=precisiondex)
+            assert math.isclose(calculated_std, exact_std, rel_tol=1e-12)
+
     # Execute the tests
     population_ddof_0()
     sample_ddof_1()
+    masked_ddof_1()
+    precision_tiers()
 
     # All done.
     return None
 # Aliases
-def test_std(): return test_standard_deviation()
\ No newline at end of file
+def test_std(): return test_standard_deviation()
+
+
+# Streaming statistics
+##########
+
+def test_StatisticsAccumulator():
+    """ This tests the accumulation and merging of streaming 
+    statistics."""
+
+    def chunked_statistics():
+        # Accumulating in small chunks gives the one-shot statistics,
+        # even with a large offset.
+        test_array = 1e6 + np.random.gamma(2.0, size=(60, 50))
+        test_mask = np.random.random((60, 50)) < 0.1
+        accumulator = mono.math.statistics.StatisticsAccumulator(
+            higher_moments=True)
+        accumulator.update(array=test_array, mask=test_mask, chunk_size=100)
+        kept_values = test_array[~test_mask]
+        deviations = kept_values - np.mean(kept_values)
+        expected_skewness = (np.mean(deviations**3) 
+                             / np.mean(deviations**2)**1.5)
+        expected_kurtosis = (np.mean(deviations**4) 
+                             / np.mean(deviations**2)**2 - 3)
+        assert accumulator.count == kept_values.size
+        assert math.isclose(accumulator.mean, np.mean(kept_values), 
+                            rel_tol=1e-15)
+        assert math.isclose(accumulator.std(ddof=1), 
+                            np.std(kept_values, ddof=1), rel_tol=1e-9)
+        assert accumulator.minimum == np.min(kept_values)
+        assert accumulator.maximum == np.max(kept_values)
+        assert math.isclose(accumulator.skewness, expected_skewness, 
+                            rel_tol=1e-6)
+        assert math.isclose(accumulator.kurtosis, expected_kurtosis, 
+                            rel_tol=1e-6)
+
+    def merged_statistics():
+        # Accumulators of parts of the data merge into the statistics 
+        # of all of it, including through dictionaries.
+        test_array = 5 + np.random.gamma(2.0, size=1000)
+        Accumulator = mono.math.statistics.StatisticsAccumulator
+        whole = Accumulator(higher_moments=True).update(array=test_array)
+        first = Accumulator(higher_moments=True).update(
+            array=test_array[:137])
+        second = Accumulator(higher_moments=True).update(
+            array=test_array[137:])
+        second = Accumulator.from_dict(second.to_dict())
+        merged = first + second
+        assert first.count == 137
+        assert merged.count == whole.count
+        for namedex in ('mean', 'minimum', 'maximum', 'skewness', 
+                        'kurtosis'):
+            assert math.isclose(getattr(merged, namedex), 
+                                getattr(whole, namedex), rel_tol=1e-12, 
+                                abs_tol=1e-12)
+        assert math.isclose(merged.variance(ddof=1), 
+                            whole.variance(ddof=1), rel_tol=1e-12)
+        # Merging in place, and merging nothing.
+        first += second
+        first.merge(Accumulator())
+        assert math.isclose(first.mean, whole.mean, rel_tol=1e-12)
+        assert first.count == whole.count
+
+    def empty_and_invalid():
+        # Without data the statistics are not defined, and the higher 
+        # moments must be asked for.
+        accumulator = mono.math.statistics.StatisticsAccumulator()
+        accumulator.update(array=np.ones(5), mask=np.ones(5, dtype=bool))
+        assert accumulator.count == 0
+        assert np.isnan(accumulator.mean)
+        assert np.isnan(accumulator.std())
+        with pytest.raises(mono.InputError):
+            accumulator.skewness
+        accumulator.update(array=np.ones(5))
+        with pytest.raises(mono.InputError):
+            mono.math.statistics.StatisticsAccumulator(
+                higher_moments=True).merge(accumulator)
+
+    # Execute the tests.
+    chunked_statistics()
+    merged_statistics()
+    empty_and_invalid()
+
+    # All done.
+    return None
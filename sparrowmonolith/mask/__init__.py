@@ -14,4 +14,35 @@ from sparrowmonolith.mask.common import *
 # makes sense to split them up other than for file organization.
 from sparrowmonolith.mask.geometric import *
 from sparrowmonolith.mask.invalid import *
-from sparrowmonolith.mask.value import *
\ No newline at end of file
+from sparrowmonolith.mask.value import *
+# Masks from local statistics.
+from sparrowmonolith.mask.local import *
+# Masks of streams of frames.
+from sparrowmonolith.mask.streaming import *
+# Masks of stacks of images.
+from sparrowmonolith.mask.stack import *
+# Growing, shrinking, and labelling masks.
+from sparrowmonolith.mask.morphology import *
+# Sparse representations of masks.
+from sparrowmonolith.mask.sparse import *
+# Coverage statistics of masks.
+from sparrowmonolith.mask.coverage import *
+# Reductions over the unmasked values.
+from sparrowmonolith.mask.reduction import *
+# Parallel evaluation of masks.
+from sparrowmonolith.mask.parallel import *
+# Out-of-core evaluation of masks.
+from sparrowmonolith.mask.chunked import *
+# Caching of computed masks.
+from sparrowmonolith.mask.cache import *
+# Libraries of many named masks saved together.
+from sparrowmonolith.mask.library import *
+# Mask recipes applied to many files.
+from sparrowmonolith.mask.recipe import *
+# Instrumentation of the mask functions.
+from sparrowmonolith.mask.instrument import *
+
+# The lazy mask expressions are kept in their own name-space as their
+# short names would otherwise clash with the masking modules.
+from sparrowmonolith.mask import expression
+expr = expression # Aliases
@@ -0,0 +1,15 @@
+"""
+The command line interface of the mask recipes, see 
+mono.mask.run_mask_recipe. For example::
+
+    python -m sparrowmonolith.mask recipe.ini *.fits --summary summary.csv
+"""
+
+import sys
+
+import sparrowmonolith as mono
+
+# Only run as ``python -m sparrowmonolith.mask``; not when this file 
+# is loaded by itself, which has no module specification.
+if ((__name__ == '__main__') and (__spec__ is not None)):
+    sys.exit(mono.mask.recipe._main())
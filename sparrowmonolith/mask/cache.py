@@ -0,0 +1,318 @@
+"""
+This contains a cache of the results of the masking functions. The
+same masks are often computed many times, such as the invalid pixels
+of a bad pixel frame or the geometric masks of a detector, for every
+frame and every step of a pipeline. The cache keeps them, keyed by a
+fingerprint of the data array and the parameters of the mask.
+
+Geometric masks only depend on the shape of the data array, so they
+are keyed only by the shape.
+"""
+
+import collections
+import hashlib
+import os
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+# The default number of bytes of masks kept in memory.
+DEFAULT_CACHE_SIZE = 2**28
+# The default number of elements hashed in a sampled fingerprint.
+DEFAULT_SAMPLE_SIZE = 2**16
+# The geometric mask functions whose masks only depend on the shape of
+# the data array; other functions are keyed by their data.
+_SHAPE_ONLY_FUNCTIONS = frozenset((
+    'mask_single_pixels', 'mask_rectangle', 'mask_subarray',
+    'mask_columns', 'mask_rows', 'mask_circle', 'mask_annulus',
+    'mask_ellipse', 'mask_polygon', 'mask_circles', 'mask_nothing',
+    'mask_everything'))
+
+def fingerprint_array(data_array, sample_size=None):
+    """ This computes a fingerprint of the data array, a hash of its
+    shape, type, and values.
+
+    The hash is the BLAKE2b hash, which is fast and built into
+    Python. The full fingerprint hashes every value. A sampled
+    fingerprint hashes only an evenly spaced sample of the values,
+    which is far faster for large arrays but cannot tell apart
+    arrays which differ only outside of the sample.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array to fingerprint.
+    sample_size : int (optional)
+        The number of values to sample for the fingerprint. If None,
+        the default, every value is hashed.
+
+    Returns
+    -------
+    fingerprint : string
+        The hexadecimal fingerprint of the array.
+    """
+    data_array = np.asarray(data_array)
+    hash_object = hashlib.blake2b(digest_size=16)
+    # The same values in a different shape or type are different.
+    hash_object.update(repr((data_array.shape,
+                             data_array.dtype.str)).encode())
+    flat_array = data_array.reshape(-1)
+    if ((sample_size is not None) and (flat_array.size > sample_size)):
+        # An evenly spaced sample, the same for arrays of the same
+        # size.
+        hash_object.update(b'sampled')
+        sample_indexes = np.linspace(0, flat_array.size - 1,
+                                     int(sample_size)).astype(np.int64)
+        flat_array = flat_array[sample_indexes]
+    # Hashing the memory directly, without a copy if possible.
+    hash_object.update(memoryview(np.ascontiguousarray(flat_array)).cast('B'))
+    fingerprint = hash_object.hexdigest()
+    return fingerprint
+
+def _parameter_fingerprint(mask_function, kwargs):
+    """ This computes a fingerprint of the mask function and its
+    parameters. Array parameters are fingerprinted by their values.
+
+    Parameters
+    ----------
+    mask_function : function
+        The mask function.
+    kwargs : dictionary
+        The keyword arguments of the mask function.
+
+    Returns
+    -------
+    fingerprint : string
+        The hexadecimal fingerprint of the function and parameters.
+    """
+    hash_object = hashlib.blake2b(digest_size=16)
+    hash_object.update('{module}.{name}'.format(
+        module=getattr(mask_function, '__module__', ''),
+        name=getattr(mask_function, '__qualname__',
+                     repr(mask_function))).encode())
+    for keydex in sorted(kwargs.keys()):
+        valuedex = kwargs[keydex]
+        hash_object.update(keydex.encode())
+        if (isinstance(valuedex, (np.ndarray, list, tuple))
+                and (np.asarray(valuedex).dtype != object)):
+            hash_object.update(fingerprint_array(
+                data_array=np.asarray(valuedex)).encode())
+        else:
+            hash_object.update(repr(valuedex).encode())
+    fingerprint = hash_object.hexdigest()
+    return fingerprint
+
+class MaskCache(object):
+    """ A cache of computed masks.
+
+    Masks are kept in memory, up to a total number of bytes, with
+    the least recently used masks removed first. If a directory is
+    provided, the masks are also saved there and loaded again when
+    they are not in memory; these are kept across sessions.
+
+    The masks returned are read-only as they are shared between all
+    who ask for them; copy them to change them.
+
+    Parameters
+    ----------
+    max_bytes : int (optional)
+        The maximum number of bytes of masks kept in memory. Defaults
+        to DEFAULT_CACHE_SIZE.
+    directory : string (optional)
+        The directory which the masks are saved in. If None, the
+        default, masks are only kept in memory.
+    sampled : boolean (optional)
+        If True, the data arrays are fingerprinted from a sample of
+        their values, see `fingerprint_array`. Defaults to False.
+    verify : boolean (optional)
+        If True, and the fingerprints are sampled, the full
+        fingerprint of the data array is checked before a cached
+        mask is used. Defaults to False.
+    sample_size : int (optional)
+        The number of values sampled for the sampled fingerprints.
+        Defaults to DEFAULT_SAMPLE_SIZE.
+    """
+
+    def __init__(self, max_bytes=None, directory=None, sampled=False,
+                 verify=False, sample_size=None):
+        self.max_bytes = (DEFAULT_CACHE_SIZE if (max_bytes is None)
+                          else int(max_bytes))
+        self.directory = directory
+        self.sampled = sampled
+        self.verify = verify
+        self.sample_size = (DEFAULT_SAMPLE_SIZE if (sample_size is None)
+                            else int(sample_size))
+        if (self.directory is not None):
+            os.makedirs(self.directory, exist_ok=True)
+        # The masks, and the full data fingerprints, by key with the
+        # most recently used last.
+        self._masks = collections.OrderedDict()
+        self._verifications = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        return None
+
+    def __len__(self):
+        return len(self._masks)
+
+    def __contains__(self, key):
+        return key in self._masks
+
+    def key(self, mask_function, data_array, **kwargs):
+        """ This computes the key of the mask of the function with
+        the data array and parameters.
+
+        Parameters
+        ----------
+        mask_function : function
+            The mask function.
+        data_array : ndarray
+            The data array that the mask will be calculated from.
+        **kwargs : dictionary
+            The keyword arguments of the mask function.
+
+        Returns
+        -------
+        key : string
+            The key of the mask.
+        """
+        data_array = np.asarray(data_array)
+        if (_is_shape_only(mask_function=mask_function)):
+            # Only the shape matters for geometric masks.
+            data_key = 'shape{shape}'.format(shape=data_array.shape)
+        elif (self.sampled):
+            data_key = fingerprint_array(data_array=data_array,
+                                         sample_size=self.sample_size)
+        else:
+            data_key = fingerprint_array(data_array=data_array)
+        key = '{data}-{parameters}'.format(
+            data=data_key, parameters=_parameter_fingerprint(
+                mask_function=mask_function, kwargs=kwargs))
+        # Keys are also file names.
+        key = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return key
+
+    def mask(self, mask_function, data_array, **kwargs):
+        """ This returns the mask of the function with the data array
+        and parameters, from the cache if it is there. Otherwise it
+        is computed and kept.
+
+        Parameters
+        ----------
+        mask_function : function
+            The mask function.
+        data_array : ndarray
+            The data array that the mask will be calculated from.
+        **kwargs : dictionary
+            The keyword arguments of the mask function.
+
+        Returns
+        -------
+        final_mask : ndarray
+            The read-only mask as computed by the mask function.
+        """
+        data_array = np.asarray(data_array)
+        key = self.key(mask_function, data_array=data_array, **kwargs)
+        # The full fingerprint, if the cached mask is to be verified.
+        if (self.sampled and self.verify
+                and (not _is_shape_only(mask_function=mask_function))):
+            verification = fingerprint_array(data_array=data_array)
+        else:
+            verification = None
+
+        # From memory, then from disk.
+        final_mask = self._masks.get(key, None)
+        if ((final_mask is not None)
+                and (self._verifications.get(key, None) != verification)):
+            # The sample matched, but the data did not.
+            final_mask = None
+        if (final_mask is not None):
+            self._masks.move_to_end(key)
+            self.hits += 1
+            return final_mask
+        final_mask = self._load(key=key, verification=verification)
+        if (final_mask is not None):
+            self.hits += 1
+            self._store(key=key, final_mask=final_mask,
+                        verification=verification)
+            return final_mask
+
+        # It needs to be computed.
+        self.misses += 1
+        final_mask = np.array(mask_function(data_array=data_array,
+                                            **kwargs), dtype=bool)
+        final_mask.setflags(write=False)
+        self._store(key=key, final_mask=final_mask,
+                    verification=verification)
+        self._save(key=key, final_mask=final_mask,
+                   verification=verification)
+        return final_mask
+    __call__ = mask
+
+    def clear(self):
+        """ This removes all of the masks kept in memory. Masks saved
+        in the directory are kept."""
+        self._masks.clear()
+        self._verifications.clear()
+        self.nbytes = 0
+        return None
+
+    def _store(self, key, final_mask, verification):
+        """ Keeps the mask in memory, removing the least recently
+        used masks to stay within the maximum number of bytes."""
+        if (final_mask.nbytes > self.max_bytes):
+            # It would not fit anyways.
+            return None
+        if (key in self._masks):
+            self.nbytes -= self._masks.pop(key).nbytes
+        self._masks[key] = final_mask
+        self._verifications[key] = verification
+        self.nbytes += final_mask.nbytes
+        while (self.nbytes > self.max_bytes):
+            old_key, old_mask = self._masks.popitem(last=False)
+            self._verifications.pop(old_key, None)
+            self.nbytes -= old_mask.nbytes
+        return None
+
+    def _filename(self, key):
+        """ The file of the mask within the directory."""
+        return os.path.join(self.directory, '{key}.npz'.format(key=key))
+
+    def _save(self, key, final_mask, verification):
+        """ Saves the mask into the directory, packed into bits."""
+        if (self.directory is None):
+            return None
+        np.savez(self._filename(key=key),
+                 packed_mask=np.packbits(final_mask, axis=None),
+                 shape=np.array(final_mask.shape, dtype=np.int64),
+                 verification=np.array(str(verification)))
+        return None
+
+    def _load(self, key, verification):
+        """ Loads the mask from the directory, if it is there."""
+        if (self.directory is None):
+            return None
+        filename = self._filename(key=key)
+        if (not os.path.isfile(filename)):
+            return None
+        with np.load(filename) as mask_file:
+            if (str(mask_file['verification']) != str(verification)):
+                # The sample matched, but the data did not.
+                return None
+            shape = tuple(mask_file['shape'].tolist())
+            final_mask = np.unpackbits(
+                mask_file['packed_mask'],
+                count=int(np.prod(shape, dtype=np.int64))).astype(bool)
+        final_mask = final_mask.reshape(shape)
+        final_mask.setflags(write=False)
+        return final_mask
+
+def _is_shape_only(mask_function):
+    """ If the mask of the function only depends on the shape of the
+    data array, as the listed geometric masks do."""
+    return ((getattr(mask_function, '__module__', None)
+             == mono.mask.geometric.__name__)
+            and (getattr(mask_function, '__name__', None)
+                 in _SHAPE_ONLY_FUNCTIONS))
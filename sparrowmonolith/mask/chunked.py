@@ -0,0 +1,567 @@
+"""
+This contains the out-of-core evaluation of masks. The data array,
+usually a memory-mapped array (such as np.memmap or the data of a
+fits file opened with memory mapping), is read and masked one chunk
+at a time, and the mask is written into a memory-mapped file. Only
+chunk-sized arrays are ever in memory.
+
+Masks which need the statistics of all of the data are computed in
+passes over the chunks, before the masks of the chunks are written.
+"""
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+# The default number of bytes of data which are read at once.
+DEFAULT_CHUNK_SIZE = 2**26
+# The number of values sampled, in a pass, to pick the pivots about
+# the ranks of the truncation bounds.
+_SAMPLE_SIZE = 2**14
+
+def mask_chunked(data_array, mask_expression, filename=None, out=None,
+                 chunk_size=None, **kwargs):
+    """ This evaluates a mask expression, or mask function, over the
+    data array one chunk at a time so that the data array does not
+    need to fit in memory.
+
+    The sigma and truncation bounds are computed by passes over the
+    chunks: the sigma bounds use sums of every chunk (one pass per
+    iteration) and the truncation bounds are found by selection, a
+    pass which samples the values and another which gathers only the
+    values about the ranks of the bounds. The masks of the chunks are then
+    evaluated and written into the output mask.
+
+    Mask functions of this module with an expression are evaluated
+    as that expression. Other mask functions need the entire data
+    array and are computed in memory.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the mask will be calculated from, often
+        a memory-mapped array.
+    mask_expression : MaskExpression or function
+        The mask expression (see mono.mask.expression) or the mask
+        function to evaluate.
+    filename : string (optional)
+        The path of the Numpy (.npy) file which the mask is written
+        into as a memory-mapped array. It is overwritten if it
+        exists.
+    out : ndarray (optional)
+        A boolean array, the same shape as the data, which the mask
+        is written into, such as a memory-mapped array. It cannot
+        be used with a filename.
+    chunk_size : int (optional)
+        The number of bytes of data read at once. Defaults to
+        DEFAULT_CHUNK_SIZE.
+    **kwargs : dictionary
+        The keyword arguments of the mask function, if a function is
+        provided.
+
+    Returns
+    -------
+    final_mask : ndarray
+        A boolean array for pixels that are masked (True) or are
+        valid (False). It is memory-mapped to the file if a filename
+        was provided.
+    """
+    # The expression of what is to be evaluated.
+    if (isinstance(mask_expression, mono.mask.expression.MaskExpression)):
+        if (len(kwargs) != 0):
+            raise mono.InputError("Keyword arguments are only used for "
+                                  "mask functions, not expressions.")
+    else:
+        mask_expression = mono.mask.parallel._function_expression(
+            mask_function=mask_expression, **kwargs)
+    chunk_size = (DEFAULT_CHUNK_SIZE if (chunk_size is None)
+                  else int(chunk_size))
+
+    # The data is not read by viewing it as an array.
+    data_array = np.asarray(data_array)
+    if ((filename is not None) and (out is not None)):
+        raise mono.InputError("The mask can be written into either a "
+                              "file or an output array, not both.")
+    elif (filename is not None):
+        final_mask = np.lib.format.open_memmap(
+            filename, mode='w+', dtype=bool, shape=data_array.shape)
+    elif (out is not None):
+        if (np.shape(out) != data_array.shape):
+            raise mono.InputError("The output mask must be the same shape "
+                                  "as the data array.")
+        final_mask = out
+    else:
+        final_mask = np.empty(data_array.shape, dtype=bool)
+
+    # Everything global is found first by passes over the chunks,
+    # then the chunks are masked.
+    windows = mono.mask.expression._tile_windows(
+        shape=data_array.shape, itemsize=data_array.itemsize,
+        tile_size=chunk_size)
+    context = {'shape': data_array.shape}
+    _prepare_chunked(mask_expression=mask_expression,
+                     data_array=data_array, windows=windows,
+                     context=context)
+    workspace = mono.mask.expression._Workspace()
+    for windowdex in windows:
+        # Reading the chunk once, rather than by every mask.
+        data_chunk = np.array(data_array[windowdex])
+        mask_expression._evaluate(data_tile=data_chunk, window=windowdex,
+                                  context=context,
+                                  out=final_mask[windowdex],
+                                  workspace=workspace, depth=0)
+    # Ensuring that the mask is on disk.
+    if (isinstance(final_mask, np.memmap)):
+        final_mask.flush()
+    return final_mask
+
+def _prepare_chunked(mask_expression, data_array, windows, context):
+    """ This prepares the expression, and all expressions within it,
+    for the data array by passes over the chunks rather than the
+    entire data array at once.
+
+    Parameters
+    ----------
+    mask_expression : MaskExpression
+        The expression to prepare.
+    data_array : ndarray
+        The data array that the mask will be calculated from.
+    windows : list
+        The slices along the first axis of every chunk.
+    context : dictionary
+        The prepared state of the expression, which is added to.
+
+    Returns
+    -------
+    None
+    """
+    expression = mono.mask.expression
+    if (isinstance(mask_expression, expression._LogicalCombination)):
+        for childdex in mask_expression.children:
+            _prepare_chunked(mask_expression=childdex,
+                             data_array=data_array, windows=windows,
+                             context=context)
+    elif (isinstance(mask_expression, expression._LogicalNot)):
+        _prepare_chunked(mask_expression=mask_expression.child,
+                         data_array=data_array, windows=windows,
+                         context=context)
+    elif (isinstance(mask_expression, expression._BandExpression)
+          and (mask_expression.bounds_function is not None)):
+        context[id(mask_expression)] = _chunked_band_bounds(
+            band_expression=mask_expression, data_array=data_array,
+            windows=windows)
+    elif (isinstance(mask_expression, expression._ElementwiseExpression)):
+        # There is nothing to prepare.
+        pass
+    elif (isinstance(mask_expression, expression._FunctionExpression)):
+        mono.warn(mono.MemoryWarning, "The mask function {func} is not "
+                  "known to work on chunks; it is computed over the "
+                  "entire data array in memory."
+                  .format(func=getattr(mask_expression.mask_function,
+                                       '__name__', 'function')))
+        mask_expression._prepare(data_array=data_array, context=context)
+    else:
+        # Everything else does not read the data when prepared.
+        mask_expression._prepare(data_array=data_array, context=context)
+    return None
+
+def _chunked_band_bounds(band_expression, data_array, windows):
+    """ This computes the lower and upper bounds of a band expression
+    from the chunks of the data array.
+
+    Parameters
+    ----------
+    band_expression : _BandExpression
+        The band expression, with a bounds function.
+    data_array : ndarray
+        The data array that the bounds will be calculated from.
+    windows : list
+        The slices along the first axis of every chunk.
+
+    Returns
+    -------
+    lower_bound : float
+        Values strictly less than this bound are masked.
+    upper_bound : float
+        Values strictly more than this bound are masked.
+    """
+    bounds_function = band_expression.bounds_function
+    kwargs = band_expression.kwargs
+    if ((bounds_function is mono.mask.value._sigma_value_bounds)
+            and (not kwargs.get('exact', False))
+            and (kwargs.get('axis', None) is None)):
+        lower_bound, upper_bound = _chunked_sigma_value_bounds(
+            data_array=data_array, windows=windows,
+            sigma_multiple=kwargs['sigma_multiple'],
+            sigma_iterations=kwargs.get('sigma_iterations', 1))
+    elif (bounds_function is mono.mask.expression._truncation_bounds):
+        lower_bound, upper_bound = _chunked_truncation_bounds(
+            data_array=data_array, windows=windows,
+            truncation_counts=lambda n_data_points: (kwargs['top_count'],
+                                                     kwargs['bottom_count']))
+    elif (bounds_function is mono.mask.expression._percent_truncation_bounds):
+        # The counts need the number of values, which the first pass
+        # finds.
+        def truncation_counts(n_data_points):
+            return mono.mask.value._percent_truncation_counts(
+                data_array=data_array, top_percent=kwargs['top_percent'],
+                bottom_percent=kwargs['bottom_percent'],
+                n_data_points=n_data_points)
+        lower_bound, upper_bound = _chunked_truncation_bounds(
+            data_array=data_array, windows=windows,
+            truncation_counts=truncation_counts)
+    else:
+        mono.warn(mono.MemoryWarning, "The bounds of {expr} are not known "
+                  "to work on chunks; they are computed over the entire "
+                  "data array in memory.".format(expr=band_expression))
+        lower_bound, upper_bound = bounds_function(data_array=data_array,
+                                                   **kwargs)
+    return float(lower_bound), float(upper_bound)
+
+def _chunked_sigma_value_bounds(data_array, windows, sigma_multiple,
+                                sigma_iterations=1):
+    """ This computes the lower and upper value bounds of the sigma
+    mask, see mono.mask.mask_sigma_value, by passes over the chunks.
+
+    The first pass finds the mean. Every iteration is then one pass
+    which sums the kept values of the chunks, and their squares,
+    shifted by the previous mean so that the variance does not
+    suffer from catastrophic cancellation.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the bounds will be calculated from.
+    windows : list
+        The slices along the first axis of every chunk.
+    sigma_multiple : float or array-like
+        The multiple of sigma which will be applied. Unequal
+        bottom-top bounds may be set as a list-like input.
+    sigma_iterations : int or None
+        The number of iterations, or None to iterate until no new
+        values are masked.
+
+    Returns
+    -------
+    lower_bound : float
+        Values strictly less than this bound are masked.
+    upper_bound : float
+        Values strictly more than this bound are masked.
+    """
+    # It does not make sense to run this mask with no iterations.
+    if ((sigma_iterations is not None) and (sigma_iterations < 1)):
+        raise mono.InputError("It does not make sense to do this "
+                              "mask with less than 1 iteration.")
+    flat_sigma_multiple = np.ravel(np.array(sigma_multiple, dtype=float))
+    bottom_sigma_multiple = flat_sigma_multiple[0]
+    top_sigma_multiple = flat_sigma_multiple[-1]
+
+    def chunk_sums(lower_bound, upper_bound, shift):
+        # The number, sum, and sum of squares of the kept values of
+        # all of the chunks, shifted.
+        n_values = 0
+        shifted_sum = 0.0
+        shifted_square_sum = 0.0
+        for windowdex in windows:
+            data_chunk = np.asarray(data_array[windowdex])
+            kept_values = np.isfinite(data_chunk)
+            if (lower_bound > -np.inf):
+                kept_values &= (lower_bound <= data_chunk)
+            if (upper_bound < np.inf):
+                kept_values &= (data_chunk <= upper_bound)
+            deviations = np.subtract(data_chunk[kept_values], shift,
+                                     dtype=np.float64)
+            n_values += deviations.size
+            shifted_sum += float(np.sum(deviations))
+            shifted_square_sum += float(np.dot(deviations, deviations))
+        return n_values, shifted_sum, shifted_square_sum
+
+    lower_bound = -np.inf
+    upper_bound = np.inf
+    # The first pass for the mean.
+    n_values, shifted_sum, __ = chunk_sums(lower_bound=lower_bound,
+                                           upper_bound=upper_bound,
+                                           shift=0.0)
+    if (n_values == 0):
+        # There are no statistics to be had.
+        return lower_bound, upper_bound
+    mean = shifted_sum / n_values
+    previous_n_values = None
+    iterdex = 0
+    while ((sigma_iterations is None) or (iterdex < sigma_iterations)):
+        iterdex = iterdex + 1
+        n_values, shifted_sum, shifted_square_sum = chunk_sums(
+            lower_bound=lower_bound, upper_bound=upper_bound, shift=mean)
+        if ((n_values == 0) or (n_values == previous_n_values)):
+            # Everything has been masked, or no new values were
+            # masked and the bounds have converged.
+            break
+        previous_n_values = n_values
+        # Calculate the mean and the sigma values of the kept data.
+        shifted_mean = shifted_sum / n_values
+        mean = mean + shifted_mean
+        stddev = np.sqrt(max(shifted_square_sum / n_values
+                             - shifted_mean**2, 0))
+        # Keeping the tightest bounds.
+        lower_bound = max(lower_bound, mean - stddev * bottom_sigma_multiple)
+        upper_bound = min(upper_bound, mean + stddev * top_sigma_multiple)
+    return lower_bound, upper_bound
+
+def _chunked_truncation_bounds(data_array, windows, truncation_counts,
+                               gather_size=None):
+    """ This computes the lower and upper value bounds of the count
+    (and percent) truncation masks, see mono.mask.mask_count_truncation,
+    by passes over the chunks.
+
+    The bounds are the values of two ranks, found by selection. The
+    first pass counts the values and takes a strided sample of them;
+    the pivots about each rank are picked from the sample. The second
+    pass counts the values below the pivots and gathers only those
+    between them. If too many are between the pivots to be gathered,
+    that pass samples them instead and the pivots are narrowed in
+    another pass. Only the chunk, the sample, and at most
+    ``gather_size`` values for each rank are ever in memory, however
+    large the counts are.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the bounds will be calculated from.
+    windows : list
+        The slices along the first axis of every chunk.
+    truncation_counts : function
+        The function of the number of (not NaN) values which gives
+        the number of values from the top, and from the bottom, of
+        the array to mask.
+    gather_size : int (optional)
+        The most values gathered for the selection of each rank.
+        Defaults to the number of values of the largest chunk.
+
+    Returns
+    -------
+    lower_bound : float
+        Values strictly less than this bound are masked.
+    upper_bound : float
+        Values strictly more than this bound are masked.
+    """
+    if (gather_size is None):
+        gather_size = max([int(np.prod(data_array[windowdex].shape))
+                           for windowdex in windows] + [_SAMPLE_SIZE])
+
+    # The first pass, all of the values are gathered if they can be.
+    n_data_points, sample, gathered = _chunked_count_and_sample(
+        data_array=data_array, windows=windows, gather_size=gather_size)
+    top_count, bottom_count = truncation_counts(n_data_points)
+    top_count = max(int(top_count), 0)
+    bottom_count = max(int(bottom_count), 0)
+
+    # Some special cases needs to be taken care of.
+    if ((top_count + bottom_count) >= n_data_points):
+        # They are masking out their entire array, or more.
+        return np.inf, -np.inf
+    # The cutoffs are the highest of the lowest values and the lowest
+    # of the highest values.
+    ranks = []
+    if (top_count > 0):
+        ranks.append(n_data_points - top_count - 1)
+    if (bottom_count > 0):
+        ranks.append(bottom_count)
+    if (gathered is not None):
+        gathered = np.partition(gathered, ranks) if (len(ranks) > 0) else []
+        rank_values = {rankdex: gathered[rankdex] for rankdex in ranks}
+    else:
+        rank_values = _chunked_select_ranks(
+            data_array=data_array, windows=windows, ranks=ranks,
+            n_data_points=n_data_points, sample=sample,
+            gather_size=gather_size)
+    upper_bound = (rank_values[n_data_points - top_count - 1]
+                   if (top_count > 0) else np.inf)
+    lower_bound = (rank_values[bottom_count]
+                   if (bottom_count > 0) else -np.inf)
+    return lower_bound, upper_bound
+
+def _ordered_values(data_array, window):
+    """ The values of the chunk which have an order (are not NaN),
+    flattened."""
+    data_chunk = np.ravel(data_array[window])
+    if (np.issubdtype(data_chunk.dtype, np.inexact)):
+        data_chunk = data_chunk[~np.isnan(data_chunk)]
+    return data_chunk
+
+def _chunked_count_and_sample(data_array, windows, gather_size):
+    """ The number of the ordered values of the data array, an evenly
+    strided sorted sample of them, and all of them if there are at
+    most ``gather_size`` (otherwise None), by one pass."""
+    stride = max(int(data_array.size) // _SAMPLE_SIZE, 1)
+    n_data_points = 0
+    sample_chunks = []
+    gathered_chunks = []
+    for windowdex in windows:
+        valuesdex = _ordered_values(data_array=data_array, window=windowdex)
+        # The sample continues its stride across the chunks.
+        sample_chunks.append(
+            np.array(valuesdex[(-n_data_points) % stride::stride]))
+        if (gathered_chunks is not None):
+            if (n_data_points + valuesdex.size <= gather_size):
+                gathered_chunks.append(np.array(valuesdex))
+            else:
+                gathered_chunks = None
+        n_data_points += valuesdex.size
+    no_values = np.array([], dtype=data_array.dtype)
+    sample = np.sort(np.concatenate(sample_chunks + [no_values]))
+    gathered = (np.concatenate(gathered_chunks + [no_values])
+                if (gathered_chunks is not None) else None)
+    return n_data_points, sample, gathered
+
+def _chunked_select_ranks(data_array, windows, ranks, n_data_points,
+                          sample, gather_size):
+    """ The values of the ranks (from the smallest) of the ordered
+    values of the data array, by passes over the chunks.
+
+    Every search keeps an outer bracket of values which the rank is
+    known to be strictly between, with a sample of them, and picks
+    pivots about the rank from the sample. A pass counts the values
+    below, and equal to, the pivots, and gathers (or samples, if
+    there are too many) those strictly between them. The outer
+    bracket is then narrowed to the side of, or between, the pivots
+    which has the rank; it holds fewer values every time, so the
+    search ends."""
+    rank_values = {}
+    searches = []
+    for rankdex in sorted(set(ranks)):
+        searchdex = {'rank': rankdex}
+        if (_narrow_search(search=searchdex, lower=None, upper=None,
+                           n_below=0, n_between=n_data_points,
+                           sample=sample, rank_values=rank_values)):
+            searches.append(searchdex)
+
+    while (len(searches) > 0):
+        for searchdex in searches:
+            searchdex.update({'n_below': 0, 'n_lower': 0, 'n_upper': 0,
+                              'n_between': 0, 'gathered': [],
+                              'sample_chunks': []})
+        # A pass over the chunks, for every search.
+        for windowdex in windows:
+            valuesdex = _ordered_values(data_array=data_array,
+                                        window=windowdex)
+            for searchdex in searches:
+                _bracket_chunk(search=searchdex, values=valuesdex,
+                               gather_size=gather_size)
+
+        unresolved_searches = []
+        for searchdex in searches:
+            sample = searchdex['sample']
+            # The number below, and up to, each side of the pivots.
+            n_below = searchdex['n_below']
+            n_to_lower = n_below + searchdex['n_lower']
+            n_to_between = n_to_lower + searchdex['n_between']
+            n_to_upper = n_to_between + searchdex['n_upper']
+            rankdex = searchdex['rank']
+            if (rankdex < n_below):
+                # Below the pivots, the sample has values of it.
+                unresolved = _narrow_search(
+                    search=searchdex, lower=searchdex['outer_lower'],
+                    upper=searchdex['lower'],
+                    n_below=searchdex['outer_below'],
+                    n_between=n_below - searchdex['outer_below'],
+                    sample=sample[sample < searchdex['lower']],
+                    rank_values=rank_values)
+            elif (rankdex < n_to_lower):
+                rank_values[rankdex] = searchdex['lower']
+                unresolved = False
+            elif (rankdex < n_to_between):
+                if (searchdex['gathered'] is not None):
+                    rank_values[rankdex] = np.partition(
+                        np.concatenate(searchdex['gathered']),
+                        rankdex - n_to_lower)[rankdex - n_to_lower]
+                    unresolved = False
+                else:
+                    # Between the pivots, they were sampled.
+                    unresolved = _narrow_search(
+                        search=searchdex, lower=searchdex['lower'],
+                        upper=searchdex['upper'], n_below=n_to_lower,
+                        n_between=searchdex['n_between'],
+                        sample=np.sort(np.concatenate(
+                            searchdex['sample_chunks'])),
+                        rank_values=rank_values)
+            elif (rankdex < n_to_upper):
+                rank_values[rankdex] = searchdex['upper']
+                unresolved = False
+            else:
+                # Above the pivots, the sample has values of it.
+                unresolved = _narrow_search(
+                    search=searchdex, lower=searchdex['upper'],
+                    upper=searchdex['outer_upper'], n_below=n_to_upper,
+                    n_between=(searchdex['outer_below']
+                               + searchdex['outer_between'] - n_to_upper),
+                    sample=sample[sample > searchdex['upper']],
+                    rank_values=rank_values)
+            # The values of this pass are no longer needed.
+            searchdex['gathered'] = None
+            searchdex['sample_chunks'] = None
+            if (unresolved):
+                unresolved_searches.append(searchdex)
+        searches = unresolved_searches
+    return rank_values
+
+def _narrow_search(search, lower, upper, n_below, n_between, sample,
+                   rank_values):
+    """ This narrows the outer bracket of the search to strictly
+    between the lower and upper values (None if unbounded), with the
+    number below and between them and a sorted sample of those
+    between, and picks the pivots about its rank from the sample.
+    If the sample is of all of the values between, the value of the
+    rank is found from it instead. If the search is still unresolved
+    it returns True."""
+    search.update({'outer_lower': lower, 'outer_upper': upper,
+                   'outer_below': n_below, 'outer_between': n_between,
+                   'sample': sample})
+    index = search['rank'] - n_below
+    if (sample.size == n_between):
+        rank_values[search['rank']] = sample[index]
+        return False
+    # The pivots are a margin of sample values either side of where
+    # the rank would be in the sample; beyond the sample, the outer
+    # bounds are used.
+    margin = max(int(3 * np.sqrt(sample.size)), 1)
+    position = index / max(n_between - 1, 1) * (sample.size - 1)
+    lower_index = int(position) - margin
+    upper_index = int(np.ceil(position)) + margin
+    search['lower'] = (sample[lower_index] if (lower_index >= 0)
+                       else lower)
+    search['upper'] = (sample[upper_index] if (upper_index < sample.size)
+                       else upper)
+    # The approximate number between the pivots, for the stride of
+    # their sample.
+    fraction = min((upper_index - lower_index) / max(sample.size, 1), 1)
+    search['stride'] = max(int(n_between * fraction) // _SAMPLE_SIZE, 1)
+    return True
+
+def _bracket_chunk(search, values, gather_size):
+    """ This counts the values of the chunk below, and equal to, the
+    pivots of the search, and gathers (while there are few enough)
+    and samples those strictly between them."""
+    between = np.ones(values.shape, dtype=bool)
+    if (search['lower'] is not None):
+        below = values < search['lower']
+        search['n_below'] += int(np.count_nonzero(below))
+        at_lower = values == search['lower']
+        search['n_lower'] += int(np.count_nonzero(at_lower))
+        between &= ~(below | at_lower)
+    if (search['upper'] is not None):
+        at_upper = values == search['upper']
+        if ((search['lower'] is None) or (search['upper'] != search['lower'])):
+            search['n_upper'] += int(np.count_nonzero(at_upper))
+        between &= (values < search['upper'])
+    between_values = values[between]
+    # The sample continues its stride across the chunks.
+    search['sample_chunks'].append(np.array(
+        between_values[(-search['n_between']) % search['stride']::
+                       search['stride']]))
+    if (search['gathered'] is not None):
+        if (search['n_between'] + between_values.size <= gather_size):
+            search['gathered'].append(between_values)
+        else:
+            search['gathered'] = None
+    search['n_between'] += between_values.size
+    return None
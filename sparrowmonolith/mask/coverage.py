@@ -0,0 +1,247 @@
+"""
+This contains the coverage statistics of a set of masks: how much of
+the data each mask flags, how much the masks overlap, and which rows
+and columns they flag. It is meant to be cheap enough to log for
+every frame of a pipeline.
+
+Boolean masks are packed into bits, and the counts and overlaps are
+the population counts (popcount) of the packed words, 64 pixels at a
+time. A bitmask is already a small integer code per pixel, a bit per
+mask; a single histogram of the codes gives every count and overlap
+at once.
+"""
+
+import astropy.table as ap_table
+import numpy as np
+
+import sparrowmonolith as mono
+
+# The number of pixels whose codes are histogrammed at once, bounding
+# the size of the temporary arrays.
+_HISTOGRAM_CHUNK_SIZE = 2**20
+# The most bits of a bitmask encoded into a histogram, beyond this the
+# packed masks are used.
+_MAXIMUM_HISTOGRAM_BITS = 12
+
+# The number of set bits of every byte, for Numpy versions without a
+# bit count.
+_POPCOUNT_TABLE = np.array([bin(bytedex).count('1')
+                            for bytedex in range(256)], dtype=np.uint8)
+
+def mask_coverage(masks, names=None):
+    """ This computes the coverage statistics of a set of masks.
+
+    Parameters
+    ----------
+    masks : dictionary, list, or ndarray
+        The masks, either a dictionary of masks by name, a list of
+        masks, or an integer bitmask array where every bit is a mask.
+        All of the masks must be the same shape.
+    names : list (optional)
+        The names of the masks of a list or of the bits of a bitmask,
+        in order. Defaults to the indexes of the masks, or the bits
+        which are set in the bitmask.
+
+    Returns
+    -------
+    coverage : dictionary
+        The coverage statistics, by key:
+
+        - ``names``: The names of the masks.
+        - ``size``: The number of pixels.
+        - ``counts``, ``fractions``: The number and fraction of the
+          pixels flagged by each mask.
+        - ``exclusive_counts``: The number of pixels flagged by each
+          mask and no other.
+        - ``overlap``: The matrix of the number of pixels flagged by
+          both of every pair of masks; the diagonal is the counts.
+        - ``union_count``, ``union_fraction``: The number and
+          fraction of the pixels flagged by any mask.
+        - ``row_counts``, ``column_counts``: The number of pixels
+          flagged by each mask in every row and column, of shape
+          (masks, rows) and (masks, columns). For stacks of images,
+          they are summed over the images.
+    """
+    mask_list, bitmask, names = _coverage_masks(masks=masks, names=names)
+    n_masks = len(names)
+    shape = (bitmask.shape if (bitmask is not None)
+             else (mask_list[0].shape if (n_masks > 0) else (0,)))
+    size = int(np.prod(shape, dtype=np.int64))
+
+    if ((bitmask is not None) and (n_masks <= _MAXIMUM_HISTOGRAM_BITS)):
+        # Every count from the histogram of the codes of the pixels.
+        code_histogram = _code_histogram(bitmask=bitmask, n_masks=n_masks)
+        # The bits of every code, the counts of the masks of each are
+        # the histogram through them.
+        code_bits = ((np.arange(2**n_masks)[:, None]
+                      >> np.arange(n_masks)[None, :]) & 1).astype(np.int64)
+        overlap = code_bits.T @ (code_histogram[:, None] * code_bits)
+        exclusive_counts = code_histogram[2**np.arange(n_masks)]
+        union_count = int(size - code_histogram[0])
+    else:
+        # The packed masks.
+        overlap, exclusive_counts, union_count = _packed_overlap(
+            mask_list=mask_list, bitmask=bitmask, n_masks=n_masks)
+
+    # The rows and columns, over the last two axes.
+    if (len(shape) >= 2):
+        row_axes = tuple(range(len(shape) - 2)) + (len(shape) - 1,)
+        column_axes = tuple(range(len(shape) - 1))
+    else:
+        row_axes = column_axes = tuple(range(len(shape)))
+    row_counts = []
+    column_counts = []
+    for indexdex in range(n_masks):
+        maskdex = (mask_list[indexdex] if (bitmask is None)
+                   else _bitmask_bit(bitmask=bitmask, bit=indexdex))
+        row_counts.append(_axis_counts(mask=maskdex, axes=row_axes))
+        column_counts.append(_axis_counts(mask=maskdex, axes=column_axes))
+
+    counts = np.diagonal(overlap).astype(np.int64)
+    coverage = {'names': list(names),
+                'size': size,
+                'counts': counts,
+                'fractions': counts / max(size, 1),
+                'exclusive_counts': np.asarray(exclusive_counts,
+                                               dtype=np.int64),
+                'overlap': np.asarray(overlap, dtype=np.int64),
+                'union_count': int(union_count),
+                'union_fraction': int(union_count) / max(size, 1),
+                'row_counts': np.array(row_counts, dtype=np.int64),
+                'column_counts': np.array(column_counts, dtype=np.int64)}
+    return coverage
+
+def mask_coverage_table(coverage):
+    """ This summarizes the coverage statistics as a table, one row
+    per mask, for logging.
+
+    Parameters
+    ----------
+    coverage : dictionary
+        The coverage statistics, see `mask_coverage`.
+
+    Returns
+    -------
+    coverage_table : Table
+        The Astropy table of the name, count, fraction, and
+        exclusive count of every mask.
+    """
+    coverage_table = ap_table.Table(
+        {'name': [str(namedex) for namedex in coverage['names']],
+         'count': coverage['counts'],
+         'fraction': coverage['fractions'],
+         'exclusive_count': coverage['exclusive_counts']})
+    coverage_table.meta['size'] = coverage['size']
+    coverage_table.meta['union_count'] = coverage['union_count']
+    coverage_table.meta['union_fraction'] = coverage['union_fraction']
+    return coverage_table
+
+def _coverage_masks(masks, names):
+    """ This sorts the input masks into either a list of boolean masks
+    or an integer bitmask, and their names."""
+    if (isinstance(masks, dict)):
+        names = list(masks.keys()) if (names is None) else list(names)
+        masks = list(masks.values())
+    if (isinstance(masks, np.ndarray) and (masks.dtype != bool)):
+        if (not np.issubdtype(masks.dtype, np.integer)):
+            raise mono.InputError("A bitmask must be an integer array, not "
+                                  "of type {type}.".format(type=masks.dtype))
+        # The bits of the bitmask are unsigned, so that the sign bit 
+        # is the highest bit.
+        bitmask = masks.view(np.dtype('u{n}'.format(n=masks.dtype.itemsize)))
+        if (names is None):
+            # The bits which are set, up to the highest.
+            highest_bits = np.bitwise_or.reduce(bitmask, axis=None)
+            names = list(range(int(highest_bits).bit_length()))
+        return None, bitmask, list(names)
+    # A list of masks, a single boolean array is a single mask.
+    if (isinstance(masks, np.ndarray)):
+        masks = [masks]
+    mask_list = [np.asarray(maskdex, dtype=bool) for maskdex in masks]
+    names = list(range(len(mask_list))) if (names is None) else list(names)
+    if (len(names) != len(mask_list)):
+        raise mono.InputError("There are {n_name} names for {n_mask} masks."
+                              .format(n_name=len(names),
+                                      n_mask=len(mask_list)))
+    for maskdex in mask_list:
+        if (maskdex.shape != mask_list[0].shape):
+            raise mono.DataError("The masks are not the same shape. Shapes: "
+                                 "{shp_1}  {shp_2}"
+                                 .format(shp_1=mask_list[0].shape,
+                                         shp_2=maskdex.shape))
+    return mask_list, None, names
+
+def _bitmask_bit(bitmask, bit):
+    """ The boolean mask of a single bit of the bitmask."""
+    return np.bitwise_and(bitmask, bitmask.dtype.type(1) << bit) != 0
+
+def _axis_counts(mask, axes):
+    """ The number of masked pixels over the axes, summed in the
+    smallest integers which cannot overflow, as that is faster."""
+    n_summed = int(np.prod([mask.shape[axisdex] for axisdex in axes],
+                           dtype=np.int64))
+    if (n_summed < 2**16):
+        count_dtype = np.uint16
+    elif (n_summed < 2**31):
+        count_dtype = np.int32
+    else:
+        count_dtype = np.int64
+    return np.add.reduce(mask.view(np.uint8), axis=axes, dtype=count_dtype)
+
+def _code_histogram(bitmask, n_masks):
+    """ The histogram of the bitmask codes of the named bits of every
+    pixel, computed in chunks of pixels."""
+    code_histogram = np.zeros(2**n_masks, dtype=np.int64)
+    flat_bitmask = bitmask.reshape(-1)
+    code_dtype = np.uint8 if (n_masks <= 8) else np.uint16
+    for startdex in range(0, flat_bitmask.size, _HISTOGRAM_CHUNK_SIZE):
+        codes = np.bitwise_and(
+            flat_bitmask[startdex:startdex + _HISTOGRAM_CHUNK_SIZE],
+            2**n_masks - 1).astype(code_dtype)
+        code_histogram += np.bincount(codes, minlength=2**n_masks)
+    return code_histogram
+
+def _pack_mask(mask):
+    """ This packs the mask into 64-bit words, the last padded with
+    zeros."""
+    packed_bytes = np.packbits(mask, axis=None)
+    padded_bytes = np.zeros(-(-packed_bytes.size // 8) * 8, dtype=np.uint8)
+    padded_bytes[:packed_bytes.size] = packed_bytes
+    return padded_bytes.view(np.uint64)
+
+def _popcount(packed_words):
+    """ The total number of set bits of the packed words."""
+    if (hasattr(np, 'bitwise_count')):
+        return int(np.sum(np.bitwise_count(packed_words), dtype=np.int64))
+    return int(np.sum(_POPCOUNT_TABLE[packed_words.view(np.uint8)],
+                      dtype=np.int64))
+
+def _packed_overlap(mask_list, bitmask, n_masks):
+    """ The overlap matrix, exclusive counts, and union count of the
+    masks by the population counts of their packed bits."""
+    if (n_masks == 0):
+        return (np.zeros((0, 0), dtype=np.int64),
+                np.zeros(0, dtype=np.int64), 0)
+    packed_masks = []
+    for indexdex in range(n_masks):
+        maskdex = (mask_list[indexdex] if (bitmask is None)
+                   else _bitmask_bit(bitmask=bitmask, bit=indexdex))
+        packed_masks.append(_pack_mask(mask=maskdex))
+    overlap = np.zeros((n_masks, n_masks), dtype=np.int64)
+    for rowdex in range(n_masks):
+        for columndex in range(rowdex, n_masks):
+            overlap[rowdex, columndex] = overlap[columndex, rowdex] = (
+                _popcount(packed_masks[rowdex] & packed_masks[columndex]))
+    # The pixels of each mask and no other are those not in the union
+    # of the masks before it nor of the masks after it.
+    before_words = [np.zeros_like(packed_masks[0])]
+    for packeddex in packed_masks[:-1]:
+        before_words.append(before_words[-1] | packeddex)
+    after_words = np.zeros_like(packed_masks[0])
+    exclusive_counts = np.zeros(n_masks, dtype=np.int64)
+    for indexdex in range(n_masks - 1, -1, -1):
+        exclusive_counts[indexdex] = _popcount(
+            packed_masks[indexdex] & ~(before_words[indexdex] | after_words))
+        after_words = after_words | packed_masks[indexdex]
+    # After every mask, it is the union.
+    return overlap, exclusive_counts, _popcount(after_words)
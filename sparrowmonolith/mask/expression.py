@@ -0,0 +1,730 @@
+
+"""
+This is a small expression layer over the masking functions. Masks
+are described lazily and combined with the logical operators, for
+example::
+
+    from sparrowmonolith.mask import expression as expr
+    mask_expression = ((expr.invalid() | expr.sigma(3)
+                        | expr.rectangle([0, 10], [0, 10]))
+                       & ~expr.columns([4, 5]))
+    final_mask = mask_expression.evaluate(data_array=data_array)
+
+Nothing is computed until the expression is evaluated. Statistics
+which need all of the data (such as the sigma and truncation
+bounds) are computed first, then the element-wise tests are fused
+and evaluated over the data in cache-sized tiles. Only tile-sized
+temporary arrays are made, rather than a full array per mask.
+
+Follows Numpy convention where True is masked and False is not
+masked.
+"""
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+# The default number of bytes of data which are evaluated at once,
+# small enough to stay within the cache of a core.
+DEFAULT_TILE_SIZE = 2**18
+
+def _tile_windows(shape, itemsize, tile_size=None):
+    """ This splits an array into tiles along its first axis. Each
+    tile is made of whole sub-arrays (rows for images) so that the
+    tiles are contiguous.
+
+    Parameters
+    ----------
+    shape : tuple
+        The shape of the array to be split.
+    itemsize : int
+        The number of bytes of each element of the array.
+    tile_size : int (optional)
+        The number of bytes of data per tile. Defaults to
+        DEFAULT_TILE_SIZE. There is always at least one sub-array
+        per tile.
+
+    Returns
+    -------
+    windows : list
+        The slices along the first axis of every tile.
+    """
+    tile_size = DEFAULT_TILE_SIZE if (tile_size is None) else int(tile_size)
+    if (len(shape) == 0):
+        # Scalars are their own tile.
+        return [Ellipsis]
+    # The number of bytes of each sub-array along the first axis.
+    subarray_bytes = max(int(np.prod(shape[1:], dtype=np.int64))
+                         * int(itemsize), 1)
+    tile_length = max(tile_size // subarray_bytes, 1)
+    windows = [slice(startdex, min(startdex + tile_length, shape[0]))
+               for startdex in range(0, shape[0], tile_length)]
+    return windows
+
+class _Workspace(object):
+    """ The scratch boolean buffers used in evaluating the tiles. One
+    buffer is needed per level of the expression tree, and they are
+    reused across all of the tiles."""
+
+    def __init__(self):
+        self._buffers = {}
+        return None
+
+    def scratch(self, depth, shape):
+        """ Returns a scratch buffer of the shape for the tree level.
+        """
+        size = int(np.prod(shape, dtype=np.int64))
+        buffer = self._buffers.get(depth, None)
+        if ((buffer is None) or (buffer.size < size)):
+            buffer = np.empty(size, dtype=bool)
+            self._buffers[depth] = buffer
+        return buffer[:size].reshape(shape)
+
+def _band_into(data_tile, lower_bound, upper_bound, out, workspace, depth):
+    """ This evaluates ``(data < lower) | (data > upper)`` into the
+    output buffer without any new temporary arrays."""
+    if (lower_bound > -np.inf):
+        np.less(data_tile, lower_bound, out=out)
+    else:
+        out.fill(False)
+    if (upper_bound < np.inf):
+        scratch = workspace.scratch(depth=depth, shape=out.shape)
+        np.greater(data_tile, upper_bound, out=scratch)
+        np.logical_or(out, scratch, out=out)
+    return out
+
+def _as_expression(other):
+    """ Converts the object to a mask expression. Functions become
+    function masks and arrays (dense or sparse) become constant
+    masks."""
+    if (isinstance(other, MaskExpression)):
+        return other
+    elif (callable(other)):
+        return function(mask_function=other)
+    else:
+        return constant(mask=other)
+
+class MaskExpression(object):
+    """ This is the base class of all mask expressions. Expressions
+    are combined with ``|`` (logical or), ``&`` (logical and),
+    ``^`` (logical exclusive or), and ``~`` (logical not), and are
+    evaluated with `evaluate`.
+    """
+
+    # Expressions which reduce to value bounds, after preparation,
+    # are fused together when combined by a logical or.
+    _is_band = False
+    # Numpy arrays should defer to the logical operators of the
+    # expressions rather than broadcasting over them.
+    __array_ufunc__ = None
+
+    def __or__(self, other):
+        return _LogicalOr(self, _as_expression(other))
+    def __ror__(self, other):
+        return _LogicalOr(_as_expression(other), self)
+    def __and__(self, other):
+        return _LogicalAnd(self, _as_expression(other))
+    def __rand__(self, other):
+        return _LogicalAnd(_as_expression(other), self)
+    def __xor__(self, other):
+        return _LogicalXor(self, _as_expression(other))
+    def __rxor__(self, other):
+        return _LogicalXor(_as_expression(other), self)
+    def __invert__(self):
+        return _LogicalNot(self)
+
+    def _prepare(self, data_array, context):
+        """ Computes anything which needs the entire data array,
+        storing it in the context."""
+        return None
+
+    def _evaluate(self, data_tile, window, context, out, workspace,
+                  depth):
+        """ Evaluates the mask of the tile into the output buffer."""
+        raise mono.DevelopmentError("Mask expressions must provide their "
+                                    "own evaluation.")
+
+    def prepare(self, data_array):
+        """ This computes everything the expression needs from the
+        entire data array, before any tile is evaluated.
+
+        Parameters
+        ----------
+        data_array : ndarray
+            The data array that the mask will be calculated from.
+
+        Returns
+        -------
+        context : dictionary
+            The prepared state of the expression for this data array.
+        """
+        data_array = np.asarray(data_array)
+        context = {'shape': data_array.shape}
+        self._prepare(data_array=data_array, context=context)
+        return context
+
+    def evaluate_window(self, data_array, window, context, out,
+                        workspace=None):
+        """ This evaluates the mask of a single tile of a prepared
+        expression into the output buffer.
+
+        Parameters
+        ----------
+        data_array : ndarray
+            The full data array that the mask will be calculated from.
+        window : slice
+            The slice along the first axis of the tile.
+        context : dictionary
+            The prepared state of the expression, see `prepare`.
+        out : ndarray
+            The boolean buffer of the tile to write the mask into.
+        workspace : _Workspace (optional)
+            The scratch buffers to reuse; one should not be shared
+            between threads.
+
+        Returns
+        -------
+        out : ndarray
+            The mask of the tile.
+        """
+        workspace = _Workspace() if (workspace is None) else workspace
+        self._evaluate(data_tile=data_array[window], window=window,
+                       context=context, out=out, workspace=workspace,
+                       depth=0)
+        return out
+
+    def evaluate(self, data_array, tile_size=None, out=None, threads=None):
+        """ This evaluates the mask expression over the data array.
+
+        Parameters
+        ----------
+        data_array : ndarray
+            The data array that the mask will be calculated from.
+        tile_size : int (optional)
+            The number of bytes of data evaluated at once. Defaults
+            to DEFAULT_TILE_SIZE.
+        out : ndarray (optional)
+            A boolean array, the same shape as the data, which the
+            mask is written into.
+        threads : int (optional)
+            If provided, the tiles are evaluated by this many threads,
+            see mono.mask.mask_parallel.
+
+        Returns
+        -------
+        final_mask : ndarray
+            A boolean array for pixels that are masked (True) or are
+            valid (False).
+        """
+        if (threads is not None):
+            return mono.mask.mask_parallel(data_array=data_array,
+                                           mask_expression=self,
+                                           threads=threads,
+                                           tile_size=tile_size, out=out)
+        data_array = np.asarray(data_array)
+        if (out is None):
+            final_mask = np.empty(data_array.shape, dtype=bool)
+        elif (np.shape(out) != data_array.shape):
+            raise mono.InputError("The output mask must be the same shape "
+                                  "as the data array.")
+        else:
+            final_mask = out
+        # Everything global is found first, then the tiles.
+        context = self.prepare(data_array=data_array)
+        workspace = _Workspace()
+        for windowdex in _tile_windows(shape=data_array.shape,
+                                       itemsize=data_array.itemsize,
+                                       tile_size=tile_size):
+            self.evaluate_window(data_array=data_array, window=windowdex,
+                                 context=context, out=final_mask[windowdex],
+                                 workspace=workspace)
+        return final_mask
+    __call__ = evaluate
+
+    def _band_bounds(self, context):
+        """ The lower and upper bounds of band expressions."""
+        return context[id(self)]
+
+
+# Logical combinations.
+##########
+
+class _LogicalCombination(MaskExpression):
+    """ The base of the logical combinations of many expressions."""
+
+    # The Numpy function which combines the masks.
+    _combine = None
+
+    def __init__(self, *args):
+        # Nested combinations of the same kind are flattened so that
+        # they may share buffers and be fused.
+        self.children = []
+        for childdex in args:
+            if (type(childdex) is type(self)):
+                self.children.extend(childdex.children)
+            else:
+                self.children.append(childdex)
+        return None
+
+    def _prepare(self, data_array, context):
+        for childdex in self.children:
+            childdex._prepare(data_array=data_array, context=context)
+        return None
+
+    def _evaluate_children(self, children, data_tile, window, context,
+                           out, workspace, depth, first):
+        """ Evaluates and combines the children into the output."""
+        for childdex in children:
+            if (first):
+                childdex._evaluate(data_tile=data_tile, window=window,
+                                   context=context, out=out,
+                                   workspace=workspace, depth=depth + 1)
+                first = False
+            else:
+                scratch = workspace.scratch(depth=depth, shape=out.shape)
+                childdex._evaluate(data_tile=data_tile, window=window,
+                                   context=context, out=scratch,
+                                   workspace=workspace, depth=depth + 1)
+                type(self)._combine(out, scratch, out=out)
+        return out
+
+    def _evaluate(self, data_tile, window, context, out, workspace,
+                  depth):
+        return self._evaluate_children(
+            children=self.children, data_tile=data_tile, window=window,
+            context=context, out=out, workspace=workspace, depth=depth,
+            first=True)
+
+    def __repr__(self):
+        return '{name}({children})'.format(
+            name=type(self).__name__.strip('_'),
+            children=', '.join(repr(childdex)
+                               for childdex in self.children))
+
+class _LogicalOr(_LogicalCombination):
+    """ The logical or of many expressions. Value bound expressions
+    are fused into a single pair of bounds: the union of the values
+    below any lower bound is the values below the highest of them,
+    and likewise for the upper bounds."""
+
+    _combine = np.logical_or
+
+    def _evaluate(self, data_tile, window, context, out, workspace,
+                  depth):
+        bands = [childdex for childdex in self.children
+                 if childdex._is_band]
+        others = [childdex for childdex in self.children
+                  if (not childdex._is_band)]
+        first = True
+        if (len(bands) >= 1):
+            bounds = [banddex._band_bounds(context=context)
+                      for banddex in bands]
+            _band_into(data_tile=data_tile,
+                       lower_bound=max(lowerdex for lowerdex, __ in bounds),
+                       upper_bound=min(upperdex for __, upperdex in bounds),
+                       out=out, workspace=workspace, depth=depth + 1)
+            first = False
+        return self._evaluate_children(
+            children=others, data_tile=data_tile, window=window,
+            context=context, out=out, workspace=workspace, depth=depth,
+            first=first)
+
+class _LogicalAnd(_LogicalCombination):
+    """ The logical and of many expressions."""
+    _combine = np.logical_and
+
+class _LogicalXor(_LogicalCombination):
+    """ The logical exclusive or of many expressions."""
+    _combine = np.logical_xor
+
+class _LogicalNot(MaskExpression):
+    """ The logical not of an expression."""
+
+    def __init__(self, child):
+        self.child = child
+        return None
+
+    def _prepare(self, data_array, context):
+        self.child._prepare(data_array=data_array, context=context)
+        return None
+
+    def _evaluate(self, data_tile, window, context, out, workspace,
+                  depth):
+        self.child._evaluate(data_tile=data_tile, window=window,
+                             context=context, out=out,
+                             workspace=workspace, depth=depth + 1)
+        np.logical_not(out, out=out)
+        return out
+
+    def __invert__(self):
+        # Double negation is just the expression.
+        return self.child
+
+    def __repr__(self):
+        return 'Not({child})'.format(child=repr(self.child))
+
+
+# Value based expressions.
+##########
+
+class _BandExpression(MaskExpression):
+    """ Masks the values strictly outside of a lower and upper value
+    bound. The bounds are either given or computed from all of the
+    data in the preparation."""
+
+    _is_band = True
+
+    def __init__(self, name, lower_bound=-np.inf, upper_bound=np.inf,
+                 bounds_function=None, **kwargs):
+        self.name = name
+        self.lower_bound = lower_bound
+        self.upper_bound = upper_bound
+        self.bounds_function = bounds_function
+        self.kwargs = kwargs
+        return None
+
+    def _prepare(self, data_array, context):
+        if (self.bounds_function is None):
+            lower_bound, upper_bound = self.lower_bound, self.upper_bound
+        else:
+            lower_bound, upper_bound = self.bounds_function(
+                data_array=data_array, **self.kwargs)
+        # Bounds are compared as floats within the tiles.
+        context[id(self)] = (float(lower_bound), float(upper_bound))
+        return None
+
+    def _evaluate(self, data_tile, window, context, out, workspace,
+                  depth):
+        lower_bound, upper_bound = self._band_bounds(context=context)
+        return _band_into(data_tile=data_tile, lower_bound=lower_bound,
+                          upper_bound=upper_bound, out=out,
+                          workspace=workspace, depth=depth)
+
+    def __repr__(self):
+        return '{name}({kwargs})'.format(name=self.name, kwargs=self.kwargs)
+
+def _truncation_bounds(data_array, top_count, bottom_count):
+    """ The count truncation bounds, where the full mask is made by
+    bounds which every value is outside of."""
+    lower_bound, upper_bound = mono.mask.value._count_truncation_bounds(
+        data_array=data_array, top_count=top_count,
+        bottom_count=bottom_count)
+    if (lower_bound is None):
+        return np.inf, -np.inf
+    return lower_bound, upper_bound
+
+def _percent_truncation_bounds(data_array, top_percent, bottom_percent):
+    """ The percent truncation bounds, see `_truncation_bounds`."""
+    top_count, bottom_count = mono.mask.value._percent_truncation_counts(
+        data_array=data_array, top_percent=top_percent,
+        bottom_percent=bottom_percent)
+    return _truncation_bounds(data_array=data_array, top_count=top_count,
+                              bottom_count=bottom_count)
+
+class _InvalidExpression(MaskExpression):
+    """ Masks the values which are not finite."""
+
+    def _evaluate(self, data_tile, window, context, out, workspace,
+                  depth):
+        if (not mono.mask.invalid._can_be_invalid(data_array=data_tile)):
+            # Integers are always valid.
+            out.fill(False)
+            return out
+        np.isfinite(data_tile, out=out)
+        np.logical_not(out, out=out)
+        return out
+
+    def __repr__(self):
+        return 'invalid()'
+
+class _ExactExpression(MaskExpression):
+    """ Masks values close to an exact value."""
+
+    def __init__(self, exact_value):
+        self.exact_value = exact_value
+        return None
+
+    def _evaluate(self, data_tile, window, context, out, workspace,
+                  depth):
+        out[...] = np.isclose(data_tile, self.exact_value)
+        return out
+
+    def __repr__(self):
+        return 'exact({value})'.format(value=self.exact_value)
+
+
+# Geometric expressions.
+##########
+
+class _GeometricExpression(MaskExpression):
+    """ The base of the geometric masks which are evaluated directly
+    within the rows of a tile of an image. For other dimensions, the
+    geometric function is just applied to each tile."""
+
+    # The name of the geometric mask function itself.
+    _mask_function_name = None
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        return None
+
+    def _evaluate(self, data_tile, window, context, out, workspace,
+                  depth):
+        if ((len(context['shape']) == 2) and isinstance(window, slice)):
+            out.fill(False)
+            self._evaluate_rows(row_start=window.start,
+                                row_stop=window.stop, context=context,
+                                out=out)
+        else:
+            mask_function = getattr(mono.mask, self._mask_function_name)
+            out[...] = mask_function(data_array=data_tile, **self.kwargs)
+        return out
+
+    def __repr__(self):
+        return '{name}({kwargs})'.format(name=self._mask_function_name,
+                                         kwargs=self.kwargs)
+
+class _RectangleExpression(_GeometricExpression):
+    _mask_function_name = 'mask_rectangle'
+
+    def _evaluate_rows(self, row_start, row_stop, context, out):
+        column_range = np.array(self.kwargs['column_range'], dtype=int)
+        row_range = np.array(self.kwargs['row_range'], dtype=int)
+        # The inclusive rectangle, clipped to the rows of the tile.
+        tile_start = max(int(row_range[0]), row_start) - row_start
+        tile_stop = min(int(row_range[-1]) + 1, row_stop) - row_start
+        if (tile_start < tile_stop):
+            out[tile_start:tile_stop,
+                column_range[0]:column_range[-1] + 1] = True
+        return out
+
+class _RowsExpression(_GeometricExpression):
+    _mask_function_name = 'mask_rows'
+
+    def _evaluate_rows(self, row_start, row_stop, context, out):
+        # Negative rows are counted from the end, as Numpy does.
+        row_list = np.ravel(np.array(self.kwargs['row_list'], dtype=int))
+        row_list = np.where(row_list < 0, row_list + context['shape'][0],
+                            row_list)
+        in_tile = (row_start <= row_list) & (row_list < row_stop)
+        out[row_list[in_tile] - row_start, :] = True
+        return out
+
+class _ColumnsExpression(_GeometricExpression):
+    _mask_function_name = 'mask_columns'
+
+    def _evaluate_rows(self, row_start, row_stop, context, out):
+        column_list = np.ravel(np.array(self.kwargs['column_list'],
+                                        dtype=int))
+        out[:, column_list] = True
+        return out
+
+class _PixelsExpression(_GeometricExpression):
+    _mask_function_name = 'mask_single_pixels'
+
+    def _prepare(self, data_array, context):
+        if (data_array.ndim != 2):
+            return None
+        # Sorting the pixels by row allows each tile to find its
+        # pixels by a binary search.
+        coordinate_mask = mono.mask.CoordinateMask(
+            shape=data_array.shape, row_indexes=self.kwargs['row_indexes'],
+            column_indexes=self.kwargs['column_indexes'])
+        context[id(self)] = coordinate_mask.flat_indexes.astype(np.int64)
+        return None
+
+    def _evaluate_rows(self, row_start, row_stop, context, out):
+        flat_indexes = context[id(self)]
+        n_columns = context['shape'][1]
+        start_index, stop_index = np.searchsorted(
+            flat_indexes, [row_start * n_columns, row_stop * n_columns])
+        out.reshape(-1)[flat_indexes[start_index:stop_index]
+                        - row_start * n_columns] = True
+        return out
+
+
+# Other expressions.
+##########
+
+class _FunctionExpression(MaskExpression):
+    """ Any mask function. As nothing is known about the function,
+    it is evaluated over the entire data array in the preparation
+    and its mask is split among the tiles."""
+
+    def __init__(self, mask_function, **kwargs):
+        self.mask_function = mask_function
+        self.kwargs = kwargs
+        return None
+
+    def _prepare(self, data_array, context):
+        context[id(self)] = np.asarray(
+            self.mask_function(data_array=data_array, **self.kwargs),
+            dtype=bool)
+        return None
+
+    def _evaluate(self, data_tile, window, context, out, workspace,
+                  depth):
+        out[...] = context[id(self)][window]
+        return out
+
+    def __repr__(self):
+        return '{name}({kwargs})'.format(
+            name=getattr(self.mask_function, '__name__', 'function'),
+            kwargs=self.kwargs)
+
+class _ElementwiseExpression(_FunctionExpression):
+    """ A mask function which only depends on the value of each 
+    element, such as the invalid masks. It is evaluated within each
+    tile by itself."""
+
+    def _prepare(self, data_array, context):
+        return None
+
+    def _evaluate(self, data_tile, window, context, out, workspace,
+                  depth):
+        out[...] = self.mask_function(data_array=data_tile, **self.kwargs)
+        return out
+
+class _ConstantExpression(MaskExpression):
+    """ A mask which has already been computed, either dense or
+    sparse. Sparse masks are split among the tiles by their flat
+    indexes so that they are never made dense."""
+
+    def __init__(self, mask):
+        if (isinstance(mask, mono.mask.sparse._SparseMask)):
+            self.mask = mask
+        else:
+            self.mask = np.asarray(mask, dtype=bool)
+        return None
+
+    def _prepare(self, data_array, context):
+        if (tuple(self.mask.shape) != data_array.shape):
+            raise mono.MaskingError("The constant mask is not the same "
+                                    "shape as the data array. Data: "
+                                    "{d_shp}  Mask: {m_shp}"
+                                    .format(d_shp=data_array.shape,
+                                            m_shp=self.mask.shape))
+        if (isinstance(self.mask, mono.mask.sparse._SparseMask)):
+            context[id(self)] = self.mask.flat_indexes.astype(np.int64)
+        return None
+
+    def _evaluate(self, data_tile, window, context, out, workspace,
+                  depth):
+        if (isinstance(self.mask, np.ndarray)):
+            out[...] = self.mask[window]
+        elif (isinstance(window, slice)):
+            # The tile is a contiguous flat range of the array.
+            flat_indexes = context[id(self)]
+            subarray_size = out[0].size if (out.ndim > 0) else 1
+            start_index, stop_index = np.searchsorted(
+                flat_indexes, [window.start * subarray_size,
+                               window.stop * subarray_size])
+            out.fill(False)
+            out.reshape(-1)[flat_indexes[start_index:stop_index]
+                            - window.start * subarray_size] = True
+        else:
+            out[...] = self.mask.to_dense()
+        return out
+
+    def __repr__(self):
+        return 'constant(shape={shp})'.format(shp=tuple(self.mask.shape))
+
+
+# The functions to make the expressions.
+##########
+
+def invalid():
+    """ A mask expression of all invalid (NaN and infinite) values,
+    see mono.mask.mask_invalid_all."""
+    return _InvalidExpression()
+
+def sigma(sigma_multiple, sigma_iterations=1, exact=False):
+    """ A mask expression of values outside of a multiple of sigma,
+    see mono.mask.mask_sigma_value. The sigma bounds are computed
+    from the entire data array."""
+    return _BandExpression(
+        name='sigma',
+        bounds_function=mono.mask.value._sigma_value_bounds,
+        sigma_multiple=sigma_multiple, sigma_iterations=sigma_iterations,
+        exact=exact)
+
+def minimum(minimum_value):
+    """ A mask expression of values strictly less than the minimum,
+    see mono.mask.mask_minimum_value."""
+    return _BandExpression(name='minimum', lower_bound=minimum_value)
+
+def maximum(maximum_value):
+    """ A mask expression of values strictly more than the maximum,
+    see mono.mask.mask_maximum_value."""
+    return _BandExpression(name='maximum', upper_bound=maximum_value)
+
+def exact(exact_value):
+    """ A mask expression of values equal to the exact value, see
+    mono.mask.mask_exact_value."""
+    return _ExactExpression(exact_value=exact_value)
+
+def exact_values(exact_values, tolerance=0):
+    """ A mask expression of values equal to any of the exact values,
+    within the tolerance, see mono.mask.mask_exact_values."""
+    return _ElementwiseExpression(
+        mask_function=mono.mask.mask_exact_values, 
+        exact_values=exact_values, tolerance=tolerance)
+
+def count_truncation(top_count, bottom_count):
+    """ A mask expression truncating the top and bottom number of
+    values, see mono.mask.mask_count_truncation."""
+    return _BandExpression(name='count_truncation',
+                           bounds_function=_truncation_bounds,
+                           top_count=top_count, bottom_count=bottom_count)
+
+def percent_truncation(top_percent, bottom_percent):
+    """ A mask expression truncating the top and bottom percent of
+    values, see mono.mask.mask_percent_truncation."""
+    return _BandExpression(name='percent_truncation',
+                           bounds_function=_percent_truncation_bounds,
+                           top_percent=top_percent,
+                           bottom_percent=bottom_percent)
+
+def pixels(column_indexes, row_indexes):
+    """ A mask expression of single pixels, see
+    mono.mask.mask_single_pixels."""
+    return _PixelsExpression(column_indexes=column_indexes,
+                             row_indexes=row_indexes)
+
+def rectangle(column_range, row_range):
+    """ A mask expression of a rectangle, see
+    mono.mask.mask_rectangle."""
+    return _RectangleExpression(column_range=column_range,
+                                row_range=row_range)
+rect = rectangle # Aliases
+
+def subarray(column_range, row_range):
+    """ A mask expression of everything but a sub-array, see
+    mono.mask.mask_subarray."""
+    return ~rectangle(column_range=column_range, row_range=row_range)
+
+def columns(column_list):
+    """ A mask expression of columns, see mono.mask.mask_columns."""
+    return _ColumnsExpression(column_list=column_list)
+
+def rows(row_list):
+    """ A mask expression of rows, see mono.mask.mask_rows."""
+    return _RowsExpression(row_list=row_list)
+
+def constant(mask):
+    """ A mask expression of an already computed mask, dense or
+    sparse."""
+    return _ConstantExpression(mask=mask)
+
+def function(mask_function, **kwargs):
+    """ A mask expression of any mask function. The function is
+    called with the entire data array, as ``data_array``, and the
+    keyword arguments provided."""
+    return _FunctionExpression(mask_function=mask_function, **kwargs)
+
+def elementwise(mask_function, **kwargs):
+    """ A mask expression of an element-wise mask function, one where
+    the mask of each value depends only on that value. The function 
+    is called with each tile, as ``data_array``, and the keyword 
+    arguments provided."""
+    return _ElementwiseExpression(mask_function=mask_function, **kwargs)
@@ -50,9 +50,10 @@ def mask_single_pixels(data_array, column_indexes, row_indexes):
     # Taking a template mask to then change.
     masked_array = mask_nothing(data_array=data_array)
 
-    # Loop over all of the pixel pairs, making as you proceed.
-    for columndex, rowdex in zip(column_indexes, row_indexes):
-        masked_array[rowdex,columndex] = True
+    # All of the pixel pairs are masked at once by fancy indexing. 
+    # The ellipsis allows for stacks of arrays to be masked with the 
+    # same pixels.
+    masked_array[..., row_indexes, column_indexes] = True
 
     # Finished.
     final_mask = masked_array
@@ -102,7 +103,7 @@ def mask_rectangle(data_array, column_range, row_range):
     masked_array = mask_nothing(data_array=data_array)
 
     # Mask rectangle inclusively.
-    masked_array[row_range[0]:row_range[-1] + 1, 
+    masked_array[..., row_range[0]:row_range[-1] + 1, 
                  column_range[0]:column_range[-1] + 1] = True
 
     # And returning.
@@ -172,12 +173,14 @@ def mask_columns(data_array, column_list):
         valid (False).
     """
 
+    # Flatten the column list in the event that it is stacked.
+    column_list = np.ravel(np.array(column_list, dtype=int))
+
     # Extract a blank mask as a template.
     masked_array = mask_nothing(data_array=data_array)
 
-    # Masking the columns
-    for columndex in column_list:
-        masked_array[:,columndex] = True
+    # Masking the columns, all at once.
+    masked_array[..., :, column_list] = True
 
     # And returning.
     final_mask = masked_array
@@ -206,12 +209,358 @@ def mask_rows(data_array, row_list):
         valid (False).
     """
 
+    # Flatten the row list in the event that it is stacked.
+    row_list = np.ravel(np.array(row_list, dtype=int))
+
+    # Extract a blank mask as a template.
+    masked_array = mask_nothing(data_array=data_array)
+
+    # Masking the rows, all at once.
+    masked_array[..., row_list, :] = True
+
+    # And returning.
+    final_mask = masked_array
+    return final_mask
+
+def _bounding_window(data_array, column_bounds, row_bounds):
+    """ This finds the window of the data array, clipped to the 
+    array, which contains the pixel centers within the bounds 
+    provided. Shapes only need to be evaluated in this window rather
+    than over the full array.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the window is within.
+    column_bounds : tuple
+        The minimum and maximum column coordinate of the shape.
+    row_bounds : tuple
+        The minimum and maximum row coordinate of the shape.
+
+    Returns
+    -------
+    window : tuple
+        The row slice and column slice of the window.
+    column_grid : ndarray
+        The column coordinates of the window, as a (1, W) array.
+    row_grid : ndarray
+        The row coordinates of the window, as a (H, 1) array.
+    """
+    n_rows, n_columns = np.shape(data_array)[-2:]
+    # The window is inclusive of pixel centers on the bounds.
+    column_start = int(min(max(np.ceil(column_bounds[0]), 0), n_columns))
+    column_stop = int(min(max(np.floor(column_bounds[-1]) + 1, 0), 
+                          n_columns))
+    row_start = int(min(max(np.ceil(row_bounds[0]), 0), n_rows))
+    row_stop = int(min(max(np.floor(row_bounds[-1]) + 1, 0), n_rows))
+    window = (slice(row_start, row_stop), slice(column_start, column_stop))
+    # The coordinates of the pixels, broadcast in an open grid.
+    row_grid, column_grid = np.ogrid[row_start:row_stop, 
+                                     column_start:column_stop]
+    return window, column_grid, row_grid
+
+def mask_circle(data_array, center_column, center_row, radius):
+    """ This applies a circular mask on the data array.
+
+    All pixels whose centers are within (inclusively) the radius 
+    of the center are masked. Only the bounding box of the circle is
+    evaluated.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the mask will be calculated from. 
+    center_column : float
+        The 0-indexed column (x-axis) coordinate of the center.
+    center_row : float
+        The 0-indexed row (y-axis) coordinate of the center.
+    radius : float
+        The radius of the circle, in pixels.
+
+    Returns
+    -------
+    final_mask : ndarray
+        A boolean array for pixels that are masked (True) or are 
+        valid (False).
+    """
+    # A circle is just an annulus without a hole.
+    final_mask = mask_annulus(data_array=data_array, 
+                              center_column=center_column, 
+                              center_row=center_row, 
+                              inner_radius=0, outer_radius=radius)
+    return final_mask
+
+def mask_annulus(data_array, center_column, center_row, 
+                 inner_radius, outer_radius):
+    """ This applies an annular mask on the data array.
+
+    All pixels whose centers are between (inclusively) the inner 
+    and outer radius from the center are masked. Only the bounding 
+    box of the annulus is evaluated.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the mask will be calculated from. 
+    center_column : float
+        The 0-indexed column (x-axis) coordinate of the center.
+    center_row : float
+        The 0-indexed row (y-axis) coordinate of the center.
+    inner_radius : float
+        The inner radius of the annulus, in pixels.
+    outer_radius : float
+        The outer radius of the annulus, in pixels.
+
+    Returns
+    -------
+    final_mask : ndarray
+        A boolean array for pixels that are masked (True) or are 
+        valid (False).
+    """
+    # Validating the input.
+    if (not (0 <= inner_radius <= outer_radius)):
+        raise mono.InputError("The radii must satisfy "
+                              "0 <= inner radius <= outer radius. "
+                              "Inner:  {in_r}  Outer:  {out_r}"
+                              .format(in_r=inner_radius, 
+                                      out_r=outer_radius))
+
+    # Extract a blank mask as a template.
+    masked_array = mask_nothing(data_array=data_array)
+
+    # Only the bounding box of the outer circle needs computing.
+    window, column_grid, row_grid = _bounding_window(
+        data_array=data_array, 
+        column_bounds=(center_column - outer_radius, 
+                       center_column + outer_radius),
+        row_bounds=(center_row - outer_radius, center_row + outer_radius))
+    # Squared distances avoid the square root.
+    distance_squared = ((column_grid - center_column)**2 
+                        + (row_grid - center_row)**2)
+    masked_array[(Ellipsis,) + window] = (
+        (inner_radius**2 <= distance_squared) 
+        & (distance_squared <= outer_radius**2))
+
+    # And returning.
+    final_mask = masked_array
+    return final_mask
+
+def mask_ellipse(data_array, center_column, center_row, 
+                 column_radius, row_radius, angle=0):
+    """ This applies an elliptical mask on the data array.
+
+    All pixels whose centers are within (inclusively) the ellipse 
+    are masked. Only the bounding box of the ellipse is evaluated.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the mask will be calculated from. 
+    center_column : float
+        The 0-indexed column (x-axis) coordinate of the center.
+    center_row : float
+        The 0-indexed row (y-axis) coordinate of the center.
+    column_radius : float
+        The semi-axis of the ellipse which is along the column 
+        (x-axis) direction before rotation, in pixels.
+    row_radius : float
+        The semi-axis of the ellipse which is along the row 
+        (y-axis) direction before rotation, in pixels.
+    angle : float (optional)
+        The rotation of the ellipse, counter-clockwise from the 
+        column (x-axis) direction, in radians. Defaults to 0.
+
+    Returns
+    -------
+    final_mask : ndarray
+        A boolean array for pixels that are masked (True) or are 
+        valid (False).
+    """
+    # Validating the input.
+    if ((column_radius <= 0) or (row_radius <= 0)):
+        raise mono.InputError("The radii of the ellipse must be positive. "
+                              "Column radius:  {c_r}  Row radius:  {r_r}"
+                              .format(c_r=column_radius, r_r=row_radius))
+    cos_angle = np.cos(angle)
+    sin_angle = np.sin(angle)
+
+    # Extract a blank mask as a template.
+    masked_array = mask_nothing(data_array=data_array)
+
+    # The half extents of the bounding box of a rotated ellipse.
+    column_extent = np.hypot(column_radius * cos_angle, 
+                             row_radius * sin_angle)
+    row_extent = np.hypot(column_radius * sin_angle, 
+                          row_radius * cos_angle)
+    window, column_grid, row_grid = _bounding_window(
+        data_array=data_array, 
+        column_bounds=(center_column - column_extent, 
+                       center_column + column_extent),
+        row_bounds=(center_row - row_extent, center_row + row_extent))
+    # Rotate the pixel coordinates into the frame of the ellipse.
+    delta_column = column_grid - center_column
+    delta_row = row_grid - center_row
+    major_coordinate = delta_column * cos_angle + delta_row * sin_angle
+    minor_coordinate = delta_row * cos_angle - delta_column * sin_angle
+    masked_array[(Ellipsis,) + window] = (
+        (major_coordinate / column_radius)**2 
+        + (minor_coordinate / row_radius)**2 <= 1)
+
+    # And returning.
+    final_mask = masked_array
+    return final_mask
+
+def mask_polygon(data_array, column_vertices, row_vertices):
+    """ This applies a polygon mask on the data array.
+
+    All pixels whose centers are within the polygon are masked, 
+    using the even-odd rule. The polygon is closed automatically. 
+    Only the bounding box of the polygon is evaluated.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the mask will be calculated from. 
+    column_vertices : list or ndarray
+        The 0-indexed column (x-axis) coordinates of the vertices of
+        the polygon, in order.
+    row_vertices : list or ndarray
+        The 0-indexed row (y-axis) coordinates of the vertices of 
+        the polygon, in order; parallel to the column vertices.
+
+    Returns
+    -------
+    final_mask : ndarray
+        A boolean array for pixels that are masked (True) or are 
+        valid (False).
+    """
+    column_vertices = np.ravel(np.array(column_vertices, dtype=float))
+    row_vertices = np.ravel(np.array(row_vertices, dtype=float))
+    # Input validation. Both should be ordered pairs and thus have 
+    # the same size.
+    if (column_vertices.size != row_vertices.size):
+        raise mono.InputError("The column and row vertices should be "
+                              "parallel arrays, the current inputs are of "
+                              "different length.")
+    if (column_vertices.size < 3):
+        raise mono.InputError("A polygon needs at least three vertices.")
+
     # Extract a blank mask as a template.
     masked_array = mask_nothing(data_array=data_array)
 
-    # Masking the rows
-    for rowdex in row_list:
-        masked_array[rowdex,:] = True
+    window, column_grid, row_grid = _bounding_window(
+        data_array=data_array, 
+        column_bounds=(column_vertices.min(), column_vertices.max()), 
+        row_bounds=(row_vertices.min(), row_vertices.max()))
+    # Casting a ray along the columns from every pixel, the pixel is
+    # inside if the ray crosses an odd number of edges. Polygons 
+    # have few edges, so only the edges are looped over.
+    inside = np.zeros((row_grid.size, column_grid.size), dtype=bool)
+    previous_column = column_vertices[-1]
+    previous_row = row_vertices[-1]
+    for columndex, rowdex in zip(column_vertices, row_vertices):
+        if (rowdex != previous_row):
+            # The rows of the window which this edge spans.
+            spans_row = ((rowdex > row_grid) != (previous_row > row_grid))
+            crossing_column = (columndex + (row_grid - rowdex) 
+                               * (previous_column - columndex) 
+                               / (previous_row - rowdex))
+            inside ^= spans_row & (column_grid < crossing_column)
+        previous_column = columndex
+        previous_row = rowdex
+    masked_array[(Ellipsis,) + window] = inside
+
+    # And returning.
+    final_mask = masked_array
+    return final_mask
+
+def mask_circles(data_array, center_columns, center_rows, radii, 
+                 chunk_size=2**22):
+    """ This applies many circular masks (such as apertures around 
+    every star in a catalog) on the data array at once.
+
+    All pixels whose centers are within (inclusively) the radius of
+    any of the centers are masked. Rather than making a mask per 
+    circle, the pixels around every center are rasterized together 
+    and masked with a single fancy-index operation per chunk.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the mask will be calculated from. 
+    center_columns : list or ndarray
+        The 0-indexed column (x-axis) coordinates of the centers.
+    center_rows : list or ndarray
+        The 0-indexed row (y-axis) coordinates of the centers; 
+        parallel to the center columns.
+    radii : float or array-like
+        The radius of the circles, in pixels. Either one radius for 
+        all circles or a radius for each circle.
+    chunk_size : int (optional)
+        The approximate number of candidate pixels rasterized at 
+        once, this bounds the memory used. Defaults to 2**22.
+
+    Returns
+    -------
+    final_mask : ndarray
+        A boolean array for pixels that are masked (True) or are 
+        valid (False).
+    """
+    center_columns = np.ravel(np.array(center_columns, dtype=float))
+    center_rows = np.ravel(np.array(center_rows, dtype=float))
+    # Input validation. Both should be ordered pairs and thus have 
+    # the same size.
+    if (center_columns.size != center_rows.size):
+        raise mono.InputError("The column and row centers should be "
+                              "parallel arrays, the current inputs are of "
+                              "different length.")
+    radii = np.ravel(np.broadcast_to(np.array(radii, dtype=float), 
+                                     center_columns.shape))
+    if (np.any(radii < 0)):
+        raise mono.InputError("The radii of the circles cannot be negative.")
+
+    # Extract a blank mask as a template.
+    masked_array = mask_nothing(data_array=data_array)
+    n_rows, n_columns = masked_array.shape[-2:]
+
+    # Sorting by radius allows each chunk to use the smallest 
+    # stencil of candidate pixels that it can.
+    sort_index = np.argsort(radii, kind='stable')
+    center_columns = center_columns[sort_index]
+    center_rows = center_rows[sort_index]
+    radii = radii[sort_index]
+    # The width of the stencil of offsets which covers each circle, 
+    # from its nearest pixel.
+    stencil_widths = 2 * np.ceil(radii + 0.5).astype(np.int64) + 1
+    index = 0
+    while (index < radii.size):
+        # The chunk is as many circles as fit, with the stencil of 
+        # its largest (last) circle; it cannot be more than fit with
+        # the stencil of its first.
+        max_circles = max(1, int(chunk_size // stencil_widths[index]**2))
+        chunk_widths = stencil_widths[index:index + max_circles]
+        chunk_pixels = (chunk_widths**2 
+                        * np.arange(1, chunk_widths.size + 1))
+        n_circles = max(1, int(np.searchsorted(chunk_pixels, chunk_size, 
+                                               side='right')))
+        chunk = slice(index, index + n_circles)
+        stencil_radius = int(np.ceil(radii[chunk][-1] + 0.5))
+        offsets = np.arange(-stencil_radius, stencil_radius + 1)
+        # The candidate pixels of every circle of the chunk.
+        chunk_columns = center_columns[chunk, None]
+        chunk_rows = center_rows[chunk, None]
+        candidate_columns = (np.rint(chunk_columns).astype(np.intp)
+                             + np.tile(offsets, offsets.size)[None, :])
+        candidate_rows = (np.rint(chunk_rows).astype(np.intp)
+                          + np.repeat(offsets, offsets.size)[None, :])
+        inside = (((candidate_columns - chunk_columns)**2 
+                   + (candidate_rows - chunk_rows)**2 
+                   <= radii[chunk, None]**2)
+                  & (0 <= candidate_columns) & (candidate_columns < n_columns)
+                  & (0 <= candidate_rows) & (candidate_rows < n_rows))
+        masked_array[..., candidate_rows[inside], 
+                     candidate_columns[inside]] = True
+        index = index + n_circles
 
     # And returning.
     final_mask = masked_array
@@ -263,14 +612,158 @@ def mask_everything(data_array):
 
     return final_mask
 
+# Stack (batch) variants.
+##########
+
+def _check_stack(data_stack):
+    """ This checks that the data stack is a stack of images, that 
+    is, an (N, H, W) array."""
+    if (np.ndim(data_stack) != 3):
+        raise mono.InputError("The data stack must be a three dimensional "
+                              "(N, H, W) stack of images. The current "
+                              "shape is: {shp}"
+                              .format(shp=np.shape(data_stack)))
+    return None
+
+def _stack_frame(data_stack):
+    """ A single image of the stack, for the geometric masks which 
+    only need its shape. An empty stack still has an image shape."""
+    data_stack = np.asarray(data_stack)
+    if (data_stack.shape[0] > 0):
+        return data_stack[0]
+    return np.empty(data_stack.shape[1:], dtype=data_stack.dtype)
+
+def _broadcast_stack(frame_mask, data_stack):
+    """ This broadcasts the mask of a single image over every image 
+    of the stack. The images all share the memory of the one mask, 
+    the image axis has a stride of 0, so the mask is read-only."""
+    return np.broadcast_to(frame_mask, np.shape(data_stack))
+
+def mask_stack_single_pixels(data_stack, column_indexes, row_indexes):
+    """ This applies the same single pixel(s) mask on every image 
+    of a stack of images. 
+
+    The mask of a single image is made and broadcast over every 
+    image; the returned mask is a read-only view and takes the 
+    memory of one image. See `mask_single_pixels`.
 
+    Parameters
+    ----------
+    data_stack : ndarray
+        The (N, H, W) stack of images that the mask will be 
+        calculated from.
+    column_indexes : list or ndarray
+        The successive 0-indexed list of column indexes that specify 
+        the pixel to be masked.
+    row_indexes : list or ndarray
+        The successive 0-indexed list of row indexes that specify the 
+        pixel to be masked.
 
+    Returns
+    -------
+    final_mask : ndarray
+        A read-only boolean (N, H, W) array for pixels that are 
+        masked (True) or are valid (False).
+    """
+    _check_stack(data_stack=data_stack)
+    data_frame = _stack_frame(data_stack=data_stack)
+    frame_mask = mask_single_pixels(data_array=data_frame, 
+                                    column_indexes=column_indexes, 
+                                    row_indexes=row_indexes)
+    final_mask = _broadcast_stack(frame_mask=frame_mask, 
+                                  data_stack=data_stack)
+    return final_mask
 
+def mask_stack_rectangle(data_stack, column_range, row_range):
+    """ This applies the same rectangular mask on every image of a 
+    stack of images. 
 
+    The mask of a single image is made and broadcast over every 
+    image; the returned mask is a read-only view and takes the 
+    memory of one image. See `mask_rectangle`.
 
+    Parameters
+    ----------
+    data_stack : ndarray
+        The (N, H, W) stack of images that the mask will be 
+        calculated from.
+    column_range : list or ndarray
+        The range of 0-indexed columns to be masked.
+    row_range : list or ndarray
+        The range of 0-indexed row to be masked.
 
+    Returns
+    -------
+    final_mask : ndarray
+        A read-only boolean (N, H, W) array for pixels that are 
+        masked (True) or are valid (False).
+    """
+    _check_stack(data_stack=data_stack)
+    data_frame = _stack_frame(data_stack=data_stack)
+    frame_mask = mask_rectangle(data_array=data_frame, 
+                                column_range=column_range, 
+                                row_range=row_range)
+    final_mask = _broadcast_stack(frame_mask=frame_mask, 
+                                  data_stack=data_stack)
+    return final_mask
 
+def mask_stack_columns(data_stack, column_list):
+    """ This applies the same column mask on every image of a stack
+    of images. 
 
+    The mask of a single image is made and broadcast over every 
+    image; the returned mask is a read-only view and takes the 
+    memory of one image. See `mask_columns`.
 
+    Parameters
+    ----------
+    data_stack : ndarray
+        The (N, H, W) stack of images that the mask will be 
+        calculated from.
+    column_list : list or ndarray
+        The list of column x-axis values that will be masked. Should 
+        be 0-indexed.
+
+    Returns
+    -------
+    final_mask : ndarray
+        A read-only boolean (N, H, W) array for pixels that are 
+        masked (True) or are valid (False).
+    """
+    _check_stack(data_stack=data_stack)
+    data_frame = _stack_frame(data_stack=data_stack)
+    frame_mask = mask_columns(data_array=data_frame, 
+                              column_list=column_list)
+    final_mask = _broadcast_stack(frame_mask=frame_mask, 
+                                  data_stack=data_stack)
+    return final_mask
+
+def mask_stack_rows(data_stack, row_list):
+    """ This applies the same row mask on every image of a stack of 
+    images. 
+
+    The mask of a single image is made and broadcast over every 
+    image; the returned mask is a read-only view and takes the 
+    memory of one image. See `mask_rows`.
 
+    Parameters
+    ----------
+    data_stack : ndarray
+        The (N, H, W) stack of images that the mask will be 
+        calculated from.
+    row_list : list or ndarray
+        The list of row y-axis values that will be masked. Should be 
+        0-indexed.
 
+    Returns
+    -------
+    final_mask : ndarray
+        A read-only boolean (N, H, W) array for pixels that are 
+        masked (True) or are valid (False).
+    """
+    _check_stack(data_stack=data_stack)
+    data_frame = _stack_frame(data_stack=data_stack)
+    frame_mask = mask_rows(data_array=data_frame, row_list=row_list)
+    final_mask = _broadcast_stack(frame_mask=frame_mask, 
+                                  data_stack=data_stack)
+    return final_mask
@@ -0,0 +1,287 @@
+"""
+This contains the opt-in instrumentation of the mask functions: the
+wall time, the bytes allocated, and the size of the input and output
+of every call, collected into one registry for the process so that
+the stages which dominate a run can be found without a profiler.
+
+When enabled, every public function of the mask module is replaced,
+both in the mask name-space and in its own module, by a wrapper which
+records its calls; when disabled, the original functions are put
+back. So, while disabled, there is no overhead at all.
+
+Allocations are measured with tracemalloc, which is itself slow; they
+may be measured for only every n-th call of each function. Only the
+outermost instrumented call measures allocations, the calls nested
+within it are timed only. The timing is per thread, but allocations
+measured while other threads also allocate include theirs.
+"""
+
+import sys
+import json
+import time
+import inspect
+import functools
+import threading
+import tracemalloc
+import collections
+
+import astropy.table as ap_table
+import numpy as np
+
+import sparrowmonolith as mono
+
+# The original functions which are instrumented, by name.
+_ORIGINAL_FUNCTIONS = {}
+# The records of the most recent calls, and the running statistics of
+# all of the calls of every function.
+_RECORDS = collections.deque(maxlen=10000)
+_STATISTICS = {}
+# The options of the instrumentation, and if it started tracemalloc.
+_OPTIONS = {'memory_interval': 1, 'started_tracemalloc': False}
+_LOCK = threading.Lock()
+# The depth of the instrumented calls of each thread.
+_THREAD_STATE = threading.local()
+
+def enable_mask_instrumentation(memory_interval=1, max_records=10000):
+    """ This enables the instrumentation of all of the public mask
+    functions. Enabling it again changes the options.
+
+    Parameters
+    ----------
+    memory_interval : int (optional)
+        The allocations of every n-th call of each function are
+        measured, using tracemalloc. If 0 or None, the allocations
+        are never measured. Defaults to every call.
+    max_records : int (optional)
+        The number of the most recent calls which are kept as
+        records, the statistics are of all of the calls.
+
+    Returns
+    -------
+    None
+    """
+    memory_interval = int(memory_interval or 0)
+    if (memory_interval < 0):
+        raise mono.InputError("The memory interval must be a positive "
+                              "number of calls, or 0 for never.")
+    global _RECORDS
+    with _LOCK:
+        _OPTIONS['memory_interval'] = memory_interval
+        if (_RECORDS.maxlen != max_records):
+            _RECORDS = collections.deque(_RECORDS, maxlen=int(max_records))
+    if ((memory_interval > 0) and (not tracemalloc.is_tracing())):
+        tracemalloc.start()
+        _OPTIONS['started_tracemalloc'] = True
+
+    # Replacing every public mask function, once.
+    for namedex, functiondex in _public_mask_functions():
+        if (namedex in _ORIGINAL_FUNCTIONS):
+            continue
+        _ORIGINAL_FUNCTIONS[namedex] = functiondex
+        _replace_function(name=namedex, function=functiondex,
+                          replacement=_instrument(function=functiondex))
+    return None
+
+def disable_mask_instrumentation():
+    """ This disables the instrumentation, the original mask
+    functions are put back. What was recorded is kept.
+
+    Returns
+    -------
+    None
+    """
+    for namedex, functiondex in list(_ORIGINAL_FUNCTIONS.items()):
+        _replace_function(name=namedex,
+                          function=getattr(mono.mask, namedex),
+                          replacement=functiondex)
+        del _ORIGINAL_FUNCTIONS[namedex]
+    if (_OPTIONS['started_tracemalloc']):
+        tracemalloc.stop()
+        _OPTIONS['started_tracemalloc'] = False
+    return None
+
+def reset_mask_instrumentation():
+    """ This removes everything which was recorded.
+
+    Returns
+    -------
+    None
+    """
+    with _LOCK:
+        _RECORDS.clear()
+        _STATISTICS.clear()
+    return None
+
+def mask_instrumentation_records():
+    """ The records of the most recent instrumented calls.
+
+    Returns
+    -------
+    records : list
+        The records, oldest first, each a dictionary of the
+        ``function`` name, the wall ``time`` in seconds, the
+        ``allocated_bytes`` (None if not measured), the
+        ``input_bytes`` and ``output_bytes`` of the arrays, and the
+        ``depth`` of the call within other instrumented calls.
+    """
+    with _LOCK:
+        return [dict(recorddex) for recorddex in _RECORDS]
+
+def mask_instrumentation_table():
+    """ This summarizes the statistics of the calls of every
+    instrumented function as a table, the slowest first.
+
+    Returns
+    -------
+    instrumentation_table : Table
+        The Astropy table of the function name, the number of calls,
+        the total, mean, and maximum time, the number of calls whose
+        allocations were measured and their mean and maximum
+        allocated bytes, and the total input bytes.
+    """
+    summary = _summary()
+    column_names = ['function', 'calls', 'total_time', 'mean_time',
+                    'max_time', 'memory_calls', 'mean_allocated_bytes',
+                    'max_allocated_bytes', 'total_input_bytes']
+    instrumentation_table = ap_table.Table(
+        rows=[[rowdex[namedex] for namedex in column_names]
+              for rowdex in summary] or None,
+        names=column_names,
+        dtype=[str, int, float, float, float, int, float, int, int])
+    return instrumentation_table
+
+def dump_mask_instrumentation(filename=None):
+    """ This dumps the statistics and records of the instrumentation
+    as JSON.
+
+    Parameters
+    ----------
+    filename : string (optional)
+        If given, the JSON is also written to this file.
+
+    Returns
+    -------
+    instrumentation_json : string
+        The JSON of the ``summary`` statistics of every function, as
+        in `mask_instrumentation_table`, and the ``records`` of the
+        most recent calls.
+    """
+    instrumentation_json = json.dumps(
+        {'summary': _summary(), 'records': mask_instrumentation_records()},
+        indent=2)
+    if (filename is not None):
+        with open(filename, 'w') as file:
+            file.write(instrumentation_json)
+    return instrumentation_json
+
+def _public_mask_functions():
+    """ The public functions of the mask modules, by name, except for
+    those of this module."""
+    for namedex, functiondex in inspect.getmembers(mono.mask,
+                                                   inspect.isfunction):
+        if (namedex.startswith('_')):
+            continue
+        elif (not functiondex.__module__.startswith(mono.mask.__name__)):
+            continue
+        elif (functiondex.__module__ == __name__):
+            continue
+        yield namedex, functiondex
+
+def _replace_function(name, function, replacement):
+    """ This replaces the function in the mask name-space and in its
+    own module, so calls within the module are replaced too."""
+    setattr(mono.mask, name, replacement)
+    home_module = sys.modules.get(function.__module__, None)
+    if (getattr(home_module, name, None) is function):
+        setattr(home_module, name, replacement)
+    return None
+
+def _array_bytes(values):
+    """ The total bytes of the arrays (dense or sparse) among the
+    values."""
+    return int(sum(valuedex.nbytes for valuedex in values
+                   if (isinstance(valuedex, (np.ndarray,
+                                             mono.mask.sparse._SparseMask)))))
+
+def _instrument(function):
+    """ The wrapper of the function which records its calls."""
+    name = function.__name__
+
+    @functools.wraps(function)
+    def instrumented_function(*args, **kwargs):
+        depth = getattr(_THREAD_STATE, 'depth', 0)
+        with _LOCK:
+            call_number = _STATISTICS.get(name, {}).get('calls', 0) + 1
+        interval = _OPTIONS['memory_interval']
+        # Allocations are only measured by the outermost call.
+        measure_memory = ((depth == 0) and (interval > 0)
+                          and tracemalloc.is_tracing()
+                          and ((call_number - 1) % interval == 0))
+        if (measure_memory):
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        _THREAD_STATE.depth = depth + 1
+        start_time = time.perf_counter()
+        result = None
+        try:
+            result = function(*args, **kwargs)
+            return result
+        finally:
+            elapsed_time = time.perf_counter() - start_time
+            _THREAD_STATE.depth = depth
+            allocated_bytes = None
+            if (measure_memory):
+                allocated_bytes = max(
+                    tracemalloc.get_traced_memory()[1] - start_memory, 0)
+            _record(name=name, elapsed_time=elapsed_time,
+                    allocated_bytes=allocated_bytes,
+                    input_bytes=_array_bytes(
+                        list(args) + list(kwargs.values())),
+                    output_bytes=_array_bytes([result]), depth=depth)
+
+    return instrumented_function
+
+def _record(name, elapsed_time, allocated_bytes, input_bytes,
+            output_bytes, depth):
+    """ This adds the call to the records and the statistics."""
+    with _LOCK:
+        _RECORDS.append({'function': name, 'time': elapsed_time,
+                         'allocated_bytes': allocated_bytes,
+                         'input_bytes': input_bytes,
+                         'output_bytes': output_bytes, 'depth': depth})
+        statistics = _STATISTICS.setdefault(
+            name, {'calls': 0, 'total_time': 0.0, 'max_time': 0.0,
+                   'memory_calls': 0, 'total_allocated_bytes': 0,
+                   'max_allocated_bytes': 0, 'total_input_bytes': 0})
+        statistics['calls'] += 1
+        statistics['total_time'] += elapsed_time
+        statistics['max_time'] = max(statistics['max_time'], elapsed_time)
+        statistics['total_input_bytes'] += input_bytes
+        if (allocated_bytes is not None):
+            statistics['memory_calls'] += 1
+            statistics['total_allocated_bytes'] += allocated_bytes
+            statistics['max_allocated_bytes'] = max(
+                statistics['max_allocated_bytes'], allocated_bytes)
+    return None
+
+def _summary():
+    """ The statistics of every function, the slowest first."""
+    with _LOCK:
+        summary = []
+        for namedex, statisticsdex in _STATISTICS.items():
+            memory_calls = statisticsdex['memory_calls']
+            summary.append({
+                'function': namedex,
+                'calls': statisticsdex['calls'],
+                'total_time': statisticsdex['total_time'],
+                'mean_time': (statisticsdex['total_time']
+                              / statisticsdex['calls']),
+                'max_time': statisticsdex['max_time'],
+                'memory_calls': memory_calls,
+                'mean_allocated_bytes': (
+                    (statisticsdex['total_allocated_bytes'] / memory_calls)
+                    if (memory_calls > 0) else 0.0),
+                'max_allocated_bytes': statisticsdex['max_allocated_bytes'],
+                'total_input_bytes': statisticsdex['total_input_bytes']})
+    summary.sort(key=lambda rowdex: rowdex['total_time'], reverse=True)
+    return summary
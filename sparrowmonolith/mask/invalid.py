@@ -1,17 +1,27 @@
-
 """
 These mask functions mask based on if the values of the arrays
 are considered invalid, or just not within the normal real number
 line (such as infinity and NaN).
+
+Integer and boolean arrays cannot have invalid values, so nothing is
+computed for them: the mask is a shared read-only array of False
+broadcast to the shape of the data, which takes no memory. Use the
+`out` buffer, or copy the mask, where a writable mask is needed.
 """
 
-import numpy as np
-import numpy.ma as np_ma
+import sys
 import inspect
 
+import numpy as np
+
 import sparrowmonolith as mono
 
-def mask_invalid_all(data_array):
+# The single False value which the masks of data that cannot be
+# invalid are broadcast from.
+_NOTHING_MASKED = np.zeros((), dtype=bool)
+_NOTHING_MASKED.flags.writeable = False
+
+def mask_invalid_all(data_array, out=None):
     """ This masks all invalid data, as defined by the other
     masking functions in this field. This is a wrapper function
     that calls all other invalid functions.
@@ -20,6 +30,9 @@ def mask_invalid_all(data_array):
     ----------
     data_array : ndarray
         The array of which the invalid data will be masked.
+    out : ndarray (optional)
+        A boolean array, the same shape as the data, which the mask
+        is written into.
 
     Returns
     -------
@@ -27,52 +40,43 @@ def mask_invalid_all(data_array):
         A boolean array for pixels that are masked (True) or are 
         valid (False).
     """
-    # Find the file within this module with all of the invalid 
-    # masks.
-    try:
-        self_filename = 'mask/invalid.py'
-        self_pathname = mono.meta.find_file_in_directory(
-            directory=mono.meta.get_module_directory(module=mono), 
-            filename=self_filename, throw=False)
-    except mono.AmbiguousError:
-        raise mono.AssumptionError("There is more than one matching "
-                                   "invalid.py file. More strict file "
-                                   "matching names needs to be applied.")
-    # Load the file.
-    invalid_module = mono.meta.load_source_file(pathname=self_pathname)
-
-    # Get all of the invalid mask functions.
-    mask_invalid_function_dict = inspect.getmembers(
-        invalid_module, inspect.isfunction)
-    # Remove all functions that are not masking functions, also 
-    # remove this function itself to prevent an infinite loop.
+    data_array = np.asarray(data_array)
+    # Integer data cannot be invalid, there is nothing to check.
+    if (not _can_be_invalid(data_array=data_array)):
+        return _nothing_masked(data_array=data_array, out=out)
+
+    # Get all of the invalid mask functions of this module. Remove 
+    # this function itself to prevent an infinite loop.
+    invalid_module = sys.modules[__name__]
     invalid_masking_functions = []
-    for keydex, functiondex in dict(mask_invalid_function_dict).items():
-        if (not ('mask' in keydex)):
+    for keydex, functiondex in inspect.getmembers(invalid_module, 
+                                                  inspect.isfunction):
+        if (not keydex.startswith('mask_invalid_')):
             # This function does not belong.
             continue
         elif (keydex == 'mask_invalid_all'):
             # Do not include this own function to prevent infinite
             # looping.
             continue
+        elif (functiondex.__module__ != invalid_module.__name__):
+            # Imported from elsewhere.
+            continue
         else:
             # A valid function.
             invalid_masking_functions.append(functiondex)
 
     # Run through all of the masking functions and combine all of 
-    # them until done.
-    # Initial mask.
-    final_mask = mono.mask.mask_nothing(data_array=data_array)
+    # them until done, in place within one scratch buffer.
+    final_mask = _output_mask(data_array=data_array, out=out)
+    final_mask.fill(False)
+    scratch_mask = np.empty(data_array.shape, dtype=bool)
     for functiondex in invalid_masking_functions:
-        final_mask = mono.mask.combine_masks_lor(
-            final_mask, functiondex(data_array=data_array))
+        functiondex(data_array=data_array, out=scratch_mask)
+        np.logical_or(final_mask, scratch_mask, out=final_mask)
     # All done.
     return final_mask
 
-
-
-
-def mask_invalid_infinity(data_array):
+def mask_invalid_infinity(data_array, out=None):
     """ This mask applies a mask to all infinite values as defined
     by np.inf and -np.inf. 
     
@@ -80,6 +84,9 @@ def mask_invalid_infinity(data_array):
     ----------
     data_array : ndarray
         The data array that the mask will be calculated from.
+    out : ndarray (optional)
+        A boolean array, the same shape as the data, which the mask
+        is written into.
 
     Returns
     -------
@@ -87,12 +94,16 @@ def mask_invalid_infinity(data_array):
         A boolean array for pixels that are masked (True) or are 
         valid (False).
     """
+    data_array = np.asarray(data_array)
+    if (not _can_be_invalid(data_array=data_array)):
+        return _nothing_masked(data_array=data_array, out=out)
     # This mask is, in a way, a wrapper around the Numpy 
     # functionality.
-    final_mask = np.array(np.isinf(data_array), dtype=bool)
+    final_mask = _output_mask(data_array=data_array, out=out)
+    np.isinf(data_array, out=final_mask)
     return final_mask
 
-def mask_invalid_positive_infinity(data_array):
+def mask_invalid_positive_infinity(data_array, out=None):
     """ This mask applies a mask to all infinite values as defined
     by np.inf. 
     
@@ -100,6 +111,9 @@ def mask_invalid_positive_infinity(data_array):
     ----------
     data_array : ndarray
         The data array that the mask will be calculated from.
+    out : ndarray (optional)
+        A boolean array, the same shape as the data, which the mask
+        is written into.
 
     Returns
     -------
@@ -107,12 +121,16 @@ def mask_invalid_positive_infinity(data_array):
         A boolean array for pixels that are masked (True) or are 
         valid (False).
     """
+    data_array = np.asarray(data_array)
+    if (not _can_be_invalid(data_array=data_array)):
+        return _nothing_masked(data_array=data_array, out=out)
     # This mask is, in a way, a wrapper around the Numpy 
     # functionality.
-    final_mask = np.array(np.isposinf(data_array), dtype=bool)
+    final_mask = _output_mask(data_array=data_array, out=out)
+    np.isposinf(data_array, out=final_mask)
     return final_mask
 
-def mask_invalid_negetive_infinity(data_array):
+def mask_invalid_negetive_infinity(data_array, out=None):
     """ This mask applies a mask to all infinite values as defined
     by -np.inf. 
     
@@ -120,6 +138,9 @@ def mask_invalid_negetive_infinity(data_array):
     ----------
     data_array : ndarray
         The data array that the mask will be calculated from.
+    out : ndarray (optional)
+        A boolean array, the same shape as the data, which the mask
+        is written into.
 
     Returns
     -------
@@ -127,12 +148,16 @@ def mask_invalid_negetive_infinity(data_array):
         A boolean array for pixels that are masked (True) or are 
         valid (False).
     """
+    data_array = np.asarray(data_array)
+    if (not _can_be_invalid(data_array=data_array)):
+        return _nothing_masked(data_array=data_array, out=out)
     # This mask is, in a way, a wrapper around the Numpy 
     # functionality.
-    final_mask = np.array(np.isneginf(data_array), dtype=bool)
+    final_mask = _output_mask(data_array=data_array, out=out)
+    np.isneginf(data_array, out=final_mask)
     return final_mask
 
-def mask_invalid_nan(data_array):
+def mask_invalid_nan(data_array, out=None):
     """ This mask applies a mask to mask all of the NaN or 
     None values from the data array. Both Numpy and Python None/NaNs
     are masked by this mask.
@@ -141,6 +166,9 @@ def mask_invalid_nan(data_array):
     ----------
     data_array : ndarray
         The data array that the mask will be calculated from.
+    out : ndarray (optional)
+        A boolean array, the same shape as the data, which the mask
+        is written into.
 
     Returns
     -------
@@ -148,7 +176,37 @@ def mask_invalid_nan(data_array):
         A boolean array for pixels that are masked (True) or are 
         valid (False).
     """
+    data_array = np.asarray(data_array)
+    if (not _can_be_invalid(data_array=data_array)):
+        return _nothing_masked(data_array=data_array, out=out)
     # This mask is, in a way, a wrapper around the Numpy 
     # functionality.
-    final_mask = np.array(np.isnan(data_array), dtype=bool)
-    return final_mask
\ No newline at end of file
+    final_mask = _output_mask(data_array=data_array, out=out)
+    np.isnan(data_array, out=final_mask)
+    return final_mask
+
+
+def _can_be_invalid(data_array):
+    """ If the data type of the array can hold invalid values;
+    integers and booleans cannot."""
+    return (data_array.dtype.kind not in 'biu')
+
+def _output_mask(data_array, out):
+    """ The mask array which is written into, either the provided
+    output or a new array."""
+    if (out is None):
+        return np.empty(data_array.shape, dtype=bool)
+    elif (np.shape(out) != data_array.shape):
+        raise mono.InputError("The output mask must be the same shape "
+                              "as the data array.")
+    return out
+
+def _nothing_masked(data_array, out):
+    """ The mask of data which has no invalid values. Without an 
+    output, it is the shared read-only False broadcast to the shape 
+    of the data."""
+    if (out is None):
+        return np.broadcast_to(_NOTHING_MASKED, data_array.shape)
+    final_mask = _output_mask(data_array=data_array, out=out)
+    final_mask.fill(False)
+    return final_mask
@@ -0,0 +1,262 @@
+"""
+This contains mask libraries: many named masks saved together in a
+single compressed Numpy npz file. Detector characterization produces
+hundreds of masks for every instrument configuration; keeping them in
+one file, each stored in its most compact form, makes them fast to
+save and load.
+
+The masks of a library are loaded lazily by name, only the masks
+which are asked for are read and decompressed.
+
+Every mask is stored as one of:
+
+- ``packed``: a dense boolean mask packed into bits.
+- ``coordinate`` or ``run_length``: a sparse mask, see
+  mono.mask.sparse.
+- ``bitmask``: an integer array of many masks, a bit for each.
+"""
+
+import json
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+# The name of the index of the masks within the library file.
+_INDEX_KEY = '__index__'
+# The library file format version.
+_LIBRARY_VERSION = 1
+# The kinds of mask storage.
+_MASK_KINDS = ('packed', 'coordinate', 'run_length', 'bitmask')
+
+def save_mask_library(filename, masks, kind='auto', compress=True):
+    """ This saves many named masks into a single library file.
+
+    Parameters
+    ----------
+    filename : string
+        The path of the library file, a Numpy npz file.
+    masks : dictionary
+        The masks by name. Each is a boolean array, a sparse mask, or
+        an integer bitmask array.
+    kind : string or dictionary (optional)
+        How the boolean masks are stored, ``packed``, ``coordinate``,
+        or ``run_length``; or a dictionary of them by name. Defaults
+        to ``auto``, the smallest of them for each mask. Sparse masks
+        and bitmasks are stored as they are.
+    compress : boolean (optional)
+        If True, the default, the file is compressed.
+
+    Returns
+    -------
+    None
+    """
+    arrays = {}
+    index = {'version': _LIBRARY_VERSION, 'masks': {}}
+    for namedex, maskdex in masks.items():
+        namedex = str(namedex)
+        if ((_INDEX_KEY in namedex) or ('/' in namedex)):
+            raise mono.InputError("The mask name `{name}` cannot be used in "
+                                  "a mask library.".format(name=namedex))
+        kinddex = (kind.get(namedex, 'auto') if (isinstance(kind, dict))
+                   else kind)
+        entry, mask_arrays = _encode_mask(mask=maskdex, kind=kinddex)
+        index['masks'][namedex] = entry
+        for keydex, arraydex in mask_arrays.items():
+            arrays['{name}/{key}'.format(name=namedex, key=keydex)] = arraydex
+    arrays[_INDEX_KEY] = np.array(json.dumps(index))
+    if (compress):
+        np.savez_compressed(filename, **arrays)
+    else:
+        np.savez(filename, **arrays)
+    return None
+
+def load_mask_library(filename):
+    """ This opens a mask library file, see `save_mask_library`. The
+    masks themselves are loaded when they are asked for.
+
+    Parameters
+    ----------
+    filename : string
+        The path of the library file.
+
+    Returns
+    -------
+    library : MaskLibrary
+        The mask library.
+    """
+    return MaskLibrary(filename=filename)
+
+class MaskLibrary(object):
+    """ The masks of a library file, loaded lazily by name.
+
+    Only the index of the masks is read when the library is opened;
+    each mask is read and decompressed from the file the first time
+    it is asked for, and kept. The library should be closed when it
+    is no longer needed, or used as a context manager.
+
+    Parameters
+    ----------
+    filename : string
+        The path of the library file.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        try:
+            self._file = np.load(filename, allow_pickle=False)
+        except IOError:
+            raise mono.FileError("The mask library file does not exist: "
+                                 "{file}".format(file=filename))
+        if (_INDEX_KEY not in self._file.files):
+            self._file.close()
+            raise mono.FileError("The file is not a mask library: {file}"
+                                 .format(file=filename))
+        index = json.loads(str(self._file[_INDEX_KEY]))
+        if (index.get('version', None) != _LIBRARY_VERSION):
+            self._file.close()
+            raise mono.FileError("The mask library version {ver} is not "
+                                 "supported.".format(ver=index.get('version')))
+        self._index = index['masks']
+        self._masks = {}
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return None
+
+    def close(self):
+        """ This closes the library file. Masks already loaded are
+        kept."""
+        self._file.close()
+        return None
+
+    @property
+    def names(self):
+        """ The names of the masks, in the order they were saved."""
+        return list(self._index.keys())
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __repr__(self):
+        return ('{name}({file!r}, masks={n})'
+                .format(name=type(self).__name__, file=self.filename,
+                        n=len(self)))
+
+    def kind(self, name):
+        """ How the mask of the name is stored."""
+        return self._entry(name=name)['kind']
+
+    def shape(self, name):
+        """ The shape of the mask of the name, without loading it."""
+        return tuple(self._entry(name=name)['shape'])
+
+    def _entry(self, name):
+        """ The index entry of the mask of the name."""
+        try:
+            return self._index[name]
+        except KeyError:
+            raise mono.InputError("There is no mask `{name}` in the mask "
+                                  "library {file}."
+                                  .format(name=name, file=self.filename))
+
+    def load(self, name, dense=True):
+        """ This loads a mask from the library.
+
+        Parameters
+        ----------
+        name : string
+            The name of the mask.
+        dense : boolean (optional)
+            If True, the default, sparse masks are made dense.
+            Otherwise they are returned as sparse masks. Bitmasks are
+            always returned as they are.
+
+        Returns
+        -------
+        mask : ndarray or sparse mask
+            The mask. Packed masks and bitmasks are shared by every
+            load and are read-only; copy them to change them.
+        """
+        entry = self._entry(name=name)
+        if (name not in self._masks):
+            mask_arrays = {keydex: self._file['{name}/{key}'.format(
+                name=name, key=keydex)] for keydex in entry['keys']}
+            self._masks[name] = _decode_mask(entry=entry,
+                                             mask_arrays=mask_arrays)
+            if (isinstance(self._masks[name], np.ndarray)):
+                # Every load shares the cached array, so that it cannot
+                # be changed for the others.
+                self._masks[name].flags.writeable = False
+        mask = self._masks[name]
+        if (dense and isinstance(mask, mono.mask.sparse._SparseMask)):
+            return mask.to_dense()
+        return mask
+
+    def __getitem__(self, name):
+        return self.load(name=name)
+
+def _encode_mask(mask, kind):
+    """ This encodes the mask into its index entry and the arrays which
+    are saved."""
+    if (isinstance(mask, mono.mask.sparse._SparseMask)):
+        sparse_mask = mask
+    else:
+        mask = np.asarray(mask)
+        if (mask.dtype != bool):
+            if (not np.issubdtype(mask.dtype, np.integer)):
+                raise mono.InputError("Masks must be boolean, or integer "
+                                      "bitmasks, not of type {type}."
+                                      .format(type=mask.dtype))
+            return ({'kind': 'bitmask', 'shape': list(mask.shape),
+                     'keys': ['bitmask']}, {'bitmask': mask})
+        if (kind == 'auto'):
+            kind = _smallest_kind(mask=mask)
+        if (kind == 'packed'):
+            return ({'kind': 'packed', 'shape': list(mask.shape),
+                     'keys': ['packed']},
+                    {'packed': np.packbits(mask, axis=None)})
+        if (kind not in _MASK_KINDS):
+            raise mono.InputError("The mask kind `{kind}` is not recognized; "
+                                  "use one of: {kinds}"
+                                  .format(kind=kind, kinds=_MASK_KINDS))
+        sparse_mask = mono.mask.sparse_mask(mask=mask, kind=kind)
+    # The sparse masks have their own serialization.
+    mask_arrays = sparse_mask.to_dict()
+    return ({'kind': str(mask_arrays['kind']),
+             'shape': list(sparse_mask.shape),
+             'keys': sorted(mask_arrays.keys())}, mask_arrays)
+
+def _smallest_kind(mask):
+    """ The kind which stores the boolean mask in the fewest bytes."""
+    index_dtype = mono.mask.sparse._minimal_index_dtype(
+        maximum_value=max(mask.size - 1, 0))
+    kind_bytes = {
+        'packed': -(-mask.size // 8),
+        'coordinate': np.count_nonzero(mask) * index_dtype.itemsize,
+        'run_length': mono.mask.sparse.RunLengthMask.from_dense(
+            mask=mask).nbytes}
+    # The first of the smallest, dense masks are kept packed.
+    return min(kind_bytes, key=kind_bytes.get)
+
+def _decode_mask(entry, mask_arrays):
+    """ This decodes the mask from its index entry and saved arrays."""
+    kind = entry['kind']
+    shape = tuple(entry['shape'])
+    if (kind == 'bitmask'):
+        return mask_arrays['bitmask']
+    if (kind == 'packed'):
+        size = int(np.prod(shape, dtype=np.int64))
+        return np.unpackbits(mask_arrays['packed'],
+                             count=size).astype(bool).reshape(shape)
+    return mono.mask.sparse_mask_from_dict(mask_dictionary=mask_arrays)
@@ -0,0 +1,217 @@
+"""
+This contains the masks from local statistics. Rather than the mean
+and sigma of the entire array, each value is compared to the
+statistics of the values in a box around it. This follows gradients
+and extended emission which a global sigma mask would either mask
+entirely or miss outliers within.
+
+The statistics are computed by the filters of scipy.ndimage over
+tiles of rows, with enough overlap between the tiles that the
+result is the same as filtering the entire array at once.
+"""
+
+import concurrent.futures
+
+import numpy as np
+import scipy.ndimage as sp_ndimage
+
+import sparrowmonolith as mono
+
+# The factor to convert the median absolute deviation into the
+# standard deviation of a normal distribution.
+_MAD_TO_SIGMA = 1.482602218505602
+
+def mask_local_sigma(data_array, box_size, sigma_multiple,
+                     statistic='median', separable=False, chunk_size=2**22,
+                     threads=None):
+    """ This masks values outside a given multiple of the local sigma
+    from the local center, found within a box around each value.
+
+    With the median statistic, the center is the median of the box
+    and sigma is the scaled median absolute deviation (MAD), taken
+    as the median of the absolute deviations from the local median
+    over the same box; both are robust to the outliers being masked.
+    With the mean statistic, the center and sigma are the mean and
+    standard deviation of the box, which is faster (the box filter
+    is separable) but not robust. The median of the box may also be 
+    approximated by the median of the column of row medians, which 
+    is far faster for large boxes.
+
+    Invalid (NaN and infinite) values are not masked, and are
+    replaced by the median of the array within the statistics. For
+    stacks of images, each image is filtered by itself.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the mask will be calculated from.
+    box_size : int or array-like
+        The size of the box, in rows and columns, around each value.
+        A single number is a square box.
+    sigma_multiple : float or array-like
+        The multiple of sigma which will be applied. Unequal
+        bottom-top bounds may be set as a list-like input. The
+        first element is the bottom bound; the last element is the
+        top bound.
+    statistic : string (optional)
+        The local statistic, either ``median`` (the default) or
+        ``mean``.
+    separable : boolean (optional)
+        If True, the local medians are approximated by the median of
+        the row medians, filtering the rows and then the columns.
+        Defaults to False, the exact median of the box.
+    chunk_size : int (optional)
+        The approximate number of data values filtered at once in a
+        tile, this bounds the memory used.
+    threads : int (optional)
+        If provided, the tiles are filtered by this many threads.
+
+    Returns
+    -------
+    final_mask : ndarray
+        The mask as computed by this function.
+    """
+    data_array = np.asarray(data_array)
+    if (data_array.ndim < 2):
+        raise mono.InputError("The local sigma mask needs at least an "
+                              "image, the data array has {ndim} "
+                              "dimensions.".format(ndim=data_array.ndim))
+    # The box, over the rows and columns only.
+    box_size = np.ravel(np.array(box_size, dtype=int))
+    row_box, column_box = int(box_size[0]), int(box_size[-1])
+    if ((row_box < 1) or (column_box < 1)):
+        raise mono.InputError("The box must be at least one value large.")
+    filter_size = (1,) * (data_array.ndim - 2) + (row_box, column_box)
+    # The sigma multiples.
+    flat_sigma_multiple = np.ravel(np.array(sigma_multiple, dtype=float))
+    bottom_sigma_multiple = flat_sigma_multiple[0]
+    top_sigma_multiple = flat_sigma_multiple[-1]
+    if (statistic not in ('median', 'mean')):
+        raise mono.InputError("The local statistic must be `median` or "
+                              "`mean`, not `{stat}`.".format(stat=statistic))
+
+    # Invalid values are replaced so they do not spread through the
+    # filters.
+    valid_values = np.isfinite(data_array)
+    if (np.all(valid_values)):
+        filled_array = data_array
+    elif (np.any(valid_values)):
+        filled_array = np.where(valid_values, data_array,
+                                np.median(data_array[valid_values]))
+    else:
+        return mono.mask.mask_nothing(data_array=data_array)
+
+    # The shift of the values for the mean statistic, the same for
+    # every tile.
+    shift = (float(np.mean(filled_array, dtype=np.float64)) 
+             if (statistic == 'mean') else 0.0)
+
+    # The tiles of rows; the median statistic filters twice so its
+    # tiles need twice the overlap.
+    row_axis = data_array.ndim - 2
+    n_rows = data_array.shape[row_axis]
+    halo = (row_box // 2) * (2 if (statistic == 'median') else 1)
+    row_size = max(data_array.size // max(n_rows, 1), 1)
+    tile_rows = max(int(chunk_size) // row_size, 1)
+    final_mask = np.empty(data_array.shape, dtype=bool)
+    tile_starts = list(range(0, n_rows, tile_rows))
+
+    def mask_tile(startdex):
+        stopdex = min(startdex + tile_rows, n_rows)
+        # The tile with the overlap, and the tile within it.
+        halo_start = max(startdex - halo, 0)
+        halo_stop = min(stopdex + halo, n_rows)
+        halo_window = ((slice(None),) * row_axis
+                       + (slice(halo_start, halo_stop),))
+        tile_window = ((slice(None),) * row_axis
+                       + (slice(startdex, stopdex),))
+        inner_window = ((slice(None),) * row_axis
+                        + (slice(startdex - halo_start,
+                                 stopdex - halo_start),))
+        center, sigma = _local_statistics(
+            data_tile=filled_array[halo_window], filter_size=filter_size,
+            statistic=statistic, separable=separable, shift=shift)
+        data_tile = data_array[tile_window]
+        center = center[inner_window]
+        sigma = sigma[inner_window]
+        final_mask[tile_window] = (
+            (data_tile < center - bottom_sigma_multiple * sigma)
+            | (data_tile > center + top_sigma_multiple * sigma))
+        return None
+
+    if ((threads is None) or (int(threads) <= 1) or (len(tile_starts) <= 1)):
+        for startdex in tile_starts:
+            mask_tile(startdex)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=int(threads)) as executor:
+            # Any errors in the threads should be raised here.
+            for futuredex in [executor.submit(mask_tile, startdex)
+                              for startdex in tile_starts]:
+                futuredex.result()
+    return final_mask
+
+def _local_statistics(data_tile, filter_size, statistic, separable=False,
+                      shift=0.0):
+    """ This computes the local center and sigma of every value of
+    the tile, see `mask_local_sigma`.
+
+    Parameters
+    ----------
+    data_tile : ndarray
+        The tile of finite data values.
+    filter_size : tuple
+        The size of the box over every axis.
+    statistic : string
+        Either ``median`` or ``mean``.
+    separable : boolean (optional)
+        If True, the medians are approximated by filtering each axis
+        in turn.
+    shift : float (optional)
+        The value the data is shifted by for the mean statistic, 
+        near the mean of the data to keep the precision of the 
+        variance.
+
+    Returns
+    -------
+    center : ndarray
+        The local median or mean.
+    sigma : ndarray
+        The local scaled median absolute deviation or standard
+        deviation.
+    """
+    data_tile = np.asarray(data_tile, dtype=np.float64)
+    if (statistic == 'median'):
+        center = _median_filter(data_tile, filter_size=filter_size,
+                                separable=separable)
+        sigma = _median_filter(np.abs(data_tile - center),
+                               filter_size=filter_size, separable=separable)
+        sigma *= _MAD_TO_SIGMA
+    else:
+        # The variance from the mean of the squares, with the values
+        # shifted to keep its precision.
+        shifted_tile = data_tile - shift
+        shifted_center = sp_ndimage.uniform_filter(
+            shifted_tile, size=filter_size, mode='reflect')
+        sigma = sp_ndimage.uniform_filter(
+            np.square(shifted_tile), size=filter_size, mode='reflect')
+        sigma -= np.square(shifted_center)
+        np.sqrt(np.maximum(sigma, 0, out=sigma), out=sigma)
+        center = shifted_center + shift
+    return center, sigma
+
+def _median_filter(data_tile, filter_size, separable):
+    """ The median filter of the tile over the box, or its separable
+    approximation, filtering each axis of the box in turn."""
+    if (not separable):
+        return sp_ndimage.median_filter(data_tile, size=filter_size,
+                                        mode='reflect')
+    filtered_tile = data_tile
+    for axisdex, sizedex in enumerate(filter_size):
+        if (sizedex > 1):
+            filtered_tile = sp_ndimage.median_filter(
+                filtered_tile, size=[(sizedex if (otherdex == axisdex) 
+                                      else 1) 
+                                     for otherdex in range(len(filter_size))],
+                mode='reflect')
+    return filtered_tile
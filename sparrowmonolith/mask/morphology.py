@@ -0,0 +1,423 @@
+"""
+This contains the morphology of masks: growing (dilation) and
+shrinking (erosion) masks by a structuring element, and finding the
+connected regions of masked pixels. Masks of hot pixels or saturation
+usually need to be grown by a few pixels to cover their wings, and
+bleed trails and cosmic ray tracks are better handled as regions than
+as single pixels.
+
+Dense masks are processed by the binary filters of scipy.ndimage over
+tiles of rows, with enough overlap between the tiles that the result
+is the same as processing the entire mask at once. Sparse masks, see
+mono.mask.sparse, are processed through their masked pixels alone
+and stay sparse.
+
+For stacks of images, the structuring element applies to the rows
+and columns of each image; images do not affect each other.
+"""
+
+import concurrent.futures
+
+import astropy.table as ap_table
+import numpy as np
+import scipy.ndimage as sp_ndimage
+import scipy.sparse as sp_sparse
+import scipy.sparse.csgraph as sp_csgraph
+
+import sparrowmonolith as mono
+
+def structuring_element(kind='square', radius=1):
+    """ This creates a structuring element, the neighborhood of each
+    pixel which the morphology operations use.
+
+    Parameters
+    ----------
+    kind : string (optional)
+        The shape of the element: ``square`` (the default), all
+        pixels within the radius along both rows and columns;
+        ``cross``, only the pixels along the row and column; or
+        ``disk``, the pixels within the radius of the center.
+    radius : int (optional)
+        The radius of the element, in pixels. Defaults to 1.
+
+    Returns
+    -------
+    structure : ndarray
+        The boolean structuring element, of shape
+        (2*radius + 1, 2*radius + 1).
+    """
+    radius = int(radius)
+    if (radius < 0):
+        raise mono.InputError("The radius of the structuring element "
+                              "cannot be negative.")
+    row_grid, column_grid = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    if (kind == 'square'):
+        structure = np.ones(row_grid.shape, dtype=bool)
+    elif (kind == 'cross'):
+        structure = (row_grid == 0) | (column_grid == 0)
+    elif (kind == 'disk'):
+        structure = (row_grid**2 + column_grid**2) <= radius**2
+    else:
+        raise mono.InputError("The structuring element kind `{kind}` is not "
+                              "recognized; use `square`, `cross`, or `disk`."
+                              .format(kind=kind))
+    return structure
+
+def dilate_mask(mask, structure=None, iterations=1, chunk_size=2**24,
+                threads=None):
+    """ This grows a mask, masking every pixel whose neighborhood, as
+    given by the structuring element, has a masked pixel. Pixels
+    outside of the mask are not masked.
+
+    Parameters
+    ----------
+    mask : ndarray or sparse mask
+        The mask to grow. Sparse masks are grown through their masked
+        pixels and returned as the same sparse type.
+    structure : array-like (optional)
+        The boolean structuring element over the rows and columns,
+        with at least one pixel, see `structuring_element`. Defaults
+        to the 3x3 square, which grows the mask by one pixel in every
+        direction.
+    iterations : int (optional)
+        The number of times the mask is grown. Defaults to 1.
+    chunk_size : int (optional)
+        The approximate number of pixels processed at once in a tile,
+        this bounds the memory used.
+    threads : int (optional)
+        If provided, the tiles are processed by this many threads.
+
+    Returns
+    -------
+    final_mask : ndarray or sparse mask
+        The grown mask.
+    """
+    return _morphology(mask=mask, operation='dilation', structure=structure,
+                       iterations=iterations, chunk_size=chunk_size,
+                       threads=threads)
+
+def erode_mask(mask, structure=None, iterations=1, chunk_size=2**24,
+               threads=None):
+    """ This shrinks a mask, keeping only the masked pixels whose
+    entire neighborhood, as given by the structuring element, is
+    masked. Pixels outside of the mask are not masked, so masked
+    pixels along the edges are removed.
+
+    Parameters
+    ----------
+    mask : ndarray or sparse mask
+        The mask to shrink. Sparse masks are shrunk through their
+        masked pixels and returned as the same sparse type.
+    structure : array-like (optional)
+        The boolean structuring element over the rows and columns,
+        with at least one pixel, see `structuring_element`. Defaults
+        to the 3x3 square.
+    iterations : int (optional)
+        The number of times the mask is shrunk. Defaults to 1.
+    chunk_size : int (optional)
+        The approximate number of pixels processed at once in a tile,
+        this bounds the memory used.
+    threads : int (optional)
+        If provided, the tiles are processed by this many threads.
+
+    Returns
+    -------
+    final_mask : ndarray or sparse mask
+        The shrunk mask.
+    """
+    return _morphology(mask=mask, operation='erosion', structure=structure,
+                       iterations=iterations, chunk_size=chunk_size,
+                       threads=threads)
+
+def label_mask_regions(mask, structure=None, data_array=None):
+    """ This finds the connected regions of masked pixels, and their
+    statistics.
+
+    Parameters
+    ----------
+    mask : ndarray or sparse mask
+        The mask which the regions are found in.
+    structure : array-like (optional)
+        The 3x3 boolean structuring element over the rows and columns
+        which connects the pixels; ``cross`` connects only pixels
+        sharing an edge. Defaults to the square, pixels touching at
+        their corners are connected.
+    data_array : ndarray (optional)
+        If provided, the sum, mean, minimum, and maximum of the data
+        values within each region are also found.
+
+    Returns
+    -------
+    labels : ndarray
+        The label of the region of every pixel, from 1; 0 is not
+        masked. For sparse masks, the labels are only of the masked
+        pixels, parallel to the flat indexes of the mask.
+    regions : Table
+        The Astropy table of every region, in order of their labels:
+        the number of pixels, the bounding box and the centroid
+        (rows and columns), and the statistics of the data values if
+        provided. For stacks of images, the image of the region is
+        also given.
+    """
+    is_sparse = isinstance(mask, mono.mask.sparse._SparseMask)
+    shape = (mask.shape if (is_sparse) else np.shape(mask))
+    if (len(shape) < 2):
+        raise mono.InputError("The regions of a mask need at least an "
+                              "image, the mask has {ndim} dimensions."
+                              .format(ndim=len(shape)))
+    structure = _full_structure(structure=structure, ndim=len(shape))
+    if (structure.shape[-2:] != (3, 3)):
+        raise mono.InputError("The structuring element connecting the "
+                              "regions must be 3x3, not {shp}."
+                              .format(shp=structure.shape[-2:]))
+    if (data_array is not None):
+        data_array = np.asarray(data_array)
+        if (data_array.shape != tuple(shape)):
+            raise mono.MaskingError("The data array is not the same shape as "
+                                    "the mask. Data: {d_shp}  Mask: {m_shp}"
+                                    .format(d_shp=data_array.shape,
+                                            m_shp=tuple(shape)))
+
+    # The label of every masked pixel.
+    if (is_sparse):
+        flat_indexes = mask.flat_indexes.astype(np.int64)
+        pixel_labels = _label_flat_indexes(flat_indexes=flat_indexes,
+                                           shape=shape, structure=structure)
+        labels = pixel_labels
+    else:
+        # The label structure must extend over every axis, only the
+        # center image of it connects pixels.
+        label_structure = np.zeros((3,) * len(shape), dtype=bool)
+        label_structure[(1,) * (len(shape) - 2)] = structure.reshape(3, 3)
+        labels, __ = sp_ndimage.label(np.asarray(mask, dtype=bool),
+                                      structure=label_structure)
+        flat_indexes = np.flatnonzero(labels)
+        pixel_labels = labels.reshape(-1)[flat_indexes]
+    n_regions = int(pixel_labels.max()) if (pixel_labels.size > 0) else 0
+
+    # The pixels grouped by their region, for the statistics.
+    order = np.argsort(pixel_labels, kind='stable')
+    flat_indexes = flat_indexes[order]
+    group_starts = np.searchsorted(pixel_labels[order],
+                                   np.arange(1, n_regions + 1))
+    pixel_counts = np.diff(np.append(group_starts, flat_indexes.size))
+    coordinates = np.unravel_index(flat_indexes, shape)
+    row_indexes, column_indexes = coordinates[-2], coordinates[-1]
+
+    def reduce_regions(ufunc, values):
+        # Every region has at least one pixel.
+        if (n_regions == 0):
+            return np.zeros(0, dtype=values.dtype)
+        return ufunc.reduceat(values, group_starts)
+
+    columns = {'label': np.arange(1, n_regions + 1, dtype=np.int64),
+               'pixel_count': pixel_counts.astype(np.int64)}
+    if (len(shape) > 2):
+        # The images of a stack are separate.
+        columns['frame'] = (flat_indexes[group_starts]
+                            // (shape[-2] * shape[-1]))
+    columns.update({
+        'row_min': reduce_regions(np.minimum, row_indexes),
+        'row_max': reduce_regions(np.maximum, row_indexes),
+        'column_min': reduce_regions(np.minimum, column_indexes),
+        'column_max': reduce_regions(np.maximum, column_indexes),
+        'row_centroid': (reduce_regions(np.add, row_indexes.astype(float))
+                         / np.maximum(pixel_counts, 1)),
+        'column_centroid': (reduce_regions(np.add,
+                                           column_indexes.astype(float))
+                            / np.maximum(pixel_counts, 1))})
+    if (data_array is not None):
+        data_values = np.take(data_array, flat_indexes).astype(np.float64)
+        columns['data_sum'] = reduce_regions(np.add, data_values)
+        columns['data_mean'] = (columns['data_sum']
+                                / np.maximum(pixel_counts, 1))
+        columns['data_min'] = reduce_regions(np.minimum, data_values)
+        columns['data_max'] = reduce_regions(np.maximum, data_values)
+    regions = ap_table.Table(columns)
+    return labels, regions
+
+def _full_structure(structure, ndim):
+    """ This gives the structuring element over every axis of the
+    mask, only extending over the rows and columns."""
+    if (structure is None):
+        structure = structuring_element(kind='square', radius=1)
+    structure = np.asarray(structure, dtype=bool)
+    if ((structure.ndim != 2) or (structure.shape[0] % 2 == 0)
+            or (structure.shape[1] % 2 == 0)):
+        raise mono.InputError("The structuring element must be two "
+                              "dimensional, with an odd number of rows and "
+                              "columns so that it has a center.")
+    if (not np.any(structure)):
+        raise mono.InputError("The structuring element must have at least "
+                              "one pixel.")
+    return structure.reshape((1,) * (ndim - 2) + structure.shape)
+
+def _morphology(mask, operation, structure, iterations, chunk_size,
+                threads):
+    """ This dilates or erodes the mask, see `dilate_mask` and
+    `erode_mask`."""
+    is_sparse = isinstance(mask, mono.mask.sparse._SparseMask)
+    shape = (mask.shape if (is_sparse) else np.shape(mask))
+    if (len(shape) < 2):
+        raise mono.InputError("The morphology of a mask needs at least an "
+                              "image, the mask has {ndim} dimensions."
+                              .format(ndim=len(shape)))
+    structure = _full_structure(structure=structure, ndim=len(shape))
+    iterations = int(iterations)
+    if (iterations < 1):
+        raise mono.InputError("The number of iterations must be at least 1.")
+
+    if (is_sparse):
+        # Only the masked pixels and their neighbors are involved.
+        flat_indexes = mask.flat_indexes.astype(np.int64)
+        for __ in range(iterations):
+            flat_indexes = _sparse_morphology(
+                flat_indexes=flat_indexes, shape=shape, structure=structure,
+                operation=operation)
+        return type(mask).from_flat_indexes(shape=shape,
+                                            flat_indexes=flat_indexes)
+
+    mask = np.asarray(mask, dtype=bool)
+    binary_function = (sp_ndimage.binary_dilation if (operation == 'dilation')
+                       else sp_ndimage.binary_erosion)
+    # The tiles of rows, overlapping by the reach of the element over
+    # all of the iterations.
+    row_axis = mask.ndim - 2
+    n_rows = mask.shape[row_axis]
+    halo = (structure.shape[row_axis] // 2) * iterations
+    row_size = max(mask.size // max(n_rows, 1), 1)
+    tile_rows = max(int(chunk_size) // row_size, 1)
+    final_mask = np.empty(mask.shape, dtype=bool)
+    tile_starts = list(range(0, n_rows, tile_rows))
+
+    def process_tile(startdex):
+        stopdex = min(startdex + tile_rows, n_rows)
+        halo_start = max(startdex - halo, 0)
+        halo_stop = min(stopdex + halo, n_rows)
+        halo_window = ((slice(None),) * row_axis
+                       + (slice(halo_start, halo_stop),))
+        tile_window = ((slice(None),) * row_axis
+                       + (slice(startdex, stopdex),))
+        inner_window = ((slice(None),) * row_axis
+                        + (slice(startdex - halo_start,
+                                 stopdex - halo_start),))
+        processed_tile = binary_function(mask[halo_window],
+                                         structure=structure,
+                                         iterations=iterations,
+                                         border_value=0)
+        final_mask[tile_window] = processed_tile[inner_window]
+        return None
+
+    if ((threads is None) or (int(threads) <= 1) or (len(tile_starts) <= 1)):
+        for startdex in tile_starts:
+            process_tile(startdex)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=int(threads)) as executor:
+            # Any errors in the threads should be raised here.
+            for futuredex in [executor.submit(process_tile, startdex)
+                              for startdex in tile_starts]:
+                futuredex.result()
+    return final_mask
+
+def _structure_offsets(structure):
+    """ The row and column offsets of the structuring element from
+    its center."""
+    row_offsets, column_offsets = np.nonzero(structure.reshape(
+        structure.shape[-2:]))
+    return (row_offsets - structure.shape[-2] // 2,
+            column_offsets - structure.shape[-1] // 2)
+
+def _shifted_flat_indexes(flat_indexes, shape, row_offset, column_offset):
+    """ This shifts the flat indexes of the pixels by the offset,
+    returning the shifted flat indexes and which stay within their
+    image."""
+    n_rows, n_columns = shape[-2], shape[-1]
+    frame_indexes, image_indexes = np.divmod(flat_indexes,
+                                             n_rows * n_columns)
+    row_indexes, column_indexes = np.divmod(image_indexes, n_columns)
+    row_indexes = row_indexes + row_offset
+    column_indexes = column_indexes + column_offset
+    inside = ((0 <= row_indexes) & (row_indexes < n_rows)
+              & (0 <= column_indexes) & (column_indexes < n_columns))
+    shifted_indexes = (frame_indexes * (n_rows * n_columns)
+                       + row_indexes * n_columns + column_indexes)
+    return shifted_indexes, inside
+
+def _sparse_morphology(flat_indexes, shape, structure, operation):
+    """ A single dilation or erosion of the sorted flat indexes of the
+    masked pixels."""
+    row_offsets, column_offsets = _structure_offsets(
+        structure=structure)
+    if (operation == 'dilation'):
+        # Every masked pixel masks the pixels of the element around
+        # it, as for scipy.ndimage; itself only if the element has 
+        # its center.
+        grown_indexes = []
+        for row_offset, column_offset in zip(row_offsets, column_offsets):
+            shifted_indexes, inside = _shifted_flat_indexes(
+                flat_indexes=flat_indexes, shape=shape,
+                row_offset=row_offset, column_offset=column_offset)
+            grown_indexes.append(shifted_indexes[inside])
+        return mono.mask.sparse._unique_flat_indexes(
+            flat_indexes=np.concatenate(grown_indexes))
+    # A pixel is kept only if its entire neighborhood is masked, and
+    # within the image. The element need not have its center, so the
+    # pixels which may be kept are the masked pixels shifted back by
+    # any one of its offsets; the shift keeps them sorted.
+    candidate_indexes, inside = _shifted_flat_indexes(
+        flat_indexes=flat_indexes, shape=shape,
+        row_offset=-row_offsets[0], column_offset=-column_offsets[0])
+    candidate_indexes = candidate_indexes[inside]
+    kept = np.ones(candidate_indexes.size, dtype=bool)
+    for row_offset, column_offset in zip(row_offsets, column_offsets):
+        shifted_indexes, inside = _shifted_flat_indexes(
+            flat_indexes=candidate_indexes, shape=shape,
+            row_offset=row_offset, column_offset=column_offset)
+        kept &= inside
+        kept &= _sorted_contains(sorted_values=flat_indexes,
+                                 values=shifted_indexes)
+    return candidate_indexes[kept]
+
+def _sorted_contains(sorted_values, values):
+    """ If each value is within the sorted values, by a binary
+    search."""
+    if (sorted_values.size == 0):
+        return np.zeros(values.shape, dtype=bool)
+    positions = np.searchsorted(sorted_values, values)
+    np.minimum(positions, sorted_values.size - 1, out=positions)
+    return sorted_values[positions] == values
+
+def _label_flat_indexes(flat_indexes, shape, structure):
+    """ This labels the connected regions of the masked pixels given
+    by their sorted flat indexes, the labels being in the order of
+    their first pixel as scipy.ndimage.label does."""
+    n_pixels = flat_indexes.size
+    if (n_pixels == 0):
+        return np.zeros(0, dtype=np.int64)
+    # The graph of neighboring masked pixels.
+    row_offsets, column_offsets = _structure_offsets(
+        structure=structure)
+    sources = []
+    targets = []
+    for row_offset, column_offset in zip(row_offsets, column_offsets):
+        shifted_indexes, inside = _shifted_flat_indexes(
+            flat_indexes=flat_indexes, shape=shape,
+            row_offset=row_offset, column_offset=column_offset)
+        connected = inside & _sorted_contains(sorted_values=flat_indexes,
+                                              values=shifted_indexes)
+        sources.append(np.flatnonzero(connected))
+        targets.append(np.searchsorted(flat_indexes,
+                                       shifted_indexes[connected]))
+    sources = np.concatenate(sources)
+    targets = np.concatenate(targets)
+    graph = sp_sparse.coo_matrix(
+        (np.ones(sources.size, dtype=np.int8), (sources, targets)),
+        shape=(n_pixels, n_pixels)).tocsr()
+    __, components = sp_csgraph.connected_components(graph, directed=True,
+                                                     connection='weak')
+    # Renumbering the regions by their first pixel.
+    __, first_pixels = np.unique(components, return_index=True)
+    region_order = np.argsort(np.argsort(first_pixels))
+    labels = region_order[components].astype(np.int64) + 1
+    return labels
@@ -0,0 +1,189 @@
+"""
+This contains the parallel evaluation of masks. The data array is 
+split into tiles of rows which are evaluated by a pool of threads 
+into one shared output mask. Nearly all of the masking is done 
+by Numpy element-wise operations which release the GIL, so the 
+threads run in parallel.
+"""
+
+import os
+import concurrent.futures
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+# The mask functions which have an expression that can be evaluated 
+# within tiles, and the name of the expression function.
+_FUNCTION_EXPRESSIONS = {
+    'mask_invalid_all': 'invalid',
+    'mask_sigma_value': 'sigma',
+    'mask_minimum_value': 'minimum',
+    'mask_maximum_value': 'maximum',
+    'mask_exact_value': 'exact',
+    'mask_count_truncation': 'count_truncation',
+    'mask_percent_truncation': 'percent_truncation',
+    'mask_single_pixels': 'pixels',
+    'mask_rectangle': 'rectangle',
+    'mask_subarray': 'subarray',
+    'mask_columns': 'columns',
+    'mask_rows': 'rows'}
+# The mask functions whose masks only depend on the value of each 
+# element.
+_ELEMENTWISE_FUNCTIONS = ('mask_invalid_infinity', 
+                          'mask_invalid_positive_infinity', 
+                          'mask_invalid_negetive_infinity', 
+                          'mask_invalid_nan',
+                          'mask_exact_values',
+                          'mask_nothing',
+                          'mask_everything')
+
+def mask_parallel(data_array, mask_expression, threads=None, 
+                  tile_size=None, out=None, **kwargs):
+    """ This evaluates a mask expression, or mask function, over 
+    tiles of the data array using a pool of threads.
+
+    Anything which needs the entire data array, such as the sigma 
+    and truncation bounds, is computed first; then the tiles are 
+    evaluated by the threads, each with its own scratch buffers, and
+    written into the one output mask. The mask is the same as the 
+    serial evaluation.
+
+    Mask functions of this module with an expression are evaluated 
+    as that expression. Other mask functions are evaluated over the 
+    entire data array first, and only their combination with other 
+    masks is done in parallel.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the mask will be calculated from.
+    mask_expression : MaskExpression or function
+        The mask expression (see mono.mask.expression) or the mask 
+        function to evaluate.
+    threads : int (optional)
+        The number of threads to use. Defaults to the number of 
+        processors.
+    tile_size : int (optional)
+        The number of bytes of data evaluated at once per thread. 
+        Defaults to the expression default.
+    out : ndarray (optional)
+        A boolean array, the same shape as the data, which the mask 
+        is written into.
+    **kwargs : dictionary
+        The keyword arguments of the mask function, if a function is
+        provided.
+
+    Returns
+    -------
+    final_mask : ndarray
+        A boolean array for pixels that are masked (True) or are 
+        valid (False).
+    """
+    # The expression of what is to be evaluated.
+    if (isinstance(mask_expression, mono.mask.expression.MaskExpression)):
+        if (len(kwargs) != 0):
+            raise mono.InputError("Keyword arguments are only used for "
+                                  "mask functions, not expressions.")
+    else:
+        mask_expression = _function_expression(
+            mask_function=mask_expression, **kwargs)
+
+    threads = (os.cpu_count() or 1) if (threads is None) else int(threads)
+    if (threads < 1):
+        raise mono.InputError("There must be at least one thread to "
+                              "evaluate the mask.")
+
+    data_array = np.asarray(data_array)
+    if (out is None):
+        final_mask = np.empty(data_array.shape, dtype=bool)
+    elif (np.shape(out) != data_array.shape):
+        raise mono.InputError("The output mask must be the same shape "
+                              "as the data array.")
+    else:
+        final_mask = out
+
+    # Everything global is found first, then the tiles. The tiles 
+    # are grouped into a few contiguous tasks per thread so that the
+    # threads stay balanced without much scheduling overhead.
+    context = mask_expression.prepare(data_array=data_array)
+    windows = mono.mask.expression._tile_windows(
+        shape=data_array.shape, itemsize=data_array.itemsize, 
+        tile_size=tile_size)
+    n_tasks = min(len(windows), threads * 4)
+    task_edges = np.linspace(0, len(windows), n_tasks + 1).astype(int)
+    tasks = [windows[startdex:stopdex] 
+             for startdex, stopdex in zip(task_edges[:-1], task_edges[1:])]
+    if ((threads == 1) or (n_tasks <= 1)):
+        # There is no need for a pool.
+        for taskdex in tasks:
+            _evaluate_windows(mask_expression=mask_expression, 
+                              data_array=data_array, windows=taskdex,
+                              context=context, final_mask=final_mask)
+        return final_mask
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=threads) as executor:
+        futures = [executor.submit(_evaluate_windows, 
+                                   mask_expression=mask_expression,
+                                   data_array=data_array, windows=taskdex,
+                                   context=context, final_mask=final_mask)
+                   for taskdex in tasks]
+        # Any errors in the threads should be raised here.
+        for futuredex in futures:
+            futuredex.result()
+    return final_mask
+
+def _evaluate_windows(mask_expression, data_array, windows, context, 
+                      final_mask):
+    """ This evaluates the tiles of a prepared expression into their 
+    part of the output mask. The tiles do not overlap so the threads
+    never write to the same part of the mask."""
+    # The scratch buffers cannot be shared between threads.
+    workspace = mono.mask.expression._Workspace()
+    for windowdex in windows:
+        mask_expression.evaluate_window(
+            data_array=data_array, window=windowdex, context=context, 
+            out=final_mask[windowdex], workspace=workspace)
+    return None
+
+def _function_expression(mask_function, **kwargs):
+    """ This converts a mask function into the expression which 
+    describes it best. 
+
+    Parameters
+    ----------
+    mask_function : function
+        The mask function.
+    **kwargs : dictionary
+        The keyword arguments of the mask function, without the 
+        data array.
+
+    Returns
+    -------
+    mask_expression : MaskExpression
+        The expression of the mask function.
+    """
+    if (not callable(mask_function)):
+        raise mono.InputError("The mask must be a mask expression or a "
+                              "mask function.")
+    function_name = getattr(mask_function, '__name__', None)
+    # Only the functions of this module are known.
+    if (getattr(mono.mask, str(function_name), None) is not mask_function):
+        return mono.mask.expression.function(mask_function=mask_function,
+                                             **kwargs)
+    if (function_name in _FUNCTION_EXPRESSIONS):
+        expression_function = getattr(
+            mono.mask.expression, _FUNCTION_EXPRESSIONS[function_name])
+        try:
+            return expression_function(**kwargs)
+        except TypeError:
+            # The expression does not support all of the parameters
+            # of the function, so the function is used as is.
+            return mono.mask.expression.function(
+                mask_function=mask_function, **kwargs)
+    elif (function_name in _ELEMENTWISE_FUNCTIONS):
+        return mono.mask.expression.elementwise(mask_function=mask_function,
+                                                **kwargs)
+    else:
+        return mono.mask.expression.function(mask_function=mask_function,
+                                             **kwargs)
@@ -0,0 +1,269 @@
+"""
+This contains mask recipes: a description of the masks to apply, in
+a file, rather than in code. A recipe is a ConfigObj (INI-like) file
+whose values are Python literals. The top level options are
+followed by one section per mask, which names the mask function and
+its parameters; the masks of all of the sections are combined by a
+logical or. For example::
+
+    # The options of the recipe.
+    extension = 0
+    suffix = "_mask"
+
+    [invalid]
+    function = "mask_invalid_all"
+
+    [sigma]
+    function = "mask_sigma_value"
+    sigma_multiple = 3
+    sigma_iterations = None
+
+    [border]
+    function = "mask_subarray"
+    column_range = [4, 2043]
+    row_range = [4, 2043]
+
+A recipe is applied to many fits files at once, in parallel over
+processes, by `run_mask_recipe`, or from the command line::
+
+    python -m sparrowmonolith.mask recipe.ini *.fits
+"""
+
+import argparse
+import concurrent.futures
+import copy
+import os
+import time
+
+import astropy.io.fits as ap_fits
+import astropy.table as ap_table
+import configobj
+import numpy as np
+
+import sparrowmonolith as mono
+
+# The top level options of a recipe and their default values.
+_RECIPE_OPTIONS = {'extension': 0,
+                   'suffix': '_mask',
+                   'output_directory': None}
+
+def read_mask_recipe(filename):
+    """ This reads a mask recipe file.
+
+    Parameters
+    ----------
+    filename : string
+        The path of the recipe file, or a list of its lines.
+
+    Returns
+    -------
+    recipe : dictionary
+        The recipe. The ``options`` are the top level options, and
+        the ``masks`` are a list of the name, the mask function
+        name, and the parameters of every mask, in order.
+    """
+    try:
+        recipe_file = configobj.ConfigObj(filename, unrepr=True,
+                                          file_error=True)
+    except (configobj.ConfigObjError, SyntaxError, ValueError) as error:
+        raise mono.ConfigurationError("The mask recipe could not be "
+                                      "read: {err}".format(err=error))
+    except IOError:
+        raise mono.FileError("The mask recipe file does not exist: "
+                             "{file}".format(file=filename))
+
+    # The top level options.
+    options = copy.deepcopy(_RECIPE_OPTIONS)
+    for keydex in recipe_file.scalars:
+        if (keydex not in _RECIPE_OPTIONS):
+            raise mono.ConfigurationError("The mask recipe option `{key}` "
+                                          "is not a recognized option."
+                                          .format(key=keydex))
+        options[keydex] = recipe_file[keydex]
+
+    # The masks, each must name a mask function.
+    masks = []
+    for sectiondex in recipe_file.sections:
+        parameters = dict(recipe_file[sectiondex])
+        function_name = parameters.pop('function', None)
+        if (not callable(getattr(mono.mask, str(function_name), None))):
+            raise mono.ConfigurationError("The mask `{name}` of the recipe "
+                                          "does not name a mask function: "
+                                          "{func}"
+                                          .format(name=sectiondex,
+                                                  func=function_name))
+        masks.append((sectiondex, function_name, parameters))
+    if (len(masks) == 0):
+        mono.warn(mono.ConfigurationWarning, "The mask recipe does not "
+                  "have any masks; nothing will be masked.")
+
+    recipe = {'options': options, 'masks': masks}
+    return recipe
+
+def apply_mask_recipe(recipe, data_array):
+    """ This applies the masks of a recipe to a data array.
+
+    The masks are combined into one mask expression, see
+    mono.mask.expression, and evaluated together.
+
+    Parameters
+    ----------
+    recipe : dictionary
+        The recipe, see `read_mask_recipe`.
+    data_array : ndarray
+        The data array that the mask will be calculated from.
+
+    Returns
+    -------
+    final_mask : ndarray
+        The mask as computed by the recipe.
+    """
+    data_array = np.asarray(data_array)
+    if (len(recipe['masks']) == 0):
+        return mono.mask.mask_nothing(data_array=data_array)
+    # The logical or of all of the masks.
+    mask_expression = None
+    for __, function_name, parametersdex in recipe['masks']:
+        expressiondex = mono.mask.parallel._function_expression(
+            mask_function=getattr(mono.mask, function_name),
+            **parametersdex)
+        mask_expression = (expressiondex if (mask_expression is None)
+                           else (mask_expression | expressiondex))
+    final_mask = mask_expression.evaluate(data_array=data_array)
+    return final_mask
+
+def run_mask_recipe(recipe, filenames, processes=None,
+                    output_directory=None, overwrite=False):
+    """ This applies the masks of a recipe to many fits files, in
+    parallel over processes, and writes the masks to fits files.
+
+    The masks are written as 8-bit integer images, 1 for masked and
+    0 for not masked, named as the data file with the suffix of the
+    recipe. A file which fails does not stop the others; its error is
+    in the summary.
+
+    Parameters
+    ----------
+    recipe : dictionary or string
+        The recipe, see `read_mask_recipe`, or the path of its file.
+    filenames : list
+        The paths of the fits files to mask.
+    processes : int (optional)
+        The number of processes to use. Defaults to the number of
+        processors.
+    output_directory : string (optional)
+        The directory to write the masks into. Defaults to the
+        output directory of the recipe, else the directory of each
+        data file.
+    overwrite : boolean (optional)
+        If True, existing mask files are replaced. Defaults to False.
+
+    Returns
+    -------
+    summary : Table
+        The Astropy table of every file: the data and mask file
+        names, the number and fraction of pixels masked, the time
+        taken, and any error.
+    """
+    if (isinstance(recipe, str)):
+        recipe = read_mask_recipe(filename=recipe)
+    options = recipe['options']
+    if (output_directory is None):
+        output_directory = options['output_directory']
+    if (output_directory is not None):
+        os.makedirs(output_directory, exist_ok=True)
+
+    # The name of every mask file.
+    mask_filenames = []
+    for filenamedex in filenames:
+        directory, basename = os.path.split(filenamedex)
+        root, __ = os.path.splitext(basename)
+        mask_filenames.append(os.path.join(
+            (directory if (output_directory is None) else output_directory),
+            '{root}{suffix}.fits'.format(root=root,
+                                         suffix=options['suffix'])))
+
+    # Masking the files over the processes.
+    processes = ((os.cpu_count() or 1) if (processes is None)
+                 else int(processes))
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max(processes, 1)) as executor:
+        rows = list(executor.map(
+            _run_mask_recipe_file, [recipe] * len(filenames), filenames,
+            mask_filenames, [overwrite] * len(filenames)))
+
+    # Summarizing the files.
+    summary = ap_table.Table(
+        rows=rows, names=('filename', 'mask_filename', 'masked_count',
+                          'masked_fraction', 'seconds', 'error'),
+        dtype=(str, str, np.int64, np.float64, np.float64, str))
+    n_errors = int(np.count_nonzero(summary['error'] != ''))
+    if (n_errors != 0):
+        mono.warn(mono.DataWarning, "{n} of the {total} files could not "
+                  "be masked, see the errors of the summary."
+                  .format(n=n_errors, total=len(summary)))
+    return summary
+
+def _run_mask_recipe_file(recipe, filename, mask_filename, overwrite):
+    """ This applies the recipe to a single fits file and writes its
+    mask, returning the row of the summary. It is run within the
+    processes."""
+    start_time = time.perf_counter()
+    try:
+        extension = recipe['options']['extension']
+        # Scaled images (such as unsigned integers, with BZERO) 
+        # cannot be memory-mapped, they are read and scaled instead.
+        data_header = ap_fits.getheader(filename, extension)
+        scaled = any((keydex in data_header) 
+                     for keydex in ('BZERO', 'BSCALE', 'BLANK'))
+        with ap_fits.open(filename, memmap=(not scaled)) as hdul:
+            final_mask = apply_mask_recipe(recipe=recipe,
+                                           data_array=hdul[extension].data)
+        # Fits files cannot store booleans.
+        header = ap_fits.Header()
+        header['MASKDATA'] = (os.path.basename(filename),
+                              'The data file which was masked.')
+        ap_fits.PrimaryHDU(data=final_mask.astype(np.uint8),
+                           header=header).writeto(mask_filename,
+                                                  overwrite=overwrite)
+    except Exception as error:
+        return (filename, mask_filename, 0, np.nan,
+                time.perf_counter() - start_time,
+                '{type}: {err}'.format(type=type(error).__name__,
+                                       err=error))
+    masked_count = int(np.count_nonzero(final_mask))
+    return (filename, mask_filename, masked_count,
+            masked_count / max(final_mask.size, 1),
+            time.perf_counter() - start_time, '')
+
+def _main(arguments=None):
+    """ The command line interface of the mask recipes."""
+    parser = argparse.ArgumentParser(
+        prog='python -m sparrowmonolith.mask',
+        description="Apply a mask recipe to many fits files in parallel.")
+    parser.add_argument('recipe', help="The mask recipe file.")
+    parser.add_argument('filenames', nargs='+', 
+                        help="The fits files to mask.")
+    parser.add_argument('-p', '--processes', type=int, default=None,
+                        help="The number of processes, defaults to the "
+                             "number of processors.")
+    parser.add_argument('-o', '--output-directory', default=None,
+                        help="The directory to write the masks into.")
+    parser.add_argument('-s', '--summary', default=None,
+                        help="The file to write the summary table into, "
+                             "its format is from its extension.")
+    parser.add_argument('--overwrite', action='store_true',
+                        help="Replace existing mask files.")
+    arguments = parser.parse_args(args=arguments)
+
+    summary = run_mask_recipe(
+        recipe=arguments.recipe, filenames=arguments.filenames, 
+        processes=arguments.processes, 
+        output_directory=arguments.output_directory, 
+        overwrite=arguments.overwrite)
+    if (arguments.summary is not None):
+        summary.write(arguments.summary, overwrite=True)
+    else:
+        summary.pprint(max_lines=-1, max_width=-1)
+    # Failing files are a failure of the command.
+    return int(any(summary['error'] != ''))
@@ -0,0 +1,575 @@
+"""
+This contains reductions of data arrays over the values which are not
+masked: counts, sums, means, standard deviations, extrema, and
+percentiles, or the values of any ranks.
+
+Applying a mask with a Numpy masked array and compressing it copies
+all of the unmasked data. Instead, the mask is given to the Numpy
+reductions as their ``where`` argument, and, over the entire array,
+the data is reduced in chunks of rows so that only a small buffer of
+the unmasked values of each chunk is made. Percentiles are found by
+selection: a sample of the values picks two pivots about the
+percentile, and only the values between them are gathered.
+
+Unmasked invalid (NaN) values propagate into the results, as they do
+with Numpy; mask them first, see mono.mask.mask_invalid_all. When
+nothing is unmasked, the sum is zero and the other reductions are NaN.
+"""
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+# The number of values sampled to pick the pivots of the percentiles.
+_PERCENTILE_SAMPLE_SIZE = 2**14
+
+def iterate_unmasked_values(data_array, mask=None, chunk_size=2**20):
+    """ This iterates over the unmasked values of the data array, in
+    chunks of rows. Only the unmasked values of one chunk are copied
+    at a time.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array.
+    mask : ndarray (optional)
+        The mask, True where masked; it is broadcast against the
+        data array. Defaults to nothing masked.
+    chunk_size : int (optional)
+        The approximate number of data values in a chunk.
+
+    Yields
+    ------
+    unmasked_values : ndarray
+        The one dimensional array of the unmasked values of the
+        chunk, in order.
+    """
+    for data_chunk, kept_chunk in _kept_chunks(
+            data_array=data_array, mask=mask, chunk_size=chunk_size):
+        if (kept_chunk is None):
+            yield data_chunk.reshape(-1)
+        else:
+            yield data_chunk[kept_chunk]
+
+def masked_count(data_array, mask=None):
+    """ The number of unmasked values of the entire data array,
+    counted from the mask alone.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array.
+    mask : ndarray (optional)
+        The mask, True where masked; it is broadcast against the
+        data array. Defaults to nothing masked.
+
+    Returns
+    -------
+    count : int
+        The number of unmasked values.
+    """
+    data_array = np.asarray(data_array)
+    if (mask is None):
+        return int(data_array.size)
+    if (isinstance(mask, mono.mask.sparse._SparseMask)):
+        return int(data_array.size - mask.count)
+    return int(data_array.size - np.count_nonzero(
+        np.broadcast_to(mask, data_array.shape)))
+
+def masked_sum(data_array, mask=None, axis=None, keepdims=False,
+               dtype=None, chunk_size=2**20):
+    """ The sum of the unmasked values of the data array.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array.
+    mask : ndarray (optional)
+        The mask, True where masked; it is broadcast against the
+        data array. Defaults to nothing masked.
+    axis : int or tuple (optional)
+        The axis or axes which are summed. Defaults to None, the
+        entire array, which is summed in chunks.
+    keepdims : boolean (optional)
+        If True, the summed axes are kept as length one.
+    dtype : dtype (optional)
+        The type of the sum, as for Numpy.
+    chunk_size : int (optional)
+        The approximate number of data values reduced at a time over
+        the entire array.
+
+    Returns
+    -------
+    total : float or ndarray
+        The sum.
+    """
+    data_array = np.asarray(data_array)
+    if (axis is not None):
+        return np.sum(data_array, axis=axis, keepdims=keepdims, dtype=dtype,
+                      where=_kept_values(data_array=data_array, mask=mask))
+    total = np.sum(np.zeros(0, dtype=data_array.dtype), dtype=dtype)
+    for data_chunk, kept_chunk in _kept_chunks(
+            data_array=data_array, mask=mask, chunk_size=chunk_size):
+        total = total + np.sum(data_chunk, dtype=dtype,
+                               where=_where(kept_chunk))
+    return _keep_dimensions(value=total, ndim=data_array.ndim,
+                            keepdims=keepdims)
+
+def masked_mean(data_array, mask=None, axis=None, keepdims=False,
+                chunk_size=2**20):
+    """ The mean of the unmasked values of the data array, in
+    float64.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array.
+    mask : ndarray (optional)
+        The mask, True where masked; it is broadcast against the
+        data array. Defaults to nothing masked.
+    axis : int or tuple (optional)
+        The axis or axes over which the mean is taken. Defaults to
+        None, the entire array, which is reduced in chunks.
+    keepdims : boolean (optional)
+        If True, the reduced axes are kept as length one.
+    chunk_size : int (optional)
+        The approximate number of data values reduced at a time over
+        the entire array.
+
+    Returns
+    -------
+    mean : float or ndarray
+        The mean; NaN where nothing is unmasked.
+    """
+    data_array = np.asarray(data_array)
+    total, count = _sum_and_count(data_array=data_array, mask=mask,
+                                  axis=axis, chunk_size=chunk_size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.true_divide(total, count)
+    return _reduced_result(value=mean, data_array=data_array, axis=axis,
+                           keepdims=keepdims)
+
+def masked_std(data_array, mask=None, axis=None, keepdims=False, ddof=0,
+               chunk_size=2**20):
+    """ The standard deviation of the unmasked values of the data
+    array, in float64. It is computed from the deviations from the
+    mean (two passes).
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array.
+    mask : ndarray (optional)
+        The mask, True where masked; it is broadcast against the
+        data array. Defaults to nothing masked.
+    axis : int or tuple (optional)
+        The axis or axes over which the standard deviation is taken.
+        Defaults to None, the entire array, which is reduced in
+        chunks.
+    keepdims : boolean (optional)
+        If True, the reduced axes are kept as length one.
+    ddof : int (optional)
+        The delta degrees of freedom, the divisor is the number of
+        unmasked values less this.
+    chunk_size : int (optional)
+        The approximate number of data values reduced at a time over
+        the entire array.
+
+    Returns
+    -------
+    stddev : float or ndarray
+        The standard deviation; NaN where there are not more
+        unmasked values than the degrees of freedom.
+    """
+    data_array = np.asarray(data_array)
+    total, count = _sum_and_count(data_array=data_array, mask=mask,
+                                  axis=axis, chunk_size=chunk_size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.true_divide(total, count)
+    if (axis is not None):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            square_deviations = np.sum(
+                np.square(np.subtract(data_array, mean, dtype=np.float64)),
+                axis=axis, keepdims=True,
+                where=_kept_values(data_array=data_array, mask=mask))
+    else:
+        square_deviations = 0.0
+        for data_chunk, kept_chunk in _kept_chunks(
+                data_array=data_array, mask=mask, chunk_size=chunk_size):
+            deviations = np.subtract(data_chunk, mean, dtype=np.float64)
+            square_deviations = square_deviations + np.sum(
+                np.square(deviations, out=deviations),
+                where=_where(kept_chunk))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = np.true_divide(square_deviations,
+                                  np.where(count > ddof, count - ddof, np.nan))
+    return _reduced_result(value=np.sqrt(variance), data_array=data_array,
+                           axis=axis, keepdims=keepdims)
+
+def masked_min(data_array, mask=None, axis=None, keepdims=False,
+               chunk_size=2**20):
+    """ The minimum of the unmasked values of the data array.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array.
+    mask : ndarray (optional)
+        The mask, True where masked; it is broadcast against the
+        data array. Defaults to nothing masked.
+    axis : int or tuple (optional)
+        The axis or axes over which the minimum is taken. Defaults
+        to None, the entire array, which is reduced in chunks.
+    keepdims : boolean (optional)
+        If True, the reduced axes are kept as length one.
+    chunk_size : int (optional)
+        The approximate number of data values reduced at a time over
+        the entire array.
+
+    Returns
+    -------
+    minimum : float or ndarray
+        The minimum; NaN where nothing is unmasked.
+    """
+    return _masked_extremum(data_array=data_array, mask=mask, axis=axis,
+                            keepdims=keepdims, chunk_size=chunk_size,
+                            ufunc=np.minimum)
+
+def masked_max(data_array, mask=None, axis=None, keepdims=False,
+               chunk_size=2**20):
+    """ The maximum of the unmasked values of the data array.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array.
+    mask : ndarray (optional)
+        The mask, True where masked; it is broadcast against the
+        data array. Defaults to nothing masked.
+    axis : int or tuple (optional)
+        The axis or axes over which the maximum is taken. Defaults
+        to None, the entire array, which is reduced in chunks.
+    keepdims : boolean (optional)
+        If True, the reduced axes are kept as length one.
+    chunk_size : int (optional)
+        The approximate number of data values reduced at a time over
+        the entire array.
+
+    Returns
+    -------
+    maximum : float or ndarray
+        The maximum; NaN where nothing is unmasked.
+    """
+    return _masked_extremum(data_array=data_array, mask=mask, axis=axis,
+                            keepdims=keepdims, chunk_size=chunk_size,
+                            ufunc=np.maximum)
+
+def masked_percentile(data_array, percent, mask=None, chunk_size=2**20):
+    """ The percentiles of the unmasked values of the entire data
+    array, linearly interpolated between the values as with the
+    default of Numpy.
+
+    The values at the ranks of the percentile are found by
+    selection: a sample of the unmasked values picks pivots on
+    either side of the rank, and only the values between them are
+    gathered and partitioned.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array.
+    percent : float or array-like
+        The percentile or percentiles, between 0 and 100.
+    mask : ndarray (optional)
+        The mask, True where masked; it is broadcast against the
+        data array. Defaults to nothing masked.
+    chunk_size : int (optional)
+        The approximate number of data values compared at a time.
+
+    Returns
+    -------
+    percentile : float or ndarray
+        The percentiles, in the shape of the percents; NaN if
+        nothing is unmasked or any unmasked value is NaN.
+    """
+    data_array = np.asarray(data_array)
+    percent = np.asarray(percent, dtype=np.float64)
+    if (np.any((percent < 0) | (percent > 100))):
+        raise mono.InputError("The percentiles must be between 0 and 100.")
+
+    # Counting the unmasked values from the mask, and sampling them.
+    count = masked_count(data_array=data_array, mask=mask)
+    has_nan, sample = _sample_unmasked(data_array=data_array, mask=mask,
+                                       count=count, chunk_size=chunk_size)
+    if ((count == 0) or has_nan):
+        return np.full(percent.shape, np.nan)[()]
+
+    # The percentiles lie between the values of two adjacent ranks.
+    positions = percent.reshape(-1) / 100 * (count - 1)
+    lower_ranks = np.floor(positions).astype(np.int64)
+    upper_ranks = np.minimum(lower_ranks + 1, count - 1)
+    rank_values = _select_ranks(
+        data_array=data_array, mask=mask,
+        ranks=np.union1d(lower_ranks, upper_ranks), count=count,
+        sample=sample, chunk_size=chunk_size)
+    lower_values = np.array([rank_values[int(rankdex)]
+                             for rankdex in lower_ranks], dtype=np.float64)
+    upper_values = np.array([rank_values[int(rankdex)]
+                             for rankdex in upper_ranks], dtype=np.float64)
+    fractions = positions - lower_ranks
+    with np.errstate(invalid='ignore'):
+        percentile = np.where(
+            fractions > 0,
+            lower_values + fractions * (upper_values - lower_values),
+            lower_values)
+    return percentile.reshape(percent.shape)[()]
+
+def masked_rank_values(data_array, ranks, mask=None, chunk_size=2**20):
+    """ The unmasked values of the entire data array at the ranks,
+    counted from the smallest, as if the unmasked values were
+    sorted. Unlike the percentiles, the values are not interpolated
+    and keep the type of the data array.
+
+    The values are found by selection, see
+    mono.mask.masked_percentile.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array.
+    ranks : int or array-like
+        The ranks, from 0 (the smallest value) to one less than the
+        number of unmasked values, see mono.mask.masked_count.
+    mask : ndarray (optional)
+        The mask, True where masked; it is broadcast against the
+        data array. Defaults to nothing masked.
+    chunk_size : int (optional)
+        The approximate number of data values compared at a time.
+
+    Returns
+    -------
+    rank_values : scalar or ndarray
+        The values at the ranks, in the shape of the ranks; NaN if
+        any unmasked value is NaN.
+    """
+    data_array = np.asarray(data_array)
+    ranks = np.asarray(ranks)
+    count = masked_count(data_array=data_array, mask=mask)
+    if ((ranks.size > 0) 
+        and ((ranks.dtype.kind not in 'iu') 
+             or np.any((ranks < 0) | (ranks >= count)))):
+        raise mono.InputError("The ranks must be integers from 0 to one "
+                              "less than the number of unmasked values, "
+                              "{n}.".format(n=count))
+
+    # Sampling the unmasked values to select the values of the ranks.
+    has_nan, sample = _sample_unmasked(data_array=data_array, mask=mask,
+                                       count=count, chunk_size=chunk_size)
+    if (has_nan):
+        return np.full(ranks.shape, np.nan, dtype=data_array.dtype)[()]
+    rank_values = _select_ranks(
+        data_array=data_array, mask=mask, ranks=ranks.reshape(-1), 
+        count=count, sample=sample, chunk_size=chunk_size)
+    rank_values = np.array([rank_values[int(rankdex)] 
+                            for rankdex in ranks.reshape(-1)], 
+                           dtype=data_array.dtype)
+    return rank_values.reshape(ranks.shape)[()]
+
+def _kept_values(data_array, mask):
+    """ The values which are not masked, broadcast to the data array,
+    or True if nothing is masked."""
+    if (mask is None):
+        return True
+    if (isinstance(mask, mono.mask.sparse._SparseMask)):
+        mask = mask.to_dense()
+    return np.logical_not(np.broadcast_to(mask, data_array.shape))
+
+def _where(kept_chunk):
+    """ The ``where`` argument of the reductions of the chunk."""
+    return True if (kept_chunk is None) else kept_chunk
+
+def _kept_chunks(data_array, mask, chunk_size):
+    """ This iterates over chunks of rows of the data array, and the
+    values of each which are kept (not masked), made within one
+    reused buffer; None if nothing is masked."""
+    data_array = np.asarray(data_array)
+    if (data_array.ndim == 0):
+        data_array = data_array.reshape(1)
+    if (mask is not None):
+        if (isinstance(mask, mono.mask.sparse._SparseMask)):
+            mask = mask.to_dense()
+        mask = np.broadcast_to(mask, data_array.shape)
+    row_size = max(int(np.prod(data_array.shape[1:], dtype=np.int64)), 1)
+    chunk_length = max(int(chunk_size) // row_size, 1)
+    kept_buffer = None
+    for startdex in range(0, len(data_array), chunk_length):
+        window = slice(startdex, startdex + chunk_length)
+        data_chunk = data_array[window]
+        if (mask is None):
+            yield data_chunk, None
+            continue
+        if (kept_buffer is None):
+            kept_buffer = np.empty((min(chunk_length, len(data_array)),)
+                                   + data_array.shape[1:], dtype=bool)
+        kept_chunk = kept_buffer[:len(data_chunk)]
+        np.logical_not(mask[window], out=kept_chunk)
+        yield data_chunk, kept_chunk
+
+def _sum_and_count(data_array, mask, axis, chunk_size):
+    """ The float64 sum and the number of the unmasked values, with
+    the reduced axes kept as length one."""
+    if (axis is not None):
+        kept_values = _kept_values(data_array=data_array, mask=mask)
+        total = np.sum(data_array, axis=axis, keepdims=True,
+                       dtype=np.float64, where=kept_values)
+        count = np.sum(np.broadcast_to(kept_values, data_array.shape),
+                       axis=axis, keepdims=True, dtype=np.int64)
+        return total, count
+    total = 0.0
+    count = 0
+    for data_chunk, kept_chunk in _kept_chunks(
+            data_array=data_array, mask=mask, chunk_size=chunk_size):
+        total = total + np.sum(data_chunk, dtype=np.float64,
+                               where=_where(kept_chunk))
+        count = count + (data_chunk.size if (kept_chunk is None)
+                         else int(np.count_nonzero(kept_chunk)))
+    return np.float64(total), np.int64(count)
+
+def _reduced_result(value, data_array, axis, keepdims):
+    """ The result of a reduction computed with the reduced axes kept
+    as length one, with them removed unless they are to be kept."""
+    if (axis is None):
+        return _keep_dimensions(value=value, ndim=data_array.ndim,
+                                keepdims=keepdims)
+    if (not keepdims):
+        value = np.squeeze(value, axis=axis)
+    return value[()]
+
+def _keep_dimensions(value, ndim, keepdims):
+    """ The reduction of the entire array, as an array of length one
+    axes if they are to be kept."""
+    if (keepdims):
+        return np.reshape(value, (1,) * ndim)
+    return np.asarray(value)[()]
+
+def _masked_extremum(data_array, mask, axis, keepdims, chunk_size, ufunc):
+    """ The minimum or maximum of the unmasked values, NaN where
+    nothing is unmasked."""
+    data_array = np.asarray(data_array)
+    # The initial value is the identity of the extremum.
+    if (data_array.dtype == bool):
+        initial = (ufunc is np.minimum)
+    elif (np.issubdtype(data_array.dtype, np.integer)):
+        limits = np.iinfo(data_array.dtype)
+        initial = limits.max if (ufunc is np.minimum) else limits.min
+    else:
+        initial = np.inf if (ufunc is np.minimum) else -np.inf
+
+    if (axis is not None):
+        kept_values = _kept_values(data_array=data_array, mask=mask)
+        extremum = ufunc.reduce(data_array, axis=axis, keepdims=True,
+                                initial=initial, where=kept_values)
+        empty = ~np.any(np.broadcast_to(kept_values, data_array.shape),
+                        axis=axis, keepdims=True)
+    else:
+        extremum = None
+        for data_chunk, kept_chunk in _kept_chunks(
+                data_array=data_array, mask=mask, chunk_size=chunk_size):
+            if ((kept_chunk is not None) and (not np.any(kept_chunk))):
+                continue
+            chunk_extremum = ufunc.reduce(data_chunk, axis=None,
+                                          initial=initial,
+                                          where=_where(kept_chunk))
+            extremum = (chunk_extremum if (extremum is None)
+                        else ufunc(extremum, chunk_extremum))
+        empty = (extremum is None)
+        if (empty):
+            extremum = np.float64(np.nan)
+    if (np.any(empty)):
+        # The empty slices have no extremum.
+        extremum = np.where(empty, np.nan, extremum)
+    return _reduced_result(value=extremum, data_array=data_array,
+                           axis=axis, keepdims=keepdims)
+
+def _sample_unmasked(data_array, mask, count, chunk_size):
+    """ If any unmasked value is NaN, and an evenly strided sorted
+    sample of the unmasked values."""
+    stride = max(count // _PERCENTILE_SAMPLE_SIZE, 1)
+    has_nan = False
+    sample_chunks = []
+    # The sample continues its stride across the chunks.
+    offset = 0
+    for valuesdex in iterate_unmasked_values(
+            data_array=data_array, mask=mask, chunk_size=chunk_size):
+        if ((valuesdex.dtype.kind in 'fc') and (not has_nan)):
+            has_nan = bool(np.isnan(valuesdex).any())
+        sample_chunks.append(valuesdex[(-offset) % stride::stride])
+        offset = offset + valuesdex.size
+    sample = (np.sort(np.concatenate(sample_chunks))
+              if (len(sample_chunks) > 0) else np.array([]))
+    return has_nan, sample
+
+def _select_ranks(data_array, mask, ranks, count, sample, chunk_size):
+    """ The unmasked values of the ranks (from the smallest), by
+    gathering only the values between pivots from the sample about
+    each rank. The ranks whose pivots overlap share them, and the
+    pivots of a rank are widened until it is between them."""
+    ranks = sorted({int(rankdex) for rankdex in ranks})
+    margins = dict.fromkeys(ranks, max(int(3 * np.sqrt(sample.size)), 1))
+    rank_values = {}
+    while (len(rank_values) < len(ranks)):
+        # The pivots of the ranks, those of neighbouring ranks which 
+        # overlap are merged; beyond the sample, there is no pivot.
+        groups = []
+        for rankdex in ranks:
+            if (rankdex in rank_values):
+                continue
+            position = rankdex / max(count - 1, 1) * (sample.size - 1)
+            lower_index = int(position) - margins[rankdex]
+            upper_index = int(np.ceil(position)) + margins[rankdex]
+            lower_pivot = (sample[lower_index] if (lower_index >= 0) 
+                           else None)
+            upper_pivot = (sample[upper_index] 
+                           if (upper_index < sample.size) else None)
+            if ((len(groups) > 0) 
+                and ((groups[-1]['upper'] is None) 
+                     or (lower_pivot is None)
+                     or (lower_pivot <= groups[-1]['upper']))):
+                groups[-1]['upper'] = upper_pivot
+                groups[-1]['ranks'].append(rankdex)
+            else:
+                groups.append({'lower': lower_pivot, 'upper': upper_pivot,
+                               'ranks': [rankdex], 'n_below': 0,
+                               'gathered': []})
+
+        # Counting below, and gathering between, the pivots.
+        for valuesdex in iterate_unmasked_values(
+                data_array=data_array, mask=mask, chunk_size=chunk_size):
+            for groupdex in groups:
+                between = np.ones(valuesdex.shape, dtype=bool)
+                if (groupdex['lower'] is not None):
+                    np.greater_equal(valuesdex, groupdex['lower'], 
+                                     out=between)
+                    groupdex['n_below'] += (valuesdex.size 
+                                            - int(np.count_nonzero(between)))
+                if (groupdex['upper'] is not None):
+                    np.logical_and(between, valuesdex <= groupdex['upper'],
+                                   out=between)
+                groupdex['gathered'].append(valuesdex[between])
+
+        # Selecting the ranks between their pivots, the pivots of the 
+        # others are widened.
+        for groupdex in groups:
+            gathered = np.concatenate(groupdex['gathered'])
+            n_below = groupdex['n_below']
+            found_ranks = [rankdex for rankdex in groupdex['ranks']
+                           if (n_below <= rankdex < n_below + gathered.size)]
+            if (len(found_ranks) > 0):
+                kth = [rankdex - n_below for rankdex in found_ranks]
+                gathered = np.partition(gathered, kth)
+                for rankdex, kthdex in zip(found_ranks, kth):
+                    rank_values[rankdex] = gathered[kthdex]
+            for rankdex in groupdex['ranks']:
+                if (rankdex not in rank_values):
+                    margins[rankdex] = margins[rankdex] * 4
+    return rank_values
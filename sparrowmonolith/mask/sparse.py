@@ -0,0 +1,689 @@
+
+"""
+These are sparse representations of masks. Masks which flag only a
+small fraction of the pixels (hot pixels, bad columns, and the like)
+are far smaller when stored as coordinate lists or row-wise run
+lengths rather than as full dense boolean arrays.
+
+Sparse masks can be combined with dense masks or other sparse masks,
+applied to data without being made dense, and serialized compactly.
+Follows the same convention as the rest of the masks where True is
+masked and False is not masked.
+"""
+
+import io
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+def _minimal_index_dtype(maximum_value):
+    """ This finds the smallest unsigned integer type that can hold
+    every index up to and including the maximum value. It is used to
+    keep the stored indexes as compact as possible.
+
+    Parameters
+    ----------
+    maximum_value : int
+        The largest value that the index type must store.
+
+    Returns
+    -------
+    index_dtype : dtype
+        The smallest unsigned integer dtype that fits.
+    """
+    for dtypedex in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if (int(maximum_value) <= np.iinfo(dtypedex).max):
+            return np.dtype(dtypedex)
+    # Numpy cannot even index arrays this large.
+    raise mono.DataError("The maximum index value `{max}` is too large to "
+                         "be stored as an index."
+                         .format(max=maximum_value))
+
+def _unique_flat_indexes(flat_indexes):
+    """ This sorts the flat indexes and removes the duplicates. It is
+    the same as Numpy unique, but sorting integers is far faster than
+    the hashing which Numpy unique may use.
+
+    Parameters
+    ----------
+    flat_indexes : array-like
+        The flat indexes, in any order and possibly repeated.
+
+    Returns
+    -------
+    unique_indexes : ndarray
+        The sorted unique flat indexes.
+    """
+    sorted_indexes = np.sort(np.ravel(np.asarray(flat_indexes, 
+                                                 dtype=np.int64)))
+    is_unique = np.ones(sorted_indexes.size, dtype=bool)
+    np.not_equal(sorted_indexes[1:], sorted_indexes[:-1], out=is_unique[1:])
+    unique_indexes = sorted_indexes[is_unique]
+    return unique_indexes
+
+class _SparseMask(object):
+    """ This is the base class of all sparse masks. All operations
+    are done through the sorted flat (C-order) indexes of the masked
+    pixels, which every sparse mask type must provide.
+    """
+
+    # The name of the representation, used for serialization.
+    _kind = None
+
+    def __init__(self, shape):
+        self.shape = tuple(int(shapedex) for shapedex in shape)
+        return None
+
+    @property
+    def flat_indexes(self):
+        """ The sorted flat indexes of the masked pixels."""
+        raise mono.DevelopmentError("Sparse mask types must provide their "
+                                    "own flat indexes.")
+
+    @property
+    def size(self):
+        """ The total number of pixels covered by the mask."""
+        return int(np.prod(self.shape, dtype=np.int64))
+
+    @property
+    def count(self):
+        """ The number of masked pixels."""
+        return int(self.flat_indexes.size)
+
+    @property
+    def fraction(self):
+        """ The fraction of the pixels that are masked."""
+        return (self.count / self.size) if (self.size > 0) else 0.0
+
+    @property
+    def nbytes(self):
+        """ The number of bytes used to store the mask."""
+        raise mono.DevelopmentError("Sparse mask types must provide their "
+                                    "own storage size.")
+
+    def to_dense(self):
+        """ This converts the sparse mask to a dense boolean mask.
+
+        Returns
+        -------
+        final_mask : ndarray
+            A boolean array for pixels that are masked (True) or are
+            valid (False).
+        """
+        final_mask = np.zeros(self.shape, dtype=bool)
+        final_mask.reshape(-1)[self.flat_indexes] = True
+        return final_mask
+
+    def __array__(self, dtype=None, copy=None):
+        # Allows for sparse masks to be used wherever Numpy expects
+        # an array, such as mono.mask.combine_masks_lor.
+        dense_mask = self.to_dense()
+        if (dtype is not None):
+            dense_mask = dense_mask.astype(dtype, copy=False)
+        return dense_mask
+
+    def __repr__(self):
+        return ('{name}(shape={shape}, count={count})'
+                .format(name=type(self).__name__, shape=self.shape,
+                        count=self.count))
+
+    def _other_flat_indexes(self, other):
+        """ This checks that the other mask is a compatible sparse mask
+        and gets its flat indexes."""
+        if (self.shape != other.shape):
+            raise mono.DataError("The sparse masks are not the same shape. "
+                                 "Shapes: {shp_1}  {shp_2}"
+                                 .format(shp_1=self.shape, shp_2=other.shape))
+        return other.flat_indexes
+
+    def _dense_other(self, other):
+        """ This checks that the other mask is a compatible dense mask.
+        """
+        dense_other = np.asarray(other, dtype=bool)
+        if (dense_other.shape != self.shape):
+            raise mono.DataError("The dense mask is not the same shape as "
+                                 "the sparse mask. Shapes: {shp_1}  {shp_2}"
+                                 .format(shp_1=self.shape,
+                                         shp_2=dense_other.shape))
+        return dense_other
+
+    def __or__(self, other):
+        # A sparse and sparse combination stays sparse, a dense
+        # combination is dense regardless. Stack masks combine 
+        # themselves.
+        if (isinstance(other, mono.mask.stack.StackMask)):
+            return NotImplemented
+        elif (isinstance(other, _SparseMask)):
+            combined_indexes = np.union1d(self.flat_indexes,
+                                          self._other_flat_indexes(other))
+            return type(self).from_flat_indexes(shape=self.shape,
+                                                flat_indexes=combined_indexes)
+        else:
+            combined_mask = np.array(self._dense_other(other), dtype=bool)
+            combined_mask.reshape(-1)[self.flat_indexes] = True
+            return combined_mask
+    __ror__ = __or__
+
+    def __and__(self, other):
+        # The logical and can never be more than the sparse mask
+        # itself so it is always sparse.
+        if (isinstance(other, _SparseMask)):
+            combined_indexes = np.intersect1d(
+                self.flat_indexes, self._other_flat_indexes(other),
+                assume_unique=True)
+        else:
+            flat_indexes = self.flat_indexes
+            dense_other = self._dense_other(other)
+            combined_indexes = flat_indexes[
+                np.take(dense_other, flat_indexes)]
+        return type(self).from_flat_indexes(shape=self.shape,
+                                            flat_indexes=combined_indexes)
+    __rand__ = __and__
+
+    def __invert__(self):
+        # The inverse of a sparse mask is dense.
+        final_mask = np.ones(self.shape, dtype=bool)
+        final_mask.reshape(-1)[self.flat_indexes] = False
+        return final_mask
+
+    def _check_data(self, data_array):
+        """ Data that the mask is applied to must be the same shape."""
+        data_array = np.asarray(data_array)
+        if (data_array.shape != self.shape):
+            raise mono.MaskingError("The data array is not the same shape as "
+                                    "the mask. Data: {d_shp}  Mask: {m_shp}"
+                                    .format(d_shp=data_array.shape,
+                                            m_shp=self.shape))
+        return data_array
+
+    def masked_values(self, data_array):
+        """ This extracts the data values which are masked without
+        making the mask dense.
+
+        Parameters
+        ----------
+        data_array : ndarray
+            The data array that the mask is applied to.
+
+        Returns
+        -------
+        masked_values : ndarray
+            The flat array of values which are masked, in C-order.
+        """
+        data_array = self._check_data(data_array=data_array)
+        return np.take(data_array, self.flat_indexes)
+
+    def unmasked_values(self, data_array):
+        """ This extracts the data values which are not masked without
+        making the mask dense. It is the same as the compressed
+        values of a Numpy masked array.
+
+        Parameters
+        ----------
+        data_array : ndarray
+            The data array that the mask is applied to.
+
+        Returns
+        -------
+        unmasked_values : ndarray
+            The flat array of values which are not masked, in C-order.
+        """
+        data_array = self._check_data(data_array=data_array)
+        return np.delete(np.ravel(data_array), self.flat_indexes)
+
+    def fill(self, data_array, fill_value):
+        """ This replaces the masked values of the data array, in
+        place, with the fill value without making the mask dense.
+
+        Parameters
+        ----------
+        data_array : ndarray
+            The data array that the mask is applied to. It is changed
+            in place.
+        fill_value : float
+            The value which the masked pixels will take.
+
+        Returns
+        -------
+        data_array : ndarray
+            The same data array, with the masked values replaced.
+        """
+        if (not isinstance(data_array, np.ndarray)):
+            raise mono.InputError("The data array must be a Numpy array to "
+                                  "be filled in place.")
+        data_array = self._check_data(data_array=data_array)
+        np.put(data_array, self.flat_indexes, fill_value)
+        return data_array
+
+    def to_coordinate(self):
+        """ This converts the sparse mask to a coordinate mask."""
+        return CoordinateMask.from_flat_indexes(
+            shape=self.shape, flat_indexes=self.flat_indexes)
+
+    def to_run_length(self):
+        """ This converts the sparse mask to a run-length mask."""
+        return RunLengthMask.from_flat_indexes(
+            shape=self.shape, flat_indexes=self.flat_indexes)
+
+    def to_dict(self):
+        """ This serializes the sparse mask into a dictionary of small
+        arrays which can be saved by Numpy, see `to_bytes`."""
+        raise mono.DevelopmentError("Sparse mask types must provide their "
+                                    "own serialization.")
+
+    def to_bytes(self):
+        """ This serializes the sparse mask into compressed bytes.
+
+        Returns
+        -------
+        mask_bytes : bytes
+            The compressed bytes of the mask, it can be read using
+            mono.mask.sparse_mask_from_bytes.
+        """
+        with io.BytesIO() as buffer:
+            np.savez_compressed(buffer, **self.to_dict())
+            mask_bytes = buffer.getvalue()
+        return mask_bytes
+
+class CoordinateMask(_SparseMask):
+    """ A sparse mask which stores the coordinates of every masked
+    pixel. This is best for scattered masks, such as hot pixels.
+
+    Parameters
+    ----------
+    shape : tuple
+        The shape of the array which the mask applies to.
+    row_indexes : list or ndarray
+        The 0-indexed row indexes of the masked pixels.
+    column_indexes : list or ndarray
+        The 0-indexed column indexes of the masked pixels; parallel
+        to the row indexes.
+    """
+
+    _kind = 'coordinate'
+
+    def __init__(self, shape, row_indexes, column_indexes):
+        super().__init__(shape=shape)
+        # Coordinates only make sense for images.
+        if (len(self.shape) != 2):
+            raise mono.InputError("Coordinate masks from row and column "
+                                  "indexes must be two dimensional. Use "
+                                  "`from_flat_indexes` for other shapes.")
+        row_indexes = np.ravel(np.asarray(row_indexes, dtype=np.int64))
+        column_indexes = np.ravel(np.asarray(column_indexes, dtype=np.int64))
+        if (row_indexes.size != column_indexes.size):
+            raise mono.InputError("The column and row indexes should be "
+                                  "parallel arrays, the current inputs are "
+                                  "of different length.")
+        flat_indexes = np.ravel_multi_index((row_indexes, column_indexes),
+                                            dims=self.shape)
+        self._set_flat_indexes(flat_indexes=flat_indexes)
+        return None
+
+    def _set_flat_indexes(self, flat_indexes):
+        """ Stores the flat indexes sorted, unique, and compact."""
+        flat_indexes = _unique_flat_indexes(flat_indexes=flat_indexes)
+        if ((flat_indexes.size > 0)
+            and ((flat_indexes[0] < 0) or (flat_indexes[-1] >= self.size))):
+            raise mono.InputError("The masked pixels lie outside of the "
+                                  "mask shape {shp}.".format(shp=self.shape))
+        self._flat_indexes = flat_indexes.astype(
+            _minimal_index_dtype(maximum_value=max(self.size - 1, 0)))
+        return None
+
+    @classmethod
+    def from_flat_indexes(cls, shape, flat_indexes):
+        """ This creates a coordinate mask from the flat (C-order)
+        indexes of the masked pixels. Any shape is supported.
+
+        Parameters
+        ----------
+        shape : tuple
+            The shape of the array which the mask applies to.
+        flat_indexes : ndarray
+            The flat indexes of the masked pixels.
+
+        Returns
+        -------
+        coordinate_mask : CoordinateMask
+            The sparse mask.
+        """
+        coordinate_mask = cls.__new__(cls)
+        _SparseMask.__init__(coordinate_mask, shape=shape)
+        coordinate_mask._set_flat_indexes(flat_indexes=flat_indexes)
+        return coordinate_mask
+
+    @classmethod
+    def from_dense(cls, mask):
+        """ This creates a coordinate mask from a dense mask.
+
+        Parameters
+        ----------
+        mask : ndarray
+            The dense boolean mask.
+
+        Returns
+        -------
+        coordinate_mask : CoordinateMask
+            The sparse mask.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        return cls.from_flat_indexes(shape=mask.shape,
+                                     flat_indexes=np.flatnonzero(mask))
+
+    @property
+    def flat_indexes(self):
+        """ The sorted flat indexes of the masked pixels."""
+        return self._flat_indexes
+
+    @property
+    def row_indexes(self):
+        """ The row indexes of the masked pixels, for images."""
+        return np.unravel_index(self._flat_indexes, self.shape)[-2]
+
+    @property
+    def column_indexes(self):
+        """ The column indexes of the masked pixels, for images."""
+        return np.unravel_index(self._flat_indexes, self.shape)[-1]
+
+    @property
+    def nbytes(self):
+        """ The number of bytes used to store the mask."""
+        return int(self._flat_indexes.nbytes)
+
+    def to_dict(self):
+        """ This serializes the sparse mask into a dictionary of small
+        arrays which can be saved by Numpy, see `to_bytes`."""
+        return {'kind': np.array(self._kind),
+                'shape': np.array(self.shape, dtype=np.int64),
+                'flat_indexes': self._flat_indexes}
+
+class RunLengthMask(_SparseMask):
+    """ A sparse mask which stores the masked pixels as runs along
+    each row. This is best for masks with contiguous runs of masked
+    pixels, such as bad rows or detector edges. For arrays with more
+    than two dimensions, the rows are along the last axis.
+
+    Parameters
+    ----------
+    shape : tuple
+        The shape of the array which the mask applies to.
+    run_rows : list or ndarray
+        The (flattened) row index of each run.
+    run_starts : list or ndarray
+        The 0-indexed column where each run starts.
+    run_lengths : list or ndarray
+        The number of masked pixels in each run.
+    """
+
+    _kind = 'run_length'
+
+    def __init__(self, shape, run_rows, run_starts, run_lengths):
+        super().__init__(shape=shape)
+        run_rows = np.ravel(np.asarray(run_rows, dtype=np.int64))
+        run_starts = np.ravel(np.asarray(run_starts, dtype=np.int64))
+        run_lengths = np.ravel(np.asarray(run_lengths, dtype=np.int64))
+        if (not (run_rows.size == run_starts.size == run_lengths.size)):
+            raise mono.InputError("The run rows, starts, and lengths should "
+                                  "be parallel arrays, the current inputs "
+                                  "are of different length.")
+        # Runs that overlap or touch are fine as input, but they are
+        # normalized through the flat indexes.
+        flat_indexes = self._runs_to_flat_indexes(
+            run_rows=run_rows, run_starts=run_starts,
+            run_lengths=run_lengths)
+        self._set_flat_indexes(
+            flat_indexes=_unique_flat_indexes(flat_indexes=flat_indexes))
+        return None
+
+    @property
+    def _row_length(self):
+        """ The length of a single row, the last axis."""
+        return self.shape[-1] if (len(self.shape) > 0) else 1
+
+    @property
+    def _row_count(self):
+        """ The number of (flattened) rows."""
+        return (self.size // self._row_length) if (self._row_length) else 0
+
+    def _runs_to_flat_indexes(self, run_rows, run_starts, run_lengths):
+        """ This expands the runs into the flat indexes."""
+        if ((run_lengths.size > 0)
+            and (np.any(run_lengths < 0) or np.any(run_starts < 0)
+                 or np.any(run_starts + run_lengths > self._row_length)
+                 or np.any(run_rows < 0)
+                 or np.any(run_rows >= self._row_count))):
+            raise mono.InputError("The runs lie outside of the mask shape "
+                                  "{shp}.".format(shp=self.shape))
+        run_flat_starts = run_rows * self._row_length + run_starts
+        total_length = int(np.sum(run_lengths))
+        # Each run is expanded by repeating its start offset, the
+        # offset being corrected so that an arange over everything
+        # counts up within each run.
+        run_offsets = run_flat_starts - (np.cumsum(run_lengths)
+                                         - run_lengths)
+        flat_indexes = (np.repeat(run_offsets, run_lengths)
+                        + np.arange(total_length, dtype=np.int64))
+        return flat_indexes
+
+    def _set_flat_indexes(self, flat_indexes):
+        """ Finds the runs of the sorted unique flat indexes, storing
+        them compactly."""
+        flat_indexes = np.asarray(flat_indexes, dtype=np.int64)
+        if ((flat_indexes.size > 0)
+            and ((flat_indexes[0] < 0) or (flat_indexes[-1] >= self.size))):
+            raise mono.InputError("The masked pixels lie outside of the "
+                                  "mask shape {shp}.".format(shp=self.shape))
+        # A new run begins where the indexes are not consecutive or
+        # where a new row begins.
+        is_run_start = np.ones(flat_indexes.size, dtype=bool)
+        is_run_start[1:] = ((np.diff(flat_indexes) != 1)
+                            | (flat_indexes[1:] % self._row_length == 0))
+        start_positions = np.flatnonzero(is_run_start)
+        run_lengths = np.diff(np.append(start_positions, flat_indexes.size))
+        run_rows, run_starts = np.divmod(flat_indexes[start_positions],
+                                         self._row_length)
+        # Stored compactly.
+        self.run_rows = run_rows.astype(
+            _minimal_index_dtype(maximum_value=max(self._row_count - 1, 0)))
+        self.run_starts = run_starts.astype(
+            _minimal_index_dtype(maximum_value=max(self._row_length - 1, 0)))
+        self.run_lengths = run_lengths.astype(
+            _minimal_index_dtype(maximum_value=self._row_length))
+        return None
+
+    @classmethod
+    def from_flat_indexes(cls, shape, flat_indexes):
+        """ This creates a run-length mask from the flat (C-order)
+        indexes of the masked pixels.
+
+        Parameters
+        ----------
+        shape : tuple
+            The shape of the array which the mask applies to.
+        flat_indexes : ndarray
+            The flat indexes of the masked pixels.
+
+        Returns
+        -------
+        run_length_mask : RunLengthMask
+            The sparse mask.
+        """
+        run_length_mask = cls.__new__(cls)
+        _SparseMask.__init__(run_length_mask, shape=shape)
+        run_length_mask._set_flat_indexes(
+            flat_indexes=_unique_flat_indexes(flat_indexes=flat_indexes))
+        return run_length_mask
+
+    @classmethod
+    def from_dense(cls, mask):
+        """ This creates a run-length mask from a dense mask. The runs
+        are found from the row-wise edges of the mask rather than
+        from every masked pixel.
+
+        Parameters
+        ----------
+        mask : ndarray
+            The dense boolean mask.
+
+        Returns
+        -------
+        run_length_mask : RunLengthMask
+            The sparse mask.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        run_length_mask = cls.__new__(cls)
+        _SparseMask.__init__(run_length_mask, shape=mask.shape)
+        row_length = run_length_mask._row_length
+        row_mask = mask.reshape(-1, row_length)
+        # The edges of the runs, padded so that runs touching the
+        # borders of the rows are found.
+        padded_mask = np.zeros((row_mask.shape[0], row_length + 2),
+                               dtype=np.int8)
+        padded_mask[:, 1:-1] = row_mask
+        edges = np.diff(padded_mask, axis=1)
+        run_rows, run_starts = np.nonzero(edges == 1)
+        __, run_ends = np.nonzero(edges == -1)
+        run_length_mask.run_rows = run_rows.astype(_minimal_index_dtype(
+            maximum_value=max(run_length_mask._row_count - 1, 0)))
+        run_length_mask.run_starts = run_starts.astype(
+            _minimal_index_dtype(maximum_value=max(row_length - 1, 0)))
+        run_length_mask.run_lengths = (run_ends - run_starts).astype(
+            _minimal_index_dtype(maximum_value=row_length))
+        return run_length_mask
+
+    @property
+    def run_count(self):
+        """ The number of runs in the mask."""
+        return int(self.run_lengths.size)
+
+    @property
+    def count(self):
+        """ The number of masked pixels."""
+        return int(np.sum(self.run_lengths, dtype=np.int64))
+
+    @property
+    def flat_indexes(self):
+        """ The sorted flat indexes of the masked pixels."""
+        return self._runs_to_flat_indexes(
+            run_rows=self.run_rows.astype(np.int64),
+            run_starts=self.run_starts.astype(np.int64),
+            run_lengths=self.run_lengths.astype(np.int64))
+
+    @property
+    def nbytes(self):
+        """ The number of bytes used to store the mask."""
+        return int(self.run_rows.nbytes + self.run_starts.nbytes
+                   + self.run_lengths.nbytes)
+
+    def to_dense(self):
+        """ This converts the sparse mask to a dense boolean mask,
+        filling each run as a slice.
+
+        Returns
+        -------
+        final_mask : ndarray
+            A boolean array for pixels that are masked (True) or are
+            valid (False).
+        """
+        # The runs are marked by their edges, and a cumulative sum
+        # across each row fills them in.
+        edges = np.zeros((self._row_count, self._row_length + 1),
+                         dtype=np.int8)
+        run_rows = self.run_rows.astype(np.intp)
+        run_starts = self.run_starts.astype(np.intp)
+        np.add.at(edges, (run_rows, run_starts), 1)
+        np.add.at(edges, (run_rows, run_starts
+                          + self.run_lengths.astype(np.intp)), -1)
+        final_mask = np.cumsum(edges[:, :-1], axis=1, dtype=np.int8) > 0
+        return final_mask.reshape(self.shape)
+
+    def to_dict(self):
+        """ This serializes the sparse mask into a dictionary of small
+        arrays which can be saved by Numpy, see `to_bytes`."""
+        return {'kind': np.array(self._kind),
+                'shape': np.array(self.shape, dtype=np.int64),
+                'run_rows': self.run_rows,
+                'run_starts': self.run_starts,
+                'run_lengths': self.run_lengths}
+
+
+def sparse_mask_from_dict(mask_dictionary):
+    """ This recreates a sparse mask from its serialized dictionary
+    form, as made by the `to_dict` method of the sparse masks.
+
+    Parameters
+    ----------
+    mask_dictionary : dictionary
+        The dictionary (or Numpy npz file) of the sparse mask.
+
+    Returns
+    -------
+    sparse_mask : CoordinateMask or RunLengthMask
+        The sparse mask.
+    """
+    kind = str(np.asarray(mask_dictionary['kind']))
+    shape = tuple(np.asarray(mask_dictionary['shape'], dtype=np.int64))
+    if (kind == CoordinateMask._kind):
+        sparse_mask = CoordinateMask.from_flat_indexes(
+            shape=shape, flat_indexes=mask_dictionary['flat_indexes'])
+    elif (kind == RunLengthMask._kind):
+        sparse_mask = RunLengthMask.__new__(RunLengthMask)
+        _SparseMask.__init__(sparse_mask, shape=shape)
+        sparse_mask.run_rows = np.asarray(mask_dictionary['run_rows'])
+        sparse_mask.run_starts = np.asarray(mask_dictionary['run_starts'])
+        sparse_mask.run_lengths = np.asarray(mask_dictionary['run_lengths'])
+    else:
+        raise mono.DataError("The sparse mask kind `{kind}` is not known."
+                             .format(kind=kind))
+    return sparse_mask
+
+def sparse_mask_from_bytes(mask_bytes):
+    """ This recreates a sparse mask from the compressed bytes made
+    by the `to_bytes` method of the sparse masks.
+
+    Parameters
+    ----------
+    mask_bytes : bytes
+        The compressed bytes of the sparse mask.
+
+    Returns
+    -------
+    sparse_mask : CoordinateMask or RunLengthMask
+        The sparse mask.
+    """
+    with io.BytesIO(mask_bytes) as buffer:
+        with np.load(buffer, allow_pickle=False) as mask_file:
+            sparse_mask = sparse_mask_from_dict(mask_dictionary=mask_file)
+    return sparse_mask
+
+def sparse_mask(mask, kind='coordinate'):
+    """ This converts a dense mask into one of the sparse mask
+    representations.
+
+    Parameters
+    ----------
+    mask : ndarray
+        The dense boolean mask to be converted.
+    kind : string (optional)
+        The sparse representation; either `coordinate` for a list of
+        pixel coordinates or `run_length` for row-wise runs. Defaults
+        to `coordinate`.
+
+    Returns
+    -------
+    sparse_mask : CoordinateMask or RunLengthMask
+        The sparse mask.
+    """
+    if (kind == CoordinateMask._kind):
+        return CoordinateMask.from_dense(mask=mask)
+    elif (kind == RunLengthMask._kind):
+        return RunLengthMask.from_dense(mask=mask)
+    else:
+        raise mono.InputError("The sparse mask kind `{kind}` is not "
+                              "recognized; use `coordinate` or "
+                              "`run_length`.".format(kind=kind))
+    # The code should not reach here.
+    raise mono.BrokenLogicError
+    return None
@@ -0,0 +1,302 @@
+"""
+This contains the masks of stacks of images, (N, H, W) arrays. Most
+of the mask of a stack is usually static, the same for every image:
+bad pixels, bad columns, the edges of the detector. Only a little of
+it is dynamic, such as cosmic rays or saturation. Storing the static
+part for every image wastes memory; here it is stored once and
+broadcast over the stack (the image axis has a stride of 0), and it
+is combined with the dynamic part of each image only when that
+image's mask is needed.
+"""
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+def mask_stack_static(data_stack, mask_function, **kwargs):
+    """ This applies a mask function which only depends on the shape
+    of the images, such as the geometric masks, to a stack of
+    images. The mask of one image is made and broadcast over the
+    stack.
+
+    Parameters
+    ----------
+    data_stack : ndarray
+        The (N, H, W) stack of images that the mask will be
+        calculated from.
+    mask_function : function
+        The mask function, it is called with a single image as the
+        ``data_array``.
+    **kwargs : dictionary
+        The keyword arguments of the mask function.
+
+    Returns
+    -------
+    final_mask : ndarray
+        A read-only boolean (N, H, W) view of the single image mask,
+        taking the memory of one image.
+    """
+    mono.mask.geometric._check_stack(data_stack=data_stack)
+    data_frame = mono.mask.geometric._stack_frame(data_stack=data_stack)
+    frame_mask = np.asarray(mask_function(data_array=data_frame, **kwargs),
+                            dtype=bool)
+    final_mask = mono.mask.geometric._broadcast_stack(frame_mask=frame_mask,
+                                                      data_stack=data_stack)
+    return final_mask
+
+def mask_stack_dynamic(data_stack, mask_function, static_mask=None,
+                       **kwargs):
+    """ This applies a mask function which depends on the values of
+    each image to a stack of images, combined with a static mask.
+    Nothing is computed until the mask of an image is needed.
+
+    Parameters
+    ----------
+    data_stack : ndarray
+        The (N, H, W) stack of images that the mask will be
+        calculated from. It is kept (not copied) by the mask.
+    mask_function : function
+        The mask function, it is called with each image as the
+        ``data_array``.
+    static_mask : ndarray (optional)
+        The (H, W) mask shared by every image, or an (N, H, W)
+        broadcast of it, such as from `mask_stack_static`.
+    **kwargs : dictionary
+        The keyword arguments of the mask function.
+
+    Returns
+    -------
+    stack_mask : StackMask
+        The lazy mask of the stack.
+    """
+    mono.mask.geometric._check_stack(data_stack=data_stack)
+
+    def frame_function(index):
+        return mask_function(data_array=data_stack[index], **kwargs)
+
+    stack_mask = StackMask(shape=np.shape(data_stack),
+                           static_mask=static_mask,
+                           dynamic_masks=[frame_function])
+    return stack_mask
+
+class StackMask(object):
+    """ The mask of a stack of images, made of a static mask shared
+    by every image and dynamic masks of each image. The mask of an
+    image is the logical or of all of them, made when it is needed.
+
+    Parameters
+    ----------
+    shape : tuple
+        The (N, H, W) shape of the stack.
+    static_mask : ndarray (optional)
+        The (H, W) mask shared by every image, dense or sparse; an 
+        (N, H, W) stride 0 broadcast of it is also accepted. Defaults
+        to no static mask.
+    dynamic_masks : list (optional)
+        The masks of each image. Each is either an (N, H, W) array
+        (or sparse mask) or a function which, given the index of an
+        image, returns its (H, W) mask.
+    """
+
+    # Numpy arrays defer to the logical or of the stack mask.
+    __array_ufunc__ = None
+
+    def __init__(self, shape, static_mask=None, dynamic_masks=None):
+        self.shape = tuple(int(shapedex) for shapedex in shape)
+        if (len(self.shape) != 3):
+            raise mono.InputError("The stack mask must be of an (N, H, W) "
+                                  "stack of images, not the shape {shp}."
+                                  .format(shp=self.shape))
+        self._static_mask = _frame_mask(mask=static_mask, shape=self.shape)
+        self._dynamic_masks = []
+        for maskdex in ([] if (dynamic_masks is None) else dynamic_masks):
+            self._add_dynamic(mask=maskdex)
+        return None
+
+    def _add_dynamic(self, mask):
+        """ Adds a dynamic mask, checking its shape."""
+        if ((not callable(mask)) and (tuple(np.shape(mask)) != self.shape)):
+            raise mono.MaskingError("The dynamic mask is not the shape of the "
+                                    "stack. Mask: {m_shp}  Stack: {s_shp}"
+                                    .format(m_shp=np.shape(mask),
+                                            s_shp=self.shape))
+        self._dynamic_masks.append(mask)
+        return None
+
+    @property
+    def n_frames(self):
+        """ The number of images in the stack."""
+        return self.shape[0]
+
+    @property
+    def static_mask(self):
+        """ The static mask, as a read-only (N, H, W) broadcast view of
+        the single image mask."""
+        return np.broadcast_to(self._static_mask, self.shape)
+
+    @property
+    def nbytes(self):
+        """ The number of bytes stored by the mask, lazy dynamic masks
+        take none."""
+        nbytes = self._static_mask.nbytes
+        for maskdex in self._dynamic_masks:
+            if (not callable(maskdex)):
+                nbytes = nbytes + int(getattr(maskdex, 'nbytes', 0))
+        return int(nbytes)
+
+    def __len__(self):
+        return self.n_frames
+
+    def __repr__(self):
+        return ('{name}(shape={shape}, dynamic={n_dyn})'
+                .format(name=type(self).__name__, shape=self.shape,
+                        n_dyn=len(self._dynamic_masks)))
+
+    def frame(self, index):
+        """ This makes the mask of a single image of the stack.
+
+        Parameters
+        ----------
+        index : int
+            The index of the image in the stack.
+
+        Returns
+        -------
+        final_mask : ndarray
+            The (H, W) mask of the image.
+        """
+        index = int(index)
+        if (index < 0):
+            index = index + self.n_frames
+        if ((index < 0) or (index >= self.n_frames)):
+            raise mono.InputError("The image index {idx} is outside of the "
+                                  "stack of {n} images."
+                                  .format(idx=index, n=self.n_frames))
+        final_mask = self._static_mask.copy()
+        for maskdex in self._dynamic_masks:
+            if (callable(maskdex)):
+                frame_mask = maskdex(index)
+            elif (isinstance(maskdex, mono.mask.sparse._SparseMask)):
+                # Only the masked pixels of the image are taken.
+                frame_size = final_mask.size
+                flat_indexes = maskdex.flat_indexes.astype(np.int64)
+                image_indexes = flat_indexes[
+                    np.searchsorted(flat_indexes, index * frame_size):
+                    np.searchsorted(flat_indexes, (index + 1) * frame_size)]
+                final_mask.reshape(-1)[image_indexes 
+                                       - index * frame_size] = True
+                continue
+            else:
+                frame_mask = maskdex[index]
+            np.logical_or(final_mask, frame_mask, out=final_mask)
+        return final_mask
+
+    def __getitem__(self, index):
+        # A single image is made directly; otherwise the whole stack.
+        if (isinstance(index, (int, np.integer))):
+            return self.frame(index=index)
+        return self.to_dense()[index]
+
+    def __iter__(self):
+        for indexdex in range(self.n_frames):
+            yield self.frame(index=indexdex)
+
+    def to_dense(self, out=None):
+        """ This makes the mask of every image of the stack.
+
+        Parameters
+        ----------
+        out : ndarray (optional)
+            The (N, H, W) boolean array to write the mask into, such
+            as a memory map.
+
+        Returns
+        -------
+        final_mask : ndarray
+            The (N, H, W) mask of the stack.
+        """
+        final_mask = (np.empty(self.shape, dtype=bool) if (out is None)
+                      else out)
+        for indexdex in range(self.n_frames):
+            final_mask[indexdex] = self.frame(index=indexdex)
+        return final_mask
+
+    def __array__(self, dtype=None, copy=None):
+        # Allows for stack masks to be used wherever Numpy expects
+        # an array.
+        dense_mask = self.to_dense()
+        if (dtype is not None):
+            dense_mask = dense_mask.astype(dtype, copy=False)
+        return dense_mask
+
+    def __or__(self, other):
+        # Single image masks join the static mask, the others are
+        # dynamic; nothing is computed.
+        if (isinstance(other, StackMask)):
+            if (other.shape != self.shape):
+                raise mono.MaskingError("The stack masks are not the same "
+                                        "shape. Shapes: {shp_1}  {shp_2}"
+                                        .format(shp_1=self.shape,
+                                                shp_2=other.shape))
+            return StackMask(
+                shape=self.shape,
+                static_mask=self._static_mask | other._static_mask,
+                dynamic_masks=self._dynamic_masks + other._dynamic_masks)
+        if (_is_static(mask=other)):
+            return StackMask(
+                shape=self.shape,
+                static_mask=(self._static_mask
+                             | _frame_mask(mask=other, shape=self.shape)),
+                dynamic_masks=self._dynamic_masks)
+        return StackMask(shape=self.shape, static_mask=self._static_mask,
+                         dynamic_masks=self._dynamic_masks + [other])
+    __ror__ = __or__
+
+    def count(self):
+        """ This counts the masked pixels of every image.
+
+        Returns
+        -------
+        counts : ndarray
+            The number of masked pixels of each image.
+        """
+        if (len(self._dynamic_masks) == 0):
+            # Every image is the static mask.
+            return np.full(self.n_frames, np.count_nonzero(self._static_mask),
+                           dtype=np.int64)
+        return np.array([np.count_nonzero(framedex) for framedex in self],
+                        dtype=np.int64)
+
+def _is_static(mask):
+    """ If the mask is the same for every image: a single image mask
+    (dense or sparse), or an (N, H, W) array which is a stride 0 
+    broadcast of one."""
+    if (isinstance(mask, mono.mask.sparse._SparseMask)):
+        return (len(mask.shape) == 2)
+    if (callable(mask)):
+        return False
+    if (np.ndim(mask) == 2):
+        return True
+    return (isinstance(mask, np.ndarray) and (mask.ndim == 3)
+            and (mask.strides[0] == 0))
+
+def _frame_mask(mask, shape):
+    """ The single (H, W) image mask of a static mask."""
+    if (mask is None):
+        return np.zeros(shape[1:], dtype=bool)
+    if (not _is_static(mask=mask)):
+        raise mono.MaskingError("The static mask must be a single image "
+                                "mask, or a stride 0 broadcast of one.")
+    if (isinstance(mask, mono.mask.sparse._SparseMask)):
+        # It is made dense once, to be shared by every image.
+        mask = mask.to_dense()
+    frame_mask = np.asarray(mask, dtype=bool)
+    if (frame_mask.ndim == 3):
+        frame_mask = frame_mask[0] if (frame_mask.shape[0] > 0) else (
+            np.zeros(frame_mask.shape[1:], dtype=bool))
+    if (frame_mask.shape != tuple(shape[1:])):
+        raise mono.MaskingError("The static mask is not the shape of the "
+                                "images. Mask: {m_shp}  Images: {i_shp}"
+                                .format(m_shp=frame_mask.shape,
+                                        i_shp=tuple(shape[1:])))
+    return np.array(frame_mask, dtype=bool)
@@ -0,0 +1,257 @@
+"""
+This contains the streaming masks, for frames which arrive one at a
+time. Rather than the statistics of an ever growing stack, each
+pixel keeps only the running mean and variance of its own history,
+updated by Welford's method as each frame arrives. Pixels far from
+their own history are masked.
+
+Older frames may also be forgotten exponentially so that the history
+follows slow drifts, such as of the bias level or of the sky.
+"""
+
+import numpy as np
+
+import sparrowmonolith as mono
+
+class StreamingSigmaMasker(object):
+    """ A per-pixel sigma mask over a stream of frames.
+
+    Each new frame is compared to the running mean and standard
+    deviation of every pixel, masking the values outside of the given
+    multiple of sigma. The frame then updates the running statistics,
+    by the weighted form of Welford's method, in O(H*W) time and
+    memory without keeping any of the previous frames. Invalid (NaN
+    and infinite) values are not masked and are not part of the
+    statistics.
+
+    Parameters
+    ----------
+    shape : tuple
+        The shape of the frames.
+    sigma_multiple : float or array-like
+        The multiple of sigma which will be applied. Unequal
+        bottom-top bounds may be set as a list-like input. The first
+        element is the bottom bound; the last element is the top
+        bound.
+    forgetting_factor : float (optional)
+        The weight of the history kept by each new frame, between 0
+        and 1. With 1, the default, every frame is weighted equally;
+        otherwise older frames are forgotten exponentially, the
+        history being about 1 / (1 - forgetting_factor) frames long.
+    minimum_frames : int (optional)
+        The number of frames in the history of a pixel before it can
+        be masked. Defaults to 10; shorter histories underestimate
+        sigma and mask too many values.
+    update_masked : boolean (optional)
+        If True, masked values also update the statistics. Defaults
+        to False, so that outliers do not inflate the history.
+    """
+
+    # The file format version of the checkpoints.
+    _checkpoint_version = 1
+
+    def __init__(self, shape, sigma_multiple, forgetting_factor=1.0,
+                 minimum_frames=10, update_masked=False):
+        self.shape = tuple(int(shapedex) for shapedex in np.ravel(shape))
+        flat_sigma_multiple = np.ravel(np.array(sigma_multiple, dtype=float))
+        self.bottom_sigma_multiple = float(flat_sigma_multiple[0])
+        self.top_sigma_multiple = float(flat_sigma_multiple[-1])
+        self.forgetting_factor = float(forgetting_factor)
+        if (not (0 < self.forgetting_factor <= 1)):
+            raise mono.InputError("The forgetting factor must be between 0 "
+                                  "and 1, not {fac}."
+                                  .format(fac=forgetting_factor))
+        self.minimum_frames = int(minimum_frames)
+        self.update_masked = bool(update_masked)
+        self.reset()
+        return None
+
+    def reset(self):
+        """ This forgets the entire history of every pixel."""
+        # The running weight, mean, and weighted sum of the squared
+        # deviations of every pixel; and the number of frames.
+        self.weight = np.zeros(self.shape, dtype=np.float64)
+        self.mean = np.zeros(self.shape, dtype=np.float64)
+        self.square_deviations = np.zeros(self.shape, dtype=np.float64)
+        self.frame_count = np.zeros(self.shape, dtype=np.int64)
+        self.n_frames = 0
+        return None
+
+    @property
+    def variance(self):
+        """ The running variance of every pixel, NaN without a
+        history."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.square_deviations / self.weight
+
+    @property
+    def stddev(self):
+        """ The running standard deviation of every pixel, NaN without
+        a history."""
+        return np.sqrt(self.variance)
+
+    def _check_frame(self, frame):
+        """ The frame must be the shape of the stream."""
+        frame = np.asarray(frame)
+        if (frame.shape != self.shape):
+            raise mono.MaskingError("The frame is not the shape of the "
+                                    "stream. Frame: {f_shp}  Stream: {s_shp}"
+                                    .format(f_shp=frame.shape,
+                                            s_shp=self.shape))
+        return frame
+
+    def mask(self, frame, update=True, out=None):
+        """ This masks the values of a new frame which are outside of
+        the sigma bounds of their history, then adds the frame to the
+        history.
+
+        Parameters
+        ----------
+        frame : ndarray
+            The new frame.
+        update : boolean (optional)
+            If False, the frame is only masked and is not added to the
+            history. Defaults to True.
+        out : ndarray (optional)
+            The boolean array to write the mask into.
+
+        Returns
+        -------
+        final_mask : ndarray
+            The mask of the frame.
+        """
+        frame = self._check_frame(frame=frame)
+        final_mask = (np.empty(self.shape, dtype=bool) if (out is None)
+                      else out)
+        # The deviations from the history, and the bounds of them.
+        deviations = np.subtract(frame, self.mean, dtype=np.float64)
+        bound = self.variance
+        np.sqrt(bound, out=bound)
+        with np.errstate(invalid='ignore'):
+            np.less(deviations, -self.bottom_sigma_multiple * bound,
+                    out=final_mask)
+            np.multiply(bound, self.top_sigma_multiple, out=bound)
+            final_mask |= (deviations > bound)
+        # Pixels without enough history are not masked.
+        final_mask &= (self.frame_count >= self.minimum_frames)
+        if (update):
+            used_values = np.isfinite(frame)
+            if (not self.update_masked):
+                used_values &= ~final_mask
+            self._update(deviations=deviations, frame=frame,
+                         used_values=used_values)
+        return final_mask
+    __call__ = mask
+
+    def update(self, frame, mask=None):
+        """ This adds a frame to the history without masking it.
+
+        Parameters
+        ----------
+        frame : ndarray
+            The new frame.
+        mask : ndarray (optional)
+            The values of the frame which are masked, these are not
+            added to the history.
+
+        Returns
+        -------
+        None
+        """
+        frame = self._check_frame(frame=frame)
+        used_values = np.isfinite(frame)
+        if (mask is not None):
+            used_values &= ~np.asarray(mask, dtype=bool)
+        deviations = np.subtract(frame, self.mean, dtype=np.float64)
+        self._update(deviations=deviations, frame=frame,
+                     used_values=used_values)
+        return None
+
+    def _update(self, deviations, frame, used_values):
+        """ The weighted Welford update of the used values, the
+        deviations being from the mean before the update. Every
+        operation is in place on the used values only."""
+        factor = self.forgetting_factor
+        if (factor != 1):
+            np.multiply(self.weight, factor, out=self.weight,
+                        where=used_values)
+            np.multiply(self.square_deviations, factor,
+                        out=self.square_deviations, where=used_values)
+        np.add(self.weight, 1, out=self.weight, where=used_values)
+        np.add(self.frame_count, 1, out=self.frame_count,
+               where=used_values)
+        # The mean moves by the deviation over the weight; the sum of
+        # the squares by the product of the deviations from the old
+        # and new means.
+        step = np.divide(deviations, self.weight, where=used_values,
+                         out=np.zeros(self.shape, dtype=np.float64))
+        np.add(self.mean, step, out=self.mean, where=used_values)
+        np.subtract(frame, self.mean, out=step, where=used_values)
+        np.multiply(step, deviations, out=step, where=used_values)
+        np.add(self.square_deviations, step, out=self.square_deviations,
+               where=used_values)
+        self.n_frames = self.n_frames + 1
+        return None
+
+    def save(self, filename):
+        """ This saves the state of the masker, its parameters and the
+        history of every pixel, to a Numpy npz file.
+
+        Parameters
+        ----------
+        filename : string
+            The path of the checkpoint file.
+
+        Returns
+        -------
+        None
+        """
+        np.savez(filename, version=np.array(self._checkpoint_version),
+                 shape=np.array(self.shape, dtype=np.int64),
+                 sigma_multiple=np.array([self.bottom_sigma_multiple,
+                                          self.top_sigma_multiple]),
+                 forgetting_factor=np.array(self.forgetting_factor),
+                 minimum_frames=np.array(self.minimum_frames),
+                 update_masked=np.array(self.update_masked),
+                 n_frames=np.array(self.n_frames),
+                 weight=self.weight, mean=self.mean,
+                 square_deviations=self.square_deviations,
+                 frame_count=self.frame_count)
+        return None
+
+    @classmethod
+    def load(cls, filename):
+        """ This loads a masker from its checkpoint file, see `save`.
+
+        Parameters
+        ----------
+        filename : string
+            The path of the checkpoint file.
+
+        Returns
+        -------
+        masker : StreamingSigmaMasker
+            The masker, as it was when it was saved.
+        """
+        try:
+            checkpoint = np.load(filename, allow_pickle=False)
+        except IOError:
+            raise mono.FileError("The streaming mask checkpoint file does not "
+                                 "exist: {file}".format(file=filename))
+        with checkpoint:
+            if (int(checkpoint['version']) != cls._checkpoint_version):
+                raise mono.FileError("The streaming mask checkpoint version "
+                                     "{ver} is not supported."
+                                     .format(ver=int(checkpoint['version'])))
+            masker = cls(shape=tuple(checkpoint['shape'].tolist()),
+                         sigma_multiple=checkpoint['sigma_multiple'],
+                         forgetting_factor=float(
+                             checkpoint['forgetting_factor']),
+                         minimum_frames=int(checkpoint['minimum_frames']),
+                         update_masked=bool(checkpoint['update_masked']))
+            masker.n_frames = int(checkpoint['n_frames'])
+            masker.weight[...] = checkpoint['weight']
+            masker.mean[...] = checkpoint['mean']
+            masker.square_deviations[...] = checkpoint['square_deviations']
+            masker.frame_count[...] = checkpoint['frame_count']
+        return masker
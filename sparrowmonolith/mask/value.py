@@ -5,13 +5,18 @@ This contains all of the value based masks. These masks are created
 based on the value of the array entries.
 """
 
+import math
 import numpy as np
-import numpy.ma as np_ma
 import decimal
 
 import sparrowmonolith as mono
 
-def mask_sigma_value(data_array, sigma_multiple, sigma_iterations=1):
+# The most integers, within the tolerance of the exact values, which
+# are listed and looked up; beyond it, ranges are compared instead.
+_MAXIMUM_INTEGER_CANDIDATES = 2**12
+
+def mask_sigma_value(data_array, sigma_multiple, sigma_iterations=1,
+                     exact=False, axis=None, chunk_size=2**22):
     """
     This applies a mask on values outside a given multiple of a 
     sigma value.
@@ -20,6 +25,20 @@ def mask_sigma_value(data_array, sigma_multiple, sigma_iterations=1):
     from the mean. The mean and sigma values are automatically 
     calculated from the array provided. 
 
+    By default, the mean and sigma are computed in float64 by Numpy
+    reductions over the unmasked values; invalid (NaN and infinite)
+    values are left out of the statistics. The arbitrary precision 
+    (Decimal) computation is available using ``exact``, but it is 
+    far slower. Values which are on the bounds within rounding, such
+    as both values of a two value array at one sigma, may be masked 
+    or not.
+
+    If an axis is given, the mean and sigma are computed separately
+    for every slice along that axis; for example, axis=0 of a stack 
+    of images clips the time series of every pixel and axis=0 of 
+    an image clips every column. The statistics of all of the slices
+    are computed together, chunked over the other axes.
+
     Parameters
     ----------
     data_array : ndarray
@@ -29,17 +48,83 @@ def mask_sigma_value(data_array, sigma_multiple, sigma_iterations=1):
         bottom-top bounds may be set as a list-like input. The 
         first element is the bottom bound; the last element is the 
         top bound.
-    sigma_iterations : int
+    sigma_iterations : int or None
         The number of iterations this filler will run through to
-        develop the proper mask.
+        develop the proper mask. If None, it iterates until no new 
+        values are masked.
+    exact : boolean (optional)
+        If True, the mean and sigma are computed with arbitrary 
+        precision (Decimal) arithmetic. Defaults to False.
+    axis : int or tuple (optional)
+        The axis or axes along which the mean and sigma are computed.
+        Defaults to None, the entire array.
+    chunk_size : int (optional)
+        The approximate number of data values whose statistics are 
+        computed at a time when an axis is given, this bounds the 
+        memory used.
 
     Returns
     -------
     final_mask : ndarray
         The mask as computed by this function.
     """
+    # The mask is the values outside of the sigma bounds. The bounds
+    # of each slice broadcast against the data array.
+    lower_bound, upper_bound = _sigma_value_bounds(
+        data_array=data_array, sigma_multiple=sigma_multiple, 
+        sigma_iterations=sigma_iterations, exact=exact, axis=axis,
+        chunk_size=chunk_size)
+
+    # The values outside of the bounds, in one pass.
+    final_mask = mask_band_value(data_array=data_array, 
+                                 minimum_value=lower_bound, 
+                                 maximum_value=upper_bound)
+    return final_mask
+
+def _sigma_value_bounds(data_array, sigma_multiple, sigma_iterations,
+                        exact=False, axis=None, chunk_size=2**22):
+    """ This computes the lower and upper value bounds of the sigma
+    mask, see `mask_sigma_value`.
+
+    Each iteration masks the values outside of its bounds, and 
+    the iterations are combined by a logical or. So, the final 
+    mask is just the values outside of the tightest bounds across 
+    all of the iterations, which are the bounds returned.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the bounds will be calculated from. 
+    sigma_multiple : float or array-like
+        The multiple of sigma which will be applied. Unequal 
+        bottom-top bounds may be set as a list-like input.
+    sigma_iterations : int or None
+        The number of iterations this filler will run through to
+        develop the proper mask. If None, it iterates until no new 
+        values are masked.
+    exact : boolean (optional)
+        If True, the mean and sigma are computed with arbitrary 
+        precision (Decimal) arithmetic. Defaults to False.
+    axis : int or tuple (optional)
+        The axis or axes along which the mean and sigma are computed.
+        Defaults to None, the entire array.
+    chunk_size : int (optional)
+        The approximate number of data values whose statistics are 
+        computed at a time when an axis is given.
+
+    Returns
+    -------
+    lower_bound : float or ndarray
+        Values strictly less than this bound are masked. If an axis
+        is given, this is an array of the bounds of every slice, 
+        with the reduced axes kept as length one.
+    upper_bound : float or ndarray
+        Values strictly more than this bound are masked. If an axis
+        is given, this is an array of the bounds of every slice, 
+        with the reduced axes kept as length one.
+    """
     # It does not make sense to run this mask with no iterations.
-    if (sigma_iterations < 1):
+    if ((sigma_iterations is not None) and (sigma_iterations < 1)):
         raise mono.InputError("It does not make sense to do this "
                               "mask with less than 1 iteration.")
 
@@ -62,40 +147,435 @@ def mask_sigma_value(data_array, sigma_multiple, sigma_iterations=1):
         bottom_sigma_multiple = flat_sigma_multiple[0]
         top_sigma_multiple = flat_sigma_multiple[-1]
 
+    # Clipping along an axis needs the bounds of every slice.
+    if (axis is not None):
+        return _sigma_value_bounds_axis(
+            data_array=data_array, 
+            bottom_sigma_multiple=bottom_sigma_multiple, 
+            top_sigma_multiple=top_sigma_multiple, 
+            sigma_iterations=sigma_iterations, exact=exact, axis=axis,
+            chunk_size=chunk_size)
+
     # The number of iterations are accomplished by just doing loops.
+    if (exact):
+        return _sigma_value_bounds_exact(
+            data_array=data_array, 
+            bottom_sigma_multiple=bottom_sigma_multiple, 
+            top_sigma_multiple=top_sigma_multiple, 
+            sigma_iterations=sigma_iterations)
+    data_array = np.asarray(data_array)
+    lower_bound = -np.inf
+    upper_bound = np.inf
+    # Invalid values would make all of the statistics invalid.
+    valid_values = np.isfinite(data_array)
+    n_values = int(np.count_nonzero(valid_values))
+    if (n_values == 0):
+        # There are no statistics to be had.
+        return lower_bound, upper_bound
+    # The running sums of the kept values. They are shifted by the 
+    # initial mean so that the variance from the sums does not
+    # suffer from catastrophic cancellation. The standard deviation
+    # is found from the deviations from the mean (two passes).
+    shift, shifted_sum, shifted_square_sum = _shifted_sums(
+        data_array=data_array, kept_values=valid_values, 
+        n_values=n_values)
+    recomputed_square_sum = shifted_square_sum
+    # The buffers of the values rejected by the iterations.
+    newly_rejected = np.empty(data_array.shape, dtype=bool)
+    previously_rejected = np.empty(data_array.shape, dtype=bool)
+    iterdex = 0
+    while ((sigma_iterations is None) or (iterdex < sigma_iterations)):
+        iterdex = iterdex + 1
+        # Calculate the mean and the sigma values of the kept data.
+        shifted_mean = shifted_sum / n_values
+        mean = shift + shifted_mean
+        stddev = np.sqrt(max(shifted_square_sum / n_values 
+                             - shifted_mean**2, 0))
+
+        # Keeping the tightest bounds.
+        previous_lower_bound = lower_bound
+        previous_upper_bound = upper_bound
+        lower_bound = max(lower_bound, mean - stddev * bottom_sigma_multiple)
+        upper_bound = min(upper_bound, mean + stddev * top_sigma_multiple)
+        if ((sigma_iterations is not None) and (iterdex >= sigma_iterations)):
+            # The statistics of the next iteration are not needed.
+            break
+
+        # Only the values newly rejected by this iteration need to 
+        # be removed from the running sums, the rest are unchanged.
+        _newly_rejected(data_array=data_array, lower_bound=lower_bound,
+                        upper_bound=upper_bound, 
+                        previous_lower_bound=previous_lower_bound,
+                        previous_upper_bound=previous_upper_bound,
+                        out=newly_rejected, scratch=previously_rejected)
+        # Infinite values are within infinite bounds, but they were 
+        # never a part of the sums.
+        np.logical_and(newly_rejected, valid_values, out=newly_rejected)
+        rejected_values = (data_array[newly_rejected].astype(np.float64) 
+                           - shift)
+        if (rejected_values.size == 0):
+            # The mask has converged, no new values were rejected.
+            break
+        n_values = n_values - rejected_values.size
+        if (n_values <= 0):
+            # Everything has been masked, there are no statistics.
+            break
+        shifted_sum = shifted_sum - np.sum(rejected_values)
+        shifted_square_sum = shifted_square_sum - np.sum(rejected_values**2)
+        if (shifted_square_sum < recomputed_square_sum / 2**10):
+            # Most of the sum of squares has been subtracted away and 
+            # precision may have been lost, recompute it from the 
+            # kept values.
+            kept_values = mask_band_value(
+                data_array=data_array, minimum_value=lower_bound, 
+                maximum_value=upper_bound, out=previously_rejected)
+            np.logical_not(kept_values, out=kept_values)
+            # The invalid values are never masked, but never kept.
+            np.logical_and(kept_values, valid_values, out=kept_values)
+            shift, shifted_sum, shifted_square_sum = _shifted_sums(
+                data_array=data_array, kept_values=kept_values, 
+                n_values=n_values)
+            recomputed_square_sum = shifted_square_sum
+
+    return lower_bound, upper_bound
+
+def _shifted_sums(data_array, kept_values, n_values):
+    """ This computes the sum and sum of squares of the kept data 
+    values, shifted by their mean, using float64 accumulation.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the sums will be calculated from.
+    kept_values : ndarray
+        The boolean array of the values which are kept.
+    n_values : int
+        The number of kept values.
+
+    Returns
+    -------
+    shift : float
+        The mean of the kept values, which the values are shifted by.
+    shifted_sum : float
+        The sum of the shifted values, zero to within rounding.
+    shifted_square_sum : float
+        The sum of the squares of the shifted values.
+    """
+    shift = np.mean(data_array, where=kept_values, dtype=np.float64)
+    shifted_sum = 0.0
+    shifted_square_sum = float(n_values * np.var(
+        data_array, where=kept_values, dtype=np.float64))
+    return shift, shifted_sum, shifted_square_sum
+
+def _newly_rejected(data_array, lower_bound, upper_bound, 
+                    previous_lower_bound, previous_upper_bound, out, 
+                    scratch):
+    """ The values outside of the new (tighter) bounds but within the
+    previous bounds, computed into the output buffer with the band 
+    masks."""
+    mask_band_value(data_array=data_array, minimum_value=lower_bound, 
+                    maximum_value=upper_bound, out=out)
+    mask_band_value(data_array=data_array, 
+                    minimum_value=previous_lower_bound, 
+                    maximum_value=previous_upper_bound, out=scratch)
+    # For booleans, greater than is "and not".
+    np.greater(out, scratch, out=out)
+    return out
+
+def _normalize_axis(axis, ndim):
+    """ This converts an axis or axes into a sorted tuple of positive 
+    axis numbers for an array with the number of dimensions.
+
+    Parameters
+    ----------
+    axis : int or tuple
+        The axis or axes, negative axes count from the end.
+    ndim : int
+        The number of dimensions of the array.
+
+    Returns
+    -------
+    axis : tuple
+        The sorted positive axis numbers.
+    """
+    axis = np.atleast_1d(axis).astype(int)
+    if (np.any((axis < -ndim) | (axis >= ndim))):
+        raise mono.InputError("The axis {axis} is out of bounds for an "
+                              "array of {ndim} dimensions."
+                              .format(axis=axis, ndim=ndim))
+    axis = tuple(sorted(set((axis % ndim).tolist())))
+    return axis
+
+def _sigma_value_bounds_axis(data_array, bottom_sigma_multiple, 
+                             top_sigma_multiple, sigma_iterations, 
+                             exact, axis, chunk_size):
+    """ This computes the lower and upper value bounds of the sigma
+    mask for every slice along the axis, see `_sigma_value_bounds`.
+
+    The bounds are computed in chunks along the first axis that is 
+    not reduced so that the temporary arrays are bounded in size.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the bounds will be calculated from. 
+    bottom_sigma_multiple : float
+        The multiple of sigma for the lower bound.
+    top_sigma_multiple : float
+        The multiple of sigma for the upper bound.
+    sigma_iterations : int or None
+        The number of iterations, or None to iterate until no new 
+        values are masked.
+    exact : boolean
+        If True, the statistics are computed with arbitrary precision
+        (Decimal) arithmetic, one slice at a time.
+    axis : int or tuple
+        The axis or axes along which the mean and sigma are computed.
+    chunk_size : int
+        The approximate number of data values per chunk.
+
+    Returns
+    -------
+    lower_bound : ndarray
+        The lower bounds, with the reduced axes kept as length one.
+    upper_bound : ndarray
+        The upper bounds, with the reduced axes kept as length one.
+    """
+    data_array = np.asarray(data_array)
+    axis = _normalize_axis(axis=axis, ndim=data_array.ndim)
+
+    # The bounds of every slice, keeping the reduced axes.
+    bounds_shape = tuple((1 if (axisdex in axis) else lengthdex) 
+                         for axisdex, lengthdex 
+                         in enumerate(data_array.shape))
+    lower_bound = np.full(bounds_shape, -np.inf)
+    upper_bound = np.full(bounds_shape, np.inf)
+
+    # Chunk along the first of the axes which are not reduced, each
+    # chunk contains whole slices.
+    kept_axes = [axisdex for axisdex in range(data_array.ndim) 
+                 if (axisdex not in axis)]
+    if (len(kept_axes) == 0):
+        # The entire array is one slice.
+        lower_value, upper_value = _sigma_value_bounds(
+            data_array=data_array, 
+            sigma_multiple=[bottom_sigma_multiple, top_sigma_multiple], 
+            sigma_iterations=sigma_iterations, exact=exact)
+        lower_bound[...] = lower_value
+        upper_bound[...] = upper_value
+        return lower_bound, upper_bound
+    chunk_axis = kept_axes[0]
+    chunk_axis_length = data_array.shape[chunk_axis]
+    subarray_size = max(data_array.size // max(chunk_axis_length, 1), 1)
+    chunk_length = max(int(chunk_size) // subarray_size, 1)
+
+    # Computing the bounds of every chunk.
+    if (exact):
+        bounds_function = _sigma_value_bounds_slices_exact
+    else:
+        bounds_function = _sigma_value_bounds_slices
+    for startdex in range(0, chunk_axis_length, chunk_length):
+        window = [slice(None)] * data_array.ndim
+        window[chunk_axis] = slice(startdex, startdex + chunk_length)
+        window = tuple(window)
+        lower_bound[window], upper_bound[window] = bounds_function(
+            data_array=data_array[window], 
+            bottom_sigma_multiple=bottom_sigma_multiple, 
+            top_sigma_multiple=top_sigma_multiple, 
+            sigma_iterations=sigma_iterations, axis=axis)
+
+    return lower_bound, upper_bound
+
+def _sigma_value_bounds_slices(data_array, bottom_sigma_multiple, 
+                               top_sigma_multiple, sigma_iterations, 
+                               axis):
+    """ This computes the lower and upper value bounds of the sigma
+    mask for every slice along the axis in float64, all of the 
+    slices at once, see `_sigma_value_bounds_axis`. 
+    
+    It is the same as the computation over the entire array: the 
+    running sums of every slice are only updated by the values 
+    newly rejected by each iteration."""
+    # Invalid values would make all of the statistics invalid.
+    valid_values = np.isfinite(data_array)
+    n_values = np.count_nonzero(valid_values, axis=axis, keepdims=True)
+    lower_bound = np.full(n_values.shape, -np.inf)
+    upper_bound = np.full(n_values.shape, np.inf)
+    # The running sums of the kept values of every slice, shifted by
+    # the mean of the slice. The deviations from the shift are 
+    # reused for every iteration.
+    deviations, shift, shifted_sum, shifted_square_sum = (
+        _shifted_slice_sums(data_array=data_array, 
+                            kept_values=valid_values, n_values=n_values, 
+                            axis=axis))
+    recomputed_square_sum = shifted_square_sum
+    # The buffers of the values rejected by the iterations.
+    newly_rejected = np.empty(data_array.shape, dtype=bool)
+    previously_rejected = np.empty(data_array.shape, dtype=bool)
+    iterdex = 0
+    while ((sigma_iterations is None) or (iterdex < sigma_iterations)):
+        iterdex = iterdex + 1
+        # Calculate the mean and the sigma values of the kept data.
+        # Slices with nothing kept have no statistics and their 
+        # bounds are left alone.
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shifted_mean = shifted_sum / n_values
+            stddev = np.sqrt(np.maximum(shifted_square_sum / n_values 
+                                        - shifted_mean**2, 0))
+        mean = shift + shifted_mean
+
+        # Keeping the tightest bounds.
+        previous_lower_bound = lower_bound
+        previous_upper_bound = upper_bound
+        lower_bound = np.fmax(lower_bound, 
+                              mean - stddev * bottom_sigma_multiple)
+        upper_bound = np.fmin(upper_bound, 
+                              mean + stddev * top_sigma_multiple)
+        if ((sigma_iterations is not None) and (iterdex >= sigma_iterations)):
+            # The statistics of the next iteration are not needed.
+            break
+
+        # Only the values newly rejected by this iteration need to 
+        # be removed from the running sums, the rest are unchanged.
+        _newly_rejected(data_array=data_array, lower_bound=lower_bound,
+                        upper_bound=upper_bound, 
+                        previous_lower_bound=previous_lower_bound,
+                        previous_upper_bound=previous_upper_bound,
+                        out=newly_rejected, scratch=previously_rejected)
+        np.logical_and(newly_rejected, valid_values, out=newly_rejected)
+        n_rejected = np.count_nonzero(newly_rejected, axis=axis, 
+                                      keepdims=True)
+        if (not np.any(n_rejected)):
+            # The mask has converged, no new values were rejected.
+            break
+        n_values = n_values - n_rejected
+        shifted_sum = shifted_sum - np.sum(deviations, where=newly_rejected,
+                                           axis=axis, keepdims=True)
+        shifted_square_sum = shifted_square_sum - np.sum(
+            np.square(deviations), where=newly_rejected, axis=axis, 
+            keepdims=True)
+        if (np.any(shifted_square_sum < recomputed_square_sum / 2**10)):
+            # Most of the sum of squares of a slice has been 
+            # subtracted away and precision may have been lost, 
+            # recompute them all from the kept values.
+            kept_values = mask_band_value(
+                data_array=data_array, minimum_value=lower_bound, 
+                maximum_value=upper_bound, out=previously_rejected)
+            np.logical_not(kept_values, out=kept_values)
+            np.logical_and(kept_values, valid_values, out=kept_values)
+            deviations, shift, shifted_sum, shifted_square_sum = (
+                _shifted_slice_sums(data_array=data_array, 
+                                    kept_values=kept_values, 
+                                    n_values=n_values, axis=axis))
+            recomputed_square_sum = shifted_square_sum
+
+    return lower_bound, upper_bound
+
+def _shifted_slice_sums(data_array, kept_values, n_values, axis):
+    """ This computes the sum and sum of squares of the kept data 
+    values of every slice along the axis, shifted by the mean of the
+    slice, see `_shifted_sums`.
+
+    Returns
+    -------
+    deviations : ndarray
+        The float64 deviations of the data values from the shift.
+    shift : ndarray
+        The mean of the kept values of every slice.
+    shifted_sum : ndarray
+        The sum of the shifted values of every slice.
+    shifted_square_sum : ndarray
+        The sum of the squares of the shifted values of every slice.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shift = (np.sum(data_array, where=kept_values, axis=axis, 
+                        keepdims=True, dtype=np.float64) 
+                 / n_values)
+        deviations = np.subtract(data_array, shift, dtype=np.float64)
+    shifted_sum = np.sum(deviations, where=kept_values, axis=axis, 
+                         keepdims=True)
+    shifted_square_sum = np.sum(np.square(deviations), where=kept_values, 
+                                axis=axis, keepdims=True)
+    return deviations, shift, shifted_sum, shifted_square_sum
+
+def _sigma_value_bounds_slices_exact(data_array, bottom_sigma_multiple, 
+                                     top_sigma_multiple, sigma_iterations,
+                                     axis):
+    """ This computes the lower and upper value bounds of the sigma
+    mask for every slice along the axis using arbitrary precision, 
+    one slice at a time, see `_sigma_value_bounds_axis`."""
+    # Moving the reduced axes to the end so that each slice is a 
+    # row.
+    slice_array = np.moveaxis(data_array, axis, 
+                              tuple(range(-len(axis), 0)))
+    kept_shape = slice_array.shape[:data_array.ndim - len(axis)]
+    slice_array = slice_array.reshape(
+        (int(np.prod(kept_shape, dtype=np.int64)), -1))
+    lower_bound = np.empty(slice_array.shape[0])
+    upper_bound = np.empty(slice_array.shape[0])
+    for slicedex, valuesdex in enumerate(slice_array):
+        lower_bound[slicedex], upper_bound[slicedex] = (
+            _sigma_value_bounds_exact(
+                data_array=valuesdex, 
+                bottom_sigma_multiple=bottom_sigma_multiple, 
+                top_sigma_multiple=top_sigma_multiple, 
+                sigma_iterations=sigma_iterations))
+    # Returning the reduced axes as length one.
+    lower_bound = np.expand_dims(lower_bound.reshape(kept_shape), axis)
+    upper_bound = np.expand_dims(upper_bound.reshape(kept_shape), axis)
+    return lower_bound, upper_bound
+
+def _sigma_value_bounds_exact(data_array, bottom_sigma_multiple, 
+                              top_sigma_multiple, sigma_iterations):
+    """ This computes the lower and upper value bounds of the sigma
+    mask using arbitrary precision, see `_sigma_value_bounds`."""
+    # The multiples need to be the same type as the statistics.
+    bottom_sigma_multiple = decimal.Decimal(str(bottom_sigma_multiple))
+    top_sigma_multiple = decimal.Decimal(str(top_sigma_multiple))
+
+    lower_bound = -np.inf
+    upper_bound = np.inf
     final_mask = mono.mask.mask_nothing(data_array=data_array)
-    for iterdex in range(sigma_iterations):
+    iterdex = 0
+    while ((sigma_iterations is None) or (iterdex < sigma_iterations)):
+        iterdex = iterdex + 1
+        previous_mask = final_mask
         # Calculate the mean and the sigma values of the data array.
         # masked values mean it was caught in previous iterations.
         mean = mono.math.statistics.arithmetic_mean(
-            array=np_ma.array(data_array, mask=final_mask).compressed())
+            array=data_array, mask=final_mask, precision='exact')
         stddev = mono.math.statistics.standard_deviation(
-            array=np_ma.array(data_array, mask=final_mask).compressed())
+            array=data_array, mask=final_mask, precision='exact')
         
-        # Calculating the two individual masks and combining them.
-        min_mask = mask_minimum_value(
-            data_array=data_array, 
-            minimum_value=(mean - stddev * bottom_sigma_multiple))
-        max_mask = mask_maximum_value(
+        # Calculating the mask of the values outside of the bounds.
+        band_mask = mask_band_value(
             data_array=data_array, 
+            minimum_value=(mean - stddev * bottom_sigma_multiple),
             maximum_value=(mean + stddev * top_sigma_multiple))
         
         # The mask based version is proper, the difference between a 
         # mask and a mask is just semantics. Also, keep track
         # of the previous masks all run through the iterations.
-        final_mask = mono.mask.combine_masks_lor(
-            final_mask, min_mask, max_mask)
+        final_mask = mono.mask.combine_masks_lor(final_mask, band_mask)
+        # Keeping the tightest bounds.
+        lower_bound = max(lower_bound, mean - stddev * bottom_sigma_multiple)
+        upper_bound = min(upper_bound, mean + stddev * top_sigma_multiple)
+        if (np.array_equal(final_mask, previous_mask)):
+            # The mask has converged, no new values were masked.
+            break
 
-    return final_mask
+    return lower_bound, upper_bound
 
-def mask_percent_truncation(data_array, top_percent, bottom_percent):
+def mask_percent_truncation(data_array, top_percent, bottom_percent,
+                            axis=None):
     """ This mask truncates the top and bottom percent of values 
     provided.
 
     The values ``top_percent`` and ``bottom_percent`` notate the 
     percentage of values from top and bottom of the data array 
     (in number of values) that should be masked. The values masked 
-    are independent on the previous masks applied.
+    are independent on the previous masks applied. NaN values are 
+    not counted and are not masked.
 
     If the percentage of values leads to a non-integer number of
     values to be masked or where many of the same value is present,
@@ -111,18 +591,65 @@ def mask_percent_truncation(data_array, top_percent, bottom_percent):
     bottom_percent : float
         The percent of values from the bottom (lowest value) of 
         the array that is to be masked. Must be between 0 and 1.
+    axis : int or tuple (optional)
+        The axis or axes along which the values are truncated, each
+        slice is truncated by itself. Defaults to None, the entire
+        array.
 
     Returns
     -------
     final_mask : ndarray
         The mask as computed by this function.
     """
+    # The percentage cuts are just fancy count cuts. We will apply
+    # them as so.
+    top_count, bottom_count = _percent_truncation_counts(
+        data_array=data_array, top_percent=top_percent, 
+        bottom_percent=bottom_percent, axis=axis)
+    # We rely on the mask count truncation being kept.
+    final_mask = mask_count_truncation(data_array=data_array, 
+                                       top_count=top_count, 
+                                       bottom_count=bottom_count, 
+                                       axis=axis)
+    # Finally return
+    return final_mask
+
+def _percent_truncation_counts(data_array, top_percent, bottom_percent,
+                               axis=None, n_data_points=None):
+    """ This converts the top and bottom percents of the percent 
+    truncation mask into counts of values, see 
+    `mask_percent_truncation`.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the counts will be calculated from. 
+    top_percent : float
+        The percent of values from the top of the array. Must be 
+        between 0 and 1.
+    bottom_percent : float
+        The percent of values from the bottom of the array. Must be 
+        between 0 and 1.
+    axis : int or tuple (optional)
+        The axis or axes along which the values are counted.
+    n_data_points : int (optional)
+        The number of values which are not NaN, if it is already 
+        known. The data array is then not read.
+
+    Returns
+    -------
+    top_count : int or ndarray
+        The number of values from the top to be masked. If an axis 
+        is given, it is the count of every slice, with the reduced 
+        axes kept as length one.
+    bottom_count : int or ndarray
+        The number of values from the bottom to be masked, in the 
+        same way as the top count.
+    """
     # For higher precision, in a way. It also gets around rounding
     # errors for the percentile to count conversion.
-    n_data_points = int(np.size(data_array))
     top_percent = decimal.Decimal(str(top_percent))
     bottom_percent = decimal.Decimal(str(bottom_percent))
-    ONE = decimal.Decimal('1.0')
 
     # Ensure that they are percentages.
     if (not (0 <= top_percent <= 1)):
@@ -130,33 +657,120 @@ def mask_percent_truncation(data_array, top_percent, bottom_percent):
     if (not (0 <= bottom_percent <= 1)):
         raise mono.InputError("The bottom percent must be between 0 and 1.")
 
-    # The percentage cuts are just fancy count cuts. We will apply
-    # them as so.
-    top_count = np.floor(top_percent * n_data_points)
-    bottom_count = np.floor(bottom_percent * n_data_points)
-    # We rely on the mask count truncation being kept.
-    final_mask = mask_count_truncation(data_array=data_array, 
-                                       top_count=top_count, 
-                                       bottom_count=bottom_count)
-    # Finally return
-    return final_mask
+    # Only the values which are not NaN are counted.
+    data_array = np.asarray(data_array)
+    if (axis is not None):
+        axis = _normalize_axis(axis=axis, ndim=data_array.ndim)
+    if (n_data_points is not None):
+        # The number of values has already been counted.
+        pass
+    elif (np.issubdtype(data_array.dtype, np.inexact)):
+        n_data_points = np.count_nonzero(~np.isnan(data_array), axis=axis, 
+                                         keepdims=(axis is not None))
+    elif (axis is not None):
+        n_data_points = np.full(
+            [(1 if (axisdex in axis) else lengthdex) 
+             for axisdex, lengthdex in enumerate(data_array.shape)], 
+            int(np.prod([data_array.shape[axisdex] for axisdex in axis])))
+    else:
+        n_data_points = int(data_array.size)
+    # The floor of the exact fraction, the percents as a ratio of 
+    # integers keep the counts exact. The numerators overflow fixed 
+    # width integers, so the products are of Python integers.
+    n_data_points = np.asarray(n_data_points).astype(object)
+    top_numerator, top_denominator = top_percent.as_integer_ratio()
+    bottom_numerator, bottom_denominator = bottom_percent.as_integer_ratio()
+    top_count = np.asarray((n_data_points * top_numerator) 
+                           // top_denominator, dtype=np.int64)
+    bottom_count = np.asarray((n_data_points * bottom_numerator) 
+                              // bottom_denominator, dtype=np.int64)
+    if (axis is None):
+        top_count = int(top_count)
+        bottom_count = int(bottom_count)
+    return top_count, bottom_count
 
-def mask_count_truncation(data_array, top_count, bottom_count):
+def mask_count_truncation(data_array, top_count, bottom_count, 
+                          axis=None):
     """ This mask truncates the top and bottom number of discrete 
     values.
 
     The values ``top_count`` and ``bottom_count`` notate the number 
     of values from top and bottom of the data array (in value) that 
     should be cut. The values masked are independent on the 
-    previous masks applied.
+    previous masks applied. NaN values are not counted and are not 
+    masked.
 
     If the cutoff point has multiple entries of the same value,
     they are kept.
 
+    The cutoff values are found by selection (partitioning) rather 
+    than sorting, which takes linear time.
+
     Parameters
     ----------
     data_array : ndarray
         The data array that the mask will be calculated from. 
+    top_count : int or array-like
+        The number of values from the top (highest value) of the 
+        array that is to be masked. If an axis is given, this may 
+        be different for every slice, broadcast against the slices 
+        with the reduced axes as length one.
+    bottom_count : int or array-like
+        The number of values from the bottom (lowest value) of the 
+        array that is to be masked, in the same way as the top 
+        count.
+    axis : int or tuple (optional)
+        The axis or axes along which the values are truncated, each
+        slice is truncated by itself. Defaults to None, the entire
+        array.
+
+    Returns
+    -------
+    final_mask : ndarray
+        The mask as computed by this function.
+    """
+    
+    # Find the values above and below the cuts, simplifying the 
+    # process to pure value cuts. 
+    if (axis is not None):
+        (lower_value, upper_value, lower_cut, upper_cut, 
+         everything) = _count_truncation_bounds_axis(
+             data_array=data_array, top_count=top_count, 
+             bottom_count=bottom_count, axis=axis)
+        # The cutoffs keep the type of the data, only the slices 
+        # which are cut compare against them. NaN values are never 
+        # masked.
+        data_array = np.asarray(data_array)
+        final_mask = ((lower_cut & (data_array < lower_value)) 
+                      | (upper_cut & (data_array > upper_value)))
+        if (np.issubdtype(data_array.dtype, np.inexact)):
+            final_mask |= everything & ~np.isnan(data_array)
+        else:
+            final_mask |= everything
+        return final_mask
+    else:
+        lower_value, upper_value = _count_truncation_bounds(
+            data_array=data_array, top_count=top_count, 
+            bottom_count=bottom_count)
+        if (lower_value is None):
+            # They are masking out their entire array, or more; all 
+            # but the NaN values which are never masked.
+            lower_value, upper_value = np.inf, -np.inf
+
+    # The values outside of the cuts, in one pass.
+    final_mask = mask_band_value(data_array=data_array, 
+                                 minimum_value=lower_value, 
+                                 maximum_value=upper_value)
+    return final_mask
+
+def _count_truncation_bounds(data_array, top_count, bottom_count):
+    """ This computes the lower and upper value bounds of the count
+    truncation mask, see `mask_count_truncation`.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the bounds will be calculated from. 
     top_count : int
         The number of values from the top (highest value) of the 
         array that is to be masked.
@@ -166,77 +780,305 @@ def mask_count_truncation(data_array, top_count, bottom_count):
 
     Returns
     -------
-    final_mask : ndarray
-        The mask as computed by this function.
+    lower_value : float
+        Values strictly less than this bound are masked. If the 
+        entire array is to be masked, this is None.
+    upper_value : float
+        Values strictly more than this bound are masked. If the 
+        entire array is to be masked, this is None.
     """
-    
     # Simple type checking as the top count and bottom count
     # are used for indexing.
     top_count = int(top_count)
     bottom_count = int(bottom_count)
 
-    # Sort the data so that the indexes line with order.
-    sorted_data = np.sort(data_array, axis=None)
-    len_sorted_data = len(sorted_data)
+    # NaN values have no order and are not counted.
+    flat_data = np.ravel(data_array)
+    if (np.issubdtype(flat_data.dtype, np.inexact)):
+        nan_values = np.isnan(flat_data)
+        if (np.any(nan_values)):
+            flat_data = flat_data[~nan_values]
+    len_flat_data = len(flat_data)
 
-    
-    # Find the values above and below the cuts, simplifying the 
-    # process to pure value cuts. However, some special cases needs
-    # to be taken care of.
-    if ((top_count + bottom_count) >= len_sorted_data):
+    # Some special cases needs to be taken care of.
+    if ((top_count + bottom_count) >= len_flat_data):
         # They are masking out their entire array, or more.
-        return mono.mask.mask_everything(data_array=data_array)
+        return None, None
+
+    # Only the values at the two cutoff indexes need to be in their
+    # sorted place, partitioning does this without a full sort.
+    partitioned_data = _partition_cutoffs(
+        data_array=flat_data, 
+        lower_index=(bottom_count if (bottom_count > 0) else None), 
+        upper_index=(len_flat_data - top_count - 1 
+                     if (top_count > 0) else None))
+
+    # Upper mask cuts.
+    if (top_count <= 0):
+        # They don't want to cut the top.
+        upper_value = np.inf
     else:
-        # Calculate the mask cuts.
-        # Upper mask cuts.
-        try:
-            upper_value = sorted_data[:-top_count][-1]
-        except TypeError:
-            # The splicing failed, find out why.
-            if (top_count <= 0):
-                # They don't want to cut the top.
-                upper_value = np.minimum(sorted_data) - 1
-            elif (top_count >= len_sorted_data):
-                # They want to mask the entire array from the top.
-                # But it should have been caught earlier.
-                raise mono.BrokenLogicError("This should have been caught "
-                                            "by the full mask function.")
-            else:
-                # The error is unknown.
-                raise mono.DevelopmentError("Why did the top count fail? "
-                                            "Top count: {top_c}"
-                                            .format(top_c=top_count))
-        # Lower mask cuts.
+        upper_value = partitioned_data[len_flat_data - top_count - 1]
+    # Lower mask cuts.
+    if (bottom_count <= 0):
+        # They don't want to cut the bottom.
+        lower_value = -np.inf
+    else:
+        lower_value = partitioned_data[bottom_count]
+    return lower_value, upper_value
+
+def _partition_cutoffs(data_array, lower_index, upper_index):
+    """ This partitions a copy of the data along its last axis so 
+    that the values at the lower and upper indexes are in their 
+    sorted place.
+
+    The upper index is partitioned first, and then only the values 
+    below it are partitioned for the lower index. Both are done in 
+    place on the one copy, which is faster than partitioning for 
+    both indexes at once.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array to be partitioned.
+    lower_index : int or None
+        The lower index, not more than the upper index. If None, 
+        it is not partitioned for.
+    upper_index : int or None
+        The upper index. If None, it is not partitioned for.
+
+    Returns
+    -------
+    partitioned_data : ndarray
+        The partitioned copy of the data array.
+    """
+    partitioned_data = np.array(data_array, copy=True)
+    if (upper_index is not None):
+        partitioned_data.partition(upper_index, axis=-1)
+        if ((lower_index is not None) and (lower_index < upper_index)):
+            partitioned_data[..., :upper_index].partition(lower_index, 
+                                                           axis=-1)
+    elif (lower_index is not None):
+        partitioned_data.partition(lower_index, axis=-1)
+    return partitioned_data
+
+def _count_truncation_bounds_axis(data_array, top_count, bottom_count, 
+                                  axis):
+    """ This computes the lower and upper value bounds of the count
+    truncation mask for every slice along the axis, see 
+    `_count_truncation_bounds`.
+
+    The slices are partitioned all at once if the counts are the 
+    same for every slice and there are no NaN values; otherwise,
+    the slices are sorted so that each slice may have its own 
+    cutoff indexes.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the bounds will be calculated from. 
+    top_count : int or array-like
+        The number of values from the top of every slice.
+    bottom_count : int or array-like
+        The number of values from the bottom of every slice.
+    axis : int or tuple
+        The axis or axes along which the values are truncated.
+
+    Returns
+    -------
+    lower_value : ndarray
+        Values strictly less than this bound are masked, in the type
+        of the data array, with the reduced axes kept as length one. 
+    upper_value : ndarray
+        Values strictly more than this bound are masked, in the same
+        way as the lower bound.
+    lower_cut : ndarray
+        If the slice is cut below the lower bound, in the same shape
+        as the bounds.
+    upper_cut : ndarray
+        If the slice is cut above the upper bound, in the same shape
+        as the bounds.
+    everything : ndarray
+        If every value of the slice which is not NaN is masked, in 
+        the same shape as the bounds; the bounds are then not used.
+    """
+    data_array = np.asarray(data_array)
+    axis = _normalize_axis(axis=axis, ndim=data_array.ndim)
+    # Moving the reduced axes to the end so that each slice is a 
+    # row.
+    slice_array = np.moveaxis(data_array, axis, 
+                              tuple(range(-len(axis), 0)))
+    kept_shape = slice_array.shape[:data_array.ndim - len(axis)]
+    slice_array = slice_array.reshape(
+        (int(np.prod(kept_shape, dtype=np.int64)), -1))
+    len_slice = slice_array.shape[-1]
+
+    # The counts of every slice, as rows.
+    def slice_counts(count):
+        count = np.asarray(count)
+        if (count.ndim != 0):
+            count = np.broadcast_to(
+                count, [(1 if (axisdex in axis) else lengthdex) 
+                        for axisdex, lengthdex 
+                        in enumerate(data_array.shape)])
+            count = np.moveaxis(count, axis, tuple(range(-len(axis), 0)))
+        count = np.broadcast_to(count.reshape(-1), (slice_array.shape[0],))
+        return np.maximum(count.astype(np.int64), 0)
+    top_count = slice_counts(count=top_count)
+    bottom_count = slice_counts(count=bottom_count)
+
+    # NaN values have no order and are not counted.
+    if (np.issubdtype(slice_array.dtype, np.inexact)):
+        n_values = np.count_nonzero(~np.isnan(slice_array), axis=-1)
+    else:
+        n_values = np.full(slice_array.shape[0], len_slice)
+    # The cutoff indexes of every slice, clipped so they can index
+    # even when they will not be used.
+    lower_index = np.clip(bottom_count, 0, max(len_slice - 1, 0))
+    upper_index = np.clip(n_values - top_count - 1, 0, 
+                          max(len_slice - 1, 0))
+
+    if (len_slice == 0):
+        # There are no values to truncate.
+        lower_value = np.zeros(slice_array.shape[0], 
+                               dtype=slice_array.dtype)
+        upper_value = np.zeros(slice_array.shape[0], 
+                               dtype=slice_array.dtype)
+    elif (np.all(n_values == len_slice) 
+          and (np.ptp(lower_index) == 0) and (np.ptp(upper_index) == 0)):
+        # Every slice has the same cutoff indexes, only those need to
+        # be in their sorted place.
+        ordered_array = _partition_cutoffs(
+            data_array=slice_array, lower_index=int(lower_index[0]), 
+            upper_index=int(upper_index[0]))
+    else:
+        # The NaN values are sorted to the end of every slice.
+        ordered_array = np.sort(slice_array, axis=-1)
+    if (len_slice != 0):
+        lower_value = np.take_along_axis(
+            ordered_array, lower_index[:, np.newaxis], axis=-1)[:, 0]
+        upper_value = np.take_along_axis(
+            ordered_array, upper_index[:, np.newaxis], axis=-1)[:, 0]
+
+    # Cuts which are not wanted, or slices which are to be entirely
+    # masked.
+    everything = (top_count + bottom_count) >= n_values
+    lower_cut = (bottom_count > 0) & ~everything
+    upper_cut = (top_count > 0) & ~everything
+
+    # Returning the reduced axes as length one.
+    def kept_axes(value):
+        return np.expand_dims(value.reshape(kept_shape), axis)
+    return (kept_axes(lower_value), kept_axes(upper_value), 
+            kept_axes(lower_cut), kept_axes(upper_cut), 
+            kept_axes(everything))
+
+def mask_band_value(data_array, minimum_value=-np.inf, 
+                    maximum_value=np.inf, axis=None, out=None,
+                    chunk_size=2**16):
+    """ This function computes a mask for all values strictly less 
+    than a minimum value or strictly more than a maximum value, 
+    that is, outside of the band between them. NaN values are not 
+    masked.
+
+    It is the same as combining `mask_minimum_value` and 
+    `mask_maximum_value`, but both comparisons are made together 
+    over small chunks of the data, written into one output mask 
+    without any data sized temporary arrays.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the mask will be calculated from. 
+    minimum_value : float or array-like (optional)
+        The value that data values strictly less than will be 
+        tagged as masked. An array of thresholds is broadcast 
+        against the data array. Defaults to no minimum.
+    maximum_value : float or array-like (optional)
+        The value that data values strictly more than will be 
+        tagged as masked, in the same way as the minimum. Defaults 
+        to no maximum.
+    axis : int (optional)
+        If given, one dimensional threshold arrays are the thresholds
+        of each index along this axis; for example, axis=0 of an 
+        image gives a threshold for every row and axis=1 for every 
+        column. Otherwise, the thresholds are broadcast as they are.
+    out : ndarray (optional)
+        A boolean array, the same shape as the data, which the mask 
+        is written into.
+    chunk_size : int (optional)
+        The approximate number of data values compared at a time.
+
+    Returns
+    -------
+    final_mask : ndarray
+        The mask as computed by this function.
+    """
+    data_array = np.asarray(data_array)
+    if (out is None):
+        final_mask = np.empty(data_array.shape, dtype=bool)
+    elif (np.shape(out) != data_array.shape):
+        raise mono.InputError("The output mask must be the same shape "
+                              "as the data array.")
+    else:
+        final_mask = out
+
+    # The thresholds, broadcast as views against the data array.
+    thresholds = []
+    for valuedex in (minimum_value, maximum_value):
+        if (np.ndim(valuedex) == 0):
+            thresholds.append(valuedex)
+            continue
+        valuedex = np.asarray(valuedex)
+        if ((axis is not None) and (valuedex.ndim == 1)):
+            axis_index = _normalize_axis(axis=axis, 
+                                         ndim=data_array.ndim)[0]
+            valuedex = valuedex.reshape(
+                (-1,) + (1,) * (data_array.ndim - axis_index - 1))
         try:
-            lower_value = sorted_data[bottom_count:][0]
-        except TypeError:
-            # The splicing failed, find out why.
-            if (bottom_count <= 0):
-                # They don't want to cut the top.
-                upper_value = np.minimum(sorted_data) - 1
-            elif (bottom_count >= len_sorted_data):
-                # They want to mask the entire array from the top.
-                # But it should have been caught earlier.
-                raise mono.BrokenLogicError("This should have been caught "
-                                            "by the full mask function.")
-            else:
-                # The error is unknown.
-                raise mono.DevelopmentError("Why did the top count fail? "
-                                            "Top count: {top_c}"
-                                            .format(top_c=top_count))
-
-        # Calculating the two individual masks and combining them.
-        max_mask = mask_maximum_value(data_array=data_array, 
-                                      maximum_value=upper_value)
-        min_mask = mask_minimum_value(data_array=data_array, 
-                                      minimum_value=lower_value)
-        # The mask based version is proper, the difference between a 
-        # mask and a mask is just semantics.
-        final_mask = mono.mask.combine_masks_lor(min_mask, max_mask)
+            thresholds.append(np.broadcast_to(valuedex, data_array.shape))
+        except ValueError:
+            raise mono.InputError("The thresholds of shape {t_shp} cannot "
+                                  "be broadcast against the data array of "
+                                  "shape {d_shp}."
+                                  .format(t_shp=valuedex.shape, 
+                                          d_shp=data_array.shape))
+    lower_value, upper_value = thresholds
+    # Infinite scalar thresholds mask nothing and are not compared.
+    has_lower = ((np.ndim(lower_value) != 0) or (lower_value > -np.inf))
+    has_upper = ((np.ndim(upper_value) != 0) or (upper_value < np.inf))
+    if (data_array.ndim == 0):
+        final_mask[...] = ((has_lower and (data_array < lower_value)) 
+                           or (has_upper and (data_array > upper_value)))
         return final_mask
-    # The code should not reach here.
-    raise mono.BrokenLogicError
-    return None
+    if (not (has_lower and has_upper)):
+        # A single comparison needs no chunks.
+        if (has_lower):
+            np.less(data_array, lower_value, out=final_mask)
+        elif (has_upper):
+            np.greater(data_array, upper_value, out=final_mask)
+        else:
+            final_mask.fill(False)
+        return final_mask
+
+    # Both comparisons over chunks of the first axis, the scratch 
+    # buffer of the second stays small.
+    row_size = max(data_array[0].size, 1) if (len(data_array) > 0) else 1
+    chunk_length = max(int(chunk_size) // row_size, 1)
+    scratch_mask = np.empty((min(chunk_length, len(data_array)),) 
+                            + data_array.shape[1:], dtype=bool)
+    for startdex in range(0, len(data_array), chunk_length):
+        window = slice(startdex, startdex + chunk_length)
+        mask_chunk = final_mask[window]
+        scratch_chunk = scratch_mask[:len(mask_chunk)]
+        np.less(data_array[window], 
+                lower_value if (np.ndim(lower_value) == 0) 
+                else lower_value[window], out=mask_chunk)
+        np.greater(data_array[window], 
+                   upper_value if (np.ndim(upper_value) == 0) 
+                   else upper_value[window], out=scratch_chunk)
+        np.logical_or(mask_chunk, scratch_chunk, out=mask_chunk)
+    return final_mask
 
 def mask_maximum_value(data_array, maximum_value):
     """ This function computes a mask for all values 
@@ -255,9 +1097,9 @@ def mask_maximum_value(data_array, maximum_value):
     final_mask : ndarray
         The mask as computed by this function.
     """
-    # Find which values are strictly less than. Decimal allows for
-    # higher precision.
-    final_mask = np.where(data_array > maximum_value, True, False)
+    # Find which values are strictly more than.
+    final_mask = mask_band_value(data_array=data_array, 
+                                 maximum_value=maximum_value)
 
     # Done
     return final_mask
@@ -280,7 +1122,8 @@ def mask_minimum_value(data_array, minimum_value):
         The mask as computed by this function.
     """
     # Find which values are strictly less than.
-    final_mask = np.where(data_array < minimum_value, True, False)
+    final_mask = mask_band_value(data_array=data_array, 
+                                 minimum_value=minimum_value)
 
     # Done
     return final_mask
@@ -305,11 +1148,184 @@ def mask_exact_value(data_array, exact_value):
         The mask as computed by this function.
     """
 
-    # For usage in the close comparison, a filled array. 
-    exact_value_array = np.full_like(data_array, exact_value)
-
-    # Find which values are close.
-    final_mask = np.isclose(data_array, exact_value_array)
+    # Find which values are close. The exact value is broadcast 
+    # rather than filled into a copy of the data array.
+    final_mask = np.isclose(data_array, exact_value)
 
     # Done
     return final_mask
+
+def mask_exact_values(data_array, exact_values, tolerance=0, 
+                      chunk_size=2**20):
+    """ This function computes a mask for all values equal to any 
+    of a set of exact values, within a tolerance.
+
+    Unlike `mask_exact_value`, the tolerance is absolute: values 
+    within the tolerance of any exact value are masked. Exact values
+    which cannot be in the data array, such as fractional values or 
+    values out of the range of an integer array, are ignored. A NaN
+    exact value masks the NaN values.
+
+    For integer arrays, the ranges of integers within the tolerance 
+    of the exact values are found exactly, in the data type, and the
+    integers are looked up directly (Numpy isin); if there are too 
+    many of them, each value is compared to the range below it, found
+    by a binary search of the sorted ranges. Otherwise, each value is
+    compared to its nearest exact values found by a binary search of
+    the sorted exact values. Either way it is one pass over the data 
+    array.
+
+    Parameters
+    ----------
+    data_array : ndarray
+        The data array that the mask will be calculated from. 
+    exact_values : array-like
+        The values that data values equal to, within the tolerance,
+        will be tagged as masked.
+    tolerance : float (optional)
+        The absolute tolerance of the comparison. Defaults to 0, 
+        equality.
+    chunk_size : int (optional)
+        The number of data values compared at once, bounding the 
+        size of the temporary arrays.
+
+    Returns
+    -------
+    final_mask : ndarray
+        The mask as computed by this function.
+    """
+    data_array = np.asarray(data_array)
+    tolerance = float(tolerance)
+    if (tolerance < 0):
+        raise mono.InputError("The tolerance must not be negative.")
+
+    if (np.issubdtype(data_array.dtype, np.integer) 
+            or (data_array.dtype == bool)):
+        return _mask_exact_integer_values(
+            data_array=data_array, exact_values=exact_values, 
+            tolerance=tolerance, chunk_size=chunk_size)
+
+    # NaN values are not found by comparisons.
+    exact_values = np.ravel(np.array(exact_values, dtype=np.float64))
+    mask_nan = bool(np.any(np.isnan(exact_values)))
+    exact_values = np.unique(exact_values[~np.isnan(exact_values)])
+
+    # Comparing each value to the nearest exact values, in chunks.
+    final_mask = np.empty(data_array.shape, dtype=bool)
+    flat_data = data_array.reshape(-1)
+    flat_mask = final_mask.reshape(-1)
+    for startdex in range(0, flat_data.size, int(chunk_size)):
+        data_chunk = flat_data[startdex:startdex + int(chunk_size)]
+        mask_chunk = flat_mask[startdex:startdex + int(chunk_size)]
+        if (exact_values.size == 0):
+            mask_chunk[...] = False
+        elif (exact_values.size <= 4):
+            # A few comparisons are faster than a search.
+            mask_chunk[...] = False
+            distance = np.empty(data_chunk.shape, dtype=np.float64)
+            for valuedex in exact_values:
+                np.subtract(data_chunk, valuedex, out=distance)
+                mask_chunk |= (np.abs(distance, out=distance) <= tolerance)
+        elif (tolerance == 0):
+            mask_chunk[...] = np.isin(data_chunk, exact_values)
+        else:
+            # The exact values above and below each value.
+            upper_index = np.searchsorted(exact_values, data_chunk)
+            np.clip(upper_index, 1, max(exact_values.size - 1, 1), 
+                    out=upper_index)
+            distance = np.abs(data_chunk - exact_values[upper_index - 1])
+            np.less_equal(distance, tolerance, out=mask_chunk)
+            np.abs(data_chunk - exact_values[upper_index 
+                                             % exact_values.size], 
+                   out=distance)
+            mask_chunk |= (distance <= tolerance)
+        if (mask_nan):
+            mask_chunk |= np.isnan(data_chunk)
+    return final_mask
+
+def _mask_exact_integer_values(data_array, exact_values, tolerance, 
+                               chunk_size):
+    """ This is `mask_exact_values` for integer (and boolean) arrays.
+    The integers which can be matched are found in the data type, so
+    that it is exact for all 64-bit values."""
+    # Booleans are compared as the integers 0 and 1.
+    work_array = (data_array.view(np.uint8) if (data_array.dtype == bool)
+                  else data_array)
+    integer_dtype = work_array.dtype
+    value_ranges = _integer_value_ranges(
+        exact_values=np.ravel(np.asarray(exact_values)).tolist(), 
+        tolerance=tolerance, type_info=np.iinfo(integer_dtype))
+    n_candidates = sum(upperdex - lowerdex + 1 
+                       for lowerdex, upperdex in value_ranges)
+
+    if (n_candidates <= _MAXIMUM_INTEGER_CANDIDATES):
+        # Few enough integers to list them all; they are made as 
+        # offsets from the lower bound so they never leave the type.
+        integer_values = np.concatenate(
+            [np.arange(upperdex - lowerdex + 1, dtype=integer_dtype) 
+             + integer_dtype.type(lowerdex)
+             for lowerdex, upperdex in value_ranges]
+            + [np.array([], dtype=integer_dtype)])
+        if (integer_values.size <= 4):
+            # A few comparisons are faster than a lookup.
+            final_mask = np.zeros(data_array.shape, dtype=bool)
+            for valuedex in integer_values:
+                final_mask |= (work_array == valuedex)
+        else:
+            final_mask = np.isin(work_array, integer_values)
+        return final_mask
+
+    # Comparing each value to the range below it, in chunks.
+    lower_bounds = np.array([lowerdex for lowerdex, __ in value_ranges], 
+                            dtype=integer_dtype)
+    upper_bounds = np.array([upperdex for __, upperdex in value_ranges], 
+                            dtype=integer_dtype)
+    final_mask = np.empty(data_array.shape, dtype=bool)
+    flat_data = work_array.reshape(-1)
+    flat_mask = final_mask.reshape(-1)
+    for startdex in range(0, flat_data.size, int(chunk_size)):
+        data_chunk = flat_data[startdex:startdex + int(chunk_size)]
+        mask_chunk = flat_mask[startdex:startdex + int(chunk_size)]
+        range_index = np.searchsorted(lower_bounds, data_chunk, 
+                                      side='right') - 1
+        np.clip(range_index, 0, None, out=range_index)
+        np.greater_equal(data_chunk, lower_bounds[range_index], 
+                         out=mask_chunk)
+        mask_chunk &= (data_chunk <= upper_bounds[range_index])
+    return final_mask
+
+def _integer_value_ranges(exact_values, tolerance, type_info):
+    """ The inclusive ranges of the integers, within the range of the 
+    integer type, which are within the tolerance of any of the exact 
+    values; sorted and merged. The bounds are Python integers, so 
+    they are exact beyond 2**53."""
+    value_ranges = []
+    for valuedex in exact_values:
+        if (isinstance(valuedex, float)):
+            if (not math.isfinite(valuedex)):
+                # Neither NaN nor infinity is an integer.
+                continue
+            elif (valuedex.is_integer()):
+                valuedex = int(valuedex)
+        if (math.isinf(tolerance)):
+            lowerdex, upperdex = type_info.min, type_info.max
+        elif (isinstance(valuedex, int)):
+            lowerdex = valuedex - math.floor(tolerance)
+            upperdex = valuedex + math.floor(tolerance)
+        else:
+            lowerdex = math.ceil(valuedex - tolerance)
+            upperdex = math.floor(valuedex + tolerance)
+        lowerdex = max(lowerdex, type_info.min)
+        upperdex = min(upperdex, type_info.max)
+        if (lowerdex <= upperdex):
+            value_ranges.append((lowerdex, upperdex))
+    # Merging the ranges which overlap or touch.
+    merged_ranges = []
+    for lowerdex, upperdex in sorted(value_ranges):
+        if ((len(merged_ranges) > 0) 
+                and (lowerdex <= merged_ranges[-1][1] + 1)):
+            merged_ranges[-1] = (merged_ranges[-1][0], 
+                                 max(merged_ranges[-1][1], upperdex))
+        else:
+            merged_ranges.append((lowerdex, upperdex))
+    return merged_ranges
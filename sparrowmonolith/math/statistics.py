@@ -1,19 +1,65 @@
-
 """
 This module is made for the complete computation of statistical
 results.
+
+The statistics are computed at one of three precision tiers:
+
+- ``float``, the default: Numpy float64 reductions, which sum by
+  pairwise summation. The relative error of a sum is about
+  log2(N) * eps * sum(|x|) / |sum(x)|, where eps = 2**-53 (about
+  1.1e-16); for the mean of data of one sign this is a few times
+  1e-15 for any frame. The standard deviation is found from the
+  deviations from the mean (two passes), so it does not suffer from
+  catastrophic cancellation.
+- ``compensated``: the sums are correctly rounded float64 sums
+  (Shewchuk's algorithm, see `math.fsum`), so the mean is within
+  one unit in the last place and the standard deviation within a
+  few. It is about 50 times slower than ``float``.
+- ``exact``: every value is converted to a Decimal and summed with
+  the precision of the Decimal context (28 significant digits by
+  default). It is about 1000 times slower than ``float``, and is
+  only practical for small arrays.
 """
 
+import math
 import decimal
 import numpy as np
 import copy
 
 import sparrowmonolith as mono
 
+# The precision tiers of the statistics.
+_PRECISION_TIERS = ('float', 'compensated', 'exact')
+
+def _check_precision(precision):
+    """ This checks that the precision tier is one which is known."""
+    if (precision not in _PRECISION_TIERS):
+        raise mono.InputError("The precision `{prec}` is not known; use one "
+                              "of: {tiers}".format(prec=precision,
+                                                   tiers=_PRECISION_TIERS))
+    return None
+
+def _compensated_sum(array, mask=None, function=None):
+    """ This computes the correctly rounded float64 sum of the
+    unmasked values of the array, after the function is applied to
+    them, and the number of values. The values are taken a chunk at a
+    time."""
+    n_values = [0]
+    def float_values():
+        for valuesdex in mono.mask.iterate_unmasked_values(
+                data_array=np.asarray(array), mask=mask):
+            valuesdex = valuesdex.astype(np.float64)
+            if (function is not None):
+                valuesdex = function(valuesdex)
+            n_values[0] = n_values[0] + valuesdex.size
+            yield from valuesdex.tolist()
+    total = math.fsum(float_values())
+    return total, n_values[0]
+
 # Means and averages
 ##########
 
-def arithmetic_mean(array):
+def arithmetic_mean(array, mask=None, precision='float'):
     """ This computes the arithmetic mean of a data array. This is
     mostly a wrapper around the Numpy function. Arbitrary precision
     is supported.
@@ -23,12 +69,41 @@ def arithmetic_mean(array):
     array : array-like
         The array of data that will have its arithmetic mean
         calculated.
+    mask : array-like (optional)
+        If provided, only the values which are not masked (False) 
+        are used. They are taken a chunk at a time, see 
+        mono.mask.iterate_unmasked_values.
+    precision : string (optional)
+        The precision tier, ``float`` (the default),
+        ``compensated``, or ``exact``; see the module.
 
     Returns
     -------
-    result : Decimal
-        The arithmetic mean of the array.
+    result : float or Decimal
+        The arithmetic mean of the array, a Decimal if exact.
     """
+    _check_precision(precision=precision)
+    if (precision == 'float'):
+        result = float(mono.mask.masked_mean(data_array=np.asarray(array),
+                                             mask=mask))
+        return result
+    elif (precision == 'compensated'):
+        summation, N = _compensated_sum(array=array, mask=mask)
+        result = (summation / N) if (N > 0) else np.nan
+        return result
+
+    if (mask is not None):
+        # Summing the unmasked values of every chunk.
+        summation = decimal.Decimal('0')
+        N = 0
+        for valuesdex in mono.mask.iterate_unmasked_values(
+                data_array=np.asarray(array), mask=mask):
+            summation = summation + mono.math.array.float_array_sum(
+                array=mono.object.array.change_dtype(
+                    array=valuesdex, dtype=decimal.Decimal))
+            N = N + int(valuesdex.size)
+        result = summation / N
+        return result
     # Using Decimal will allow for "arbitrary precision", change
     # to using Numpy arrays.
     array = mono.object.array.change_dtype(
@@ -43,7 +118,7 @@ def arithmetic_mean(array):
 mean = arithmetic_mean
 
 
-def median(array):
+def median(array, mask=None, precision='float'):
     """ This returns the median of an array. This is a wrapper 
     around a sort and average function.
 
@@ -57,12 +132,40 @@ def median(array):
     ---------
     array : array-like
         The array of data that will have its median calculated.
+    mask : array-like (optional)
+        If provided, only the values which are not masked (False) 
+        are used. The middle values are found by selection rather 
+        than sorting, see mono.mask.masked_rank_values.
+    precision : string (optional)
+        The precision tier of the average of the two middle values,
+        ``float`` (the default), ``compensated``, or ``exact``; see
+        the module. Only the exact median keeps the type of the
+        middle value.
 
     Returns
     -------
-    result : Decimal
+    result : float or Decimal
         The median of the array.
     """
+    _check_precision(precision=precision)
+    if (precision != 'exact'):
+        # The middle values by selection, and their average, which 
+        # is the same for both of the float tiers.
+        result = float(mono.mask.masked_percentile(
+            data_array=np.asarray(array), percent=50, mask=mask))
+        return result
+
+    if (mask is not None):
+        # The middle values of the unmasked values.
+        array = np.asarray(array)
+        N = mono.mask.masked_count(data_array=array, mask=mask)
+        middle_ranks = sorted({(N - 1) // 2, N // 2})
+        middle_values = list(mono.mask.masked_rank_values(
+            data_array=array, ranks=middle_ranks, mask=mask))
+        if (len(middle_values) == 1):
+            return middle_values[0]
+        else:
+            return arithmetic_mean(array=middle_values, precision='exact')
     # Sort the 'list'.
     sort_array = sorted(np.array(array).flatten())
     # Return the middle result, or the mean of the two results.
@@ -74,7 +177,8 @@ def median(array):
     else:
         # Even, return the average of the middle two.
         index = (N - 1) // 2
-        return arithmetic_mean(array=sort_array[index:index+2])
+        return arithmetic_mean(array=sort_array[index:index+2],
+                               precision='exact')
     # Should not reach here.
     raise mono.BrokenLogicError
     # All done.
@@ -82,7 +186,7 @@ def median(array):
 
 
 # Standard deviation
-def standard_deviation(array, ddof=0):
+def standard_deviation(array, ddof=0, mask=None, precision='float'):
     """ This computes the standard deviation of the array. It is
     a wrapper around np.std. Arbitrary precision is supported.
 
@@ -95,20 +199,60 @@ def standard_deviation(array, ddof=0):
         Means Delta Degrees of Freedom. The divisor used in 
         calculations is N - ddof, where N represents the number of 
         elements. By default ddof is zero.
-
+    mask : array-like (optional)
+        If provided, only the values which are not masked (False) 
+        are used. They are taken a chunk at a time, see 
+        mono.mask.iterate_unmasked_values.
+    precision : string (optional)
+        The precision tier, ``float`` (the default),
+        ``compensated``, or ``exact``; see the module.
 
     Returns
     -------
-    result : float
-        The standard deviation.
+    result : float or Decimal
+        The standard deviation, a Decimal if exact.
     """
+    _check_precision(precision=precision)
+    if (precision == 'float'):
+        result = float(mono.mask.masked_std(data_array=np.asarray(array),
+                                            mask=mask, ddof=ddof))
+        return result
+    elif (precision == 'compensated'):
+        mean = arithmetic_mean(array=array, mask=mask,
+                               precision='compensated')
+        total_of_delta_squared, N = _compensated_sum(
+            array=array, mask=mask,
+            function=lambda values: np.square(values - mean))
+        divisor = N - ddof
+        result = (math.sqrt(total_of_delta_squared / divisor)
+                  if (divisor > 0) else np.nan)
+        return result
+
+    if (mask is not None):
+        # The deviations of the unmasked values of every chunk.
+        mean = arithmetic_mean(array, mask=mask, precision='exact')
+        total_of_delta_squared = decimal.Decimal('0')
+        N = 0
+        for valuesdex in mono.mask.iterate_unmasked_values(
+                data_array=np.asarray(array), mask=mask):
+            valuesdex = mono.object.array.change_dtype(
+                array=valuesdex, dtype=decimal.Decimal)
+            total_of_delta_squared = (
+                total_of_delta_squared 
+                + mono.math.array.float_array_sum(
+                    array=(valuesdex - mean)**2))
+            N = N + int(valuesdex.size)
+        result = decimal.Decimal(total_of_delta_squared 
+                                 / (N - ddof)).sqrt()
+        return result
+
     # Using Decimal will allow for "arbitrary precision", change
     # to using Numpy arrays.
     array = mono.object.array.change_dtype(
         array=array, dtype=decimal.Decimal)
 
     # Calculating the std.
-    mean = arithmetic_mean(array)
+    mean = arithmetic_mean(array, precision='exact')
     total_of_delta_squared = mono.math.array.float_array_sum(
         array=(array - mean)**2)
     divisor = len(array) - ddof
@@ -118,4 +262,238 @@ def standard_deviation(array, ddof=0):
     # All done.
     return result
 # Aliases
-std = standard_deviation
\ No newline at end of file
+std = standard_deviation
+
+
+# Streaming statistics
+##########
+
+class StatisticsAccumulator(object):
+    """ The running statistics of data which is given a chunk at a 
+    time: the count, mean, variance (from the sum of the squared 
+    deviations, M2), minimum, and maximum, and optionally the 
+    skewness and kurtosis (from M3 and M4).
+
+    The moments of every chunk are computed about the chunk's own 
+    mean with Numpy, and combined with those accumulated so far by 
+    the pairwise formulas of Chan et al. and Pebay, so they do not 
+    suffer from the cancellation of the naive sums of powers. The 
+    same formulas merge two accumulators; the statistics of data 
+    split across threads, processes, or files may be accumulated 
+    separately and merged, with the same result (to rounding) as 
+    one accumulator of all of the data. For other processes, see 
+    `to_dict` and `from_dict`.
+
+    As with Numpy, unmasked invalid (NaN) values propagate into the 
+    statistics; mask them first, see mono.mask.mask_invalid_all.
+
+    Parameters
+    ----------
+    higher_moments : boolean (optional)
+        If True, M3 and M4 are also accumulated, so the skewness and
+        kurtosis can be found. Defaults to False, it is faster.
+    """
+
+    def __init__(self, higher_moments=False):
+        self.higher_moments = bool(higher_moments)
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._m3 = 0.0
+        self._m4 = 0.0
+        self._minimum = np.inf
+        self._maximum = -np.inf
+        return None
+
+    def __repr__(self):
+        return ('{name}(count={n}, mean={mean}, std={std})'
+                .format(name=type(self).__name__, n=self.count, 
+                        mean=self.mean, std=self.std()))
+
+    def update(self, array, mask=None, chunk_size=2**20):
+        """ This adds the data of the array to the statistics, a chunk
+        at a time.
+
+        Parameters
+        ----------
+        array : array-like
+            The data which is added.
+        mask : array-like (optional)
+            If provided, only the values which are not masked (False)
+            are added, see mono.mask.iterate_unmasked_values.
+        chunk_size : int (optional)
+            The approximate number of data values in a chunk.
+
+        Returns
+        -------
+        self : StatisticsAccumulator
+            The accumulator itself, updated.
+        """
+        for valuesdex in mono.mask.iterate_unmasked_values(
+                data_array=np.asarray(array), mask=mask, 
+                chunk_size=chunk_size):
+            if (valuesdex.size == 0):
+                continue
+            valuesdex = valuesdex.astype(np.float64, copy=False)
+            chunk_mean = float(np.mean(valuesdex))
+            deviations = valuesdex - chunk_mean
+            squared_deviations = np.square(deviations)
+            chunk_m3 = 0.0
+            chunk_m4 = 0.0
+            if (self.higher_moments):
+                chunk_m3 = float(np.dot(squared_deviations, deviations))
+                chunk_m4 = float(np.dot(squared_deviations, 
+                                        squared_deviations))
+            self._combine(count=int(valuesdex.size), mean=chunk_mean, 
+                          m2=float(np.sum(squared_deviations)), 
+                          m3=chunk_m3, m4=chunk_m4, 
+                          minimum=np.min(valuesdex), 
+                          maximum=np.max(valuesdex))
+        return self
+
+    def merge(self, other):
+        """ This merges the statistics of another accumulator into 
+        this one.
+
+        Parameters
+        ----------
+        other : StatisticsAccumulator
+            The accumulator which is merged, it is not changed. If 
+            this accumulator has higher moments, it must too, unless
+            it is empty.
+
+        Returns
+        -------
+        self : StatisticsAccumulator
+            The accumulator itself, merged.
+        """
+        if (not isinstance(other, StatisticsAccumulator)):
+            raise mono.InputError("Only statistics accumulators can be "
+                                  "merged, not {type}."
+                                  .format(type=type(other)))
+        elif (self.higher_moments and (not other.higher_moments) 
+              and (other.count > 0)):
+            raise mono.InputError("The accumulator being merged does not "
+                                  "have the higher moments of this one.")
+        self._combine(count=other.count, mean=other._mean, m2=other._m2, 
+                      m3=other._m3, m4=other._m4, minimum=other._minimum,
+                      maximum=other._maximum)
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other=other)
+
+    def __add__(self, other):
+        if (not isinstance(other, StatisticsAccumulator)):
+            return NotImplemented
+        # The result has higher moments only if both have them.
+        result = StatisticsAccumulator(
+            higher_moments=(self.higher_moments and other.higher_moments))
+        return result.merge(other=self).merge(other=other)
+
+    def _combine(self, count, mean, m2, m3, m4, minimum, maximum):
+        """ This combines the moments of other data with those of the 
+        accumulator, by the pairwise formulas."""
+        if (count == 0):
+            return None
+        elif (self.count == 0):
+            self.count = count
+            self._mean, self._m2, self._m3, self._m4 = mean, m2, m3, m4
+            self._minimum, self._maximum = minimum, maximum
+            return None
+        n_a = self.count
+        n_b = count
+        n = n_a + n_b
+        delta = mean - self._mean
+        delta_n = delta / n
+        # The higher moments need the lower moments before they are 
+        # combined.
+        if (self.higher_moments):
+            self._m4 = (self._m4 + m4 
+                        + delta * delta_n**3 * n_a * n_b 
+                        * (n_a**2 - n_a * n_b + n_b**2)
+                        + 6 * delta_n**2 * (n_a**2 * m2 + n_b**2 * self._m2)
+                        + 4 * delta_n * (n_a * m3 - n_b * self._m3))
+            self._m3 = (self._m3 + m3 
+                        + delta * delta_n**2 * n_a * n_b * (n_a - n_b)
+                        + 3 * delta_n * (n_a * m2 - n_b * self._m2))
+        self._m2 = self._m2 + m2 + delta * delta_n * n_a * n_b
+        self._mean = self._mean + delta_n * n_b
+        self.count = n
+        self._minimum = np.minimum(self._minimum, minimum)
+        self._maximum = np.maximum(self._maximum, maximum)
+        return None
+
+    @property
+    def mean(self):
+        """ The arithmetic mean, NaN if there is no data."""
+        return float(self._mean) if (self.count > 0) else np.nan
+
+    @property
+    def minimum(self):
+        """ The minimum value, NaN if there is no data."""
+        return float(self._minimum) if (self.count > 0) else np.nan
+
+    @property
+    def maximum(self):
+        """ The maximum value, NaN if there is no data."""
+        return float(self._maximum) if (self.count > 0) else np.nan
+
+    def variance(self, ddof=0):
+        """ The variance, with the divisor N - ddof, NaN if that is 
+        not positive."""
+        divisor = self.count - ddof
+        return (float(self._m2 / divisor) if (divisor > 0) else np.nan)
+
+    def std(self, ddof=0):
+        """ The standard deviation, with the divisor N - ddof, NaN if 
+        that is not positive."""
+        return math.sqrt(self.variance(ddof=ddof))
+
+    @property
+    def skewness(self):
+        """ The (biased) sample skewness, g1, as scipy.stats.skew."""
+        self._check_higher_moments()
+        if ((self.count == 0) or (self._m2 == 0)):
+            return np.nan
+        return float(math.sqrt(self.count) * self._m3 / self._m2**1.5)
+
+    @property
+    def kurtosis(self):
+        """ The (biased) sample excess kurtosis, g2, as 
+        scipy.stats.kurtosis; it is 0 for a normal distribution."""
+        self._check_higher_moments()
+        if ((self.count == 0) or (self._m2 == 0)):
+            return np.nan
+        return float(self.count * self._m4 / self._m2**2 - 3)
+
+    def _check_higher_moments(self):
+        """ This checks that the higher moments are accumulated."""
+        if (not self.higher_moments):
+            raise mono.InputError("The higher moments are not accumulated; "
+                                  "use `higher_moments=True`.")
+        return None
+
+    def to_dict(self):
+        """ The accumulated statistics as a dictionary of numbers, to 
+        be saved or sent to another process; see `from_dict`."""
+        return {'higher_moments': self.higher_moments, 'count': self.count,
+                'mean': float(self._mean), 'm2': float(self._m2), 
+                'm3': float(self._m3), 'm4': float(self._m4), 
+                'minimum': float(self._minimum), 
+                'maximum': float(self._maximum)}
+
+    @classmethod
+    def from_dict(cls, statistics_dictionary):
+        """ The accumulator of the statistics of a dictionary, see 
+        `to_dict`."""
+        accumulator = cls(
+            higher_moments=statistics_dictionary['higher_moments'])
+        accumulator._combine(
+            count=int(statistics_dictionary['count']), 
+            mean=statistics_dictionary['mean'], 
+            m2=statistics_dictionary['m2'], m3=statistics_dictionary['m3'], 
+            m4=statistics_dictionary['m4'], 
+            minimum=statistics_dictionary['minimum'], 
+            maximum=statistics_dictionary['maximum'])
+        return accumulator